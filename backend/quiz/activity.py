@@ -0,0 +1,336 @@
+"""
+日別活動の集計と連続学習日数
+
+QuizResult の作成ごとに、ユーザー・日付（settings.QUIZ_ACTIVITY_TIME_ZONE、デフォルトは Asia/Tokyo）・
+カテゴリごとの集計行（DailyActivity）を1文のF()式で加算し、連続学習日数（UserStreak）を
+最終活動日との比較で更新します。ヒートマップは期間内の集計行のみ、連続学習日数は1行のみを
+参照するため、APIの処理量はユーザーの履歴の長さによりません。
+
+backfill_daily_activity コマンドで QuizResult から集計行をまとめて作り直せます。
+"""
+
+import datetime
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import DailyActivity, QuizResult, UserStreak
+
+logger = logging.getLogger(__name__)
+
+# 日付の区切りに使うタイムゾーンのデフォルト
+DEFAULT_ACTIVITY_TIME_ZONE = 'Asia/Tokyo'
+
+# ヒートマップの期間のデフォルトと上限（日）
+DEFAULT_HEATMAP_DAYS = 365
+MAX_HEATMAP_DAYS = 366
+
+# 作り直しで1チャンクに含めるユーザー数のデフォルト
+DEFAULT_BACKFILL_CHUNK_SIZE = 500
+
+# bulk_update / bulk_create の1文あたりの行数
+BACKFILL_WRITE_BATCH_SIZE = 1000
+
+# 作り直しで書き込むフィールド
+BACKFILL_FIELDS = ['quizzes_completed', 'total_points', 'percentage_sum', 'updated_at']
+
+ONE_DAY = datetime.timedelta(days=1)
+
+
+def get_activity_time_zone() -> ZoneInfo:
+    """日付の区切りに使うタイムゾーンを返します"""
+    return ZoneInfo(getattr(settings, 'QUIZ_ACTIVITY_TIME_ZONE', DEFAULT_ACTIVITY_TIME_ZONE))
+
+
+def activity_date(value: datetime.datetime) -> datetime.date:
+    """日時を集計のタイムゾーンでの日付に変換します"""
+    return timezone.localtime(value, get_activity_time_zone()).date()
+
+
+def activity_today() -> datetime.date:
+    """集計のタイムゾーンでの今日の日付を返します"""
+    return activity_date(timezone.now())
+
+
+def compute_streaks(dates: Iterable[datetime.date]) -> Tuple[int, int, Optional[datetime.date]]:
+    """
+    活動した日付から連続学習日数を計算します。
+
+    Args:
+        dates: 活動した日付（昇順、重複なし）
+
+    Returns:
+        (最終活動日までの連続日数, 最長連続日数, 最終活動日)
+    """
+    current = longest = 0
+    last = None
+    for date in dates:
+        current = current + 1 if last is not None and date == last + ONE_DAY else 1
+        longest = max(longest, current)
+        last = date
+    return current, longest, last
+
+
+def recompute_user_streak(user_id: int) -> UserStreak:
+    """ユーザーの連続学習日数を日別活動から計算し直します"""
+    dates = (
+        DailyActivity.objects.filter(user_id=user_id)
+        .order_by('date').values_list('date', flat=True).distinct()
+    )
+    current, longest, last = compute_streaks(dates)
+    streak, _ = UserStreak.objects.update_or_create(
+        user_id=user_id,
+        defaults={'current_streak': current, 'longest_streak': longest, 'last_active_date': last},
+    )
+    return streak
+
+
+def update_user_streak(user_id: int, date: datetime.date):
+    """
+    活動した日付で連続学習日数を更新します。
+
+    最終活動日より前の日付の結果（後から登録された結果）は途中の空白を埋める可能性があるため、
+    日別活動から計算し直します。
+    """
+    streak, _ = UserStreak.objects.select_for_update().get_or_create(user_id=user_id)
+    last = streak.last_active_date
+    if last is not None and date < last:
+        recompute_user_streak(user_id)
+        return
+    if last == date:
+        return
+
+    streak.current_streak = streak.current_streak + 1 if last == date - ONE_DAY else 1
+    streak.longest_streak = max(streak.longest_streak, streak.current_streak)
+    streak.last_active_date = date
+    streak.save(update_fields=['current_streak', 'longest_streak', 'last_active_date', 'updated_at'])
+
+
+def record_daily_activity(result: QuizResult):
+    """
+    クイズ結果を日別活動と連続学習日数に反映します。
+
+    Args:
+        result: 作成されたクイズ結果
+    """
+    date = activity_date(result.completed_at)
+    category_id = result.quiz.category_id
+    rows = DailyActivity.objects.filter(user_id=result.user_id, date=date, category_id=category_id)
+    increment = {
+        'quizzes_completed': F('quizzes_completed') + 1,
+        'total_points': F('total_points') + result.score,
+        'percentage_sum': F('percentage_sum') + result.percentage,
+    }
+
+    with transaction.atomic():
+        if not rows.update(**increment):
+            try:
+                with transaction.atomic():
+                    DailyActivity.objects.create(
+                        user_id=result.user_id,
+                        date=date,
+                        category_id=category_id,
+                        quizzes_completed=1,
+                        total_points=result.score,
+                        percentage_sum=result.percentage,
+                    )
+            except IntegrityError:
+                # 同時に作成された場合は作成された行に加算する
+                rows.update(**increment)
+        update_user_streak(result.user_id, date)
+
+
+@receiver(post_save, sender=QuizResult)
+def update_daily_activity_on_quiz_result(sender, instance, created, raw=False, **kwargs):
+    """作成されたクイズ結果を日別活動に反映します"""
+    if not created or raw:
+        return
+    record_daily_activity(instance)
+
+
+def get_heatmap(user_id: int, start: datetime.date, end: datetime.date,
+                category_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    期間内の日ごとの活動を返します（活動のない日は含みません）。
+
+    Args:
+        user_id: ユーザーID
+        start: 開始日
+        end: 終了日（この日を含む）
+        category_id: 指定した場合はこのカテゴリのみを集計する
+    """
+    rows = DailyActivity.objects.filter(user_id=user_id, date__gte=start, date__lte=end)
+    if category_id is not None:
+        rows = rows.filter(category_id=category_id)
+    days = rows.values('date').order_by('date').annotate(
+        count=Sum('quizzes_completed'),
+        points=Sum('total_points'),
+        percentage_sum=Sum('percentage_sum'),
+    )
+    return [
+        {
+            'date': day['date'],
+            'count': day['count'],
+            'points': day['points'],
+            'avg_percentage': day['percentage_sum'] / day['count'] if day['count'] else 0.0,
+        }
+        for day in days
+    ]
+
+
+def get_streak(user_id: int, today: Optional[datetime.date] = None) -> Dict[str, Any]:
+    """
+    連続学習日数を返します。
+
+    最終活動日が昨日より前の場合は連続が途切れているため、現在の連続日数は0になります。
+    """
+    today = today or activity_today()
+    streak = UserStreak.objects.filter(user_id=user_id).first()
+    if streak is None or streak.last_active_date is None:
+        return {'current_streak': 0, 'longest_streak': 0, 'last_active_date': None, 'active_today': False}
+
+    last = streak.last_active_date
+    return {
+        'current_streak': streak.current_streak if last >= today - ONE_DAY else 0,
+        'longest_streak': streak.longest_streak,
+        'last_active_date': last,
+        'active_today': last == today,
+    }
+
+
+class BackfillResult:
+    """
+    日別活動の作り直しの結果
+    """
+
+    def __init__(self):
+        self.users = 0
+        self.created = 0
+        self.updated = 0
+        self.deleted = 0
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        """処理時間（秒）"""
+        return (self.finished_at or time.time()) - self.started_at
+
+
+def _day_bounds(since: Optional[datetime.date], until: Optional[datetime.date]) -> Dict[str, datetime.datetime]:
+    """日付の範囲を completed_at の範囲の条件に変換します（until の日を含む）"""
+    tz = get_activity_time_zone()
+    bounds = {}
+    if since:
+        bounds['completed_at__gte'] = datetime.datetime.combine(since, datetime.time.min, tzinfo=tz)
+    if until:
+        bounds['completed_at__lt'] = datetime.datetime.combine(until + ONE_DAY, datetime.time.min, tzinfo=tz)
+    return bounds
+
+
+def backfill_daily_activity_chunk(user_ids: List[int], since: Optional[datetime.date] = None,
+                                  until: Optional[datetime.date] = None, result: Optional[BackfillResult] = None) -> BackfillResult:
+    """
+    1チャンクのユーザーの日別活動を QuizResult から作り直し、連続学習日数を計算し直します。
+
+    Args:
+        user_ids: 対象のユーザーID
+        since: 作り直す期間の開始日
+        until: 作り直す期間の終了日（この日を含む）
+        result: 結果を加算するオブジェクト
+    """
+    result = result or BackfillResult()
+    aggregated = (
+        QuizResult.objects.filter(user_id__in=user_ids, **_day_bounds(since, until))
+        .annotate(day=TruncDate('completed_at', tzinfo=get_activity_time_zone()))
+        .values('user_id', 'day', 'quiz__category_id').order_by()
+        .annotate(count=Count('id'), points=Sum('score'), percentage_sum=Sum('percentage'))
+    )
+
+    scope = DailyActivity.objects.filter(user_id__in=user_ids)
+    if since:
+        scope = scope.filter(date__gte=since)
+    if until:
+        scope = scope.filter(date__lte=until)
+
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {
+            (user_id, date, category_id): pk
+            for pk, user_id, date, category_id in scope.values_list('id', 'user_id', 'date', 'category_id')
+        }
+        to_update, to_create = [], []
+        for row in aggregated:
+            activity = DailyActivity(
+                user_id=row['user_id'],
+                date=row['day'],
+                category_id=row['quiz__category_id'],
+                quizzes_completed=row['count'],
+                total_points=row['points'] or 0,
+                percentage_sum=row['percentage_sum'] or 0.0,
+                updated_at=now,
+            )
+            activity.pk = existing.pop((activity.user_id, activity.date, activity.category_id), None)
+            (to_create if activity.pk is None else to_update).append(activity)
+
+        DailyActivity.objects.bulk_update(to_update, BACKFILL_FIELDS, batch_size=BACKFILL_WRITE_BATCH_SIZE)
+        DailyActivity.objects.bulk_create(to_create, batch_size=BACKFILL_WRITE_BATCH_SIZE)
+        if existing:
+            DailyActivity.objects.filter(pk__in=existing.values()).delete()
+
+        for user_id in user_ids:
+            recompute_user_streak(user_id)
+
+    result.users += len(user_ids)
+    result.created += len(to_create)
+    result.updated += len(to_update)
+    result.deleted += len(existing)
+    return result
+
+
+def backfill_daily_activity(user_ids: Optional[Iterable[int]] = None, since: Optional[datetime.date] = None,
+                            until: Optional[datetime.date] = None,
+                            chunk_size: int = DEFAULT_BACKFILL_CHUNK_SIZE) -> BackfillResult:
+    """
+    QuizResult から日別活動を作り直します。
+
+    Args:
+        user_ids: 対象のユーザーID（省略時は結果または日別活動のある全ユーザー）
+        since: 作り直す期間の開始日
+        until: 作り直す期間の終了日（この日を含む）
+        chunk_size: 1チャンクのユーザー数
+    """
+    results = QuizResult.objects.filter(**_day_bounds(since, until))
+    activities = DailyActivity.objects.all()
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        results = results.filter(user_id__in=user_ids)
+        activities = activities.filter(user_id__in=user_ids)
+    if since:
+        activities = activities.filter(date__gte=since)
+    if until:
+        activities = activities.filter(date__lte=until)
+
+    targets = set(results.order_by().values_list('user_id', flat=True).distinct())
+    targets.update(activities.order_by().values_list('user_id', flat=True).distinct())
+    targets = sorted(targets)
+
+    result = BackfillResult()
+    for start in range(0, len(targets), chunk_size):
+        backfill_daily_activity_chunk(targets[start:start + chunk_size], since, until, result)
+
+    result.finished_at = time.time()
+    logger.info(
+        f"{result.users}人の日別活動を作り直しました（作成: {result.created}件, 更新: {result.updated}件, "
+        f"削除: {result.deleted}件, {result.elapsed:.2f}秒）"
+    )
+    return result
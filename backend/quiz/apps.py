@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class QuizConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "quiz"
+
+    def ready(self):
+        """キャッシュ無効化・統計情報の集計・ランキング・日別活動・正答率分布のシグナルハンドラを登録する"""
+        from . import activity  # noqa: F401
+        from . import cache  # noqa: F401
+        from . import distribution  # noqa: F401
+        from . import leaderboard  # noqa: F401
+        from . import statistics  # noqa: F401
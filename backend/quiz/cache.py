@@ -0,0 +1,320 @@
+"""
+ユーザーごとの統計・活動履歴のキャッシュ
+
+UserStatistics と ActivityHistory はDjangoではなくデータベースのトリガー
+（trigger_update_user_statistics）が更新するため、Djangoのシグナルだけでは変更を検知できません。
+quiz_quizresult / quiz_userstatistics / quiz_activityhistory のトリガーが送る
+NOTIFY（チャンネル quiz_user_cache）を listen_cache_invalidation コマンドで受信し、
+該当ユーザーのキャッシュを無効化します。
+
+キャッシュキーにはユーザーごとのバージョン番号を含め、無効化はバージョン番号の更新のみで行います。
+クエリパラメーターの組み合わせごとのキーを列挙せずに、そのユーザーのキャッシュをまとめて無効化できます。
+キーには全ユーザー共通の世代番号も含め、待ち受けの再接続時には世代番号を更新して全ユーザーの
+キャッシュを無効化します（切断中に送られた通知は失われるため）。
+
+無効化は待ち受けのプロセスから行うため、キャッシュはWebサーバーのプロセスと共有するバックエンド
+（Redisなど）である必要があります。プロセス内のキャッシュ（LocMemCache、settings.CACHES 未設定時の
+デフォルト）では listen_cache_invalidation は起動できません。
+
+全ユーザーで共有するカテゴリ・難易度・クイズの一覧（カタログ）も同じ方式でキャッシュし、
+これらのモデルの保存・削除時にカタログ全体のバージョン番号を更新します。
+"""
+
+import json
+import logging
+import select
+import time
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ActivityHistory, Category, DifficultyLevel, Quiz, QuizResult, UserStatistics
+
+logger = logging.getLogger(__name__)
+
+# トリガーがNOTIFYを送るチャンネル（supabase/migrations で定義）
+CACHE_INVALIDATION_CHANNEL = 'quiz_user_cache'
+
+# キャッシュの有効期間（秒）のデフォルト
+DEFAULT_STATS_CACHE_TIMEOUT = 300
+
+# キャッシュキーの接頭辞
+CACHE_KEY_PREFIX = 'quiz:user'
+
+# カタログのキャッシュの有効期間（秒）のデフォルト
+DEFAULT_CATALOG_CACHE_TIMEOUT = 3600
+
+# カタログのキャッシュキーの接頭辞
+CATALOG_CACHE_KEY_PREFIX = 'quiz:catalog'
+
+# 待ち受けの接続が切断された場合の再接続の間隔（秒、失敗するたびに倍にして最大値まで延ばす）
+RECONNECT_INITIAL_DELAY = 1.0
+RECONNECT_MAX_DELAY = 60.0
+
+
+def get_stats_cache_timeout() -> int:
+    """キャッシュの有効期間（秒）を返します。0の場合はキャッシュしません"""
+    return getattr(settings, 'QUIZ_STATS_CACHE_TIMEOUT', DEFAULT_STATS_CACHE_TIMEOUT)
+
+
+def _version_key(user_id: Any) -> str:
+    return f'{CACHE_KEY_PREFIX}:{user_id}:version'
+
+
+def _generation_key() -> str:
+    return f'{CACHE_KEY_PREFIX}:generation'
+
+
+def get_user_cache_version(user_id: Any) -> int:
+    """ユーザーのキャッシュのバージョン番号を返します"""
+    return cache.get_or_set(_version_key(user_id), 1, timeout=None)
+
+
+def get_user_cache_generation() -> int:
+    """全ユーザー共通のキャッシュの世代番号を返します"""
+    return cache.get_or_set(_generation_key(), 1, timeout=None)
+
+
+def _get_user_cache_versions(user_id: Any):
+    """世代番号とユーザーのバージョン番号を1回の取得で返します（ない場合のみ個別に作成する）"""
+    generation_key, version_key = _generation_key(), _version_key(user_id)
+    values = cache.get_many([generation_key, version_key])
+    generation = values.get(generation_key)
+    if generation is None:
+        generation = get_user_cache_generation()
+    version = values.get(version_key)
+    if version is None:
+        version = get_user_cache_version(user_id)
+    return generation, version
+
+
+def user_cache_key(user_id: Any, name: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    ユーザーごとのキャッシュキーを返します。
+
+    Args:
+        user_id: ユーザーID
+        name: キャッシュの種類（例: 'stats-summary'）
+        params: 結果に影響するクエリパラメーター
+    """
+    suffix = ''
+    if params:
+        suffix = ':' + '&'.join(f'{key}={params[key]}' for key in sorted(params) if params[key] not in (None, ''))
+    generation, version = _get_user_cache_versions(user_id)
+    return f'{CACHE_KEY_PREFIX}:{user_id}:g{generation}:v{version}:{name}{suffix}'
+
+
+def get_or_build_user_cache(user_id: Any, name: str, params: Optional[Dict[str, Any]], builder: Callable[[], Any]) -> Any:
+    """
+    ユーザーごとのキャッシュを返し、なければbuilderで作成して保存します。
+
+    Args:
+        user_id: ユーザーID
+        name: キャッシュの種類
+        params: 結果に影響するクエリパラメーター
+        builder: キャッシュがない場合に値を作成する関数
+
+    Returns:
+        キャッシュされた値
+    """
+    timeout = get_stats_cache_timeout()
+    if not timeout:
+        return builder()
+
+    key = user_cache_key(user_id, name, params)
+    value = cache.get(key)
+    if value is None:
+        value = builder()
+        cache.set(key, value, timeout=timeout)
+    return value
+
+
+def invalidate_user_cache(user_id: Any):
+    """ユーザーのキャッシュをすべて無効化します（バージョン番号を更新する）"""
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # バージョン番号がまだない（キャッシュされていない）か、期限切れで消えている
+        cache.set(key, 2, timeout=None)
+    logger.debug(f"ユーザー {user_id} のキャッシュを無効化しました")
+
+
+def invalidate_all_user_caches():
+    """全ユーザーのキャッシュを無効化します（世代番号を更新する）"""
+    key = _generation_key()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
+    logger.debug("全ユーザーのキャッシュを無効化しました")
+
+
+def handle_invalidation_payload(payload: str) -> Optional[Any]:
+    """
+    トリガーのNOTIFYのペイロード（{"table": ..., "op": ..., "user_id": ...}）を処理します。
+
+    Returns:
+        無効化したユーザーID、ペイロードが不正な場合はNone
+    """
+    try:
+        user_id = json.loads(payload).get('user_id')
+    except (ValueError, AttributeError):
+        logger.warning(f"不正なキャッシュ無効化通知を無視しました: {payload}")
+        return None
+    if user_id is None:
+        return None
+    invalidate_user_cache(user_id)
+    return user_id
+
+
+@receiver(post_save, sender=QuizResult)
+@receiver(post_save, sender=UserStatistics)
+@receiver(post_save, sender=ActivityHistory)
+@receiver(post_delete, sender=QuizResult)
+@receiver(post_delete, sender=UserStatistics)
+@receiver(post_delete, sender=ActivityHistory)
+def invalidate_user_cache_on_change(sender, instance, **kwargs):
+    """Django経由の変更でもキャッシュを無効化します（通知の待ち受けを起動していない環境向け）"""
+    invalidate_user_cache(instance.user_id)
+
+
+def get_catalog_cache_timeout() -> int:
+    """カタログのキャッシュの有効期間（秒）を返します。0の場合はキャッシュしません"""
+    return getattr(settings, 'QUIZ_CATALOG_CACHE_TIMEOUT', DEFAULT_CATALOG_CACHE_TIMEOUT)
+
+
+def _catalog_version_key() -> str:
+    return f'{CATALOG_CACHE_KEY_PREFIX}:version'
+
+
+def get_or_build_catalog_cache(name: str, builder: Callable[[], Any]) -> Any:
+    """
+    全ユーザーで共有するカタログのキャッシュを返し、なければbuilderで作成して保存します。
+
+    Args:
+        name: キャッシュの種類（例: 'active-categories'）
+        builder: キャッシュがない場合に値を作成する関数
+    """
+    timeout = get_catalog_cache_timeout()
+    if not timeout:
+        return builder()
+
+    version = cache.get_or_set(_catalog_version_key(), 1, timeout=None)
+    key = f'{CATALOG_CACHE_KEY_PREFIX}:v{version}:{name}'
+    value = cache.get(key)
+    if value is None:
+        value = builder()
+        cache.set(key, value, timeout=timeout)
+    return value
+
+
+def invalidate_catalog_cache():
+    """カタログのキャッシュをすべて無効化します（バージョン番号を更新する）"""
+    key = _catalog_version_key()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
+    logger.debug("カタログのキャッシュを無効化しました")
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=DifficultyLevel)
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=DifficultyLevel)
+@receiver(post_delete, sender=Quiz)
+def invalidate_catalog_cache_on_change(sender, instance, **kwargs):
+    """カテゴリ・難易度・クイズの変更時にカタログのキャッシュを無効化します"""
+    invalidate_catalog_cache()
+
+
+def _listen(connection):
+    """接続を自動コミットに切り替えてチャンネルの待ち受けを開始します"""
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        cursor.execute(f'LISTEN {CACHE_INVALIDATION_CHANNEL}')
+
+
+def _close_quietly(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+def _reconnect(reconnect: Callable[[], Any], should_stop: Callable[[], bool]) -> Optional[Any]:
+    """
+    間隔を倍にしながら再接続を繰り返し、待ち受けを再開した接続を返します。
+
+    切断中に送られた通知は失われるため、再接続後に全ユーザーのキャッシュを無効化します。
+
+    Returns:
+        新しい接続、再接続の前に終了を指示された場合はNone
+    """
+    delay = RECONNECT_INITIAL_DELAY
+    while not should_stop():
+        time.sleep(delay)
+        connection = None
+        try:
+            connection = reconnect()
+            _listen(connection)
+        except Exception as e:
+            if connection is not None:
+                _close_quietly(connection)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+            logger.warning(f"通知の待ち受けの再接続に失敗しました。{delay:.0f}秒後に再試行します: {str(e)}")
+            continue
+        invalidate_all_user_caches()
+        logger.info("通知の待ち受けを再開しました。切断中の通知が失われた可能性があるため、全ユーザーのキャッシュを無効化しました")
+        return connection
+    return None
+
+
+def listen_for_invalidations(connection, should_stop: Callable[[], bool] = lambda: False,
+                             timeout: float = 5.0, on_invalidate: Optional[Callable[[Any], None]] = None,
+                             reconnect: Optional[Callable[[], Any]] = None):
+    """
+    psycopg2の接続でNOTIFYを待ち受け、受信するたびに該当ユーザーのキャッシュを無効化します。
+
+    Args:
+        connection: psycopg2の接続（自動コミットに切り替えて使用する）
+        should_stop: Trueを返すと待ち受けを終了する関数（timeout秒ごとに確認する）
+        timeout: 通知を待つ最大秒数
+        on_invalidate: 無効化したユーザーIDごとに呼ばれるコールバック
+        reconnect: 新しい接続を返す関数。指定した場合は接続の切断時に再接続し（間隔は
+                   RECONNECT_INITIAL_DELAY から RECONNECT_MAX_DELAY まで倍にする）、全ユーザーの
+                   キャッシュを無効化して待ち受けを続ける。省略時は切断の例外をそのまま送出する
+    """
+    original = connection
+    _listen(connection)
+    logger.info(f"チャンネル {CACHE_INVALIDATION_CHANNEL} の通知の待ち受けを開始しました")
+
+    try:
+        while not should_stop():
+            try:
+                if select.select([connection], [], [], timeout) == ([], [], []):
+                    continue
+                connection.poll()
+            except Exception as e:
+                if reconnect is None:
+                    raise
+                logger.warning(f"通知の待ち受けの接続が切断されました。再接続します: {str(e)}")
+                _close_quietly(connection)
+                connection = _reconnect(reconnect, should_stop)
+                if connection is None:
+                    return
+                continue
+            while connection.notifies:
+                notify = connection.notifies.pop(0)
+                user_id = handle_invalidation_payload(notify.payload)
+                if user_id is not None and on_invalidate:
+                    on_invalidate(user_id)
+    finally:
+        # 再接続で作成した接続はここで閉じる（最初の接続は呼び出し元が閉じる）
+        if connection is not None and connection is not original:
+            _close_quietly(connection)
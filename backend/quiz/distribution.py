@@ -0,0 +1,247 @@
+"""
+クイズ別の正答率分布とパーセンタイル
+
+クイズごとの正答率を BUCKET_WIDTH 刻みの固定の区間に分け、区間ごとの件数（QuizScoreBucket）を
+QuizResult の作成ごとに1文のF()式で加算します。パーセンタイル順位はクイズの区間の件数
+（最大 BUCKET_COUNT 行）のみから計算するため、結果の件数によらず O(区間数) です。
+
+rebuild_score_distributions コマンドで QuizResult から分布をまとめて作り直せます。
+作り直しはクイズごとに1トランザクションで、区間の行をロックしてから結果を読み込み、件数を置き換えるため、
+作り直し中に作成された結果の加算は失われません。ただし二重計上を防げるのは、QuizResult の作成と加算
+（post_save）が同じトランザクションで行われる場合のみです（QuizResultViewSet.perform_create）。
+トランザクション外（自動コミット）で作成すると、作成のコミットから加算までの間に作り直しが結果を
+読み込んだ場合に、その区間が1件多くなります。そのような経路がある場合は定期的に作り直してください。
+結果はチャンクごとに集計するため、メモリ使用量は結果の件数によりません。NumPyがインストールされていれば
+NumPyで集計します。
+"""
+
+import logging
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import QuizResult, QuizScoreBucket
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPyがない環境では標準ライブラリで集計する
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# 区間の数と幅（正答率 0〜100% を1%刻み、100%は最後の区間に含める）
+BUCKET_COUNT = 100
+BUCKET_WIDTH = 100.0 / BUCKET_COUNT
+
+# 作り直しで1回に読み込む結果の件数
+REBUILD_READ_CHUNK_SIZE = 10000
+
+# bulk_update / bulk_create の1文あたりの行数
+REBUILD_WRITE_BATCH_SIZE = 1000
+
+# 作り直し中に同じ区間の行が同時に作成された場合に、クイズの作り直しを再試行する回数
+REBUILD_RETRY_COUNT = 2
+
+
+def bucket_for(percentage: float) -> int:
+    """正答率が含まれる区間番号を返します"""
+    return min(max(int(percentage // BUCKET_WIDTH), 0), BUCKET_COUNT - 1)
+
+
+def record_score(quiz_id: int, percentage: float):
+    """
+    クイズの分布の該当する区間の件数を加算します。
+
+    作り直しとの二重計上を防ぐため、QuizResult の作成と同じトランザクションで呼び出してください。
+    """
+    bucket = bucket_for(percentage)
+    rows = QuizScoreBucket.objects.filter(quiz_id=quiz_id, bucket=bucket)
+    if rows.update(count=F('count') + 1):
+        return
+    try:
+        with transaction.atomic():
+            QuizScoreBucket.objects.create(quiz_id=quiz_id, bucket=bucket, count=1)
+    except IntegrityError:
+        # 同時に作成された場合は作成された行に加算する
+        rows.update(count=F('count') + 1)
+
+
+@receiver(post_save, sender=QuizResult)
+def update_distribution_on_quiz_result(sender, instance, created, raw=False, **kwargs):
+    """作成されたクイズ結果を正答率分布に反映します"""
+    if not created or raw:
+        return
+    record_score(instance.quiz_id, instance.percentage)
+
+
+def get_bucket_counts(quiz_id: int) -> List[int]:
+    """クイズの区間ごとの件数を返します（長さ BUCKET_COUNT）"""
+    counts = [0] * BUCKET_COUNT
+    for bucket, count in QuizScoreBucket.objects.filter(quiz_id=quiz_id).values_list('bucket', 'count'):
+        counts[bucket] = count
+    return counts
+
+
+def get_bucket_counts_for_quizzes(quiz_ids: Iterable[int]) -> Dict[int, List[int]]:
+    """複数のクイズの区間ごとの件数を1回のクエリで返します（クイズIDごと、長さ BUCKET_COUNT）"""
+    distributions = {quiz_id: [0] * BUCKET_COUNT for quiz_id in quiz_ids}
+    rows = QuizScoreBucket.objects.filter(quiz_id__in=list(distributions)).values_list('quiz_id', 'bucket', 'count')
+    for quiz_id, bucket, count in rows:
+        distributions[quiz_id][bucket] = count
+    return distributions
+
+
+def percentile_rank(counts: List[int], percentage: float) -> Optional[float]:
+    """
+    区間ごとの件数から正答率のパーセンタイル順位（0〜100）を計算します。
+
+    下の区間の件数と同じ区間の件数の半分を、全体の件数で割った値です。
+    結果がない場合はNoneを返します。
+    """
+    total = sum(counts)
+    if not total:
+        return None
+    bucket = bucket_for(percentage)
+    below = sum(counts[:bucket])
+    return round((below + counts[bucket] / 2) / total * 100, 1)
+
+
+def get_percentile_rank(quiz_id: int, percentage: float) -> Optional[float]:
+    """クイズでの正答率のパーセンタイル順位を返します"""
+    return percentile_rank(get_bucket_counts(quiz_id), percentage)
+
+
+def get_distribution(quiz_id: int, counts: Optional[List[int]] = None) -> Dict[str, Any]:
+    """クイズの正答率分布を返します"""
+    counts = counts if counts is not None else get_bucket_counts(quiz_id)
+    return {
+        'quiz': quiz_id,
+        'total': sum(counts),
+        'bucket_width': BUCKET_WIDTH,
+        'counts': counts,
+    }
+
+
+def add_bucket_counts(counts: List[int], percentages: List[float]):
+    """
+    正答率の列の区間ごとの件数を counts（長さ BUCKET_COUNT）に加算します。
+
+    Args:
+        counts: 加算先の区間ごとの件数
+        percentages: 1チャンク分の正答率
+    """
+    if not percentages:
+        return
+
+    if np is None:
+        for bucket, count in Counter(bucket_for(p) for p in percentages).items():
+            counts[bucket] += count
+        return
+
+    buckets = np.clip(np.floor_divide(np.asarray(percentages, dtype=np.float64), BUCKET_WIDTH).astype(np.int64),
+                      0, BUCKET_COUNT - 1)
+    for bucket, count in enumerate(np.bincount(buckets, minlength=BUCKET_COUNT).tolist()):
+        counts[bucket] += count
+
+
+def compute_quiz_bucket_counts(quiz_id: int) -> List[int]:
+    """
+    クイズの区間ごとの件数を QuizResult から計算します（結果はチャンクごとに集計します）。
+
+    Returns:
+        区間ごとの件数（長さ BUCKET_COUNT）
+    """
+    counts = [0] * BUCKET_COUNT
+    chunk: List[float] = []
+    percentages = (
+        QuizResult.objects.filter(quiz_id=quiz_id).order_by()
+        .values_list('percentage', flat=True).iterator(chunk_size=REBUILD_READ_CHUNK_SIZE)
+    )
+    for percentage in percentages:
+        chunk.append(percentage)
+        if len(chunk) >= REBUILD_READ_CHUNK_SIZE:
+            add_bucket_counts(counts, chunk)
+            chunk = []
+    add_bucket_counts(counts, chunk)
+    return counts
+
+
+def rebuild_quiz_distribution(quiz_id: int) -> int:
+    """
+    1クイズの正答率分布を QuizResult から作り直します。
+
+    区間の行を select_for_update でロックしてから結果を読み込むため、作り直し中の record_score は
+    作り直しのコミット後に加算されます。結果の作成と record_score が同じトランザクションであれば、
+    結果は作り直しの集計か加算のどちらか一方にのみ含まれます。自動コミットで作成された結果は、
+    作成のコミット後・加算前に読み込まれると二重に計上されます（+1のずれ。次回の作り直しで解消する）。
+    行は削除せずに件数を更新し、件数が0になった区間の行のみ削除します。
+
+    Returns:
+        集計した結果の件数
+    """
+    for attempt in range(REBUILD_RETRY_COUNT + 1):
+        try:
+            with transaction.atomic():
+                existing = {
+                    row.bucket: row
+                    for row in QuizScoreBucket.objects.select_for_update().filter(quiz_id=quiz_id)
+                }
+                counts = compute_quiz_bucket_counts(quiz_id)
+
+                to_update, to_create, to_delete = [], [], []
+                for bucket, count in enumerate(counts):
+                    row = existing.pop(bucket, None)
+                    if row is None:
+                        if count:
+                            to_create.append(QuizScoreBucket(quiz_id=quiz_id, bucket=bucket, count=count))
+                    elif not count:
+                        to_delete.append(row.pk)
+                    elif row.count != count:
+                        row.count = count
+                        to_update.append(row)
+                to_delete.extend(row.pk for row in existing.values())
+
+                QuizScoreBucket.objects.bulk_update(to_update, ['count'], batch_size=REBUILD_WRITE_BATCH_SIZE)
+                QuizScoreBucket.objects.bulk_create(to_create, batch_size=REBUILD_WRITE_BATCH_SIZE)
+                if to_delete:
+                    QuizScoreBucket.objects.filter(pk__in=to_delete).delete()
+            return sum(counts)
+        except IntegrityError:
+            # ロック後に record_score が新しい区間の行を作成した場合は、その行も含めて作り直す
+            if attempt == REBUILD_RETRY_COUNT:
+                raise
+            logger.info(f"クイズ {quiz_id} の区間の行が同時に作成されたため、作り直しを再試行します")
+
+
+def rebuild_score_distributions(quiz_ids: Optional[Iterable[int]] = None) -> Dict[str, Any]:
+    """
+    QuizResult から正答率分布をクイズごとに作り直します。
+
+    Args:
+        quiz_ids: 対象のクイズID（省略時は結果または分布のある全クイズ）
+
+    Returns:
+        作り直したクイズ数・結果の件数・処理時間
+    """
+    started_at = time.time()
+    if quiz_ids is None:
+        targets = set(QuizResult.objects.order_by().values_list('quiz_id', flat=True).distinct())
+        targets.update(QuizScoreBucket.objects.order_by().values_list('quiz_id', flat=True).distinct())
+    else:
+        targets = set(quiz_ids)
+
+    results = 0
+    for quiz_id in sorted(targets):
+        results += rebuild_quiz_distribution(quiz_id)
+
+    summary = {'quizzes': len(targets), 'results': results, 'elapsed': time.time() - started_at}
+    logger.info(
+        f"{summary['quizzes']}件のクイズの正答率分布を作り直しました"
+        f"（結果: {summary['results']}件, {summary['elapsed']:.2f}秒）"
+    )
+    return summary
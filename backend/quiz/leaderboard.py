@@ -0,0 +1,285 @@
+"""
+ランキング（リーダーボード）
+
+全体・カテゴリ別・難易度別の合計ポイントのランキングを、Redisのソート済みセットで管理します。
+QuizResult の作成（コミット）ごとに該当するランキングへスコアを加算し（ZINCRBY）、
+rebuild_leaderboards コマンドで定期的に UserStatistics から作り直します。
+上位N件（ZREVRANGE）と自分の順位（ZREVRANK）はいずれも O(log n) で、
+リクエストごとに統計情報テーブル全体を並べ替えることはありません。
+
+settings.QUIZ_LEADERBOARD_BACKEND:
+    'redis': settings.QUIZ_LEADERBOARD_REDIS_URL のRedisを使用する（本番環境）
+    'memory': プロセス内のメモリを使用する（ローカル開発・テスト用、プロセス間で共有されない）
+"""
+
+import bisect
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import QuizResult, UserStatistics
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redisは本番環境のみ
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_BACKEND_REDIS = 'redis'
+LEADERBOARD_BACKEND_MEMORY = 'memory'
+LEADERBOARD_BACKENDS = (LEADERBOARD_BACKEND_REDIS, LEADERBOARD_BACKEND_MEMORY)
+
+# ランキングの種類
+SCOPE_GLOBAL = 'global'
+SCOPE_CATEGORY = 'category'
+SCOPE_DIFFICULTY = 'difficulty'
+
+# ランキングのキーの接頭辞
+LEADERBOARD_KEY_PREFIX = 'quiz:leaderboard'
+
+# 上位N件のデフォルトと上限
+DEFAULT_LEADERBOARD_LIMIT = 10
+MAX_LEADERBOARD_LIMIT = 100
+
+# 作り直しで1回のZADDに含める件数
+REBUILD_BATCH_SIZE = 1000
+
+
+def leaderboard_key(scope: str = SCOPE_GLOBAL, scope_id: Optional[int] = None) -> str:
+    """ランキングのキーを返します（例: quiz:leaderboard:category:3）"""
+    if scope == SCOPE_GLOBAL:
+        return f'{LEADERBOARD_KEY_PREFIX}:{SCOPE_GLOBAL}'
+    return f'{LEADERBOARD_KEY_PREFIX}:{scope}:{scope_id}'
+
+
+def get_result_keys(category_id: Optional[int], difficulty_id: Optional[int]) -> List[str]:
+    """クイズ結果が加算されるランキングのキーを返します"""
+    keys = [leaderboard_key()]
+    if category_id is not None:
+        keys.append(leaderboard_key(SCOPE_CATEGORY, category_id))
+    if difficulty_id is not None:
+        keys.append(leaderboard_key(SCOPE_DIFFICULTY, difficulty_id))
+    return keys
+
+
+class LeaderboardBackend:
+    """
+    ランキングの保存先の基底クラス
+    """
+
+    def increment(self, keys: Iterable[str], user_id: int, points: int):
+        """各ランキングのユーザーのポイントを加算します"""
+        raise NotImplementedError
+
+    def top(self, key: str, limit: int) -> List[Tuple[int, int]]:
+        """上位limit件の (user_id, points) をポイントの降順で返します"""
+        raise NotImplementedError
+
+    def rank(self, key: str, user_id: int) -> Optional[Tuple[int, int]]:
+        """ユーザーの (順位（1始まり）, points) を返します。ランキングにいない場合はNone"""
+        raise NotImplementedError
+
+    def count(self, key: str) -> int:
+        """ランキングの人数を返します"""
+        raise NotImplementedError
+
+    def replace(self, boards: Dict[str, Dict[int, int]]):
+        """すべてのランキングを置き換えます（boardsにないランキングは削除します）"""
+        raise NotImplementedError
+
+
+class RedisLeaderboardBackend(LeaderboardBackend):
+    """
+    Redisのソート済みセットによるランキング
+    """
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise ImproperlyConfigured("QUIZ_LEADERBOARD_BACKEND='redis' にはredisパッケージが必要です")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+
+    def increment(self, keys, user_id, points):
+        pipeline = self.client.pipeline()
+        for key in keys:
+            pipeline.zincrby(key, points, user_id)
+        pipeline.execute()
+
+    def top(self, key, limit):
+        return [(int(member), int(score)) for member, score in self.client.zrevrange(key, 0, limit - 1, withscores=True)]
+
+    def rank(self, key, user_id):
+        pipeline = self.client.pipeline(transaction=False)
+        pipeline.zrevrank(key, user_id)
+        pipeline.zscore(key, user_id)
+        position, score = pipeline.execute()
+        if position is None:
+            return None
+        return position + 1, int(score)
+
+    def count(self, key):
+        return self.client.zcard(key)
+
+    def replace(self, boards):
+        # 一時キーに作成してからRENAMEし、作り直し中も古いランキングを返す
+        pipeline = self.client.pipeline()
+        for key, scores in boards.items():
+            temporary = f'{key}:rebuild'
+            pipeline.delete(temporary)
+            items = list(scores.items())
+            for start in range(0, len(items), REBUILD_BATCH_SIZE):
+                pipeline.zadd(temporary, dict(items[start:start + REBUILD_BATCH_SIZE]))
+            pipeline.rename(temporary, key)
+        stale = set(self.client.scan_iter(match=f'{LEADERBOARD_KEY_PREFIX}:*')) - set(boards)
+        if stale:
+            pipeline.delete(*stale)
+        pipeline.execute()
+
+
+class InMemoryLeaderboardBackend(LeaderboardBackend):
+    """
+    プロセス内のメモリによるランキング（ローカル開発・テスト用）
+
+    (-points, user_id) の昇順のリストを二分探索で維持します。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scores: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._orders: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+
+    def _set(self, key, user_id, points):
+        scores, order = self._scores[key], self._orders[key]
+        if user_id in scores:
+            del order[bisect.bisect_left(order, (-scores[user_id], user_id))]
+        scores[user_id] = points
+        bisect.insort(order, (-points, user_id))
+
+    def increment(self, keys, user_id, points):
+        with self._lock:
+            for key in keys:
+                self._set(key, user_id, self._scores[key].get(user_id, 0) + points)
+
+    def top(self, key, limit):
+        with self._lock:
+            return [(user_id, -points) for points, user_id in self._orders.get(key, [])[:limit]]
+
+    def rank(self, key, user_id):
+        with self._lock:
+            scores = self._scores.get(key, {})
+            if user_id not in scores:
+                return None
+            points = scores[user_id]
+            return bisect.bisect_left(self._orders[key], (-points, user_id)) + 1, points
+
+    def count(self, key):
+        with self._lock:
+            return len(self._scores.get(key, {}))
+
+    def replace(self, boards):
+        with self._lock:
+            self._scores.clear()
+            self._orders.clear()
+            for key, scores in boards.items():
+                self._scores[key] = dict(scores)
+                self._orders[key] = sorted((-points, user_id) for user_id, points in scores.items())
+
+
+_leaderboard: Optional[LeaderboardBackend] = None
+
+
+def get_leaderboard() -> LeaderboardBackend:
+    """設定に応じたランキングの保存先を返します（プロセス内で共有します）"""
+    global _leaderboard
+    if _leaderboard is None:
+        backend = getattr(settings, 'QUIZ_LEADERBOARD_BACKEND', LEADERBOARD_BACKEND_MEMORY)
+        if backend == LEADERBOARD_BACKEND_REDIS:
+            _leaderboard = RedisLeaderboardBackend(settings.QUIZ_LEADERBOARD_REDIS_URL)
+        elif backend == LEADERBOARD_BACKEND_MEMORY:
+            _leaderboard = InMemoryLeaderboardBackend()
+        else:
+            raise ImproperlyConfigured(
+                f"不明なランキングの保存先です: {backend}（{', '.join(LEADERBOARD_BACKENDS)} のいずれか）"
+            )
+    return _leaderboard
+
+
+def reset_leaderboard():
+    """ランキングの保存先を破棄します（設定の変更後やテストで使用）"""
+    global _leaderboard
+    _leaderboard = None
+
+
+def get_top(scope: str = SCOPE_GLOBAL, scope_id: Optional[int] = None,
+            limit: int = DEFAULT_LEADERBOARD_LIMIT) -> List[Tuple[int, int]]:
+    """ランキングの上位 (user_id, points) を返します"""
+    return get_leaderboard().top(leaderboard_key(scope, scope_id), min(max(limit, 1), MAX_LEADERBOARD_LIMIT))
+
+
+def get_user_rank(user_id: int, scope: str = SCOPE_GLOBAL, scope_id: Optional[int] = None) -> Optional[Tuple[int, int]]:
+    """ユーザーの (順位, points) を返します。ランキングにいない場合はNone"""
+    return get_leaderboard().rank(leaderboard_key(scope, scope_id), user_id)
+
+
+def get_leaderboard_size(scope: str = SCOPE_GLOBAL, scope_id: Optional[int] = None) -> int:
+    """ランキングの人数を返します"""
+    return get_leaderboard().count(leaderboard_key(scope, scope_id))
+
+
+def record_quiz_result(user_id: int, category_id: Optional[int], difficulty_id: Optional[int], points: int):
+    """
+    クイズ結果のポイントをランキングに加算します。
+
+    ランキングの更新に失敗してもクイズ結果の保存は失敗させず、次回の作り直しで反映します。
+    """
+    try:
+        get_leaderboard().increment(get_result_keys(category_id, difficulty_id), user_id, points)
+    except Exception as e:
+        logger.warning(f"ランキングの更新に失敗しました（ユーザー {user_id}）: {str(e)}")
+
+
+@receiver(post_save, sender=QuizResult)
+def update_leaderboard_on_quiz_result(sender, instance, created, raw=False, **kwargs):
+    """作成されたクイズ結果をコミット後にランキングへ加算します"""
+    if not created or raw:
+        return
+    quiz = instance.quiz
+    transaction.on_commit(lambda: record_quiz_result(
+        instance.user_id, quiz.category_id, quiz.difficulty_id, instance.score,
+    ))
+
+
+def rebuild_leaderboards() -> Dict[str, int]:
+    """
+    UserStatistics の全体・カテゴリ別・難易度別の行からすべてのランキングを作り直します。
+
+    作り直しの途中にコミットされた結果の加算は上書きされることがありますが、次回の作り直しで反映されます。
+
+    Returns:
+        ランキングのキーごとの人数
+    """
+    boards: Dict[str, Dict[int, int]] = defaultdict(dict)
+    rows = UserStatistics.objects.filter(
+        Q(category__isnull=True) | Q(difficulty__isnull=True)
+    ).values_list('user_id', 'category_id', 'difficulty_id', 'total_points')
+
+    for user_id, category_id, difficulty_id, points in rows.iterator(chunk_size=REBUILD_BATCH_SIZE):
+        if category_id is None and difficulty_id is None:
+            key = leaderboard_key()
+        elif difficulty_id is None:
+            key = leaderboard_key(SCOPE_CATEGORY, category_id)
+        else:
+            key = leaderboard_key(SCOPE_DIFFICULTY, difficulty_id)
+        boards[key][user_id] = points
+
+    get_leaderboard().replace(boards)
+    logger.info(f"{len(boards)}件のランキングを作り直しました")
+    return {key: len(scores) for key, scores in boards.items()}
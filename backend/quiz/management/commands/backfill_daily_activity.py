@@ -0,0 +1,76 @@
+"""
+日別活動の作り直しコマンド
+
+このコマンドは QuizResult から日別活動（DailyActivity）をまとめて作り直し、連続学習日数を計算し直します。
+日別活動の導入前の結果の取り込みや、データのインポート後に使用します。
+ユーザーのチャンクごとに (ユーザー, 日付, カテゴリ) で集計し、まとめて書き込みます。
+
+使用例:
+    python manage.py backfill_daily_activity                                   # 全ユーザーを作り直す
+    python manage.py backfill_daily_activity --user=12                         # 特定ユーザーのみ作り直す
+    python manage.py backfill_daily_activity --since=2026-10-01 --until=2026-10-31  # 期間内の日付のみ作り直す
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from quiz.activity import DEFAULT_BACKFILL_CHUNK_SIZE, backfill_daily_activity
+
+
+class Command(BaseCommand):
+    help = 'QuizResultから日別活動と連続学習日数を作り直します'
+
+    def add_arguments(self, parser):
+        """コマンドライン引数の設定"""
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='作り直すユーザーID（複数指定可）',
+        )
+        parser.add_argument(
+            '--since',
+            dest='since',
+            help='作り直す期間の開始日（YYYY-MM-DD）',
+        )
+        parser.add_argument(
+            '--until',
+            dest='until',
+            help='作り直す期間の終了日（YYYY-MM-DD、この日を含む）',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            dest='chunk_size',
+            default=DEFAULT_BACKFILL_CHUNK_SIZE,
+            help=f'1チャンクのユーザー数（デフォルト: {DEFAULT_BACKFILL_CHUNK_SIZE}）',
+        )
+
+    def handle(self, *args, **options):
+        """コマンド実行時のメイン処理"""
+        since = self._parse_date(options.get('since'))
+        until = self._parse_date(options.get('until'))
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size には1以上を指定してください。')
+
+        result = backfill_daily_activity(
+            user_ids=options.get('user_ids'),
+            since=since,
+            until=until,
+            chunk_size=options['chunk_size'],
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.users}人の日別活動を作り直しました（作成: {result.created}件, 更新: {result.updated}件, '
+            f'削除: {result.deleted}件, {result.elapsed:.2f}秒）'
+        ))
+
+    def _parse_date(self, value):
+        """日付の引数を変換する"""
+        if not value:
+            return None
+        parsed = parse_date(value)
+        if parsed is None:
+            raise CommandError(f'日付として解釈できません: {value}（YYYY-MM-DD形式で指定してください）')
+        return parsed
@@ -0,0 +1,88 @@
+"""
+キャッシュ無効化通知の待ち受けコマンド
+
+このコマンドは quiz_quizresult / quiz_userstatistics / quiz_activityhistory のトリガーが送る
+NOTIFY（チャンネル quiz_user_cache）を待ち受け、該当ユーザーの統計・活動履歴のキャッシュを無効化します。
+settings.SUPABASE_DB_URL が設定されていればSupabaseのデータベースに、なければDjangoのデフォルトの
+データベース（PostgreSQLのみ）に接続します。接続が切断された場合は間隔を延ばしながら再接続し、
+切断中の通知は失われるため全ユーザーのキャッシュを無効化します。Ctrl+Cで終了します。
+
+キャッシュはWebサーバーのプロセスと共有するバックエンド（Redisなど）である必要があり、
+プロセス内のキャッシュ（LocMemCache / DummyCache）では起動できません。
+
+使用例:
+    python manage.py listen_cache_invalidation                  # 通知を待ち受ける
+    python manage.py listen_cache_invalidation --timeout=10     # 10秒ごとに接続を確認する
+    python manage.py listen_cache_invalidation -v 2             # 無効化したユーザーIDを表示する
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from quiz.cache import CACHE_INVALIDATION_CHANNEL, listen_for_invalidations
+
+# 通知を待つ最大秒数のデフォルト
+DEFAULT_LISTEN_TIMEOUT = 5.0
+
+
+class Command(BaseCommand):
+    help = 'トリガーのNOTIFYを待ち受け、ユーザーごとのキャッシュを無効化します'
+
+    def add_arguments(self, parser):
+        """コマンドライン引数の設定"""
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            dest='timeout',
+            default=DEFAULT_LISTEN_TIMEOUT,
+            help=f'通知を待つ最大秒数（デフォルト: {DEFAULT_LISTEN_TIMEOUT}）',
+        )
+
+    def handle(self, *args, **options):
+        """コマンド実行時のメイン処理"""
+        if isinstance(caches['default'], (LocMemCache, DummyCache)):
+            # 無効化はこのプロセスのキャッシュにしか反映されず、Webサーバーのキャッシュが古いまま残る
+            raise CommandError(
+                'キャッシュの無効化には、Webサーバーと共有するキャッシュ（Redisなど）を settings.CACHES に'
+                '設定してください（プロセス内のキャッシュでは無効化が反映されません）'
+            )
+        connection = self._connect()
+        verbosity = options['verbosity']
+
+        def on_invalidate(user_id):
+            if verbosity >= 2:
+                self.stdout.write(f"ユーザー {user_id} のキャッシュを無効化しました")
+
+        self.stdout.write(f"チャンネル {CACHE_INVALIDATION_CHANNEL} の通知を待ち受けています（Ctrl+Cで終了）")
+        try:
+            listen_for_invalidations(
+                connection, timeout=options['timeout'], on_invalidate=on_invalidate, reconnect=self._connect,
+            )
+        except KeyboardInterrupt:
+            self.stdout.write("待ち受けを終了しました")
+        finally:
+            connection.close()
+
+    def _connect(self):
+        """通知を待ち受けるpsycopg2の接続を作成します"""
+        if getattr(settings, 'SUPABASE_DB_URL', None):
+            from techskillsquiz.supabase_backends import connect_supabase_database
+            from techskillsquiz.supabase_sync import SupabaseConnectionError
+
+            try:
+                return connect_supabase_database(application_name='django-cache-invalidation')
+            except SupabaseConnectionError as e:
+                raise CommandError(str(e))
+
+        connection = connections['default']
+        if connection.vendor != 'postgresql':
+            raise CommandError('通知の待ち受けにはPostgreSQLのデータベースが必要です（SUPABASE_DB_URLを設定してください）')
+        try:
+            import psycopg2
+        except ImportError:
+            raise CommandError('通知の待ち受けにはpsycopg2が必要です')
+        return psycopg2.connect(**connection.get_connection_params())
@@ -0,0 +1,69 @@
+"""
+ランキング作り直しコマンド
+
+このコマンドは UserStatistics の全体・カテゴリ別・難易度別の行から、すべてのランキングを作り直します。
+ランキングはクイズ結果ごとに加算されますが、加算に失敗した場合やトリガーによる統計情報の修正を
+反映するため、定期的に実行してください（--watch で常駐させるか、cronなどから実行します）。
+
+使用例:
+    python manage.py rebuild_leaderboards                      # 1回作り直す
+    python manage.py rebuild_leaderboards --watch              # 300秒間隔で作り直し続ける
+    python manage.py rebuild_leaderboards --watch --interval=60
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from quiz.leaderboard import rebuild_leaderboards
+
+# --watch の作り直しの間隔（秒）のデフォルト
+DEFAULT_REBUILD_INTERVAL = 300.0
+
+
+class Command(BaseCommand):
+    help = 'UserStatisticsからランキングを作り直します'
+
+    def add_arguments(self, parser):
+        """コマンドライン引数の設定"""
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            dest='watch',
+            default=False,
+            help='終了せずに一定間隔で作り直しを繰り返します',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            dest='interval',
+            default=DEFAULT_REBUILD_INTERVAL,
+            help=f'--watch の作り直しの間隔（秒、デフォルト: {DEFAULT_REBUILD_INTERVAL}）',
+        )
+
+    def handle(self, *args, **options):
+        """コマンド実行時のメイン処理"""
+        if not options['watch']:
+            self._rebuild()
+            return
+
+        interval = max(1.0, options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'{interval}秒間隔で作り直しを開始します（Ctrl+Cで終了）'))
+        try:
+            while True:
+                try:
+                    self._rebuild()
+                except Exception as e:
+                    self.stderr.write(self.style.ERROR(f' ✗ ランキングの作り直しに失敗しました: {str(e)}'))
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\n作り直しを終了しました。'))
+
+    def _rebuild(self):
+        """ランキングを1回作り直します"""
+        started_at = time.time()
+        sizes = rebuild_leaderboards()
+        self.stdout.write(
+            f' - {len(sizes)}件のランキングを作り直しました'
+            f'（{sum(sizes.values())}件, {time.time() - started_at:.2f}秒）'
+        )
@@ -0,0 +1,37 @@
+"""
+正答率分布の作り直しコマンド
+
+このコマンドは QuizResult からクイズごとの正答率分布（QuizScoreBucket）をまとめて作り直します。
+正答率分布の導入前の結果の取り込みや、データのインポート後に使用します。
+NumPyがインストールされていればNumPyで集計します。
+
+使用例:
+    python manage.py rebuild_score_distributions                        # 全クイズを作り直す
+    python manage.py rebuild_score_distributions --quiz=3 --quiz=5      # 特定クイズのみ作り直す
+"""
+
+from django.core.management.base import BaseCommand
+
+from quiz.distribution import rebuild_score_distributions
+
+
+class Command(BaseCommand):
+    help = 'QuizResultからクイズごとの正答率分布を作り直します'
+
+    def add_arguments(self, parser):
+        """コマンドライン引数の設定"""
+        parser.add_argument(
+            '--quiz',
+            type=int,
+            action='append',
+            dest='quiz_ids',
+            help='作り直すクイズID（複数指定可）',
+        )
+
+    def handle(self, *args, **options):
+        """コマンド実行時のメイン処理"""
+        summary = rebuild_score_distributions(quiz_ids=options.get('quiz_ids'))
+        self.stdout.write(self.style.SUCCESS(
+            f"{summary['quizzes']}件のクイズの正答率分布を作り直しました"
+            f"（結果: {summary['results']}件, {summary['elapsed']:.2f}秒）"
+        ))
@@ -0,0 +1,99 @@
+"""
+ユーザー統計情報の再計算コマンド
+
+このコマンドは QuizResult から UserStatistics を再計算します。データのインポート後や
+トリガーの不具合の修正後、統計情報を後から作り直す場合に使用します。
+ユーザーのチャンクごとに全集計レベルを1回の GROUP BY GROUPING SETS で集計してまとめて書き込み、
+--workers を指定するとチャンクを複数のプロセスで並列に処理します。
+
+使用例:
+    python manage.py rebuild_user_statistics                              # 全ユーザーを再計算する
+    python manage.py rebuild_user_statistics --workers=4                  # 4プロセスで並列に再計算する
+    python manage.py rebuild_user_statistics --user=12 --user=34          # 特定ユーザーのみ再計算する
+    python manage.py rebuild_user_statistics --category=3                 # カテゴリ3を含む行のみ再計算する
+    python manage.py rebuild_user_statistics --since=2026-10-01           # 10/1以降に結果があるユーザーを再計算する
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.statistics import DEFAULT_REBUILD_CHUNK_SIZE, rebuild_user_statistics
+from techskillsquiz.supabase_data_sync import parse_since
+
+
+class Command(BaseCommand):
+    help = 'QuizResultからユーザー統計情報を再計算します'
+
+    def add_arguments(self, parser):
+        """コマンドライン引数の設定"""
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='再計算するユーザーID（複数指定可）',
+        )
+        parser.add_argument(
+            '--category',
+            type=int,
+            action='append',
+            dest='category_ids',
+            help='再計算するカテゴリID（複数指定可、カテゴリを含む行のみを再計算します）',
+        )
+        parser.add_argument(
+            '--since',
+            dest='since',
+            help='この日時以降に完了した結果があるユーザーのみ再計算します（ISO 8601形式）',
+        )
+        parser.add_argument(
+            '--until',
+            dest='until',
+            help='この日時より前に完了した結果があるユーザーのみ再計算します（ISO 8601形式）',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            dest='chunk_size',
+            default=DEFAULT_REBUILD_CHUNK_SIZE,
+            help=f'1チャンクのユーザー数（デフォルト: {DEFAULT_REBUILD_CHUNK_SIZE}）',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            dest='workers',
+            default=1,
+            help='チャンクを並列に処理するプロセス数（デフォルト: 1）',
+        )
+
+    def handle(self, *args, **options):
+        """コマンド実行時のメイン処理"""
+        try:
+            since = parse_since(options.get('since'))
+            until = parse_since(options.get('until'))
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['chunk_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--chunk-size と --workers には1以上を指定してください。')
+
+        verbosity = options['verbosity']
+
+        def on_chunk(result):
+            if verbosity >= 2:
+                self.stdout.write(
+                    f' - {result.users}人: 作成 {result.created}件, 更新 {result.updated}件, '
+                    f'削除 {result.deleted}件 ({result.elapsed:.2f}秒)'
+                )
+
+        result = rebuild_user_statistics(
+            user_ids=options.get('user_ids'),
+            category_ids=options.get('category_ids'),
+            since=since,
+            until=until,
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            on_chunk=on_chunk,
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.users}人の統計情報を再計算しました（作成: {result.created}件, 更新: {result.updated}件, '
+            f'削除: {result.deleted}件, {result.elapsed:.2f}秒）'
+        ))
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0008_question_alter_category_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStreak',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('current_streak', models.PositiveIntegerField(default=0, verbose_name='連続日数')),
+                ('longest_streak', models.PositiveIntegerField(default=0, verbose_name='最長連続日数')),
+                ('last_active_date', models.DateField(blank=True, null=True, verbose_name='最終活動日')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='作成日時')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='streak', to=settings.AUTH_USER_MODEL, verbose_name='ユーザー')),
+            ],
+            options={
+                'verbose_name': '連続学習日数',
+                'verbose_name_plural': '連続学習日数',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='日付')),
+                ('quizzes_completed', models.PositiveIntegerField(default=0, verbose_name='完了クイズ数')),
+                ('total_points', models.PositiveIntegerField(default=0, verbose_name='合計ポイント')),
+                ('percentage_sum', models.FloatField(default=0.0, verbose_name='正答率の合計')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='作成日時')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_activities', to='quiz.category', verbose_name='カテゴリ')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_activities', to=settings.AUTH_USER_MODEL, verbose_name='ユーザー')),
+            ],
+            options={
+                'verbose_name': '日別活動',
+                'verbose_name_plural': '日別活動',
+                'ordering': ['user', 'date', 'category'],
+                'unique_together': {('user', 'date', 'category')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0009_dailyactivity_userstreak'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizScoreBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.PositiveSmallIntegerField(verbose_name='区間番号')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='件数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_buckets', to='quiz.quiz', verbose_name='クイズ')),
+            ],
+            options={
+                'verbose_name': '正答率分布',
+                'verbose_name_plural': '正答率分布',
+                'ordering': ['quiz', 'bucket'],
+                'unique_together': {('quiz', 'bucket')},
+            },
+        ),
+    ]
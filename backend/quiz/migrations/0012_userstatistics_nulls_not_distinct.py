@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:58
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_statistics(apps, schema_editor):
+    """
+    一意制約の追加前に、NULLを含む (user, category, difficulty) の重複行を1行にまとめる
+
+    unique_together ではNULLが区別されるため、同時に作成された全体・カテゴリ別・難易度別の行が
+    重複している場合がある。重複した各行はそれぞれ一部の結果を集計しているため、最も古い行に
+    件数・ポイントを合算し（平均スコアは件数で加重平均、最高スコア・最終クイズ日は最大値）、
+    残りの行を削除する。
+    """
+    UserStatistics = apps.get_model('quiz', 'UserStatistics')
+    duplicates = (
+        UserStatistics.objects.values('user_id', 'category_id', 'difficulty_id')
+        .order_by()
+        .annotate(rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for row in duplicates:
+        rows = list(UserStatistics.objects.filter(
+            user_id=row['user_id'],
+            category_id=row['category_id'],
+            difficulty_id=row['difficulty_id'],
+        ).order_by('id'))
+        keep = rows[0]
+        quizzes_completed = sum(r.quizzes_completed for r in rows)
+        keep.avg_score = (
+            sum(r.avg_score * r.quizzes_completed for r in rows) / quizzes_completed
+            if quizzes_completed else 0.0
+        )
+        keep.quizzes_completed = quizzes_completed
+        keep.total_points = sum(r.total_points for r in rows)
+        keep.highest_score = max(r.highest_score for r in rows)
+        quiz_dates = [r.last_quiz_date for r in rows if r.last_quiz_date is not None]
+        keep.last_quiz_date = max(quiz_dates) if quiz_dates else None
+        keep.save(update_fields=['quizzes_completed', 'total_points', 'avg_score', 'highest_score', 'last_quiz_date', 'updated_at'])
+        UserStatistics.objects.filter(id__in=[r.id for r in rows[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0011_quizresult_user_quiz_latest_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='userstatistics',
+            unique_together=set(),
+        ),
+        migrations.RunPython(merge_duplicate_statistics, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='userstatistics',
+            constraint=models.UniqueConstraint(fields=('user', 'category', 'difficulty'), name='quiz_userstatistics_user_scope_uniq', nulls_distinct=False),
+        ),
+    ]
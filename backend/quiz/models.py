@@ -12,7 +12,10 @@ from .models import (
     Answer,
     QuizResult,
     UserStatistics,
-    ActivityHistory
+    ActivityHistory,
+    DailyActivity,
+    UserStreak,
+    QuizScoreBucket
 )
 
 # すべてのモデルをエクスポート
@@ -25,5 +28,8 @@ __all__ = [
     'Answer',
     'QuizResult',
     'UserStatistics',
-    'ActivityHistory'
+    'ActivityHistory',
+    'DailyActivity',
+    'UserStreak',
+    'QuizScoreBucket'
 ]
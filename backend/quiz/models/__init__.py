@@ -7,6 +7,9 @@ from .answer import Answer
 from .quiz_result import QuizResult
 from .user_statistics import UserStatistics
 from .activity_history import ActivityHistory
+from .daily_activity import DailyActivity
+from .user_streak import UserStreak
+from .quiz_score_bucket import QuizScoreBucket
 
 __all__ = [
     'TestSupabaseModel', 
@@ -17,5 +20,8 @@ __all__ = [
     'Answer',
     'QuizResult',
     'UserStatistics',
-    'ActivityHistory'
+    'ActivityHistory',
+    'DailyActivity',
+    'UserStreak',
+    'QuizScoreBucket'
 ] 
\ No newline at end of file
@@ -0,0 +1,55 @@
+"""
+日別活動集計モデル
+"""
+
+from django.db import models
+from django.contrib.auth import get_user_model
+from .category import Category
+
+User = get_user_model()
+
+
+class DailyActivity(models.Model):
+    """
+    日別活動集計モデル - ユーザー・日付（settings.QUIZ_ACTIVITY_TIME_ZONE）・カテゴリごとのクイズ完了数
+
+    QuizResult の作成時にDjango側で加算する集計テーブル（quiz.activity）。
+    backfill_daily_activity コマンドで QuizResult から作り直せます。
+    """
+    user = models.ForeignKey(
+        User,
+        verbose_name='ユーザー',
+        on_delete=models.CASCADE,
+        related_name='daily_activities'
+    )
+    date = models.DateField('日付')
+    category = models.ForeignKey(
+        Category,
+        verbose_name='カテゴリ',
+        on_delete=models.CASCADE,
+        related_name='daily_activities',
+        null=True,
+        blank=True
+    )
+    quizzes_completed = models.PositiveIntegerField('完了クイズ数', default=0)
+    total_points = models.PositiveIntegerField('合計ポイント', default=0)
+    percentage_sum = models.FloatField('正答率の合計', default=0.0)
+    created_at = models.DateTimeField('作成日時', auto_now_add=True)
+    updated_at = models.DateTimeField('更新日時', auto_now=True)
+
+    class Meta:
+        verbose_name = '日別活動'
+        verbose_name_plural = '日別活動'
+        ordering = ['user', 'date', 'category']
+        unique_together = [
+            ['user', 'date', 'category']
+        ]
+
+    def __str__(self):
+        category_name = self.category.name if self.category else "カテゴリなし"
+        return f"{self.user.username} - {self.date} - {category_name} - 完了: {self.quizzes_completed}回"
+
+    @property
+    def avg_percentage(self):
+        """その日の平均正答率"""
+        return self.percentage_sum / self.quizzes_completed if self.quizzes_completed else 0.0
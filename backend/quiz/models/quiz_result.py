@@ -42,6 +42,10 @@ class QuizResult(models.Model, SupabaseModelMixin):
         verbose_name_plural = 'クイズ結果'
         ordering = ['-completed_at']
         unique_together = [['user', 'quiz', 'completed_at']]
+        indexes = [
+            # ユーザー・クイズごとの最新の結果の取得（latest-per-quiz）に使用
+            models.Index(fields=['user', 'quiz', '-completed_at'], name='quiz_result_user_quiz_latest'),
+        ]
 
     def __str__(self):
         result = "合格" if self.passed else "不合格"
@@ -0,0 +1,35 @@
+"""
+クイズ別の正答率分布モデル
+"""
+
+from django.db import models
+from .quiz import Quiz
+
+
+class QuizScoreBucket(models.Model):
+    """
+    クイズ別の正答率分布モデル - クイズごとの正答率の区間（quiz.distribution.BUCKET_WIDTH刻み）ごとの結果件数
+
+    QuizResult の作成時に該当する区間の件数を加算する集計テーブル（quiz.distribution）。
+    rebuild_score_distributions コマンドで QuizResult から作り直せます。
+    """
+    quiz = models.ForeignKey(
+        Quiz,
+        verbose_name='クイズ',
+        on_delete=models.CASCADE,
+        related_name='score_buckets'
+    )
+    bucket = models.PositiveSmallIntegerField('区間番号')
+    count = models.PositiveIntegerField('件数', default=0)
+    updated_at = models.DateTimeField('更新日時', auto_now=True)
+
+    class Meta:
+        verbose_name = '正答率分布'
+        verbose_name_plural = '正答率分布'
+        ordering = ['quiz', 'bucket']
+        unique_together = [
+            ['quiz', 'bucket']
+        ]
+
+    def __str__(self):
+        return f"{self.quiz.title} - 区間{self.bucket}: {self.count}件"
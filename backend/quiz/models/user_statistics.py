@@ -51,8 +51,14 @@ class UserStatistics(models.Model, SupabaseModelMixin):
         verbose_name = 'ユーザー統計'
         verbose_name_plural = 'ユーザー統計'
         ordering = ['user', 'category', 'difficulty']
-        unique_together = [
-            ['user', 'category', 'difficulty']
+        constraints = [
+            # カテゴリ別・難易度別・全体の行はカテゴリや難易度がNULLのため、NULLも同じ値として一意にする
+            # （INSERT ... ON CONFLICT (user_id, category_id, difficulty_id) がNULLの行にも使える。PostgreSQL 15以降）
+            models.UniqueConstraint(
+                fields=['user', 'category', 'difficulty'],
+                name='quiz_userstatistics_user_scope_uniq',
+                nulls_distinct=False,
+            ),
         ]
         indexes = [
             models.Index(fields=['user', 'category']),
@@ -0,0 +1,34 @@
+"""
+連続学習日数モデル
+"""
+
+from django.db import models
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+class UserStreak(models.Model):
+    """
+    連続学習日数モデル - クイズを完了した日の連続日数
+
+    QuizResult の作成時に最終活動日と比較して更新するため、履歴の長さによらず参照できます（quiz.activity）。
+    """
+    user = models.OneToOneField(
+        User,
+        verbose_name='ユーザー',
+        on_delete=models.CASCADE,
+        related_name='streak'
+    )
+    current_streak = models.PositiveIntegerField('連続日数', default=0)
+    longest_streak = models.PositiveIntegerField('最長連続日数', default=0)
+    last_active_date = models.DateField('最終活動日', null=True, blank=True)
+    created_at = models.DateTimeField('作成日時', auto_now_add=True)
+    updated_at = models.DateTimeField('更新日時', auto_now=True)
+
+    class Meta:
+        verbose_name = '連続学習日数'
+        verbose_name_plural = '連続学習日数'
+
+    def __str__(self):
+        return f"{self.user.username} - 連続: {self.current_streak}日, 最長: {self.longest_streak}日"
@@ -3,6 +3,7 @@
 """
 
 from rest_framework import serializers
+from .distribution import get_bucket_counts, percentile_rank
 from .models import (
     Category, 
     DifficultyLevel,
@@ -100,17 +101,37 @@ class QuizResultSerializer(serializers.ModelSerializer):
     quiz_title = serializers.CharField(source='quiz.title', read_only=True)
     category_name = serializers.CharField(source='quiz.category.name', read_only=True)
     difficulty_name = serializers.CharField(source='quiz.difficulty.name', read_only=True)
+    percentile_rank = serializers.SerializerMethodField()
     
     class Meta:
         model = QuizResult
         fields = [
             'id', 'user', 'username', 'quiz', 'quiz_title', 
             'category_name', 'difficulty_name', 
-            'score', 'total_possible', 'percentage', 
+            'score', 'total_possible', 'percentage', 'percentile_rank',
             'time_taken', 'passed', 'completed_at', 
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'user', 'username', 'quiz_title', 'category_name', 'difficulty_name', 'passed', 'completed_at', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'user', 'username', 'quiz_title', 'category_name', 'difficulty_name', 'percentile_rank', 'passed', 'completed_at', 'created_at', 'updated_at']
+
+    def get_percentile_rank(self, obj):
+        """クイズの全結果の中での正答率のパーセンタイル順位（一覧ではクイズごとに分布を1回だけ取得する）"""
+        distributions = self.context.setdefault('score_distributions', {})
+        if obj.quiz_id not in distributions:
+            distributions[obj.quiz_id] = get_bucket_counts(obj.quiz_id)
+        return percentile_rank(distributions[obj.quiz_id], obj.percentage)
+
+
+class LatestQuizResultSerializer(QuizResultSerializer):
+    """クイズごとの最新の結果のシリアライザー（受験回数と最高成績を含む）"""
+
+    attempt_count = serializers.IntegerField(read_only=True)
+    best_score = serializers.IntegerField(read_only=True)
+    best_percentage = serializers.FloatField(read_only=True)
+
+    class Meta(QuizResultSerializer.Meta):
+        fields = QuizResultSerializer.Meta.fields + ['attempt_count', 'best_score', 'best_percentage']
+        read_only_fields = fields
 
 
 class UserStatisticsSerializer(serializers.ModelSerializer):
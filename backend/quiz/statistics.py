@@ -0,0 +1,446 @@
+"""
+Django側でのユーザー統計情報の集計
+
+Supabaseでは quiz_quizresult のトリガー（trigger_update_user_statistics）が UserStatistics と
+ActivityHistory を更新しますが、ローカル開発・テスト・Supabase以外のデータベースではトリガーがないため
+これらのテーブルが更新されません。settings.QUIZ_STATISTICS_BACKEND を 'django' にすると、
+QuizResult の作成時にDjango側でトリガーと同じ集計を行います。
+
+集計はユーザーの結果の件数によらず、影響する4行（カテゴリ・難易度の組み合わせ、カテゴリ別、
+難易度別、全体）を1文の INSERT ... ON CONFLICT DO UPDATE で加算します。一意制約
+（user, category, difficulty）は NULLS NOT DISTINCT のため、カテゴリや難易度がNULLの行も
+同時に作成されて重複することはありません。NULLS NOT DISTINCT に対応しないデータベース
+（SQLite、PostgreSQL 14以前）では一意制約が作成されないため、F()式によるUPDATEで更新し、
+行がない場合のみINSERTします。
+
+rebuild_user_statistics は QuizResult から統計情報をまとめて再計算します（インポート後や
+トリガーの不具合の修正後に使用する）。ユーザーのチャンクごとに全集計レベルを1回の
+GROUP BY GROUPING SETS で集計し（PostgreSQL以外ではレベルごとのGROUP BY）、既存の行の
+bulk_update と新しい行の bulk_create でまとめて書き込みます。
+"""
+
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import Avg, Count, F, Max, Sum
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import invalidate_user_cache
+from .models import ActivityHistory, Quiz, QuizResult, UserStatistics
+
+logger = logging.getLogger(__name__)
+
+# 集計方法: Supabaseのトリガーに任せる / Django側で集計する
+STATISTICS_BACKEND_TRIGGER = 'trigger'
+STATISTICS_BACKEND_DJANGO = 'django'
+STATISTICS_BACKENDS = (STATISTICS_BACKEND_TRIGGER, STATISTICS_BACKEND_DJANGO)
+
+
+def get_statistics_backend() -> str:
+    """統計情報の集計方法を返します（settings.QUIZ_STATISTICS_BACKEND）"""
+    backend = getattr(settings, 'QUIZ_STATISTICS_BACKEND', STATISTICS_BACKEND_TRIGGER)
+    if backend not in STATISTICS_BACKENDS:
+        raise ValueError(f"不明な統計情報の集計方法です: {backend}（{', '.join(STATISTICS_BACKENDS)} のいずれか）")
+    return backend
+
+
+def get_statistics_scopes(category_id, difficulty_id):
+    """
+    結果が影響する統計情報の (category_id, difficulty_id) の組み合わせを返します。
+
+    トリガーと同じく、クイズにカテゴリや難易度がない場合はその行を作成しません。
+    """
+    scopes = [(None, None)]
+    if category_id is not None:
+        scopes.append((category_id, None))
+    if difficulty_id is not None:
+        scopes.append((None, difficulty_id))
+    if category_id is not None and difficulty_id is not None:
+        scopes.append((category_id, difficulty_id))
+    return scopes
+
+
+def _upsert_scopes(result: QuizResult, scopes: List[Tuple[Any, Any]]):
+    """
+    影響する全行の統計情報に結果を1文の INSERT ... ON CONFLICT DO UPDATE で加算します。
+
+    一意制約が NULLS NOT DISTINCT のため、カテゴリや難易度がNULLの行も競合として扱われます。
+    """
+    table = connection.ops.quote_name(UserStatistics._meta.db_table)
+    now = timezone.now()
+    values = ', '.join(['(%s, %s, %s, 1, %s, %s, %s, %s, %s, %s)'] * len(scopes))
+    params = []
+    for category_id, difficulty_id in scopes:
+        params += [
+            result.user_id, category_id, difficulty_id,
+            result.score, result.percentage, result.score, result.completed_at, now, now,
+        ]
+    sql = f"""
+        INSERT INTO {table} AS s (
+            user_id, category_id, difficulty_id, quizzes_completed, total_points,
+            avg_score, highest_score, last_quiz_date, created_at, updated_at
+        ) VALUES {values}
+        ON CONFLICT (user_id, category_id, difficulty_id) DO UPDATE SET
+            quizzes_completed = s.quizzes_completed + 1,
+            total_points = s.total_points + EXCLUDED.total_points,
+            avg_score = (s.avg_score * s.quizzes_completed + EXCLUDED.avg_score) / (s.quizzes_completed + 1),
+            highest_score = GREATEST(s.highest_score, EXCLUDED.highest_score),
+            last_quiz_date = EXCLUDED.last_quiz_date,
+            updated_at = EXCLUDED.updated_at
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def _apply_to_scope(result: QuizResult, category_id, difficulty_id):
+    """
+    1行の統計情報に結果を加算します（行がなければ作成します）。
+
+    一意制約が作成されないデータベース（NULLS NOT DISTINCT 非対応）のためのフォールバックです。
+    """
+    rows = UserStatistics.objects.filter(user_id=result.user_id, category_id=category_id, difficulty_id=difficulty_id)
+    increment = {
+        # 右辺はすべて更新前の値を参照する
+        'quizzes_completed': F('quizzes_completed') + 1,
+        'total_points': F('total_points') + result.score,
+        'avg_score': (F('avg_score') * F('quizzes_completed') + result.percentage) / (F('quizzes_completed') + 1),
+        'highest_score': Greatest(F('highest_score'), result.score),
+        'last_quiz_date': result.completed_at,
+    }
+    if rows.update(**increment):
+        return
+
+    try:
+        with transaction.atomic():
+            UserStatistics.objects.create(
+                user_id=result.user_id,
+                category_id=category_id,
+                difficulty_id=difficulty_id,
+                quizzes_completed=1,
+                total_points=result.score,
+                avg_score=result.percentage,
+                highest_score=result.score,
+                last_quiz_date=result.completed_at,
+            )
+    except IntegrityError:
+        # 同時に作成された場合は作成された行に加算する
+        rows.update(**increment)
+
+
+def apply_quiz_result(result: QuizResult):
+    """
+    クイズ結果を統計情報と活動履歴に反映します（trigger_update_user_statistics と同じ処理）。
+
+    Args:
+        result: 作成されたクイズ結果
+    """
+    quiz = result.quiz
+    scopes = get_statistics_scopes(quiz.category_id, quiz.difficulty_id)
+    with transaction.atomic():
+        if connection.features.supports_nulls_distinct_unique_constraints:
+            _upsert_scopes(result, scopes)
+        else:
+            for category_id, difficulty_id in scopes:
+                _apply_to_scope(result, category_id, difficulty_id)
+
+        ActivityHistory.objects.create(
+            user_id=result.user_id,
+            quiz=quiz,
+            category_id=quiz.category_id,
+            difficulty_id=quiz.difficulty_id,
+            score=result.score,
+            percentage=result.percentage,
+            activity_type='quiz_completed',
+        )
+
+
+@receiver(post_save, sender=QuizResult)
+def update_statistics_on_quiz_result(sender, instance, created, raw=False, **kwargs):
+    """Django側で集計する設定の場合、作成されたクイズ結果を統計情報に反映します"""
+    if not created or raw or get_statistics_backend() != STATISTICS_BACKEND_DJANGO:
+        return
+    apply_quiz_result(instance)
+    logger.debug(f"ユーザー {instance.user_id} の統計情報をDjango側で更新しました")
+
+
+# 再計算で1チャンクに含めるユーザー数のデフォルト
+DEFAULT_REBUILD_CHUNK_SIZE = 500
+
+# bulk_update / bulk_create の1文あたりの行数
+REBUILD_WRITE_BATCH_SIZE = 1000
+
+# 再計算で書き込むフィールド
+REBUILD_FIELDS = ['quizzes_completed', 'total_points', 'avg_score', 'highest_score', 'last_quiz_date', 'updated_at']
+
+# 統計情報の集計レベル（QuizResultからの参照）: 組み合わせ、カテゴリ別、難易度別、全体
+STATISTICS_LEVELS = (
+    ('quiz__category_id', 'quiz__difficulty_id'),
+    ('quiz__category_id',),
+    ('quiz__difficulty_id',),
+    (),
+)
+
+# カテゴリを指定した再計算ではカテゴリを含むレベルのみを対象にする
+CATEGORY_STATISTICS_LEVELS = STATISTICS_LEVELS[:2]
+
+# 統計情報のキー: (user_id, category_id, difficulty_id)
+StatisticsKey = Tuple[int, Optional[int], Optional[int]]
+
+
+class RebuildResult:
+    """
+    統計情報の再計算の結果
+    """
+
+    def __init__(self, users: int = 0, created: int = 0, updated: int = 0, deleted: int = 0):
+        self.users = users
+        self.created = created
+        self.updated = updated
+        self.deleted = deleted
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        """処理時間（秒）"""
+        return (self.finished_at or time.time()) - self.started_at
+
+    def add(self, other: 'RebuildResult'):
+        """チャンクの結果を加算します"""
+        self.users += other.users
+        self.created += other.created
+        self.updated += other.updated
+        self.deleted += other.deleted
+
+
+def build_grouping_sets_sql(user_count: int, category_count: int = 0) -> str:
+    """
+    全集計レベルを1回で集計する GROUP BY GROUPING SETS のSQLを作成します（PostgreSQL用）。
+
+    Args:
+        user_count: 対象のユーザー数（プレースホルダーの数）
+        category_count: 対象のカテゴリ数（0の場合はカテゴリで絞り込まない）
+    """
+    result_table = connection.ops.quote_name(QuizResult._meta.db_table)
+    quiz_table = connection.ops.quote_name(Quiz._meta.db_table)
+    where = [f"r.user_id IN ({', '.join(['%s'] * user_count)})"]
+    grouping_sets = ['(r.user_id, q.category_id, q.difficulty_id)', '(r.user_id, q.category_id)']
+    if category_count:
+        where.append(f"q.category_id IN ({', '.join(['%s'] * category_count)})")
+    else:
+        grouping_sets += ['(r.user_id, q.difficulty_id)', '(r.user_id)']
+
+    return (
+        'SELECT r.user_id, q.category_id, q.difficulty_id, '
+        'GROUPING(q.category_id), GROUPING(q.difficulty_id), '
+        'COUNT(*), SUM(r.score), AVG(r.percentage), MAX(r.score), MAX(r.completed_at) '
+        f'FROM {result_table} r JOIN {quiz_table} q ON q.id = r.quiz_id '
+        f"WHERE {' AND '.join(where)} "
+        f"GROUP BY GROUPING SETS ({', '.join(grouping_sets)})"
+    )
+
+
+def _statistics_values(count, points, avg_score, highest_score, last_quiz_date) -> Dict[str, Any]:
+    return {
+        'quizzes_completed': count,
+        'total_points': points or 0,
+        'avg_score': avg_score or 0.0,
+        'highest_score': highest_score or 0,
+        'last_quiz_date': last_quiz_date,
+    }
+
+
+def _aggregate_with_grouping_sets(user_ids: List[int], category_ids: Optional[List[int]]) -> Dict[StatisticsKey, Dict[str, Any]]:
+    sql = build_grouping_sets_sql(len(user_ids), len(category_ids or []))
+    rows = {}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, list(user_ids) + list(category_ids or []))
+        for user_id, category_id, difficulty_id, category_grouped, difficulty_grouped, *values in cursor.fetchall():
+            key = (
+                user_id,
+                None if category_grouped else category_id,
+                None if difficulty_grouped else difficulty_id,
+            )
+            rows[key] = _statistics_values(*values)
+    return rows
+
+
+def _aggregate_with_orm(user_ids: List[int], category_ids: Optional[List[int]]) -> Dict[StatisticsKey, Dict[str, Any]]:
+    results = QuizResult.objects.filter(user_id__in=user_ids)
+    levels = STATISTICS_LEVELS
+    if category_ids:
+        results = results.filter(quiz__category_id__in=category_ids)
+        levels = CATEGORY_STATISTICS_LEVELS
+
+    rows = {}
+    for level in levels:
+        grouped = results.values('user_id', *level).order_by().annotate(
+            count=Count('id'),
+            points=Sum('score'),
+            average=Avg('percentage'),
+            highest=Max('score'),
+            last=Max('completed_at'),
+        )
+        for row in grouped:
+            key = (row['user_id'], row.get('quiz__category_id'), row.get('quiz__difficulty_id'))
+            rows[key] = _statistics_values(row['count'], row['points'], row['average'], row['highest'], row['last'])
+    return rows
+
+
+def aggregate_user_statistics(user_ids: List[int], category_ids: Optional[List[int]] = None) -> Dict[StatisticsKey, Dict[str, Any]]:
+    """
+    ユーザーの統計情報を QuizResult から集計します。
+
+    Args:
+        user_ids: 対象のユーザーID
+        category_ids: 指定した場合はこれらのカテゴリを含む行のみを集計する
+
+    Returns:
+        (user_id, category_id, difficulty_id) ごとの統計値
+    """
+    if connection.vendor == 'postgresql':
+        return _aggregate_with_grouping_sets(user_ids, category_ids)
+    return _aggregate_with_orm(user_ids, category_ids)
+
+
+def write_user_statistics(user_ids: List[int], rows: Dict[StatisticsKey, Dict[str, Any]],
+                          category_ids: Optional[List[int]] = None) -> RebuildResult:
+    """
+    集計した統計情報で対象範囲の UserStatistics を置き換えます。
+
+    既存の行はIDを保ったまま bulk_update し、新しい行は bulk_create します。
+    結果がなくなった行は削除します。
+
+    Args:
+        user_ids: 対象のユーザーID
+        rows: aggregate_user_statistics の結果
+        category_ids: 指定した場合はこれらのカテゴリを含む行のみを対象にする
+    """
+    scope = UserStatistics.objects.filter(user_id__in=user_ids)
+    if category_ids:
+        scope = scope.filter(category_id__in=category_ids)
+
+    result = RebuildResult(users=len(user_ids))
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {
+            (user_id, category_id, difficulty_id): pk
+            for pk, user_id, category_id, difficulty_id in scope.values_list('id', 'user_id', 'category_id', 'difficulty_id')
+        }
+        to_update, to_create = [], []
+        for (user_id, category_id, difficulty_id), values in rows.items():
+            statistics = UserStatistics(
+                user_id=user_id, category_id=category_id, difficulty_id=difficulty_id, updated_at=now, **values
+            )
+            statistics.pk = existing.pop((user_id, category_id, difficulty_id), None)
+            (to_create if statistics.pk is None else to_update).append(statistics)
+
+        UserStatistics.objects.bulk_update(to_update, REBUILD_FIELDS, batch_size=REBUILD_WRITE_BATCH_SIZE)
+        UserStatistics.objects.bulk_create(to_create, batch_size=REBUILD_WRITE_BATCH_SIZE)
+        if existing:
+            UserStatistics.objects.filter(pk__in=existing.values()).delete()
+
+    for user_id in user_ids:
+        invalidate_user_cache(user_id)
+
+    result.created, result.updated, result.deleted = len(to_create), len(to_update), len(existing)
+    result.finished_at = time.time()
+    return result
+
+
+def rebuild_user_statistics_chunk(user_ids: List[int], category_ids: Optional[List[int]] = None) -> RebuildResult:
+    """1チャンクのユーザーの統計情報を再計算します"""
+    return write_user_statistics(user_ids, aggregate_user_statistics(user_ids, category_ids), category_ids)
+
+
+def get_rebuild_user_ids(user_ids: Optional[Iterable[int]] = None, category_ids: Optional[List[int]] = None,
+                         since=None, until=None) -> List[int]:
+    """
+    再計算の対象のユーザーIDを返します。
+
+    統計情報は累計のため、期間を指定した場合はその期間に結果があるユーザーのすべての結果から再計算します。
+    期間を指定しない場合は、結果がなくなったユーザーの行も削除するため統計情報のあるユーザーも含めます。
+
+    Args:
+        user_ids: 対象のユーザーID（省略時は全ユーザー）
+        category_ids: 対象のカテゴリID
+        since: この日時以降に完了した結果があるユーザーに限定する
+        until: この日時より前に完了した結果があるユーザーに限定する
+    """
+    results = QuizResult.objects.all()
+    statistics = UserStatistics.objects.all()
+    if user_ids is not None:
+        results = results.filter(user_id__in=list(user_ids))
+        statistics = statistics.filter(user_id__in=list(user_ids))
+    if category_ids:
+        results = results.filter(quiz__category_id__in=category_ids)
+        statistics = statistics.filter(category_id__in=category_ids)
+    if since:
+        results = results.filter(completed_at__gte=since)
+    if until:
+        results = results.filter(completed_at__lt=until)
+
+    found = set(results.order_by().values_list('user_id', flat=True).distinct())
+    if not since and not until:
+        found.update(statistics.order_by().values_list('user_id', flat=True).distinct())
+    return sorted(found)
+
+
+def _init_rebuild_worker():
+    """ワーカープロセスでDjangoを初期化します（spawnで起動した場合）"""
+    import django
+
+    django.setup()
+
+
+def rebuild_user_statistics(user_ids: Optional[Iterable[int]] = None, category_ids: Optional[List[int]] = None,
+                            since=None, until=None, chunk_size: int = DEFAULT_REBUILD_CHUNK_SIZE, workers: int = 1,
+                            on_chunk: Optional[Callable[[RebuildResult], None]] = None) -> RebuildResult:
+    """
+    QuizResult から UserStatistics を再計算します。
+
+    Args:
+        user_ids: 対象のユーザーID（省略時は全ユーザー）
+        category_ids: 対象のカテゴリID（指定した場合はカテゴリを含む行のみを再計算する）
+        since: この日時以降に完了した結果があるユーザーに限定する
+        until: この日時より前に完了した結果があるユーザーに限定する
+        chunk_size: 1チャンクのユーザー数
+        workers: チャンクを並列に処理するプロセス数
+        on_chunk: チャンクの完了ごとに呼ばれるコールバック
+
+    Returns:
+        全チャンクの合計の結果
+    """
+    targets = get_rebuild_user_ids(user_ids, category_ids, since, until)
+    chunks = [targets[i:i + chunk_size] for i in range(0, len(targets), chunk_size)]
+    total = RebuildResult()
+
+    def complete(result: RebuildResult):
+        total.add(result)
+        if on_chunk:
+            on_chunk(result)
+
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            complete(rebuild_user_statistics_chunk(chunk, category_ids))
+    else:
+        # 子プロセスに接続を引き継がないよう、フォークする前に閉じる
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_rebuild_worker) as executor:
+            futures = [executor.submit(rebuild_user_statistics_chunk, chunk, category_ids) for chunk in chunks]
+            for future in as_completed(futures):
+                complete(future.result())
+
+    total.finished_at = time.time()
+    logger.info(
+        f"{total.users}人の統計情報を再計算しました（作成: {total.created}件, 更新: {total.updated}件, "
+        f"削除: {total.deleted}件, {total.elapsed:.2f}秒）"
+    )
+    return total
@@ -0,0 +1,205 @@
+"""
+日別活動と連続学習日数のテスト
+
+クイズ結果ごとの日別活動の加算、連続学習日数の更新、QuizResult からの作り直し、
+ヒートマップ・連続学習日数のAPIをテストします。
+"""
+
+import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from quiz.activity import (
+    activity_date,
+    activity_today,
+    backfill_daily_activity,
+    compute_streaks,
+    get_streak,
+    update_user_streak,
+)
+from quiz.models import Category, DailyActivity, DifficultyLevel, Quiz, QuizResult, UserStreak
+
+User = get_user_model()
+
+D = datetime.date
+
+
+class DailyActivityTestCase(TestCase):
+    """日別活動の加算と作り直しのテスト"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='daily', email='daily@example.com', password='testpassword')
+        difficulty = DifficultyLevel.objects.create(name='初級', slug='beginner', level=1, point_multiplier=1.0)
+        self.python = Category.objects.create(name='Python', slug='python')
+        self.web = Category.objects.create(name='Web', slug='web')
+        self.quizzes = [
+            Quiz.objects.create(category=self.python, difficulty=difficulty, title='Python基礎'),
+            Quiz.objects.create(category=self.python, difficulty=difficulty, title='Python応用'),
+            Quiz.objects.create(category=self.web, difficulty=difficulty, title='HTML基礎'),
+        ]
+
+    def _result(self, quiz, score):
+        return QuizResult.objects.create(
+            user=self.user, quiz=quiz, score=score, total_possible=100, percentage=score, time_taken=60,
+        )
+
+    def _snapshot(self):
+        return sorted(
+            (a.date, a.category_id, a.quizzes_completed, a.total_points, round(a.percentage_sum, 6))
+            for a in DailyActivity.objects.filter(user=self.user)
+        )
+
+    def test_activity_date_uses_tokyo(self):
+        """日付が Asia/Tokyo で区切られることのテスト"""
+        utc = datetime.timezone.utc
+        self.assertEqual(activity_date(datetime.datetime(2026, 10, 18, 14, 59, tzinfo=utc)), D(2026, 10, 18))
+        self.assertEqual(activity_date(datetime.datetime(2026, 10, 18, 15, 0, tzinfo=utc)), D(2026, 10, 19))
+
+    def test_results_are_added_per_day_and_category(self):
+        """結果ごとに日付・カテゴリの行へ加算され、連続学習日数が更新されることのテスト"""
+        self._result(self.quizzes[0], 60)
+        self._result(self.quizzes[1], 80)
+        self._result(self.quizzes[2], 90)
+
+        today = activity_today()
+        self.assertEqual(self._snapshot(), [(today, self.python.pk, 2, 140, 140.0), (today, self.web.pk, 1, 90, 90.0)])
+        self.assertEqual(get_streak(self.user.pk)['current_streak'], 1)
+        self.assertTrue(get_streak(self.user.pk)['active_today'])
+
+    def test_backfill_matches_incremental_rollup(self):
+        """QuizResult からの作り直しがクイズ結果ごとの加算と一致することのテスト"""
+        for i, quiz in enumerate(self.quizzes * 2):
+            self._result(quiz, 50 + i)
+        # 結果を1日ずつ過去にずらし、加算で作り直し後の期待値を作る
+        for days, result in enumerate(QuizResult.objects.order_by('pk')):
+            QuizResult.objects.filter(pk=result.pk).update(completed_at=F('completed_at') - datetime.timedelta(days=days % 3))
+        DailyActivity.objects.all().delete()
+        UserStreak.objects.all().delete()
+
+        result = backfill_daily_activity()
+
+        self.assertEqual(result.users, 1)
+        self.assertEqual(sum(row[2] for row in self._snapshot()), 6)
+        self.assertEqual(len({row[0] for row in self._snapshot()}), 3)
+        self.assertEqual(get_streak(self.user.pk)['longest_streak'], 3)
+
+        # 作り直しを繰り返しても結果は変わらない
+        before = self._snapshot()
+        DailyActivity.objects.filter(user=self.user).update(quizzes_completed=99)
+        out = StringIO()
+        call_command('backfill_daily_activity', '--user', str(self.user.pk), stdout=out)
+        self.assertEqual(self._snapshot(), before)
+        self.assertIn('1人の日別活動を作り直しました', out.getvalue())
+
+    def test_backfill_date_range(self):
+        """期間を指定した場合は期間内の日付の行のみを作り直すことのテスト"""
+        self._result(self.quizzes[0], 60)
+        today = activity_today()
+        old = DailyActivity.objects.create(user=self.user, date=today - datetime.timedelta(days=10), quizzes_completed=5)
+        DailyActivity.objects.filter(user=self.user, date=today).update(quizzes_completed=99)
+
+        backfill_daily_activity(since=today, until=today)
+
+        self.assertEqual(DailyActivity.objects.get(user=self.user, date=today).quizzes_completed, 1)
+        self.assertTrue(DailyActivity.objects.filter(pk=old.pk).exists())
+
+
+class StreakTestCase(TestCase):
+    """連続学習日数のテスト"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='streak', email='streak@example.com', password='testpassword')
+
+    def test_compute_streaks(self):
+        """日付の列からの連続日数の計算のテスト"""
+        dates = [D(2026, 10, 1), D(2026, 10, 2), D(2026, 10, 3), D(2026, 10, 5), D(2026, 10, 6)]
+        self.assertEqual(compute_streaks(dates), (2, 3, D(2026, 10, 6)))
+        self.assertEqual(compute_streaks([]), (0, 0, None))
+
+    def test_incremental_updates(self):
+        """連続・途切れ・同日の更新と、過去の日付による計算し直しのテスト"""
+        for day in (1, 2, 3, 3, 5):
+            DailyActivity.objects.get_or_create(user=self.user, date=D(2026, 10, day))
+            update_user_streak(self.user.pk, D(2026, 10, day))
+        streak = UserStreak.objects.get(user=self.user)
+        self.assertEqual((streak.current_streak, streak.longest_streak), (1, 3))
+
+        # 後から登録された10/4の結果で空白が埋まる
+        DailyActivity.objects.create(user=self.user, date=D(2026, 10, 4))
+        update_user_streak(self.user.pk, D(2026, 10, 4))
+        streak.refresh_from_db()
+        self.assertEqual((streak.current_streak, streak.longest_streak, streak.last_active_date), (5, 5, D(2026, 10, 5)))
+
+    def test_broken_streak_is_reported_as_zero(self):
+        """最終活動日が昨日より前の場合は現在の連続日数が0になることのテスト"""
+        UserStreak.objects.create(user=self.user, current_streak=4, longest_streak=6, last_active_date=D(2026, 10, 10))
+
+        self.assertEqual(get_streak(self.user.pk, today=D(2026, 10, 11))['current_streak'], 4)
+        self.assertEqual(get_streak(self.user.pk, today=D(2026, 10, 12))['current_streak'], 0)
+        self.assertEqual(get_streak(self.user.pk, today=D(2026, 10, 12))['longest_streak'], 6)
+
+
+class ActivityCalendarAPITests(APITestCase):
+    """ヒートマップ・連続学習日数のAPIのテスト"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='calendar', email='calendar@example.com', password='testpassword')
+        self.category = Category.objects.create(name='Python', slug='python')
+        self.other = Category.objects.create(name='Web', slug='web')
+        for day, category, count in ((1, self.category, 2), (1, self.other, 1), (3, self.category, 4)):
+            DailyActivity.objects.create(
+                user=self.user, date=D(2026, 10, day), category=category,
+                quizzes_completed=count, total_points=count * 10, percentage_sum=count * 80.0,
+            )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('quiz:activity-calendar-heatmap')
+
+    def test_heatmap(self):
+        """期間内の日ごとの合計が返されることのテスト"""
+        response = self.client.get(self.url, {'start': '2026-10-01', 'end': '2026-10-31'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(day['date'], day['count'], day['points']) for day in response.data['days']],
+            [(D(2026, 10, 1), 3, 30), (D(2026, 10, 3), 4, 40)],
+        )
+        self.assertEqual((response.data['total'], response.data['active_days']), (7, 2))
+
+        response = self.client.get(self.url, {'start': '2026-10-01', 'end': '2026-10-31', 'category': self.other.pk})
+        self.assertEqual(response.data['total'], 1)
+
+    def test_heatmap_query_count_does_not_depend_on_history(self):
+        """ヒートマップのクエリ数が履歴の長さによらないことのテスト"""
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(self.url, {'start': '2026-10-01', 'end': '2026-10-31'})
+        DailyActivity.objects.bulk_create(
+            DailyActivity(user=self.user, date=D(2025, 1, 1) + datetime.timedelta(days=i), quizzes_completed=1)
+            for i in range(200)
+        )
+        with CaptureQueriesContext(connection) as after:
+            self.client.get(self.url, {'start': '2026-10-01', 'end': '2026-10-31'})
+
+        self.assertEqual(len(before), len(after))
+
+    def test_heatmap_validation(self):
+        """不正な日付や長すぎる期間は400になることのテスト"""
+        self.assertEqual(self.client.get(self.url, {'start': 'yesterday'}).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {'start': '2024-01-01', 'end': '2026-10-31'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_streak(self):
+        """連続学習日数が返されることのテスト"""
+        response = self.client.get(reverse('quiz:activity-calendar-streak'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['current_streak'], 0)
+        self.assertIsNone(response.data['last_active_date'])
@@ -0,0 +1,216 @@
+"""
+ユーザーごとのキャッシュのテスト
+
+バージョン番号による無効化、ビューのキャッシュ、トリガーのNOTIFYの受信による無効化をテストします。
+"""
+
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from quiz.cache import (
+    get_or_build_user_cache,
+    handle_invalidation_payload,
+    listen_for_invalidations,
+)
+from quiz.models import Category, UserStatistics
+
+User = get_user_model()
+
+
+def notify_payload(user_id, table='quiz_userstatistics', op='UPDATE'):
+    """トリガーが送るNOTIFYのペイロードを作成します"""
+    return json.dumps({'table': table, 'op': op, 'user_id': user_id})
+
+
+@override_settings(QUIZ_STATS_CACHE_TIMEOUT=300)
+class UserCacheTestCase(TestCase):
+    """バージョン番号による無効化のテスト"""
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def _build(self):
+        self.calls += 1
+        return {'calls': self.calls}
+
+    def test_cached_until_invalidation_payload(self):
+        """NOTIFYを受信するまでキャッシュが使われ、受信後は作り直されることのテスト"""
+        get_or_build_user_cache(1, 'stats-summary', {'limit': 10}, self._build)
+        get_or_build_user_cache(1, 'stats-summary', {'limit': 10}, self._build)
+        self.assertEqual(self.calls, 1)
+
+        self.assertEqual(handle_invalidation_payload(notify_payload(1)), 1)
+
+        self.assertEqual(get_or_build_user_cache(1, 'stats-summary', {'limit': 10}, self._build), {'calls': 2})
+
+    def test_other_users_and_invalid_payloads(self):
+        """他のユーザーのキャッシュは残り、不正なペイロードは無視されることのテスト"""
+        get_or_build_user_cache(1, 'recent-activities', None, self._build)
+        get_or_build_user_cache(2, 'recent-activities', None, self._build)
+
+        handle_invalidation_payload(notify_payload(2))
+        self.assertIsNone(handle_invalidation_payload('not json'))
+        self.assertIsNone(handle_invalidation_payload(json.dumps({'table': 'quiz_quizresult'})))
+
+        get_or_build_user_cache(1, 'recent-activities', None, self._build)
+        self.assertEqual(self.calls, 2)
+
+    @override_settings(QUIZ_STATS_CACHE_TIMEOUT=0)
+    def test_disabled_cache(self):
+        """有効期間が0の場合はキャッシュしないことのテスト"""
+        get_or_build_user_cache(1, 'stats-summary', None, self._build)
+        get_or_build_user_cache(1, 'stats-summary', None, self._build)
+        self.assertEqual(self.calls, 2)
+
+
+class FakeListenConnection:
+    """NOTIFYを受信するpsycopg2の接続のモック"""
+
+    def __init__(self, payloads):
+        self.pending = list(payloads)
+        self.notifies = []
+        self.executed = []
+        self.autocommit = False
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                return False
+
+            def execute(self, sql):
+                connection.executed.append(sql)
+
+        return Cursor()
+
+    def poll(self):
+        self.notifies.extend(SimpleNamespace(payload=payload) for payload in self.pending)
+        self.pending = []
+
+
+@override_settings(QUIZ_STATS_CACHE_TIMEOUT=300)
+class ListenForInvalidationsTestCase(TestCase):
+    """NOTIFYの待ち受けのテスト"""
+
+    @patch('quiz.cache.select.select')
+    def test_notifies_invalidate_users(self, mock_select):
+        """受信した通知ごとに該当ユーザーのキャッシュが無効化されることのテスト"""
+        cache.clear()
+        connection = FakeListenConnection([notify_payload(1), notify_payload(3, 'quiz_quizresult', 'INSERT')])
+        mock_select.side_effect = [([], [], []), ([connection], [], [])]
+        checks = iter([False, False, True])
+        invalidated = []
+
+        listen_for_invalidations(connection, should_stop=lambda: next(checks), on_invalidate=invalidated.append)
+
+        self.assertTrue(connection.autocommit)
+        self.assertEqual(connection.executed, ['LISTEN quiz_user_cache'])
+        self.assertEqual(invalidated, [1, 3])
+
+    @patch('quiz.cache.time.sleep')
+    @patch('quiz.cache.select.select')
+    def test_reconnects_and_invalidates_all_users(self, mock_select, mock_sleep):
+        """切断時に間隔を延ばして再接続し、切断中の通知の代わりに全ユーザーのキャッシュを無効化することのテスト"""
+        cache.clear()
+        calls = []
+
+        def build():
+            calls.append(1)
+            return len(calls)
+
+        get_or_build_user_cache(1, 'stats-summary', None, build)
+        lost = FakeListenConnection([])
+        resumed = FakeListenConnection([notify_payload(2)])
+        lost.close = MagicMock()
+        resumed.close = MagicMock()
+        attempts = iter([OperationalError('could not connect to server'), resumed])
+
+        def reconnect():
+            result = next(attempts)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        mock_select.side_effect = [OSError('connection reset'), ([resumed], [], [])]
+        checks = iter([False, False, False, False, True])
+        invalidated = []
+
+        listen_for_invalidations(lost, should_stop=lambda: next(checks), on_invalidate=invalidated.append,
+                                 reconnect=reconnect)
+
+        self.assertEqual([c.args[0] for c in mock_sleep.call_args_list], [1.0, 2.0])
+        self.assertEqual(resumed.executed, ['LISTEN quiz_user_cache'])
+        self.assertEqual(invalidated, [2])
+        lost.close.assert_called_once()
+        resumed.close.assert_called_once()
+        # 再接続後は通知のなかったユーザーのキャッシュも作り直される
+        get_or_build_user_cache(1, 'stats-summary', None, build)
+        self.assertEqual(len(calls), 2)
+
+    @patch('quiz.cache.select.select')
+    def test_disconnect_is_raised_without_reconnect(self, mock_select):
+        """再接続の関数を指定しない場合は切断の例外を送出することのテスト"""
+        mock_select.side_effect = OSError('connection reset')
+
+        with self.assertRaises(OSError):
+            listen_for_invalidations(FakeListenConnection([]), should_stop=lambda: False)
+
+    def test_command_requires_shared_cache(self):
+        """プロセス内のキャッシュでは待ち受けのコマンドを起動しないことのテスト"""
+        with self.assertRaises(CommandError):
+            call_command('listen_cache_invalidation')
+
+
+@override_settings(QUIZ_STATS_CACHE_TIMEOUT=300)
+class StatisticsSummaryCacheTests(APITestCase):
+    """統計サマリーのキャッシュのテスト"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cacheuser', email='cache@example.com', password='testpassword')
+        self.category = Category.objects.create(name='Python', slug='python')
+        self.stats = UserStatistics.objects.create(
+            user=self.user, category=None, difficulty=None,
+            quizzes_completed=5, total_points=450, avg_score=90.0, highest_score=100.0,
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('quiz:userstatistics-summary')
+
+    def _total(self, **params):
+        return self.client.get(self.url, params).data['total_quizzes_completed']
+
+    def test_summary_is_cached_until_trigger_notify(self):
+        """トリガーによる更新（Djangoのシグナルなし）はNOTIFYの受信まで反映されないことのテスト"""
+        self.assertEqual(self._total(), 5)
+
+        # トリガーによる更新を模してシグナルを送らずに更新する
+        UserStatistics.objects.filter(pk=self.stats.pk).update(quizzes_completed=6)
+        self.assertEqual(self._total(), 5)
+        self.assertEqual(self._total(sort_dir='asc'), 6)
+
+        handle_invalidation_payload(notify_payload(self.user.pk))
+        self.assertEqual(self._total(), 6)
+
+    def test_summary_is_invalidated_by_django_save(self):
+        """Django経由で保存した場合はシグナルで無効化されることのテスト"""
+        self.assertEqual(self._total(), 5)
+
+        self.stats.quizzes_completed = 7
+        self.stats.save()
+
+        self.assertEqual(self._total(), 7)
@@ -0,0 +1,116 @@
+"""
+ダッシュボードのAPIのテスト
+
+統計サマリー・最近の活動履歴・カテゴリ一覧がまとめて返されること、
+クエリ数がデータ量によらないこと、キャッシュとその無効化をテストします。
+"""
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from quiz.models import Category, DifficultyLevel, Quiz, QuizResult
+from quiz.views import DashboardViewSet
+
+User = get_user_model()
+
+
+@override_settings(QUIZ_STATISTICS_BACKEND='django')
+class DashboardAPITests(APITestCase):
+    """ダッシュボードのAPIのテスト"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='dashboard', email='dashboard@example.com', password='testpassword')
+        self.other = User.objects.create_user(username='dashboard2', email='dashboard2@example.com', password='testpassword')
+        self.difficulty = DifficultyLevel.objects.create(name='初級', slug='beginner', level=1, point_multiplier=1.0)
+        self.python = Category.objects.create(name='Python', slug='python', display_order=1)
+        self.web = Category.objects.create(name='Web', slug='web', display_order=2)
+        Category.objects.create(name='非公開', slug='hidden', is_active=False)
+        self.quiz = Quiz.objects.create(category=self.python, difficulty=self.difficulty, title='Python基礎')
+        self.url = reverse('quiz:dashboard-list')
+
+    def _add_results(self, user, count):
+        for i in range(count):
+            QuizResult.objects.create(
+                user=user, quiz=self.quiz, score=50 + i, total_possible=100, percentage=50 + i, time_taken=60,
+            )
+
+    def _get(self, user, **params):
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        return response, len(queries)
+
+    def test_dashboard_contains_all_parts(self):
+        """統計サマリー・最近の活動履歴・アクティブなカテゴリ一覧が返されることのテスト"""
+        self._add_results(self.user, 3)
+
+        response, _ = self._get(self.user, limit=2)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['stats']['total_quizzes_completed'], 3)
+        self.assertEqual(len(response.data['recent_activities']), 2)
+        self.assertEqual([c['slug'] for c in response.data['categories']], ['python', 'web'])
+
+    def test_limit_is_clamped(self):
+        """活動履歴の件数が1〜MAX_RECENT_LIMITに丸められることのテスト"""
+        self._add_results(self.user, 3)
+
+        for limit, expected in ((-1, 1), (0, 1), (10 ** 9, 3)):
+            with self.subTest(limit=limit):
+                response, _ = self._get(self.user, limit=limit)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(len(response.data['recent_activities']), expected)
+
+    @patch('quiz.views.ActivityHistoryViewSet.build_recent', return_value=[])
+    def test_oversized_limit_is_capped(self, build_recent):
+        """上限を超える件数はMAX_RECENT_LIMITで取得されることのテスト"""
+        self._get(self.user, limit=10 ** 9)
+
+        self.assertEqual(build_recent.call_args.args[1], DashboardViewSet.MAX_RECENT_LIMIT)
+
+    def test_non_integer_limit_is_rejected(self):
+        """整数でない件数は400になることのテスト"""
+        response, _ = self._get(self.user, limit='abc')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_query_count_does_not_depend_on_data(self):
+        """クエリ数が活動履歴や統計情報の件数によらないことのテスト"""
+        self._add_results(self.user, 1)
+        self._add_results(self.other, 5)
+
+        _, few = self._get(self.user)
+        _, many = self._get(self.other)
+
+        self.assertEqual(few, many)
+
+    @override_settings(QUIZ_STATS_CACHE_TIMEOUT=300, QUIZ_CATALOG_CACHE_TIMEOUT=300)
+    def test_cached_response_runs_no_queries(self):
+        """キャッシュ済みの場合はクエリを実行しないことのテスト"""
+        self._add_results(self.user, 2)
+        self._get(self.user)
+
+        response, queries = self._get(self.user)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, 0)
+
+    @override_settings(QUIZ_STATS_CACHE_TIMEOUT=300, QUIZ_CATALOG_CACHE_TIMEOUT=300)
+    def test_catalog_cache_is_invalidated_by_category_change(self):
+        """カテゴリの変更でカテゴリ一覧のキャッシュが無効化されることのテスト"""
+        self._get(self.user)
+        self.web.is_active = False
+        self.web.save()
+
+        response, _ = self._get(self.user)
+
+        self.assertEqual([c['slug'] for c in response.data['categories']], ['python'])
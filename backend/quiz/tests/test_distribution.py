@@ -0,0 +1,226 @@
+"""
+クイズ別の正答率分布とパーセンタイルのテスト
+
+区間の計算、クイズ結果ごとの加算、QuizResult からの作り直し、
+結果のレスポンスと distribution エンドポイントのパーセンタイル順位をテストします。
+"""
+
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from quiz import distribution
+from quiz.distribution import (
+    BUCKET_COUNT,
+    add_bucket_counts,
+    bucket_for,
+    compute_quiz_bucket_counts,
+    get_bucket_counts,
+    percentile_rank,
+    rebuild_quiz_distribution,
+    rebuild_score_distributions,
+)
+from quiz.models import Category, DifficultyLevel, Quiz, QuizResult, QuizScoreBucket
+
+User = get_user_model()
+
+
+def create_quiz(title='Python基礎', slug='python'):
+    category, _ = Category.objects.get_or_create(slug=slug, defaults={'name': slug})
+    difficulty, _ = DifficultyLevel.objects.get_or_create(
+        slug='beginner', defaults={'name': '初級', 'level': 1, 'point_multiplier': 1.0}
+    )
+    return Quiz.objects.create(category=category, difficulty=difficulty, title=title)
+
+
+def create_result(user, quiz, percentage):
+    return QuizResult.objects.create(
+        user=user, quiz=quiz, score=int(percentage), total_possible=100, percentage=percentage, time_taken=60,
+    )
+
+
+class ScoreDistributionTestCase(TestCase):
+    """正答率分布の計算と作り直しのテスト"""
+
+    def setUp(self):
+        self.quiz = create_quiz()
+        self.other_quiz = create_quiz('HTML基礎', 'web')
+        self.users = [
+            User.objects.create_user(username=f'dist{i}', email=f'dist{i}@example.com', password='testpassword')
+            for i in range(4)
+        ]
+
+    def test_bucket_for(self):
+        """区間番号の計算と範囲外の値の丸めのテスト"""
+        self.assertEqual([bucket_for(p) for p in (0, 0.5, 1.0, 99.9, 100, 150, -5)], [0, 0, 1, 99, 99, 99, 0])
+
+    def test_percentile_rank(self):
+        """下の区間の件数と同じ区間の半分から計算されることのテスト"""
+        counts = [0] * BUCKET_COUNT
+        counts[50], counts[80], counts[99] = 2, 1, 1
+
+        self.assertEqual(percentile_rank(counts, 80.5), 62.5)
+        self.assertEqual(percentile_rank(counts, 100), 87.5)
+        self.assertEqual(percentile_rank(counts, 10), 0.0)
+        self.assertIsNone(percentile_rank([0] * BUCKET_COUNT, 50))
+
+    def test_results_are_added_incrementally(self):
+        """クイズ結果ごとに該当する区間の件数が加算されることのテスト"""
+        for user, percentage in zip(self.users, (50, 50.5, 80, 100)):
+            create_result(user, self.quiz, percentage)
+
+        counts = get_bucket_counts(self.quiz.pk)
+        self.assertEqual((counts[50], counts[80], counts[99], sum(counts)), (2, 1, 1, 4))
+        self.assertEqual(sum(get_bucket_counts(self.other_quiz.pk)), 0)
+
+    def _assert_rebuild_matches_incremental(self):
+        for i, user in enumerate(self.users):
+            create_result(user, self.quiz, 20 * i + 5)
+            create_result(user, self.other_quiz, 100 - i)
+        expected = {quiz.pk: get_bucket_counts(quiz.pk) for quiz in (self.quiz, self.other_quiz)}
+        QuizScoreBucket.objects.update(count=0)
+
+        summary = rebuild_score_distributions()
+
+        self.assertEqual((summary['quizzes'], summary['results']), (2, 8))
+        self.assertEqual({quiz_id: get_bucket_counts(quiz_id) for quiz_id in expected}, expected)
+
+    def test_rebuild_without_numpy(self):
+        """NumPyがない環境でも作り直しが加算と一致することのテスト"""
+        with patch.object(distribution, 'np', None):
+            self._assert_rebuild_matches_incremental()
+
+    @unittest.skipIf(distribution.np is None, 'NumPyがインストールされていません')
+    def test_rebuild_with_numpy(self):
+        """NumPyでの作り直しが加算と一致することのテスト"""
+        self._assert_rebuild_matches_incremental()
+
+    def test_add_bucket_counts(self):
+        """チャンクごとの区間の件数が加算されることのテスト"""
+        counts = [0] * BUCKET_COUNT
+        with patch.object(distribution, 'np', None):
+            add_bucket_counts(counts, [10.0, 10.9])
+            add_bucket_counts(counts, [10.5, 100.0])
+            add_bucket_counts(counts, [])
+        self.assertEqual((counts[10], counts[99], sum(counts)), (3, 1, 4))
+
+    def test_quiz_bucket_counts_are_read_in_chunks(self):
+        """結果がチャンクに分けて集計されることのテスト"""
+        for user, percentage in zip(self.users, (10, 10.5, 30, 100)):
+            create_result(user, self.quiz, percentage)
+        create_result(self.users[0], self.other_quiz, 10)
+
+        with patch.object(distribution, 'REBUILD_READ_CHUNK_SIZE', 3), \
+                patch.object(distribution, 'add_bucket_counts', wraps=add_bucket_counts) as add:
+            counts = compute_quiz_bucket_counts(self.quiz.pk)
+
+        self.assertEqual([len(c.args[1]) for c in add.call_args_list], [3, 1])
+        self.assertEqual((counts[10], counts[30], counts[99], sum(counts)), (2, 1, 1, 4))
+
+    def test_rebuild_updates_rows_in_place(self):
+        """作り直しは区間の行を削除せずに更新し、件数が0の区間の行のみ削除することのテスト"""
+        create_result(self.users[0], self.quiz, 40)
+        create_result(self.users[1], self.quiz, 60)
+        kept = QuizScoreBucket.objects.get(quiz=self.quiz, bucket=40)
+        QuizScoreBucket.objects.filter(pk=kept.pk).update(count=5)
+        QuizScoreBucket.objects.create(quiz=self.quiz, bucket=70, count=3)
+
+        self.assertEqual(rebuild_quiz_distribution(self.quiz.pk), 2)
+
+        rows = dict(QuizScoreBucket.objects.filter(quiz=self.quiz).values_list('bucket', 'count'))
+        self.assertEqual(rows, {40: 1, 60: 1})
+        self.assertEqual(QuizScoreBucket.objects.get(quiz=self.quiz, bucket=40).pk, kept.pk)
+
+    def test_rebuild_retries_when_bucket_row_is_created_concurrently(self):
+        """区間の行の作成が同時の作成と競合した場合は、そのクイズの作り直しを再試行することのテスト"""
+        create_result(self.users[0], self.quiz, 40)
+        QuizScoreBucket.objects.filter(quiz=self.quiz).delete()
+        bulk_create = QuizScoreBucket.objects.bulk_create
+        calls = []
+
+        def conflicting_bulk_create(objs, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 1:
+                raise IntegrityError('duplicate key value violates unique constraint')
+            return bulk_create(objs, **kwargs)
+
+        with patch.object(QuizScoreBucket.objects, 'bulk_create', side_effect=conflicting_bulk_create):
+            self.assertEqual(rebuild_quiz_distribution(self.quiz.pk), 1)
+
+        self.assertEqual(calls, [1, 1])
+        self.assertEqual(sum(get_bucket_counts(self.quiz.pk)), 1)
+
+    def test_rebuild_command_for_one_quiz(self):
+        """クイズを指定した作り直しは他のクイズの分布を変更しないことのテスト"""
+        create_result(self.users[0], self.quiz, 40)
+        create_result(self.users[0], self.other_quiz, 60)
+        QuizScoreBucket.objects.filter(quiz=self.other_quiz).update(count=7)
+        QuizScoreBucket.objects.filter(quiz=self.quiz).update(count=7)
+        out = StringIO()
+
+        call_command('rebuild_score_distributions', '--quiz', str(self.quiz.pk), stdout=out)
+
+        self.assertEqual(sum(get_bucket_counts(self.quiz.pk)), 1)
+        self.assertEqual(sum(get_bucket_counts(self.other_quiz.pk)), 7)
+        self.assertIn('1件のクイズの正答率分布を作り直しました', out.getvalue())
+
+
+class ScoreDistributionAPITests(APITestCase):
+    """パーセンタイル順位のAPIのテスト"""
+
+    def setUp(self):
+        self.quiz = create_quiz()
+        self.other_quiz = create_quiz('HTML基礎', 'web')
+        self.users = [
+            User.objects.create_user(username=f'api{i}', email=f'api{i}@example.com', password='testpassword')
+            for i in range(4)
+        ]
+        for user, percentage in zip(self.users, (20, 40, 60, 80)):
+            create_result(user, self.quiz, percentage)
+            create_result(user, self.other_quiz, percentage)
+
+    def test_distribution_endpoint(self):
+        """分布と指定した正答率・自分の結果のパーセンタイル順位が返されることのテスト"""
+        url = reverse('quiz:quiz-distribution', args=[self.quiz.pk])
+        self.client.force_authenticate(user=self.users[2])
+
+        response = self.client.get(url, {'percentage': 70})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['total'], len(response.data['counts'])), (4, BUCKET_COUNT))
+        self.assertEqual(response.data['percentile_rank'], 75.0)
+        self.assertEqual(response.data['my_percentile_rank'], 62.5)
+        self.assertEqual(self.client.get(url, {'percentage': 'high'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_result_response_includes_percentile(self):
+        """結果の一覧にパーセンタイル順位が含まれ、分布はクイズごとに1回だけ取得されることのテスト"""
+        self.client.force_authenticate(user=self.users[3])
+        bucket_table = QuizScoreBucket._meta.db_table
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('quiz:quizresult-list'))
+
+        results = response.data['results'] if 'results' in response.data else response.data
+        self.assertEqual([r['percentile_rank'] for r in results], [87.5, 87.5])
+        self.assertEqual(sum(bucket_table in q['sql'] for q in queries.captured_queries), 2)
+
+    def test_result_is_created_in_same_transaction_as_distribution(self):
+        """正答率分布の加算に失敗した場合はクイズ結果の作成もロールバックされることのテスト"""
+        self.client.force_authenticate(user=self.users[0])
+        data = {'quiz': self.quiz.pk, 'score': 50, 'total_possible': 100, 'percentage': 50.0, 'time_taken': 60}
+        before = QuizResult.objects.count()
+
+        with patch('quiz.distribution.record_score', side_effect=IntegrityError('lock timeout')):
+            with self.assertRaises(IntegrityError):
+                self.client.post(reverse('quiz:quizresult-list'), data, format='json')
+
+        self.assertEqual(QuizResult.objects.count(), before)
@@ -0,0 +1,194 @@
+"""
+ランキングのテスト
+
+ソート済みセットの操作、クイズ結果ごとの加算、UserStatistics からの作り直し、
+ランキングのAPIが統計情報テーブルを参照しないことをテストします。
+"""
+
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from quiz.leaderboard import (
+    SCOPE_CATEGORY,
+    SCOPE_DIFFICULTY,
+    InMemoryLeaderboardBackend,
+    RedisLeaderboardBackend,
+    get_top,
+    get_user_rank,
+    leaderboard_key,
+    rebuild_leaderboards,
+    reset_leaderboard,
+)
+from quiz.models import Category, DifficultyLevel, Quiz, QuizResult, UserStatistics
+
+User = get_user_model()
+
+
+class InMemoryLeaderboardBackendTestCase(TestCase):
+    """メモリによるランキングのテスト"""
+
+    def test_increment_top_and_rank(self):
+        """加算後の上位と順位のテスト"""
+        board = InMemoryLeaderboardBackend()
+        key = leaderboard_key()
+        board.increment([key], 1, 50)
+        board.increment([key], 2, 80)
+        board.increment([key], 3, 60)
+        board.increment([key], 1, 40)
+
+        self.assertEqual(board.top(key, 2), [(1, 90), (2, 80)])
+        self.assertEqual(board.rank(key, 3), (3, 60))
+        self.assertIsNone(board.rank(key, 4))
+        self.assertEqual(board.count(key), 3)
+
+    def test_replace(self):
+        """作り直しで古いランキングが置き換えられることのテスト"""
+        board = InMemoryLeaderboardBackend()
+        board.increment([leaderboard_key(), leaderboard_key(SCOPE_CATEGORY, 1)], 1, 50)
+
+        board.replace({leaderboard_key(): {2: 10, 3: 30}})
+
+        self.assertEqual(board.top(leaderboard_key(), 10), [(3, 30), (2, 10)])
+        self.assertEqual(board.count(leaderboard_key(SCOPE_CATEGORY, 1)), 0)
+
+
+class RedisLeaderboardBackendTestCase(TestCase):
+    """Redisによるランキングのテスト"""
+
+    @patch('quiz.leaderboard.redis')
+    def test_commands(self, mock_redis):
+        """ZINCRBY / ZREVRANGE / ZREVRANK を使用することのテスト"""
+        client = mock_redis.Redis.from_url.return_value
+        pipeline = client.pipeline.return_value
+        pipeline.execute.return_value = [0, 120.0]
+        client.zrevrange.return_value = [('7', 120.0), ('3', 90.0)]
+        board = RedisLeaderboardBackend('redis://localhost:6379/2')
+
+        board.increment(['a', 'b'], 7, 30)
+        self.assertEqual([c.args for c in pipeline.zincrby.call_args_list], [('a', 30, 7), ('b', 30, 7)])
+        self.assertEqual(board.top('a', 2), [(7, 120), (3, 90)])
+        client.zrevrange.assert_called_with('a', 0, 1, withscores=True)
+        self.assertEqual(board.rank('a', 7), (1, 120))
+
+    @patch('quiz.leaderboard.redis')
+    def test_replace_renames_and_deletes_stale(self, mock_redis):
+        """作り直しは一時キーからRENAMEし、不要なランキングを削除することのテスト"""
+        client = mock_redis.Redis.from_url.return_value
+        client.scan_iter.return_value = [leaderboard_key(), leaderboard_key(SCOPE_DIFFICULTY, 9)]
+        pipeline = client.pipeline.return_value
+
+        RedisLeaderboardBackend('redis://localhost').replace({leaderboard_key(): {1: 10}})
+
+        pipeline.zadd.assert_called_once_with(f'{leaderboard_key()}:rebuild', {1: 10})
+        pipeline.rename.assert_called_once_with(f'{leaderboard_key()}:rebuild', leaderboard_key())
+        pipeline.delete.assert_called_with(leaderboard_key(SCOPE_DIFFICULTY, 9))
+
+
+@override_settings(QUIZ_LEADERBOARD_BACKEND='memory')
+class LeaderboardUpdateTestCase(TestCase):
+    """クイズ結果ごとの加算と作り直しのテスト"""
+
+    def setUp(self):
+        reset_leaderboard()
+        self.addCleanup(reset_leaderboard)
+        self.users = [
+            User.objects.create_user(username=f'ranker{i}', email=f'ranker{i}@example.com', password='testpassword')
+            for i in range(2)
+        ]
+        self.category = Category.objects.create(name='Python', slug='python')
+        self.difficulty = DifficultyLevel.objects.create(name='初級', slug='beginner', level=1, point_multiplier=1.0)
+        self.quiz = Quiz.objects.create(category=self.category, difficulty=self.difficulty, title='Python基礎')
+
+    def _result(self, user, score):
+        return QuizResult.objects.create(
+            user=user, quiz=self.quiz, score=score, total_possible=100, percentage=score, time_taken=60,
+        )
+
+    def test_results_are_added_on_commit(self):
+        """コミット後に全体・カテゴリ別・難易度別のランキングへ加算されることのテスト"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._result(self.users[0], 70)
+            self._result(self.users[1], 90)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._result(self.users[0], 50)
+
+        self.assertEqual(get_top(), [(self.users[0].pk, 120), (self.users[1].pk, 90)])
+        self.assertEqual(get_user_rank(self.users[1].pk, SCOPE_CATEGORY, self.category.pk), (2, 90))
+        self.assertEqual(get_top(SCOPE_DIFFICULTY, self.difficulty.pk, limit=1), [(self.users[0].pk, 120)])
+
+    def test_rebuild_from_statistics(self):
+        """UserStatistics の全体・カテゴリ別・難易度別の行から作り直されることのテスト"""
+        UserStatistics.objects.create(user=self.users[0], total_points=300)
+        UserStatistics.objects.create(user=self.users[1], total_points=500)
+        UserStatistics.objects.create(user=self.users[0], category=self.category, total_points=200)
+        UserStatistics.objects.create(user=self.users[0], difficulty=self.difficulty, total_points=100)
+        UserStatistics.objects.create(user=self.users[1], category=self.category, difficulty=self.difficulty, total_points=999)
+
+        sizes = rebuild_leaderboards()
+
+        self.assertEqual(len(sizes), 3)
+        self.assertEqual(get_top(), [(self.users[1].pk, 500), (self.users[0].pk, 300)])
+        self.assertEqual(get_top(SCOPE_CATEGORY, self.category.pk), [(self.users[0].pk, 200)])
+        self.assertEqual(get_user_rank(self.users[0].pk, SCOPE_DIFFICULTY, self.difficulty.pk), (1, 100))
+
+    def test_leaderboard_failure_does_not_break_results(self):
+        """ランキングの更新に失敗してもクイズ結果は保存されることのテスト"""
+        failing = MagicMock()
+        failing.increment.side_effect = ConnectionError('redis is down')
+        with patch('quiz.leaderboard.get_leaderboard', return_value=failing):
+            with self.captureOnCommitCallbacks(execute=True):
+                self._result(self.users[0], 70)
+
+        self.assertEqual(QuizResult.objects.count(), 1)
+
+
+@override_settings(QUIZ_LEADERBOARD_BACKEND='memory')
+class LeaderboardAPITests(APITestCase):
+    """ランキングのAPIのテスト"""
+
+    def setUp(self):
+        reset_leaderboard()
+        self.addCleanup(reset_leaderboard)
+        self.users = [
+            User.objects.create_user(username=f'player{i}', email=f'player{i}@example.com', password='testpassword')
+            for i in range(3)
+        ]
+        self.category = Category.objects.create(name='Python', slug='python')
+        for points, user in zip((100, 300, 200), self.users):
+            UserStatistics.objects.create(user=user, total_points=points)
+        UserStatistics.objects.create(user=self.users[0], category=self.category, total_points=100)
+        rebuild_leaderboards()
+        self.client.force_authenticate(user=self.users[0])
+
+    def test_global_top(self):
+        """全体の上位N件がユーザー名付きで返され、統計情報テーブルを参照しないことのテスト"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('quiz:leaderboard-list'), {'limit': 2})
+
+        self.assertEqual(response.data['total_users'], 3)
+        self.assertEqual(
+            [(r['rank'], r['username'], r['total_points']) for r in response.data['results']],
+            [(1, 'player1', 300), (2, 'player2', 200)],
+        )
+        self.assertFalse(any(UserStatistics._meta.db_table in q['sql'] for q in queries.captured_queries))
+
+    def test_category_top_and_my_rank(self):
+        """カテゴリ別の上位と自分の順位のテスト"""
+        response = self.client.get(reverse('quiz:leaderboard-category', args=[self.category.pk]))
+        self.assertEqual([r['user_id'] for r in response.data['results']], [self.users[0].pk])
+
+        response = self.client.get(reverse('quiz:leaderboard-me'))
+        self.assertEqual((response.data['rank'], response.data['total_points']), (3, 100))
+
+        response = self.client.get(reverse('quiz:leaderboard-me'), {'category': self.category.pk})
+        self.assertEqual((response.data['scope'], response.data['rank']), (SCOPE_CATEGORY, 1))
+
+        self.client.force_authenticate(user=self.users[1])
+        response = self.client.get(reverse('quiz:leaderboard-me'), {'category': self.category.pk})
+        self.assertIsNone(response.data['rank'])
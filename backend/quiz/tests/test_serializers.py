@@ -696,7 +696,7 @@ class QuizResultSerializerTest(TestCase):
         expected_fields = set([
             'id', 'user', 'username', 'quiz', 'quiz_title', 
             'category_name', 'difficulty_name', 
-            'score', 'total_possible', 'percentage', 
+            'score', 'total_possible', 'percentage', 'percentile_rank',
             'time_taken', 'passed', 'completed_at', 
             'created_at', 'updated_at'
         ])
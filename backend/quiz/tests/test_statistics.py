@@ -0,0 +1,270 @@
+"""
+Django側でのユーザー統計情報の集計のテスト
+
+QuizResult の作成時にトリガーと同じ4行の統計情報と活動履歴が更新されること、
+更新のクエリ数が結果の件数によらないこと、QuizResult からの一括の再計算をテストします。
+"""
+
+import datetime
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from quiz import statistics
+from quiz.models import ActivityHistory, Category, DifficultyLevel, Quiz, QuizResult, UserStatistics
+from quiz.statistics import (
+    build_grouping_sets_sql,
+    get_rebuild_user_ids,
+    get_statistics_backend,
+    get_statistics_scopes,
+    rebuild_user_statistics,
+)
+
+User = get_user_model()
+
+
+@override_settings(QUIZ_STATISTICS_BACKEND='django')
+class DjangoStatisticsAggregatorTestCase(TestCase):
+    """Django側での集計のテスト"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='statsuser', email='stats@example.com', password='testpassword')
+        self.category = Category.objects.create(name='Python', slug='python')
+        self.difficulty = DifficultyLevel.objects.create(name='初級', slug='beginner', level=1, point_multiplier=1.0)
+        self.other_difficulty = DifficultyLevel.objects.create(name='中級', slug='intermediate', level=2, point_multiplier=1.5)
+        self.quiz = Quiz.objects.create(category=self.category, difficulty=self.difficulty, title='Python基礎')
+        self.other_quiz = Quiz.objects.create(category=self.category, difficulty=self.other_difficulty, title='Python応用')
+
+    def _result(self, quiz, score):
+        return QuizResult.objects.create(
+            user=self.user, quiz=quiz, score=score, total_possible=100, percentage=score, time_taken=60,
+        )
+
+    def _stats(self, category=None, difficulty=None):
+        return UserStatistics.objects.get(user=self.user, category=category, difficulty=difficulty)
+
+    def test_all_scopes_are_updated(self):
+        """全体・カテゴリ別・難易度別・組み合わせの4行が更新されることのテスト"""
+        self._result(self.quiz, 80)
+        last = self._result(self.quiz, 60)
+        self._result(self.other_quiz, 100)
+
+        overall = self._stats()
+        self.assertEqual((overall.quizzes_completed, overall.total_points, overall.highest_score), (3, 240, 100))
+        self.assertAlmostEqual(overall.avg_score, 80.0)
+
+        combined = self._stats(self.category, self.difficulty)
+        self.assertEqual((combined.quizzes_completed, combined.total_points, combined.highest_score), (2, 140, 80))
+        self.assertAlmostEqual(combined.avg_score, 70.0)
+        self.assertEqual(combined.last_quiz_date, last.completed_at)
+
+        self.assertEqual(self._stats(category=self.category).quizzes_completed, 3)
+        self.assertEqual(self._stats(difficulty=self.other_difficulty).quizzes_completed, 1)
+        self.assertEqual(UserStatistics.objects.filter(user=self.user).count(), 6)
+
+        activities = ActivityHistory.objects.filter(user=self.user)
+        self.assertEqual(activities.count(), 3)
+        self.assertEqual(activities.filter(difficulty=self.other_difficulty).get().score, 100)
+
+    def test_query_count_does_not_depend_on_history(self):
+        """既存の行の更新のクエリ数が結果の件数によらず一定であることのテスト"""
+        self._result(self.quiz, 50)
+
+        counts = []
+        for score in (60, 70, 80):
+            with CaptureQueriesContext(connection) as queries:
+                self._result(self.quiz, score)
+            counts.append(len(queries))
+
+        self.assertEqual(len(set(counts)), 1)
+
+    def test_updates_are_not_applied_again_on_save(self):
+        """既存の結果の保存では集計しないことのテスト"""
+        result = self._result(self.quiz, 80)
+        result.time_taken = 90
+        result.save()
+
+        self.assertEqual(self._stats().quizzes_completed, 1)
+
+    @override_settings(QUIZ_STATISTICS_BACKEND='trigger')
+    def test_trigger_backend_does_nothing(self):
+        """トリガーに任せる設定ではDjango側で集計しないことのテスト"""
+        self._result(self.quiz, 80)
+
+        self.assertFalse(UserStatistics.objects.filter(user=self.user).exists())
+        self.assertFalse(ActivityHistory.objects.filter(user=self.user).exists())
+
+    @override_settings(QUIZ_STATISTICS_BACKEND='signals')
+    def test_unknown_backend(self):
+        """不明な集計方法はエラーになることのテスト"""
+        with self.assertRaises(ValueError):
+            get_statistics_backend()
+
+    def test_scope_rows_are_unique_including_null(self):
+        """カテゴリや難易度がNULLの行も (user, category, difficulty) で一意になることのテスト"""
+        self._result(self.quiz, 80)
+
+        duplicate = UserStatistics(user=self.user, category=self.category, difficulty=None)
+        with self.assertRaises(ValidationError):
+            duplicate.validate_constraints()
+
+    def test_upsert_is_single_statement(self):
+        """NULLS NOT DISTINCT に対応する場合は全行を1文の INSERT ... ON CONFLICT で加算することのテスト"""
+        result = self._result(self.quiz, 80)
+        scopes = get_statistics_scopes(self.category.pk, self.difficulty.pk)
+
+        with patch.object(connection.features, 'supports_nulls_distinct_unique_constraints', True), \
+                patch.object(statistics, '_upsert_scopes') as mock_upsert:
+            statistics.apply_quiz_result(result)
+        mock_upsert.assert_called_once_with(result, scopes)
+
+        cursor = MagicMock()
+        with patch.object(statistics.connection, 'cursor') as mock_cursor:
+            mock_cursor.return_value.__enter__.return_value = cursor
+            statistics._upsert_scopes(result, scopes)
+
+        cursor.execute.assert_called_once()
+        sql, params = cursor.execute.call_args.args
+        self.assertIn('ON CONFLICT (user_id, category_id, difficulty_id) DO UPDATE', sql)
+        self.assertIn('quizzes_completed = s.quizzes_completed + 1', sql)
+        self.assertEqual([tuple(params[i + 1:i + 3]) for i in range(0, len(params), 9)], scopes)
+
+    def test_scopes(self):
+        """カテゴリや難易度がない場合はその行を対象にしないことのテスト"""
+        self.assertEqual(get_statistics_scopes(1, 2), [(None, None), (1, None), (None, 2), (1, 2)])
+        self.assertEqual(get_statistics_scopes(None, 2), [(None, None), (None, 2)])
+
+
+class RebuildUserStatisticsTestCase(TestCase):
+    """QuizResult からの統計情報の再計算のテスト"""
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'rebuild{i}', email=f'rebuild{i}@example.com', password='testpassword')
+            for i in range(3)
+        ]
+        self.python = Category.objects.create(name='Python', slug='python')
+        self.web = Category.objects.create(name='Web', slug='web')
+        self.beginner = DifficultyLevel.objects.create(name='初級', slug='beginner', level=1, point_multiplier=1.0)
+        self.advanced = DifficultyLevel.objects.create(name='上級', slug='advanced', level=3, point_multiplier=2.0)
+        quizzes = [
+            Quiz.objects.create(category=self.python, difficulty=self.beginner, title='Python基礎'),
+            Quiz.objects.create(category=self.python, difficulty=self.advanced, title='Python応用'),
+            Quiz.objects.create(category=self.web, difficulty=self.beginner, title='HTML基礎'),
+        ]
+        # Django側の集計で正しい統計情報を作成し、再計算の期待値とする
+        with self.settings(QUIZ_STATISTICS_BACKEND='django'):
+            for i, user in enumerate(self.users[:2]):
+                for j, quiz in enumerate(quizzes):
+                    for score in (40 + 10 * i + j, 90 - j):
+                        QuizResult.objects.create(
+                            user=user, quiz=quiz, score=score, total_possible=100, percentage=score, time_taken=60,
+                        )
+        self.expected = self._snapshot()
+
+    def _snapshot(self):
+        return {
+            (s.user_id, s.category_id, s.difficulty_id): (
+                s.quizzes_completed, s.total_points, round(s.avg_score, 6), s.highest_score, s.last_quiz_date,
+            )
+            for s in UserStatistics.objects.all()
+        }
+
+    def _corrupt(self):
+        """トリガーの不具合を模して統計情報を壊します"""
+        UserStatistics.objects.filter(user=self.users[0]).update(quizzes_completed=0, total_points=0, avg_score=0)
+        UserStatistics.objects.filter(user=self.users[1], category=None, difficulty=None).delete()
+        UserStatistics.objects.create(user=self.users[2], quizzes_completed=3, total_points=99)
+
+    def test_rebuild_all(self):
+        """全ユーザーの統計情報が結果から再計算され、結果のない行が削除されることのテスト"""
+        self._corrupt()
+
+        result = rebuild_user_statistics(chunk_size=1)
+
+        self.assertEqual(self._snapshot(), self.expected)
+        self.assertEqual((result.users, result.created, result.deleted), (3, 1, 1))
+        self.assertEqual(result.updated, len(self.expected) - 1)
+
+    def test_rebuild_category(self):
+        """カテゴリを指定した場合はそのカテゴリを含む行のみが再計算されることのテスト"""
+        self._corrupt()
+
+        rebuild_user_statistics(category_ids=[self.python.pk])
+
+        user = self.users[0]
+        self.assertEqual(self._snapshot()[(user.pk, self.python.pk, None)], self.expected[(user.pk, self.python.pk, None)])
+        self.assertEqual(UserStatistics.objects.get(user=user, category=self.web, difficulty=None).quizzes_completed, 0)
+        self.assertEqual(UserStatistics.objects.get(user=user, category=None, difficulty=None).quizzes_completed, 0)
+        self.assertTrue(UserStatistics.objects.filter(user=self.users[2]).exists())
+
+    def test_rebuild_user_selection(self):
+        """ユーザーと期間の指定で対象のユーザーが絞り込まれることのテスト"""
+        QuizResult.objects.filter(user=self.users[1]).update(completed_at=F('completed_at') - datetime.timedelta(days=30))
+        since = timezone.now() - datetime.timedelta(days=1)
+
+        self.assertEqual(get_rebuild_user_ids(since=since), [self.users[0].pk])
+        self.assertEqual(get_rebuild_user_ids(until=since), [self.users[1].pk])
+        self.assertEqual(get_rebuild_user_ids(user_ids=[self.users[1].pk, self.users[2].pk]), [self.users[1].pk])
+
+    def test_grouping_sets_sql(self):
+        """全集計レベルを1回のGROUPING SETSで集計するSQLのテスト"""
+        sql = build_grouping_sets_sql(2)
+        self.assertIn('GROUP BY GROUPING SETS ((r.user_id, q.category_id, q.difficulty_id), '
+                      '(r.user_id, q.category_id), (r.user_id, q.difficulty_id), (r.user_id))', sql)
+        self.assertIn('r.user_id IN (%s, %s)', sql)
+
+        sql = build_grouping_sets_sql(1, category_count=1)
+        self.assertIn('q.category_id IN (%s)', sql)
+        self.assertNotIn('(r.user_id))', sql)
+
+    def test_command(self):
+        """コマンドで再計算できることのテスト"""
+        self._corrupt()
+        out = StringIO()
+
+        call_command('rebuild_user_statistics', '--user', str(self.users[0].pk), stdout=out)
+
+        self.assertIn('1人の統計情報を再計算しました', out.getvalue())
+        user_rows = {k: v for k, v in self._snapshot().items() if k[0] == self.users[0].pk}
+        self.assertEqual(user_rows, {k: v for k, v in self.expected.items() if k[0] == self.users[0].pk})
+
+
+class MergeDuplicateStatisticsMigrationTestCase(TestCase):
+    """一意制約の追加前に重複した統計情報の行をまとめるマイグレーションのテスト"""
+
+    def test_duplicates_are_merged_without_losing_results(self):
+        """重複した行の件数・ポイントを合算し、最高スコア・最終クイズ日は最大値とすることのテスト"""
+        import importlib
+        from django.apps import apps
+
+        if connection.features.supports_nulls_distinct_unique_constraints:
+            self.skipTest('NULLS NOT DISTINCT の一意制約があるため重複行を作成できない')
+        migration = importlib.import_module('quiz.migrations.0012_userstatistics_nulls_not_distinct')
+        user = User.objects.create_user(username='dupuser', password='testpassword')
+        earlier = timezone.now() - datetime.timedelta(days=1)
+        later = timezone.now()
+        first = UserStatistics.objects.create(
+            user=user, quizzes_completed=1, total_points=80, avg_score=80.0, highest_score=80, last_quiz_date=later,
+        )
+        UserStatistics.objects.create(
+            user=user, quizzes_completed=3, total_points=120, avg_score=40.0, highest_score=60, last_quiz_date=earlier,
+        )
+
+        migration.merge_duplicate_statistics(apps, None)
+
+        merged = UserStatistics.objects.get(user=user)
+        self.assertEqual(merged.pk, first.pk)
+        self.assertEqual(merged.quizzes_completed, 4)
+        self.assertEqual(merged.total_points, 200)
+        self.assertAlmostEqual(merged.avg_score, 50.0)
+        self.assertEqual(merged.highest_score, 80)
+        self.assertEqual(merged.last_quiz_date, later)
@@ -6,6 +6,8 @@ from datetime import datetime, timedelta
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from quiz.models import Category, DifficultyLevel, Quiz, Question, Answer, QuizResult, UserStatistics, ActivityHistory
 
@@ -1186,6 +1188,77 @@ class QuizResultViewSetTests(APITestCase):
         if len(results) >= 2:
             self.assertGreaterEqual(results[0]['score'], results[1]['score'])
 
+    def test_latest_per_quiz(self):
+        """クイズごとの最新の結果が受験回数・最高成績とともに返されるテスト"""
+        # quiz1 を2回再受験（最新は65点、最高は最初の80点）
+        for score in (95, 65):
+            QuizResult.objects.create(
+                user=self.user,
+                quiz=self.quiz1,
+                score=score,
+                total_possible=100,
+                percentage=float(score),
+                time_taken=240
+            )
+        # 最高得点の結果を過去にずらし、最新の結果が65点になるようにする
+        QuizResult.objects.filter(user=self.user, quiz=self.quiz1, score=95).update(
+            completed_at=self.result1.completed_at - timedelta(days=1)
+        )
+
+        # クライアントに認証情報を設定
+        self.client.force_authenticate(user=self.user)
+
+        # APIリクエスト実行
+        response = self.client.get(reverse('quiz:quizresult-latest-per-quiz'))
+
+        # ステータスコードの検証
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+
+        # クイズごとに1件（自分の結果のみ）、完了日時の新しい順で返されることを検証
+        self.assertEqual([result['quiz'] for result in results], [self.quiz1.pk, self.quiz2.pk])
+        latest = results[0]
+        self.assertEqual(latest['score'], 65)
+        self.assertEqual(latest['attempt_count'], 3)
+        self.assertEqual(latest['best_score'], 95)
+        self.assertEqual(latest['best_percentage'], 95.0)
+        self.assertEqual((results[1]['score'], results[1]['attempt_count']), (60, 1))
+
+        # クイズによる絞り込みと不正な値の検証
+        response = self.client.get(reverse('quiz:quizresult-latest-per-quiz'), {'quiz': self.quiz2.pk})
+        self.assertEqual([result['quiz'] for result in response.data['results']], [self.quiz2.pk])
+        response = self.client.get(reverse('quiz:quizresult-latest-per-quiz'), {'quiz': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_latest_per_quiz_as_admin(self):
+        """管理者にはユーザー・クイズごとの最新の結果が返されるテスト"""
+        # クライアントに認証情報を設定
+        self.client.force_authenticate(user=self.admin_user)
+
+        # APIリクエスト実行
+        response = self.client.get(reverse('quiz:quizresult-latest-per-quiz'))
+
+        # ユーザーごとに分けて集計されることを検証
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertTrue(all(result['attempt_count'] == 1 for result in response.data['results']))
+
+
+    def test_latest_per_quiz_is_paginated_in_database(self):
+        """最新の結果の並べ替えとページネーションがデータベースで行われるテスト"""
+        self.client.force_authenticate(user=self.admin_user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('quiz:quizresult-latest-per-quiz'), {'limit': 2, 'offset': 1})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        expected = list(
+            QuizResult.objects.order_by('-completed_at', '-id').values_list('pk', flat=True)[1:3]
+        )
+        self.assertEqual([result['id'] for result in response.data['results']], expected)
+        page_sql = next(q['sql'] for q in queries.captured_queries if 'LIMIT 2' in q['sql'])
+        self.assertIn('ORDER BY', page_sql)
 
 class UserStatisticsViewSetTests(APITestCase):
     """UserStatisticsViewSetに対するテスト"""
@@ -1719,4 +1792,19 @@ class ActivityHistoryViewSetTests(APITestCase):
         if len(response.data) >= 2:
             date1 = datetime.fromisoformat(response.data[0]['activity_date'].replace('Z', '+00:00'))
             date2 = datetime.fromisoformat(response.data[1]['activity_date'].replace('Z', '+00:00'))
-            self.assertGreaterEqual(date1, date2)  # 最新のものが先に来ていることを検証
\ No newline at end of file
+            self.assertGreaterEqual(date1, date2)  # 最新のものが先に来ていることを検証
+    def test_recent_endpoint_limit_validation(self):
+        """limit が整数でない場合は400、範囲外の場合は1〜MAX_RECENT_LIMITに丸めることのテスト"""
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.recent_url, {'limit': 'many'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('detail', response.data)
+
+        response = self.client.get(self.recent_url, {'limit': 0})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+        response = self.client.get(self.recent_url, {'limit': 100000})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
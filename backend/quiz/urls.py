@@ -13,7 +13,10 @@ from .views import (
     AnswerViewSet,
     QuizResultViewSet,
     UserStatisticsViewSet,
-    ActivityHistoryViewSet
+    ActivityHistoryViewSet,
+    LeaderboardViewSet,
+    ActivityCalendarViewSet,
+    DashboardViewSet
 )
 
 # DRF用ルーターの初期化
@@ -28,6 +31,9 @@ router.register(r'answers', AnswerViewSet)
 router.register(r'quiz-results', QuizResultViewSet)
 router.register(r'user-statistics', UserStatisticsViewSet)
 router.register(r'activity-history', ActivityHistoryViewSet)
+router.register(r'leaderboard', LeaderboardViewSet, basename='leaderboard')
+router.register(r'activity-calendar', ActivityCalendarViewSet, basename='activity-calendar')
+router.register(r'dashboard', DashboardViewSet, basename='dashboard')
 
 # アプリのURLパターン
 urlpatterns = [
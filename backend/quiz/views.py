@@ -2,14 +2,19 @@
 クイズアプリのビュー定義
 """
 
-from rest_framework import viewsets, permissions, filters
+import datetime
+
+from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Avg, Sum
+from django.db.models import Avg, Count, F, Max, OuterRef, Subquery, Sum, Window
+from django.db.models.functions import RowNumber
+from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.db import transaction
+from django.utils.dateparse import parse_date
+from django.db import connection, transaction
 
 from .models import (
     Category, 
@@ -21,6 +26,18 @@ from .models import (
     UserStatistics,
     ActivityHistory
 )
+from .activity import DEFAULT_HEATMAP_DAYS, MAX_HEATMAP_DAYS, activity_today, get_heatmap, get_streak
+from .cache import get_or_build_catalog_cache, get_or_build_user_cache
+from .distribution import get_bucket_counts, get_bucket_counts_for_quizzes, get_distribution, percentile_rank
+from .leaderboard import (
+    DEFAULT_LEADERBOARD_LIMIT,
+    SCOPE_CATEGORY,
+    SCOPE_DIFFICULTY,
+    SCOPE_GLOBAL,
+    get_leaderboard_size,
+    get_top,
+    get_user_rank,
+)
 from .serializers import (
     CategorySerializer,
     DifficultyLevelSerializer,
@@ -29,6 +46,7 @@ from .serializers import (
     QuestionSerializer,
     AnswerSerializer,
     QuizResultSerializer,
+    LatestQuizResultSerializer,
     UserStatisticsSerializer,
     ActivityHistorySerializer
 )
@@ -117,6 +135,30 @@ class QuizViewSet(viewsets.ModelViewSet):
         questions = Question.objects.filter(quiz=quiz).order_by('display_order')
         serializer = QuestionSerializer(questions, many=True)
         return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def distribution(self, request, pk=None):
+        """
+        クイズの正答率分布とパーセンタイル順位を取得する
+
+        ?percentage= を指定するとその正答率の、ログイン中は自分の最新の結果のパーセンタイル順位を返す
+        """
+        quiz = self.get_object()
+        counts = get_bucket_counts(quiz.pk)
+        data = get_distribution(quiz.pk, counts)
+
+        percentage = request.query_params.get('percentage')
+        try:
+            data['percentile_rank'] = percentile_rank(counts, float(percentage)) if percentage else None
+        except ValueError:
+            return Response({'detail': 'percentageには数値を指定してください'}, status=status.HTTP_400_BAD_REQUEST)
+
+        data['my_percentile_rank'] = None
+        if request.user.is_authenticated:
+            latest = QuizResult.objects.filter(user=request.user, quiz=quiz).order_by('-completed_at').first()
+            if latest:
+                data['my_percentile_rank'] = percentile_rank(counts, latest.percentage)
+        return Response(data)
         
     @action(detail=False, methods=['get'])
     def filter_by_category_and_difficulty(self, request, category_id=None, difficulty_id=None):
@@ -201,6 +243,69 @@ class QuizResultViewSet(viewsets.ModelViewSet):
         if user.is_staff:
             return QuizResult.objects.all()
         return QuizResult.objects.filter(user=user)
+
+    @staticmethod
+    def latest_per_quiz_queryset(queryset):
+        """
+        ユーザー・クイズごとの最新の結果に受験回数と最高成績を付けたクエリセットを返す（完了日時の新しい順）
+
+        最新の行はサブクエリで選び、PostgreSQLでは DISTINCT ON (user_id, quiz_id) で
+        (user, quiz, -completed_at) のインデックスを使い、それ以外のデータベースでは ROW_NUMBER() が1の行に絞り込む。
+        受験回数と最高成績は (user, quiz) ごとの相関サブクエリで集計するため、並べ替えとページネーションは
+        データベースで行われる。
+        """
+        if connection.vendor == 'postgresql':
+            latest = queryset.order_by('user_id', 'quiz_id', '-completed_at', '-id').distinct('user_id', 'quiz_id')
+        else:
+            latest = queryset.annotate(
+                latest_rank=Window(
+                    RowNumber(),
+                    partition_by=[F('user_id'), F('quiz_id')],
+                    order_by=[F('completed_at').desc(), F('id').desc()],
+                ),
+            ).filter(latest_rank=1)
+
+        attempts = (
+            QuizResult.objects.filter(user_id=OuterRef('user_id'), quiz_id=OuterRef('quiz_id'))
+            .order_by().values('user_id', 'quiz_id')
+        )
+        return (
+            QuizResult.objects.filter(pk__in=Subquery(latest.values('pk')))
+            .select_related('user', 'quiz__category', 'quiz__difficulty')
+            .annotate(
+                attempt_count=Subquery(attempts.annotate(value=Count('id')).values('value')),
+                best_score=Subquery(attempts.annotate(value=Max('score')).values('value')),
+                best_percentage=Subquery(attempts.annotate(value=Max('percentage')).values('value')),
+            )
+            .order_by('-completed_at', '-id')
+        )
+
+    @action(detail=False, methods=['get'], url_path='latest-per-quiz')
+    def latest_per_quiz(self, request):
+        """
+        クイズごとの最新の結果を受験回数・最高成績とともに取得する（完了日時の新しい順）
+
+        ?quiz= で絞り込める（管理者は ?user= で特定のユーザーに絞り込める）
+        """
+        queryset = self.get_queryset()
+        for field in ('user', 'quiz'):
+            value = request.query_params.get(field)
+            if value is not None:
+                if not value.isdigit():
+                    return Response({'detail': f'{field} には数値を指定してください。'}, status=status.HTTP_400_BAD_REQUEST)
+                queryset = queryset.filter(**{f'{field}_id': int(value)})
+
+        results = self.latest_per_quiz_queryset(queryset)
+        page = self.paginate_queryset(results)
+        rows = page if page is not None else list(results)
+
+        # パーセンタイル順位の分布は表示するクイズ分を1回のクエリで取得する
+        context = self.get_serializer_context()
+        context['score_distributions'] = get_bucket_counts_for_quizzes({result.quiz_id for result in rows})
+        serializer = LatestQuizResultSerializer(rows, many=True, context=context)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
     
     def get_serializer_context(self):
         """
@@ -224,7 +329,9 @@ class QuizResultViewSet(viewsets.ModelViewSet):
         passed = percentage >= quiz.pass_score if total_possible else False
 
         # QuizResult だけを保存（後続処理は DB トリガーに任せる）
-        serializer.save(user=self.request.user, passed=passed, percentage=percentage)
+        # 正答率分布の加算（post_save）を同じトランザクションで行い、作り直しとの二重計上を防ぐ
+        with transaction.atomic():
+            serializer.save(user=self.request.user, passed=passed, percentage=percentage)
 
 
 class UserStatisticsViewSet(viewsets.ReadOnlyModelViewSet):
@@ -237,6 +344,9 @@ class UserStatisticsViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_fields = ['user', 'category', 'difficulty']
     ordering_fields = ['quizzes_completed', 'total_points', 'avg_score', 'highest_score', 'last_quiz_date']
     permission_classes = [permissions.IsAuthenticated]  # 認証済みユーザーのみアクセス可能
+
+    # サマリーの結果に影響するクエリパラメーター（キャッシュのキーに含める）
+    SUMMARY_PARAMS = ('start_date', 'end_date', 'sort_by', 'sort_dir')
     
     def get_queryset(self):
         """
@@ -260,15 +370,25 @@ class UserStatisticsViewSet(viewsets.ReadOnlyModelViewSet):
     def summary(self, request):
         """
         ユーザーの全体的な統計情報のサマリーを取得する
+
+        トリガーが更新するまで結果は変わらないため、ユーザーごとにキャッシュする（quiz.cache）
         """
-        user = request.user
-        
+        params = {key: request.query_params.get(key) for key in self.SUMMARY_PARAMS}
+        data = get_or_build_user_cache(
+            request.user.pk, 'stats-summary', params,
+            lambda: self.build_summary(request.user, request.query_params),
+        )
+        return Response(data)
+
+    @staticmethod
+    def build_summary(user, query_params):
+        """統計情報のサマリーを集計する（クエリ数はレコード数によらず一定）"""
         # クエリパラメーターから期間フィルターを取得
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
+        start_date = query_params.get('start_date')
+        end_date = query_params.get('end_date')
         
-        # 基本クエリセット
-        stats_query = UserStatistics.objects.filter(user=user)
+        # 基本クエリセット（シリアライズで参照する関連を同時に取得する）
+        stats_query = UserStatistics.objects.filter(user=user).select_related('user', 'category', 'difficulty')
         
         # 期間フィルタリングの適用
         if start_date:
@@ -278,22 +398,21 @@ class UserStatisticsViewSet(viewsets.ReadOnlyModelViewSet):
         
         # 全体統計（カテゴリと難易度がどちらも NULL のレコード）
         overall_qs = stats_query.filter(category__isnull=True, difficulty__isnull=True)
-        total_quizzes = overall_qs.aggregate(total=Sum('quizzes_completed'))['total'] or 0
-        total_points = overall_qs.aggregate(total=Sum('total_points'))['total'] or 0
-        avg_score = overall_qs.aggregate(avg=Avg('avg_score'))['avg'] or 0
+        totals = overall_qs.aggregate(quizzes=Sum('quizzes_completed'), points=Sum('total_points'), avg=Avg('avg_score'))
         
         # フォールバック: 全体行がまだ無い場合は全レコードから集計
-        if total_quizzes == 0:
-            total_quizzes = stats_query.aggregate(total=Sum('quizzes_completed'))['total'] or 0
-            total_points = stats_query.aggregate(total=Sum('total_points'))['total'] or 0
-            avg_score = stats_query.aggregate(avg=Avg('avg_score'))['avg'] or 0
+        if not totals['quizzes']:
+            totals = stats_query.aggregate(quizzes=Sum('quizzes_completed'), points=Sum('total_points'), avg=Avg('avg_score'))
+        total_quizzes = totals['quizzes'] or 0
+        total_points = totals['points'] or 0
+        avg_score = totals['avg'] or 0
         
         # カテゴリごとの統計（難易度=Noneのレコードで集計）
         categories_query = stats_query.filter(difficulty=None)
         
         # ソートオプション（デフォルトは完了クイズ数の降順）
-        sort_by = request.query_params.get('sort_by', 'quizzes_completed')
-        sort_dir = '-' if request.query_params.get('sort_dir', 'desc') == 'desc' else ''
+        sort_by = query_params.get('sort_by') or 'quizzes_completed'
+        sort_dir = '-' if (query_params.get('sort_dir') or 'desc') == 'desc' else ''
         categories = categories_query.order_by(f'{sort_dir}{sort_by}')
         
         # 難易度ごとの統計（カテゴリ=Noneのレコードで集計）
@@ -315,14 +434,14 @@ class UserStatisticsViewSet(viewsets.ReadOnlyModelViewSet):
         category_serializer = UserStatisticsSerializer(categories, many=True)
         difficulty_serializer = UserStatisticsSerializer(difficulties, many=True)
         
-        return Response({
+        return {
             'total_quizzes_completed': total_quizzes,
             'total_points': total_points,
             'overall_avg_score': avg_score,
             'categories': category_serializer.data,
             'difficulties': difficulty_serializer.data,
             'recent_progress': recent_progress
-        })
+        }
 
 
 class ActivityHistoryViewSet(viewsets.ReadOnlyModelViewSet):
@@ -335,6 +454,9 @@ class ActivityHistoryViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_fields = ['user', 'quiz', 'category', 'difficulty', 'activity_type']
     ordering_fields = ['activity_date', 'score', 'percentage']
     permission_classes = [permissions.IsAuthenticated]  # 認証済みユーザーのみアクセス可能
+
+    DEFAULT_RECENT_LIMIT = 10
+    MAX_RECENT_LIMIT = 50
     
     def get_queryset(self):
         """
@@ -348,10 +470,202 @@ class ActivityHistoryViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'])
     def recent(self, request):
         """
-        ユーザーの最近の活動履歴を取得する
+        ユーザーの最近の活動履歴を取得する（?limit= で件数を1〜MAX_RECENT_LIMITで指定）
         """
         user = request.user
-        limit = int(request.query_params.get('limit', 10))
-        activities = ActivityHistory.objects.filter(user=user).order_by('-activity_date')[:limit]
-        serializer = self.get_serializer(activities, many=True)
-        return Response(serializer.data)
+        try:
+            limit = int(request.query_params.get('limit', self.DEFAULT_RECENT_LIMIT))
+        except ValueError:
+            return Response(
+                {'detail': 'limit は整数で指定してください'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # キャッシュのキーにも使うため、範囲外の値は丸める
+        limit = min(max(limit, 1), self.MAX_RECENT_LIMIT)
+        context = self.get_serializer_context()
+        return Response(get_or_build_user_cache(
+            user.pk, 'recent-activities', {'limit': limit},
+            lambda: self.build_recent(user, limit, context),
+        ))
+
+    @staticmethod
+    def build_recent(user, limit, context=None):
+        """最近の活動履歴をシリアライズする（関連を同時に取得し、クエリ数を1回にする）"""
+        activities = (
+            ActivityHistory.objects.filter(user=user)
+            .select_related('user', 'quiz', 'category', 'difficulty')
+            .order_by('-activity_date')[:limit]
+        )
+        return ActivityHistorySerializer(activities, many=True, context=context or {}).data
+
+
+class LeaderboardViewSet(viewsets.ViewSet):
+    """
+    ランキングの取得のためのエンドポイント
+
+    Redisのソート済みセット（quiz.leaderboard）から取得するため、統計情報テーブルは並べ替えない
+    """
+    permission_classes = [permissions.IsAuthenticated]  # 認証済みユーザーのみアクセス可能
+
+    def _get_limit(self, request):
+        try:
+            return int(request.query_params.get('limit', DEFAULT_LEADERBOARD_LIMIT))
+        except ValueError:
+            return DEFAULT_LEADERBOARD_LIMIT
+
+    def _top_response(self, request, scope, scope_id=None):
+        """上位N件のランキングを返す"""
+        top = get_top(scope, scope_id, self._get_limit(request))
+        usernames = dict(
+            get_user_model().objects.filter(pk__in=[user_id for user_id, _ in top]).values_list('pk', 'username')
+        )
+        return Response({
+            'scope': scope,
+            'scope_id': scope_id,
+            'total_users': get_leaderboard_size(scope, scope_id),
+            'results': [
+                {
+                    'rank': rank,
+                    'user_id': user_id,
+                    'username': usernames.get(user_id),
+                    'total_points': points,
+                }
+                for rank, (user_id, points) in enumerate(top, start=1)
+            ],
+        })
+
+    def list(self, request):
+        """
+        全体のランキングの上位を取得する
+        """
+        return self._top_response(request, SCOPE_GLOBAL)
+
+    @action(detail=False, methods=['get'], url_path=r'category/(?P<category_id>\d+)')
+    def category(self, request, category_id=None):
+        """
+        カテゴリ別のランキングの上位を取得する
+        """
+        return self._top_response(request, SCOPE_CATEGORY, int(category_id))
+
+    @action(detail=False, methods=['get'], url_path=r'difficulty/(?P<difficulty_id>\d+)')
+    def difficulty(self, request, difficulty_id=None):
+        """
+        難易度別のランキングの上位を取得する
+        """
+        return self._top_response(request, SCOPE_DIFFICULTY, int(difficulty_id))
+
+    @action(detail=False, methods=['get'])
+    def me(self, request):
+        """
+        自分の順位を取得する（?category=ID または ?difficulty=ID でカテゴリ別・難易度別）
+        """
+        scope, scope_id = SCOPE_GLOBAL, None
+        for param, param_scope in (('category', SCOPE_CATEGORY), ('difficulty', SCOPE_DIFFICULTY)):
+            value = request.query_params.get(param)
+            if value and value.isdigit():
+                scope, scope_id = param_scope, int(value)
+                break
+
+        rank = get_user_rank(request.user.pk, scope, scope_id)
+        return Response({
+            'scope': scope,
+            'scope_id': scope_id,
+            'rank': rank[0] if rank else None,
+            'total_points': rank[1] if rank else 0,
+            'total_users': get_leaderboard_size(scope, scope_id),
+        })
+
+
+class ActivityCalendarViewSet(viewsets.ViewSet):
+    """
+    日別活動（ヒートマップ・連続学習日数）の取得のためのエンドポイント
+
+    日別活動の集計行（quiz.activity）から取得するため、活動履歴の長さによらない
+    """
+    permission_classes = [permissions.IsAuthenticated]  # 認証済みユーザーのみアクセス可能
+
+    @action(detail=False, methods=['get'])
+    def heatmap(self, request):
+        """
+        期間内の日ごとのクイズ完了数を取得する（?start=YYYY-MM-DD&end=YYYY-MM-DD&category=ID）
+        """
+        end = request.query_params.get('end')
+        start = request.query_params.get('start')
+        end_date = parse_date(end) if end else activity_today()
+        start_date = parse_date(start) if start else None
+        if end_date is None or (start and start_date is None):
+            return Response({'detail': '日付はYYYY-MM-DD形式で指定してください'}, status=status.HTTP_400_BAD_REQUEST)
+        if start_date is None:
+            start_date = end_date - datetime.timedelta(days=DEFAULT_HEATMAP_DAYS - 1)
+        if start_date > end_date or (end_date - start_date).days >= MAX_HEATMAP_DAYS:
+            return Response(
+                {'detail': f'期間は{MAX_HEATMAP_DAYS}日以内で指定してください'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        category = request.query_params.get('category')
+        category_id = int(category) if category and category.isdigit() else None
+        days = get_heatmap(request.user.pk, start_date, end_date, category_id)
+        return Response({
+            'start': start_date,
+            'end': end_date,
+            'category': category_id,
+            'total': sum(day['count'] for day in days),
+            'active_days': len(days),
+            'days': days,
+        })
+
+    @action(detail=False, methods=['get'])
+    def streak(self, request):
+        """
+        現在の連続学習日数と最長連続日数を取得する
+        """
+        return Response(get_streak(request.user.pk))
+
+
+class DashboardViewSet(viewsets.ViewSet):
+    """
+    ダッシュボードの取得のためのエンドポイント
+
+    統計サマリー・最近の活動履歴・アクティブなカテゴリ一覧を1回のリクエストで返す。
+    統計サマリーと活動履歴はユーザーごとのキャッシュ（個別のエンドポイントと共有）、
+    カテゴリ一覧はカタログのキャッシュから取得し、クエリ数はデータ量によらず一定になる。
+    """
+    permission_classes = [permissions.IsAuthenticated]  # 認証済みユーザーのみアクセス可能
+
+    DEFAULT_RECENT_LIMIT = 5
+    MAX_RECENT_LIMIT = 50
+
+    def list(self, request):
+        """
+        ダッシュボードに表示するデータをまとめて取得する（?limit= で活動履歴の件数を1〜MAX_RECENT_LIMITで指定）
+        """
+        user = request.user
+        try:
+            limit = int(request.query_params.get('limit', self.DEFAULT_RECENT_LIMIT))
+        except ValueError:
+            return Response(
+                {'detail': 'limit は整数で指定してください'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # キャッシュのキーにも使うため、範囲外の値は丸める
+        limit = min(max(limit, 1), self.MAX_RECENT_LIMIT)
+        context = {'request': request}
+
+        summary = get_or_build_user_cache(
+            user.pk, 'stats-summary', dict.fromkeys(UserStatisticsViewSet.SUMMARY_PARAMS),
+            lambda: UserStatisticsViewSet.build_summary(user, {}),
+        )
+        recent_activities = get_or_build_user_cache(
+            user.pk, 'recent-activities', {'limit': limit},
+            lambda: ActivityHistoryViewSet.build_recent(user, limit, context),
+        )
+        categories = get_or_build_catalog_cache(
+            'active-categories',
+            lambda: CategorySerializer(Category.objects.filter(is_active=True), many=True).data,
+        )
+        return Response({
+            'stats': summary,
+            'recent_activities': recent_activities,
+            'categories': categories,
+        })
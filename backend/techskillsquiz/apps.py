@@ -37,11 +37,16 @@ class TechskillsquizConfig(AppConfig):
         # マイグレーション後のSupabase同期ハンドラを登録
         try:
             from django.db.models.signals import post_migrate
-            from .supabase_sync import post_migration_sync_handler
+            from .supabase_sync import post_migration_sync_handler, build_supabase_model_registry
+            
+            # 同期対象モデルのレジストリを起動時に1回だけ構築
+            supabase_models = build_supabase_model_registry()
             
             # post_migrate信号にハンドラを接続
-            post_migrate.connect(post_migration_sync_handler, sender=self)
-            print("Supabase同期ハンドラが登録されました。", file=sys.stderr)
+            # （このアプリはモデルを持たずsenderに指定しても通知されないため、全アプリの通知を受け、
+            #   ハンドラ側で最後のアプリの通知時にのみ同期を実行する）
+            post_migrate.connect(post_migration_sync_handler, dispatch_uid='techskillsquiz_supabase_sync')
+            print(f"Supabase同期ハンドラが登録されました（対象モデル: {len(supabase_models)}件）。", file=sys.stderr)
             
             # 環境変数の設定状況をログに出力
             auto_sync = getattr(settings, 'SUPABASE_AUTO_SYNC', False)
@@ -50,6 +55,11 @@ class TechskillsquizConfig(AppConfig):
             
             if auto_sync and not has_connection:
                 print("警告: SUPABASE_AUTO_SYNCが有効ですが、接続情報が不足しています。", file=sys.stderr)
+            
+            # defaultデータベースがSupabaseのデータベースそのものであればミラーリングを行わない
+            from .supabase import shares_default_database
+            if shares_default_database():
+                print("DjangoのデータベースがSupabaseのデータベースと同一のため、Supabaseへのミラーリングを無効にします。", file=sys.stderr)
         except ImportError as e:
             print(f"Supabase同期ハンドラのインポートに失敗しました: {e}", file=sys.stderr)
             import traceback
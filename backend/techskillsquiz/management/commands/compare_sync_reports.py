@@ -0,0 +1,94 @@
+"""
+Supabase同期レポート比較コマンド
+
+このコマンドは sync_supabase --report --report-format=json|ndjson で出力した2つの計測レポートを比較し、
+モデルごとの処理時間・HTTP/RPC呼び出し回数・再試行回数・転送バイト数などの差分を表示します。
+リリース間の性能の劣化（処理時間や呼び出し回数の増加）を検出するために使用します。
+
+使用例:
+    python manage.py compare_sync_reports old.json new.json                        # 差分を表示
+    python manage.py compare_sync_reports old.json new.json --threshold=0.2        # 20%以上の増加のみ劣化として扱う
+    python manage.py compare_sync_reports old.json new.json --fail-on-regression   # 劣化があれば終了コード1
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from techskillsquiz.supabase_metrics import load_report, diff_reports
+
+# 劣化とみなす増加率のデフォルト
+DEFAULT_REGRESSION_THRESHOLD = 0.1
+
+
+class Command(BaseCommand):
+    help = '2つのSupabase同期計測レポートを比較します'
+
+    def add_arguments(self, parser):
+        """コマンドライン引数の設定"""
+        parser.add_argument('old_report', help='比較元のレポート（JSON / NDJSON）')
+        parser.add_argument('new_report', help='比較先のレポート（JSON / NDJSON）')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            dest='threshold',
+            default=DEFAULT_REGRESSION_THRESHOLD,
+            help=f'劣化とみなす増加率（デフォルト: {DEFAULT_REGRESSION_THRESHOLD}）',
+        )
+        parser.add_argument(
+            '--fail-on-regression',
+            action='store_true',
+            dest='fail_on_regression',
+            default=False,
+            help='劣化が見つかった場合にエラー終了します（CIでの利用を想定）',
+        )
+
+    def handle(self, *args, **options):
+        """コマンド実行時のメイン処理"""
+        try:
+            old = load_report(options['old_report'])
+            new = load_report(options['new_report'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f'レポートを読み込めませんでした: {str(e)}')
+
+        threshold = options['threshold']
+        rows = diff_reports(old, new)
+
+        self.stdout.write(
+            f"比較元: {options['old_report']}（{old.get('total_seconds', 0):.2f}秒）\n"
+            f"比較先: {options['new_report']}（{new.get('total_seconds', 0):.2f}秒）"
+        )
+
+        if not rows:
+            self.stdout.write(self.style.SUCCESS('差分はありません。'))
+            return
+
+        regressions = []
+        current_model = None
+        for row in rows:
+            if row['model'] != current_model:
+                current_model = row['model']
+                self.stdout.write(f'\n{current_model}')
+
+            line = f"  {row['metric']}: {self._format(row['old'])} → {self._format(row['new'])} ({row['delta']:+g}"
+            line += f", {row['ratio'] - 1:+.0%})" if row['ratio'] is not None else ")"
+
+            # 値が増加し、増加率がしきい値を超えた項目（比較元が0の場合は増加のみで判定）を劣化とする
+            regressed = row['delta'] > 0 and (row['ratio'] is None or row['ratio'] - 1 > threshold)
+            if regressed:
+                regressions.append(row)
+                self.stdout.write(self.style.ERROR(line))
+            elif row['delta'] < 0:
+                self.stdout.write(self.style.SUCCESS(line))
+            else:
+                self.stdout.write(line)
+
+        if regressions:
+            message = f'{len(regressions)}件の項目で{threshold:.0%}を超える増加がありました。'
+            if options['fail_on_regression']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(f'\n{message}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('\nしきい値を超える増加はありません。'))
+
+    def _format(self, value) -> str:
+        """数値を表示用に整形します"""
+        return f'{value:.3f}' if isinstance(value, float) else str(value)
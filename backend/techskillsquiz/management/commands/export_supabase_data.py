@@ -0,0 +1,116 @@
+"""
+Supabaseデータ出力コマンド
+
+このコマンドはSupabaseModelMixinを継承したモデルのデータを、新しいSupabaseプロジェクトへの
+初期データ投入用のSQLスクリプトとして出力します。データはストリーミングで書き出されるため、
+件数に関わらずメモリ使用量は一定です。
+
+使用例:
+    python manage.py export_supabase_data -o seed.sql                  # COPY形式で全モデルを出力
+    python manage.py export_supabase_data --format=insert -o seed.sql  # 複数行INSERT形式で出力
+    python manage.py export_supabase_data --app=quiz --model=Category  # 特定モデルのみ標準出力へ
+    psql "$SUPABASE_DB_URL" -f seed.sql                                # 出力したスクリプトの投入
+"""
+
+from typing import List, Optional, Type
+
+from django.core.management.base import BaseCommand, CommandError
+
+from techskillsquiz.supabase_sync import get_supabase_models
+from techskillsquiz.supabase_mixins import SupabaseModelMixin
+from techskillsquiz.supabase_export import (
+    export_models,
+    EXPORT_FORMATS,
+    EXPORT_FORMAT_COPY,
+    DEFAULT_EXPORT_CHUNK_SIZE,
+)
+
+
+class Command(BaseCommand):
+    help = 'Supabaseへの初期データ投入用のSQLスクリプトを出力します'
+
+    def add_arguments(self, parser):
+        """コマンドライン引数の設定"""
+        parser.add_argument(
+            '--app',
+            dest='app_label',
+            help='特定のアプリケーションのモデルのみを出力します',
+        )
+        parser.add_argument(
+            '--model',
+            dest='model_name',
+            help='特定のモデルのみを出力します',
+        )
+        parser.add_argument(
+            '--format',
+            dest='export_format',
+            choices=EXPORT_FORMATS,
+            default=EXPORT_FORMAT_COPY,
+            help='出力形式（copy: COPY ... FROM STDIN、insert: 複数行INSERT）',
+        )
+        parser.add_argument(
+            '-o', '--output',
+            dest='output',
+            default='-',
+            help='出力先のファイル（デフォルト: 標準出力）',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            dest='chunk_size',
+            default=DEFAULT_EXPORT_CHUNK_SIZE,
+            help=f'1回に読み込む件数（INSERT形式では1文あたりの行数、デフォルト: {DEFAULT_EXPORT_CHUNK_SIZE}）',
+        )
+        parser.add_argument(
+            '--no-sequences',
+            action='store_false',
+            dest='reset_sequences',
+            default=True,
+            help='投入後に主キーのシーケンスを最大値に合わせるSQLを出力しません',
+        )
+
+    def handle(self, *args, **options):
+        """コマンド実行時のメイン処理"""
+        models_to_export = self._get_models_to_export(options.get('app_label'), options.get('model_name'))
+        if not models_to_export:
+            raise CommandError('出力対象のモデルが見つかりませんでした。')
+
+        output = options['output']
+        # 進捗はスクリプトと混ざらないように標準エラーに出力する
+        progress = self.stderr
+
+        def report_model(model, row_count):
+            progress.write(f' - {model._meta.app_label}.{model.__name__}: {row_count}件')
+
+        if output == '-':
+            # OutputWrapperは行末に改行を補うため、そのままの文字列を書き込む
+            self.stdout.ending = ''
+            counts = self._export(models_to_export, self.stdout, options, report_model)
+        else:
+            with open(output, 'w', encoding='utf-8', newline='\n') as stream:
+                counts = self._export(models_to_export, stream, options, report_model)
+
+        total = sum(counts.values())
+        progress.write(self.style.SUCCESS(f'{len(counts)}モデル、{total}件のデータを出力しました。'))
+
+    def _export(self, models_to_export, stream, options, report_model):
+        return export_models(
+            models_to_export,
+            stream,
+            export_format=options['export_format'],
+            chunk_size=options['chunk_size'],
+            reset_sequences=options['reset_sequences'],
+            on_model=report_model,
+        )
+
+    def _get_models_to_export(self, app_label: Optional[str] = None, model_name: Optional[str] = None) -> List[Type[SupabaseModelMixin]]:
+        """出力対象のモデルを取得する"""
+        all_models = get_supabase_models()
+
+        if app_label:
+            all_models = [m for m in all_models if m._meta.app_label == app_label]
+
+        if model_name:
+            all_models = [m for m in all_models if m.__name__ == model_name]
+
+        return all_models
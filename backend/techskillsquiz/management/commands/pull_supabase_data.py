@@ -0,0 +1,141 @@
+"""
+Supabaseデータ取り込みコマンド
+
+このコマンドはSupabaseのトリガー（trigger_update_user_statistics など）が更新するテーブルの
+変更された行のみを取得し、Djangoのデータベースに反映します。
+テーブルごとに前回取り込んだ最後の行の (updated_at, 主キー) をウォーターマークとして保存するため、
+処理量は前回からの変更件数に比例します。
+
+使用例:
+    python manage.py pull_supabase_data                          # 前回のウォーターマーク以降の変更を取り込む
+    python manage.py pull_supabase_data --watch                  # 5秒間隔で継続的に取り込む
+    python manage.py pull_supabase_data --watch --interval=1     # 1秒間隔で継続的に取り込む
+    python manage.py pull_supabase_data --model=UserStatistics   # 特定モデルのみ取り込む
+    python manage.py pull_supabase_data --since=2026-10-01       # 指定日時以降に更新された行を取り込む
+"""
+
+import time
+from typing import List, Type
+
+from django.core.management.base import BaseCommand, CommandError
+
+from techskillsquiz.supabase_data_sync import (
+    get_pull_models,
+    pull_model_changes,
+    parse_since,
+    DEFAULT_DATA_SYNC_BATCH_SIZE,
+    DEFAULT_PULL_INTERVAL,
+    SINCE_AUTO,
+)
+
+# 連続してエラーが発生した場合の最大待機時間（秒）
+MAX_ERROR_BACKOFF = 60.0
+
+
+class Command(BaseCommand):
+    help = 'Supabaseのトリガーが更新するテーブルの変更をDjangoに取り込みます'
+
+    def add_arguments(self, parser):
+        """コマンドライン引数の設定"""
+        parser.add_argument(
+            '--model',
+            dest='model_name',
+            help='特定のモデルのみを取り込みます',
+        )
+        parser.add_argument(
+            '--since',
+            dest='since',
+            default=SINCE_AUTO,
+            help=f"取り込む行の更新日時の下限（ISO 8601形式、'{SINCE_AUTO}' で保存済みのウォーターマークから再開、デフォルト: {SINCE_AUTO}）",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            dest='batch_size',
+            default=DEFAULT_DATA_SYNC_BATCH_SIZE,
+            help=f'1回に取得する件数（デフォルト: {DEFAULT_DATA_SYNC_BATCH_SIZE}）',
+        )
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            dest='watch',
+            default=False,
+            help='終了せずに一定間隔で取り込みを繰り返します',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            dest='interval',
+            default=DEFAULT_PULL_INTERVAL,
+            help=f'--watch のポーリング間隔（秒、デフォルト: {DEFAULT_PULL_INTERVAL}）',
+        )
+
+    def handle(self, *args, **options):
+        """コマンド実行時のメイン処理"""
+        models_to_pull = self._get_models_to_pull(options.get('model_name'))
+        if not models_to_pull:
+            raise CommandError('取り込み対象のモデルが見つかりませんでした。')
+
+        try:
+            since = parse_since(options.get('since'))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        batch_size = options['batch_size']
+
+        if not options['watch']:
+            errors = self._pull_once(models_to_pull, since, batch_size)
+            if errors:
+                raise CommandError(f'{errors}件のモデルの取り込みに失敗しました。')
+            return
+
+        interval = max(0.1, options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'{interval}秒間隔で取り込みを開始します（Ctrl+Cで終了）'))
+        backoff = interval
+        try:
+            while True:
+                errors = self._pull_once(models_to_pull, since, batch_size, quiet=True)
+                # --since は初回のみ使用し、以降は保存したウォーターマークから続ける
+                since = None
+                # エラーが続く場合は待機時間を延ばす
+                backoff = min(backoff * 2, MAX_ERROR_BACKOFF) if errors else interval
+                time.sleep(backoff)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\n取り込みを終了しました。'))
+
+    def _pull_once(self, models_to_pull: List[Type], since, batch_size: int, quiet: bool = False) -> int:
+        """
+        全モデルの変更を1回取り込みます
+
+        Returns:
+            エラーが発生したモデルの数
+        """
+        errors = 0
+        for model in models_to_pull:
+            model_name = f"{model._meta.app_label}.{model.__name__}"
+            try:
+                result = pull_model_changes(model, since, batch_size=batch_size)
+            except Exception as e:
+                errors += 1
+                self.stderr.write(self.style.ERROR(f' ✗ {model_name} の取り込みに失敗しました: {str(e)}'))
+                continue
+
+            if result.synced or not quiet:
+                self.stdout.write(
+                    f' - {model_name}: {result.synced}件を取り込みました ({result.elapsed:.2f}秒)'
+                )
+        return errors
+
+    def _get_models_to_pull(self, model_name=None) -> List[Type]:
+        """取り込み対象のモデルを取得する"""
+        try:
+            all_models = get_pull_models()
+        except LookupError as e:
+            raise CommandError(f'settings.SUPABASE_PULL_MODELS に存在しないモデルがあります: {str(e)}')
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if model_name:
+            all_models = [m for m in all_models if m.__name__ == model_name]
+
+        return all_models
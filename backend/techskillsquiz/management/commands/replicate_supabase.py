@@ -0,0 +1,148 @@
+"""
+Supabase論理レプリケーションコマンド
+
+このコマンドはDjangoのデータベースの論理レプリケーションスロット（wal2json）から
+Supabaseモデルのテーブルの変更を読み込み、Supabaseのデータベースにバッチで反映します。
+QuerySet.update() や bulk_create を含むすべての書き込みがミラーリングされます。
+
+settings.SUPABASE_MIRROR_BACKEND = 'replication' とすると、保存時のシグナルによるミラーリングは行われません。
+反映先は settings.SUPABASE_DB_URL で直接接続します。
+
+使用例:
+    python manage.py replicate_supabase                     # 溜まっている変更を反映して終了
+    python manage.py replicate_supabase --watch             # 1秒間隔で継続的に反映する
+    python manage.py replicate_supabase --batch-size=5000   # 1回に読み込む変更の件数を指定
+    python manage.py replicate_supabase --drop-slot         # レプリケーションスロットを削除（ミラーリングの停止時）
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from techskillsquiz.supabase_backends import connect_supabase_database
+from techskillsquiz.supabase_replication import (
+    LogicalReplicationMirror,
+    DEFAULT_REPLICATION_BATCH_SIZE,
+    DEFAULT_REPLICATION_INTERVAL,
+    DEFAULT_REPLICATION_SLOT,
+)
+from techskillsquiz.supabase_sync import get_supabase_models, SupabaseSyncError
+
+# 連続してエラーが発生した場合の最大待機時間（秒）
+MAX_ERROR_BACKOFF = 60.0
+
+
+class Command(BaseCommand):
+    help = 'Djangoのデータベースの論理レプリケーションでSupabaseへ変更をミラーリングします'
+
+    def add_arguments(self, parser):
+        """コマンドライン引数の設定"""
+        parser.add_argument(
+            '--slot',
+            dest='slot_name',
+            default=DEFAULT_REPLICATION_SLOT,
+            help=f'レプリケーションスロット名（デフォルト: {DEFAULT_REPLICATION_SLOT}）',
+        )
+        parser.add_argument(
+            '--database',
+            dest='database',
+            default='default',
+            help='変更を読み込むDjangoのデータベース（デフォルト: default）',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            dest='batch_size',
+            default=DEFAULT_REPLICATION_BATCH_SIZE,
+            help=f'1回に読み込む変更の件数の目安（デフォルト: {DEFAULT_REPLICATION_BATCH_SIZE}）',
+        )
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            dest='watch',
+            default=False,
+            help='終了せずに一定間隔で反映を繰り返します',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            dest='interval',
+            default=DEFAULT_REPLICATION_INTERVAL,
+            help=f'--watch のポーリング間隔（秒、デフォルト: {DEFAULT_REPLICATION_INTERVAL}）',
+        )
+        parser.add_argument(
+            '--drop-slot',
+            action='store_true',
+            dest='drop_slot',
+            default=False,
+            help='レプリケーションスロットを削除して終了します',
+        )
+
+    def handle(self, *args, **options):
+        """コマンド実行時のメイン処理"""
+        source = connections[options['database']]
+        if source.vendor != 'postgresql':
+            raise CommandError('論理レプリケーションにはPostgreSQLのデータベースが必要です。')
+
+        try:
+            target = connect_supabase_database(application_name='django-supabase-replication')
+        except SupabaseSyncError as e:
+            raise CommandError(str(e))
+
+        mirror = LogicalReplicationMirror(
+            get_supabase_models(),
+            source,
+            target,
+            slot_name=options['slot_name'],
+            batch_size=options['batch_size'],
+        )
+        try:
+            if options['drop_slot']:
+                mirror.drop_slot()
+                self.stdout.write(self.style.SUCCESS(f"レプリケーションスロット {mirror.slot_name} を削除しました。"))
+                return
+
+            if mirror.ensure_slot():
+                self.stdout.write(self.style.WARNING(
+                    f"レプリケーションスロット {mirror.slot_name} を作成しました。"
+                    "作成前の行は sync_supabase --data または --check --fix で反映してください。"
+                ))
+
+            if not options['watch']:
+                self._replicate_until_caught_up(mirror)
+                return
+
+            interval = max(0.1, options['interval'])
+            self.stdout.write(self.style.SUCCESS(f'{interval}秒間隔で反映を開始します（Ctrl+Cで終了）'))
+            backoff = interval
+            try:
+                while True:
+                    try:
+                        self._replicate_until_caught_up(mirror, quiet=True)
+                        backoff = interval
+                    except Exception as e:
+                        # スロットは進んでいないため、次回同じ変更から再試行される
+                        self.stderr.write(self.style.ERROR(f' ✗ 反映に失敗しました: {str(e)}'))
+                        backoff = min(backoff * 2, MAX_ERROR_BACKOFF)
+                    time.sleep(backoff)
+            except KeyboardInterrupt:
+                self.stdout.write(self.style.WARNING('\n反映を終了しました。'))
+        finally:
+            target.close()
+
+    def _replicate_until_caught_up(self, mirror: LogicalReplicationMirror, quiet: bool = False):
+        """スロットに溜まっている変更がなくなるまでバッチで反映します"""
+        total = 0
+        while True:
+            result = mirror.run_once()
+            if result.transactions:
+                total += result.transactions
+                self.stdout.write(
+                    f" - {result.transactions}トランザクション（upsert {result.upserted}件、削除 {result.deleted}件）"
+                    f"を反映しました（LSN {result.lsn}、{result.elapsed:.2f}秒）"
+                )
+            if result.transactions + result.skipped_transactions == 0:
+                break
+        if not total and not quiet:
+            self.stdout.write('反映する変更はありません。')
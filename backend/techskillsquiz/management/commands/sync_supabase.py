@@ -12,7 +12,16 @@ Supabase同期コマンド
     python manage.py sync_supabase --verbose      # 詳細ログ出力
     python manage.py sync_supabase --check        # 整合性チェックのみ実行
     python manage.py sync_supabase --check --fix  # 不整合を自動修正
+    python manage.py sync_supabase --check --deep # レコードの内容まで比較（範囲ダイジェスト）
+    python manage.py sync_supabase --check --fix --resume  # 中断した修復を再開
     python manage.py sync_supabase --report       # 詳細レポート生成
+    python manage.py sync_supabase --report --report-format=json  # 処理時間・呼び出し回数の計測レポート
+    python manage.py sync_supabase --jobs=8       # 最大8モデルを並列に同期
+    python manage.py sync_supabase --force        # スキーマに変更のないモデルも差分を確認
+    python manage.py sync_supabase --backend=direct  # SUPABASE_DB_URLで直接接続し1トランザクションで同期
+    python manage.py sync_supabase --plan > plan.sql  # 実行されるDDLを表示のみ（差分があれば終了コード1）
+    python manage.py sync_supabase --data         # 前回のウォーターマーク以降に更新された行を送信
+    python manage.py sync_supabase --data --since=2026-10-01T00:00:00+09:00  # 指定日時以降に更新された行を送信
 """
 
 import sys
@@ -27,9 +36,44 @@ from django.conf import settings
 from techskillsquiz.supabase_sync import (
     get_supabase_models,
     sync_django_model_to_supabase,
-    sync_all_models_to_supabase
+    sync_all_models_to_supabase,
+    sync_models_to_supabase,
+    sort_models_by_dependency,
+    plan_models_sync,
+    SupabaseSyncError,
 )
+from techskillsquiz.supabase import get_supabase_admin_client, get_supabase_client
+from techskillsquiz.supabase_backends import SYNC_BACKENDS
 from techskillsquiz.supabase_mixins import SupabaseModelMixin
+from techskillsquiz.supabase_metrics import (
+    start_recording,
+    stop_recording,
+    install_http_metrics,
+    write_report,
+    track_model,
+    track_phase,
+    record as record_metrics,
+    set_model_status,
+    PHASE_DATA,
+    REPORT_FORMATS,
+    REPORT_FORMAT_TEXT,
+)
+from techskillsquiz.supabase_consistency import (
+    verify_model_content,
+    get_model_label,
+    RepairState,
+    DEFAULT_REPAIR_CHUNK_SIZE,
+    DEFAULT_REPAIR_JOBS,
+    DEFAULT_REPAIR_STATE_FILE,
+)
+from techskillsquiz.supabase_data_sync import (
+    push_model_changes,
+    supports_incremental_sync,
+    is_pull_model,
+    parse_since,
+    SINCE_AUTO,
+    WATERMARK_FIELD,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -76,6 +120,33 @@ class Command(BaseCommand):
             default=False,
             help='不整合が見つかった場合に自動的に修復します',
         )
+        parser.add_argument(
+            '--deep',
+            action='store_true',
+            dest='deep_check',
+            default=False,
+            help='整合性チェックで主キーだけでなくレコードの内容も比較します',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            dest='resume',
+            default=False,
+            help='--fix で中断した修復を状態ファイルから再開します',
+        )
+        parser.add_argument(
+            '--state-file',
+            dest='state_file',
+            default=DEFAULT_REPAIR_STATE_FILE,
+            help=f'修復の進捗を保存する状態ファイル（デフォルト: {DEFAULT_REPAIR_STATE_FILE}）',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            dest='chunk_size',
+            default=DEFAULT_REPAIR_CHUNK_SIZE,
+            help=f'修復・差分同期で1回のupsertで送信する件数（デフォルト: {DEFAULT_REPAIR_CHUNK_SIZE}）',
+        )
         parser.add_argument(
             '--report',
             action='store_true',
@@ -83,6 +154,61 @@ class Command(BaseCommand):
             default=False,
             help='同期結果の詳細レポートを生成します',
         )
+        parser.add_argument(
+            '--report-format',
+            dest='report_format',
+            choices=REPORT_FORMATS,
+            default=REPORT_FORMAT_TEXT,
+            help='レポートの形式（text: 読みやすい形式、json / ndjson: モデルごとの処理時間・呼び出し回数などの計測値）',
+        )
+        parser.add_argument(
+            '--report-file',
+            dest='report_file',
+            default=None,
+            help='レポートの出力先（デフォルト: supabase_sync_report_<日時>.<形式>）',
+        )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            dest='jobs',
+            default=None,
+            help='同時に同期するモデルの最大数を指定します（デフォルト: settings.SUPABASE_SYNC_JOBS）',
+        )
+        parser.add_argument(
+            '--backend',
+            choices=SYNC_BACKENDS,
+            dest='backend',
+            default=None,
+            help='スキーマ同期の方法（direct: データベースに直接接続、rpc: execute_sql RPC、'
+                 'auto: SUPABASE_DB_URLがあればdirect、デフォルト: settings.SUPABASE_SYNC_BACKEND）',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            dest='force',
+            default=False,
+            help='前回の同期からスキーマに変更のないモデルも差分を確認します',
+        )
+        parser.add_argument(
+            '--plan',
+            action='store_true',
+            dest='plan_only',
+            default=False,
+            help='同期で実行されるDDLをSQLスクリプトとして表示し、実行はしません（差分があればエラー終了）',
+        )
+        parser.add_argument(
+            '--data',
+            action='store_true',
+            dest='sync_data',
+            default=False,
+            help=f'スキーマではなくデータを同期し、{WATERMARK_FIELD} がウォーターマークより新しい行を送信します',
+        )
+        parser.add_argument(
+            '--since',
+            dest='since',
+            default=SINCE_AUTO,
+            help=f"--data で送信する行の更新日時の下限（ISO 8601形式、'{SINCE_AUTO}' で保存済みのウォーターマークから再開、デフォルト: {SINCE_AUTO}）",
+        )
 
     def handle(self, *args, **options):
         """コマンド実行時のメイン処理"""
@@ -93,7 +219,18 @@ class Command(BaseCommand):
         verbose = options.get('verbose')
         check_only = options.get('check_only')
         fix_consistency = options.get('fix_consistency')
+        deep_check = options.get('deep_check')
+        resume = options.get('resume')
+        state_file = options.get('state_file') or DEFAULT_REPAIR_STATE_FILE
+        chunk_size = options.get('chunk_size') or DEFAULT_REPAIR_CHUNK_SIZE
         generate_report = options.get('generate_report')
+        report_format = options.get('report_format') or REPORT_FORMAT_TEXT
+        report_file = options.get('report_file')
+        jobs = options.get('jobs')
+        force = options.get('force')
+        plan_only = options.get('plan_only')
+        sync_data = options.get('sync_data')
+        since_option = options.get('since') or SINCE_AUTO
 
         # ロギングの設定
         if verbose:
@@ -117,25 +254,57 @@ class Command(BaseCommand):
             )
             return
 
+        # 計画モードの場合（標準出力にはSQLスクリプトのみを出力する）
+        if plan_only:
+            self._plan_sync(models_to_sync, options.get('backend'))
+            return
+
+        if sync_data:
+            try:
+                since = parse_since(since_option)
+            except ValueError as e:
+                raise CommandError(str(e))
+
         # 同期対象のモデル情報を表示
         self._display_models_info(models_to_sync)
 
-        # 整合性チェックモードの場合
-        if check_only:
-            self._check_consistency(models_to_sync, fix_consistency, verbose)
-            return
-
         # 確認プロンプト
-        if not no_input and not self._confirm_sync():
+        if not check_only and not no_input and not self._confirm_sync():
             self.stdout.write(self.style.WARNING('同期をキャンセルしました。'))
             return
 
-        # 同期実行
-        results = self._perform_sync(models_to_sync, verbose)
-        
+        # 計測レポートの場合は処理時間・HTTP呼び出しの計測を開始
+        recording = generate_report and report_format != REPORT_FORMAT_TEXT
+        if recording:
+            start_recording(mode='check' if check_only else ('data' if sync_data else 'sync'))
+            # 行のミラーリングと管理用のRPC（service_role）でクライアントが異なるため、両方に登録する
+            for get_client in (get_supabase_client, get_supabase_admin_client):
+                try:
+                    install_http_metrics(get_client())
+                except Exception as e:
+                    logger.warning(f"HTTP呼び出しの計測を設定できませんでした: {str(e)}")
+
+        try:
+            if check_only:
+                # 整合性チェックモードの場合
+                results = self._check_consistency(
+                    models_to_sync, fix_consistency, verbose, deep_check,
+                    jobs=jobs, chunk_size=chunk_size, state_file=state_file, resume=resume,
+                )
+            elif sync_data:
+                # データの差分同期
+                results = self._sync_data(models_to_sync, since, chunk_size, verbose)
+            else:
+                # 同期実行
+                results = self._perform_sync(models_to_sync, verbose, jobs, force, options.get('backend'))
+        finally:
+            recorder = stop_recording() if recording else None
+
         # レポート生成
-        if generate_report:
-            self._generate_report(results, models_to_sync)
+        if recorder is not None:
+            self._write_metrics_report(recorder, report_format, report_file)
+        elif generate_report:
+            self._generate_report(results, models_to_sync, report_file)
 
     def _get_models_to_sync(self, app_label: Optional[str] = None, model_name: Optional[str] = None) -> List[Type[SupabaseModelMixin]]:
         """同期対象のモデルを取得する"""
@@ -164,7 +333,8 @@ class Command(BaseCommand):
         user_input = input('同期を実行しますか？ [y/N]: ').lower()
         return user_input in ('y', 'yes')
 
-    def _perform_sync(self, models: List[Type[SupabaseModelMixin]], verbose: bool):
+    def _perform_sync(self, models: List[Type[SupabaseModelMixin]], verbose: bool, jobs: Optional[int] = None,
+                      force: bool = False, backend: Optional[str] = None):
         """同期を実行"""
         import time
         
@@ -173,47 +343,55 @@ class Command(BaseCommand):
         
         self.stdout.write(self.style.SUCCESS('同期を開始します...'))
         
-        results = {}
         total_count = len(models)
+        completed = []
+        model_times = {}
         
-        for i, model in enumerate(models, 1):
+        def report_model_result(model, success, model_time):
+            """モデルごとの同期完了時に結果を表示（メインスレッドから呼ばれる）"""
+            completed.append(model)
             model_name = f"{model._meta.app_label}.{model.__name__}"
+            model_times[model_name] = model_time
             table_name = model._meta.db_table
             
-            self.stdout.write(f'[{i}/{total_count}] {model_name} の同期を実行中...')
+            self.stdout.write(f'[{len(completed)}/{total_count}] {model_name} の同期が終了しました')
             
-            try:
-                # 処理時間計測
-                model_start_time = time.time()
-                
-                # モデルのフィールド情報を表示（詳細モード）
-                if verbose:
-                    self.stdout.write('  フィールド情報:')
-                    for field in model._meta.fields:
-                        field_type = field.__class__.__name__
-                        nullable = 'NULL' if field.null else 'NOT NULL'
-                        pk = 'PRIMARY KEY' if field.primary_key else ''
-                        self.stdout.write(f'    - {field.name} ({field_type}): {nullable} {pk}')
-                
-                # 同期実行
-                success = sync_django_model_to_supabase(model)
-                results[model_name] = success
-                
-                # 処理時間計算
-                model_time = time.time() - model_start_time
-                
-                if success:
-                    self.stdout.write(self.style.SUCCESS(f'   ✓ {table_name} テーブルの同期に成功しました ({model_time:.2f}秒)'))
-                else:
-                    self.stdout.write(self.style.ERROR(f'   ✗ {table_name} テーブルの同期に失敗しました ({model_time:.2f}秒)'))
-                    
-            except Exception as e:
-                results[model_name] = False
-                self.stdout.write(self.style.ERROR(f'   ✗ {table_name} テーブルの同期中にエラーが発生しました: {str(e)}'))
-                if verbose:
-                    import traceback
-                    self.stdout.write(self.style.ERROR('詳細なエラー情報:'))
-                    traceback.print_exc()
+            # モデルのフィールド情報を表示（詳細モード）
+            if verbose:
+                self.stdout.write('  フィールド情報:')
+                for field in model._meta.fields:
+                    field_type = field.__class__.__name__
+                    nullable = 'NULL' if field.null else 'NOT NULL'
+                    pk = 'PRIMARY KEY' if field.primary_key else ''
+                    self.stdout.write(f'    - {field.name} ({field_type}): {nullable} {pk}')
+            
+            if success:
+                self.stdout.write(self.style.SUCCESS(f'   ✓ {table_name} テーブルの同期に成功しました ({model_time:.2f}秒)'))
+            else:
+                self.stdout.write(self.style.ERROR(f'   ✗ {table_name} テーブルの同期に失敗しました ({model_time:.2f}秒)'))
+        
+        def report_model_skipped(model):
+            """スキーマに変更がないためスキップしたモデルを表示"""
+            completed.append(model)
+            model_name = f"{model._meta.app_label}.{model.__name__}"
+            self.stdout.write(f'[{len(completed)}/{total_count}] {model_name} はスキーマに変更がないためスキップしました')
+        
+        # 依存関係の順序を守りながら並列に同期実行
+        try:
+            sync_results = sync_models_to_supabase(
+                models,
+                jobs=jobs,
+                on_complete=report_model_result,
+                force=force,
+                on_skip=report_model_skipped,
+                backend=backend,
+            )
+        except SupabaseSyncError as e:
+            raise CommandError(str(e))
+        results = {
+            f"{model._meta.app_label}.{model.__name__}": success
+            for model, success in sync_results.items()
+        }
         
         # 総処理時間
         total_time = time.time() - start_time
@@ -240,59 +418,161 @@ class Command(BaseCommand):
                 self.stdout.write(' - モデルのsupabase_table属性が正しく設定されているか確認してください')
                 self.stdout.write(' - --verboseオプションを付けて実行すると詳細なログが表示されます')
         
+        return {
+            model_name: {'status': 'ok' if success else 'error', 'time': model_times.get(model_name, 0.0)}
+            for model_name, success in results.items()
+        }
+
+    def _plan_sync(self, models: List[Type[SupabaseModelMixin]], backend: Optional[str] = None):
+        """
+        スキーマのスナップショットと比較して同期で実行されるDDLをSQLスクリプトとして出力します
+        差分がある場合はCommandErrorでエラー終了します
+        """
+        from datetime import datetime
+
+        try:
+            plans = plan_models_sync(models, backend=backend)
+        except SupabaseSyncError as e:
+            raise CommandError(str(e))
+
+        changed = [plan for plan in plans if plan.has_changes]
+        action_labels = {'create': 'テーブル作成', 'alter': 'テーブル変更', None: '変更なし'}
+
+        self.stdout.write(f"-- Supabase同期計画（{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}）")
+        self.stdout.write(f"-- 対象モデル: {len(plans)}件、差分のあるモデル: {len(changed)}件")
+        in_transaction = any(plan.statements for plan in plans)
+        index_statements = [statement for plan in plans for statement in plan.index_statements]
+        if in_transaction:
+            self.stdout.write("BEGIN;")
+
+        for plan in plans:
+            model_name = f"{plan.model._meta.app_label}.{plan.model.__name__}"
+            self.stdout.write(f"\n-- {model_name} → {plan.table_name}: {action_labels[plan.action]}")
+            for statement in plan.statements:
+                self.stdout.write(statement)
+            if plan.index_statements:
+                self.stdout.write(f"-- インデックス {len(plan.index_statements)}件（トランザクション外で作成）")
+            if plan.extra_columns:
+                self.stdout.write(f"-- 不要なカラム（自動削除しません）: {', '.join(plan.extra_columns)}")
+
+        if in_transaction:
+            self.stdout.write("\nCOMMIT;")
+        if index_statements:
+            # CREATE INDEX CONCURRENTLY はトランザクション内で実行できないため、COMMITの後に出力する
+            self.stdout.write("\n-- 既存のテーブルへのインデックス（書き込みをブロックしないようCONCURRENTLYで作成）")
+            for statement in index_statements:
+                self.stdout.write(statement)
+        if changed:
+            raise CommandError(
+                f"{len(changed)}件のモデルでDjangoとSupabaseのスキーマに差分があります: "
+                + ', '.join(plan.table_name for plan in changed)
+            )
+
+        self.stderr.write(self.style.SUCCESS('スキーマに差分はありません。'))
+
+    def _sync_data(self, models: List[Type[SupabaseModelMixin]], since, chunk_size: int, verbose: bool) -> Dict[str, Dict[str, Any]]:
+        """
+        更新日時がウォーターマーク（またはsince）より新しい行を、外部キーの依存順にSupabaseへ送信します
+
+        Returns:
+            モデルごとの同期結果 {モデル名: {'status': ..., ...}}
+        """
+        if since is None:
+            self.stdout.write(self.style.SUCCESS('保存済みのウォーターマークから差分同期を開始します...'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{since.isoformat()} 以降に更新された行の同期を開始します...'))
+        
+        results = {}
+        
+        for level in sort_models_by_dependency(models):
+            for model in level:
+                model_name = f"{model._meta.app_label}.{model.__name__}"
+                table_name = model._meta.db_table
+                
+                if not supports_incremental_sync(model):
+                    self.stdout.write(self.style.WARNING(
+                        f' - {model_name} は {WATERMARK_FIELD} フィールドがないためスキップしました'
+                    ))
+                    results[model_name] = {'status': 'skipped'}
+                    set_model_status(model, 'skipped')
+                    continue
+                
+                if is_pull_model(model):
+                    # Supabaseのトリガーが更新するテーブルは pull_supabase_data で取り込む
+                    self.stdout.write(self.style.WARNING(
+                        f' - {model_name} はSupabase側で更新されるためスキップしました（pull_supabase_data で取り込みます）'
+                    ))
+                    results[model_name] = {'status': 'skipped'}
+                    set_model_status(model, 'skipped')
+                    continue
+                
+                self.stdout.write(f' - {model_name} の差分を同期中...')
+                
+                def report_progress(result):
+                    """バッチの送信完了ごとに進捗を表示"""
+                    if verbose:
+                        self.stdout.write(
+                            f'   {result.synced}件送信 ({result.throughput:.1f}件/秒, '
+                            f'ウォーターマーク: {result.watermark.isoformat()})'
+                        )
+                
+                with track_model(model), track_phase(PHASE_DATA):
+                    try:
+                        result = push_model_changes(model, since, batch_size=chunk_size, on_progress=report_progress)
+                        record_metrics(rows_synced=result.synced)
+                    except Exception as e:
+                        self.stdout.write(self.style.ERROR(f'   ✗ {table_name} テーブルの差分同期に失敗しました: {str(e)}'))
+                        self.stdout.write('   送信済みのバッチまではウォーターマークが保存されています。再実行すると続きから同期します。')
+                        results[model_name] = {'status': 'error', 'error': str(e)}
+                        set_model_status(model, 'error')
+                        continue
+                
+                self.stdout.write(self.style.SUCCESS(
+                    f'   ✓ {table_name} テーブルに{result.synced}件を送信しました ({result.elapsed:.2f}秒)'
+                ))
+                results[model_name] = {'status': 'ok', 'synced': result.synced, 'time': result.elapsed}
+                set_model_status(model, 'ok')
+        
+        synced_total = sum(data.get('synced', 0) for data in results.values())
+        error_count = sum(1 for data in results.values() if data['status'] == 'error')
+        self.stdout.write(f'\n差分同期結果: {synced_total}件を送信しました')
+        if error_count:
+            self.stdout.write(self.style.ERROR(f' - エラーが発生したモデル: {error_count}件'))
+        
         return results
 
-    def _check_consistency(self, models: List[Type[SupabaseModelMixin]], fix: bool, verbose: bool):
+    def _check_consistency(
+        self,
+        models: List[Type[SupabaseModelMixin]],
+        fix: bool,
+        verbose: bool,
+        deep: bool = False,
+        jobs: Optional[int] = None,
+        chunk_size: int = DEFAULT_REPAIR_CHUNK_SIZE,
+        state_file: str = DEFAULT_REPAIR_STATE_FILE,
+        resume: bool = False,
+    ):
         """
         DjangoモデルとSupabaseテーブル間の整合性をチェックします
+        deepがTrueの場合は範囲ダイジェストでレコードの内容も比較します
+        resumeがTrueの場合は状態ファイルに記録された未修復のレコードを検証せずに修復します
+
+        Returns:
+            モデルごとのチェック結果 {モデル名: {'status': ..., ...}}
         """
         self.stdout.write(self.style.SUCCESS('整合性チェックを開始します...'))
         
         results = {}
+        state = RepairState(state_file) if fix else None
         
         for model in models:
             model_name = f"{model._meta.app_label}.{model.__name__}"
-            table_name = model._meta.db_table
-            
-            self.stdout.write(f' - {model_name} の整合性チェックを実行中...')
-            
-            try:
-                matched, mismatched, mismatched_ids = model.verify_supabase_consistency()
-                
-                if mismatched == 0:
-                    self.stdout.write(self.style.SUCCESS(f'   ✓ {table_name} テーブルは整合性が保たれています ({matched}件)'))
-                    results[model_name] = {'status': 'ok', 'matched': matched, 'mismatched': 0, 'fixed': 0}
-                else:
-                    self.stdout.write(self.style.WARNING(
-                        f'   ! {table_name} テーブルに不整合があります ({mismatched}/{matched + mismatched}件)'
-                    ))
-                    
-                    if verbose:
-                        self.stdout.write('   不整合のID:')
-                        for id_value in mismatched_ids:
-                            self.stdout.write(f'     - {id_value}')
-                    
-                    # 修正モードの場合
-                    if fix:
-                        self.stdout.write('   不整合を修正中...')
-                        matched_count, added_count, error_count = model.fix_supabase_consistency()
-                        
-                        if error_count == 0:
-                            self.stdout.write(self.style.SUCCESS(f'   ✓ 修正完了: {added_count}件追加'))
-                            results[model_name] = {'status': 'fixed', 'matched': matched_count, 'mismatched': mismatched, 'fixed': added_count}
-                        else:
-                            self.stdout.write(self.style.ERROR(f'   ✗ 修正中にエラー: {error_count}件のエラー, {added_count}件は追加成功'))
-                            results[model_name] = {'status': 'error', 'matched': matched_count, 'mismatched': mismatched, 'fixed': added_count, 'errors': error_count}
-                    else:
-                        results[model_name] = {'status': 'mismatch', 'matched': matched, 'mismatched': mismatched}
-                        self.stdout.write(self.style.WARNING('   修正するには --fix オプションを付けて実行してください'))
-                    
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f'   ✗ 整合性チェック中にエラーが発生しました: {str(e)}'))
-                results[model_name] = {'status': 'error', 'error': str(e)}
-                if verbose:
-                    import traceback
-                    traceback.print_exc()
+            # 検証・修復のHTTP呼び出しと処理時間をモデルごとのdataフェーズとして計測する
+            with track_model(model), track_phase(PHASE_DATA):
+                results[model_name] = self._check_model_consistency(
+                    model, fix, verbose, deep, jobs, chunk_size, state, resume
+                )
+            set_model_status(model, results[model_name]['status'])
         
         # 結果の集計
         ok_count = sum(1 for data in results.values() if data.get('status') == 'ok')
@@ -315,17 +595,154 @@ class Command(BaseCommand):
         if mismatch_count > 0 and not fix:
             self.stdout.write('\n不整合を修正するには、--fix オプションを付けて再実行してください:')
             self.stdout.write('  python manage.py sync_supabase --check --fix')
+        
+        return results
 
-    def _generate_report(self, results, models):
+    def _check_model_consistency(self, model, fix, verbose, deep, jobs, chunk_size, state, resume) -> Dict[str, Any]:
+        """
+        1モデル分の整合性チェック（と修復）を実行し、結果を返します
+        """
+        model_name = f"{model._meta.app_label}.{model.__name__}"
+        table_name = model._meta.db_table
+        
+        # 中断した修復の再開
+        pending_ids = state.get(get_model_label(model)) if (state is not None and resume) else None
+        if pending_ids:
+            pk_field = model._meta.pk
+            pending_ids = [pk_field.to_python(pk) for pk in pending_ids]
+            self.stdout.write(f' - {model_name} の中断した修復を再開します（残り {len(pending_ids)}件）')
+            try:
+                return self._repair_records(
+                    model, pending_ids, 0, len(pending_ids), jobs, chunk_size, state
+                )
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'   ✗ 修復中にエラーが発生しました: {str(e)}'))
+                return {'status': 'error', 'error': str(e)}
+
+        self.stdout.write(f' - {model_name} の整合性チェックを実行中...')
+
+        try:
+            report = model.verify_supabase_consistency_report()
+            matched = report.matched_count
+            mismatched_ids = report.missing_in_supabase
+            mismatched = len(mismatched_ids)
+            record_metrics(rows_checked=matched + mismatched + len(report.missing_in_django))
+
+            # Django側に存在しないSupabaseのレコードは修正対象外のため報告のみ行う
+            if report.missing_in_django:
+                self.stdout.write(self.style.WARNING(
+                    f'   ! {table_name} テーブルにDjango側に存在しないレコードがあります ({len(report.missing_in_django)}件)'
+                ))
+                if verbose:
+                    for id_value in report.missing_in_django:
+                        self.stdout.write(f'     - {id_value}')
+
+            # レコードの内容を範囲ダイジェストで比較
+            if deep:
+                content_report = verify_model_content(model)
+                if content_report.changed:
+                    self.stdout.write(self.style.WARNING(
+                        f'   ! {table_name} テーブルに内容が異なるレコードがあります ({len(content_report.changed)}件、'
+                        f'比較した範囲: {content_report.ranges_compared}件)'
+                    ))
+                    if verbose:
+                        for id_value in content_report.changed:
+                            self.stdout.write(f'     - {id_value}')
+                    mismatched_ids = mismatched_ids + content_report.changed
+                    mismatched = len(mismatched_ids)
+                    matched -= len(content_report.changed)
+
+            if mismatched == 0:
+                self.stdout.write(self.style.SUCCESS(f'   ✓ {table_name} テーブルは整合性が保たれています ({matched}件)'))
+                return {'status': 'ok', 'matched': matched, 'mismatched': 0, 'fixed': 0}
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f'   ! {table_name} テーブルに不整合があります ({mismatched}/{matched + mismatched}件)'
+                ))
+
+                if verbose:
+                    self.stdout.write('   不整合のID:')
+                    for id_value in mismatched_ids:
+                        self.stdout.write(f'     - {id_value}')
+
+                # 修正モードの場合
+                if fix:
+                    return self._repair_records(
+                        model, mismatched_ids, matched, mismatched, jobs, chunk_size, state
+                    )
+                else:
+                    self.stdout.write(self.style.WARNING('   修正するには --fix オプションを付けて実行してください'))
+                    return {'status': 'mismatch', 'matched': matched, 'mismatched': mismatched}
+
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'   ✗ 整合性チェック中にエラーが発生しました: {str(e)}'))
+            if verbose:
+                import traceback
+                traceback.print_exc()
+            return {'status': 'error', 'error': str(e)}
+
+    def _repair_records(self, model, ids, matched, mismatched, jobs, chunk_size, state):
+        """
+        不整合のレコードをバッチupsertで修復し、進捗とスループットを表示します
+        """
+        self.stdout.write('   不整合を修正中...')
+        
+        def report_progress(result):
+            """チャンクの完了ごとに進捗を表示（メインスレッドから呼ばれる）"""
+            self.stdout.write(
+                f'   [{result.processed}/{result.total}] {result.repaired}件修復 '
+                f'({result.throughput:.1f}件/秒, エラー: {result.error_count}件)'
+            )
+        
+        result = model.repair_supabase_records(
+            ids,
+            chunk_size=chunk_size,
+            jobs=jobs or DEFAULT_REPAIR_JOBS,
+            on_progress=report_progress,
+            state=state,
+        )
+        record_metrics(rows_repaired=result.repaired)
+        
+        for chunk_error in result.chunk_errors:
+            self.stdout.write(self.style.ERROR(
+                f"   ✗ ID {chunk_error['first_id']}〜{chunk_error['last_id']} ({chunk_error['count']}件): {chunk_error['error']}"
+            ))
+        
+        if result.error_count == 0:
+            self.stdout.write(self.style.SUCCESS(
+                f'   ✓ 修正完了: {result.repaired}件追加 ({result.elapsed:.2f}秒, {result.throughput:.1f}件/秒)'
+            ))
+            return {'status': 'fixed', 'matched': matched, 'mismatched': mismatched, 'fixed': result.repaired}
+        
+        self.stdout.write(self.style.ERROR(
+            f'   ✗ 修正中にエラー: {result.error_count}件のエラー, {result.repaired}件は追加成功'
+        ))
+        self.stdout.write('   再開するには --resume オプションを付けて再実行してください:')
+        self.stdout.write('     python manage.py sync_supabase --check --fix --resume')
+        return {'status': 'error', 'matched': matched, 'mismatched': mismatched, 'fixed': result.repaired, 'errors': result.error_count}
+
+    def _default_report_file(self, extension: str) -> str:
+        """日時を含むレポートファイル名を返します"""
+        from datetime import datetime
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return f"supabase_sync_report_{timestamp}.{extension}"
+
+    def _write_metrics_report(self, recorder, report_format: str, report_file: Optional[str] = None):
+        """
+        モデルごとの処理時間・呼び出し回数などの計測値をJSON / NDJSON形式で出力します
+        """
+        report_file = report_file or self._default_report_file(report_format)
+        write_report(recorder, report_file, report_format)
+        self.stdout.write(self.style.SUCCESS(f'計測レポートが生成されました: {report_file}'))
+
+    def _generate_report(self, results, models, report_file: Optional[str] = None):
         """
         同期結果の詳細レポートを生成します
         """
-        import time
         from datetime import datetime
         
         # レポートファイル名
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        report_file = f"supabase_sync_report_{timestamp}.txt"
+        report_file = report_file or self._default_report_file('txt')
         
         self.stdout.write(f'\n同期レポートを生成中: {report_file}')
         
@@ -350,6 +767,7 @@ class Command(BaseCommand):
                     'error': 'エラー',
                     'fixed': '修正済み',
                     'mismatch': '不整合',
+                    'skipped': 'スキップ',
                 }.get(status, status)
                 
                 f.write(f"### {model_name}\n")
@@ -364,6 +782,9 @@ class Command(BaseCommand):
                 if 'fixed' in result:
                     f.write(f"修正されたレコード数: {result['fixed']}\n")
                 
+                if 'synced' in result:
+                    f.write(f"送信したレコード数: {result['synced']}\n")
+                
                 if 'errors' in result:
                     f.write(f"エラー数: {result['errors']}\n")
                 
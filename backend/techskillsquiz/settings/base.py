@@ -95,6 +95,57 @@ SUPABASE_SERVICE_KEY = os.environ.get("SUPABASE_SERVICE_KEY")
 # マイグレーション後に自動的にSupabaseテーブルを同期するかどうか
 SUPABASE_AUTO_SYNC = os.environ.get("SUPABASE_AUTO_SYNC", "False").lower() in ("true", "1", "t")
 
+# スキーマ同期時に同時に同期するモデルの最大数
+SUPABASE_SYNC_JOBS = int(os.environ.get("SUPABASE_SYNC_JOBS", "4"))
+
+# スキーマ同期の方法（auto: SUPABASE_DB_URLがあれば直接接続、direct: 直接接続のみ、rpc: execute_sql RPCのみ）
+SUPABASE_SYNC_BACKEND = os.environ.get("SUPABASE_SYNC_BACKEND", "auto")
+
+# スキーマ同期で直接接続するSupabaseのデータベース（例: postgresql://postgres:<password>@db.<ref>.supabase.co:5432/postgres）
+SUPABASE_DB_URL = os.environ.get("SUPABASE_DB_URL")
+
+# DjangoのdefaultデータベースがSupabaseのデータベースと同一かどうか（未設定の場合は接続情報から自動判定）
+# 同一の場合、SupabaseModelMixinによるHTTP経由のミラーリングを行わない
+_shares_default_database = os.environ.get("SUPABASE_SHARES_DEFAULT_DATABASE")
+SUPABASE_SHARES_DEFAULT_DATABASE = (
+    None if _shares_default_database is None
+    else _shares_default_database.lower() in ("true", "1", "t")
+)
+
+# 行のミラーリングの方法（signals: 保存時にHTTPで送信、replication: replicate_supabase コマンドで論理レプリケーション）
+SUPABASE_MIRROR_BACKEND = os.environ.get("SUPABASE_MIRROR_BACKEND", "signals")
+
+# sync_supabase --data の差分送信の対象を何秒前までに更新された行に限るか
+# （updated_at はコミット前に設定されるため、これより長いトランザクションの行は取りこぼす可能性がある）
+SUPABASE_DATA_SYNC_LAG = float(os.environ.get("SUPABASE_DATA_SYNC_LAG", "60"))
+
+# Supabaseのトリガーが更新するため、pull_supabase_data でDjangoに取り込むモデル
+# None の場合は QUIZ_STATISTICS_BACKEND から求める（"trigger": UserStatistics・ActivityHistory、
+# "django": なし。Django側で集計した行は sync_supabase の差分同期で送信する）
+SUPABASE_PULL_MODELS = None
+
+# ユーザーごとの統計・活動履歴APIのキャッシュの有効期間（秒、0でキャッシュしない）
+# トリガーによる更新は listen_cache_invalidation コマンドがNOTIFYを受信して無効化する
+# （コマンドはWebサーバーと共有するキャッシュが必要。CACHES 未設定時のプロセス内のキャッシュでは起動しない。
+#   production.py ではRedisを使用する）
+QUIZ_STATS_CACHE_TIMEOUT = int(os.environ.get("QUIZ_STATS_CACHE_TIMEOUT", "300"))
+
+# カテゴリ・難易度・クイズの一覧（全ユーザー共通）のキャッシュの有効期間（秒、0でキャッシュしない）
+QUIZ_CATALOG_CACHE_TIMEOUT = int(os.environ.get("QUIZ_CATALOG_CACHE_TIMEOUT", "3600"))
+
+# UserStatistics / ActivityHistory の集計方法
+# "trigger": Supabaseのトリガー（trigger_update_user_statistics）に任せる
+# "django": QuizResultの作成時にDjango側で集計する（トリガーのないデータベース向け）
+QUIZ_STATISTICS_BACKEND = os.environ.get("QUIZ_STATISTICS_BACKEND", "trigger")
+
+# ランキングの保存先（"redis": Redisのソート済みセット / "memory": プロセス内のメモリ、開発用）
+# rebuild_leaderboards コマンドで UserStatistics から定期的に作り直す
+QUIZ_LEADERBOARD_BACKEND = os.environ.get("QUIZ_LEADERBOARD_BACKEND", "memory")
+QUIZ_LEADERBOARD_REDIS_URL = os.environ.get("QUIZ_LEADERBOARD_REDIS_URL", os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/2"))
+
+# 日別活動（ヒートマップ・連続学習日数）の日付の区切りに使うタイムゾーン
+QUIZ_ACTIVITY_TIME_ZONE = os.environ.get("QUIZ_ACTIVITY_TIME_ZONE", "Asia/Tokyo")
+
 # REST Framework設定
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
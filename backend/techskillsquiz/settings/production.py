@@ -66,6 +66,9 @@ CACHES = {
     }
 }
 
+# ランキングはキャッシュと同じRedisのソート済みセットで管理する
+QUIZ_LEADERBOARD_BACKEND = os.environ.get("QUIZ_LEADERBOARD_BACKEND", "redis")
+
 # 静的ファイルの設定（AWS S3やCloudFrontの使用を想定）
 STATIC_URL = os.environ.get("STATIC_URL", "static/")
 STATIC_ROOT = os.environ.get("STATIC_ROOT", os.path.join(BASE_DIR, 'staticfiles'))
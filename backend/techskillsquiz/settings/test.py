@@ -78,6 +78,10 @@ CACHES = {
     }
 }
 
+# テスト間でキャッシュが残らないよう、統計APIのキャッシュは無効にする（キャッシュのテストでは上書きする）
+QUIZ_STATS_CACHE_TIMEOUT = 0
+QUIZ_CATALOG_CACHE_TIMEOUT = 0
+
 # テスト用のメディアファイル設定
 MEDIA_ROOT = os.path.join(BASE_DIR, 'test_media')
 MEDIA_URL = '/test-media/'
@@ -5,14 +5,23 @@ Supabase Client Configuration
 """
 
 import os
+import re
+import shlex
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
 from supabase import create_client, Client
 
 # 環境変数からSupabaseの接続情報を取得
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_ANON_KEY")
+# 管理用のRPC・テーブル（introspect_schema・範囲ダイジェスト・django_supabase_schema_state・django_supabase_mirrored_tables）は
+# service_role のみ利用できるため、それらに限り SUPABASE_SERVICE_KEY のクライアントを使用する
+SUPABASE_SERVICE_KEY = os.environ.get("SUPABASE_SERVICE_KEY")
 
 # クライアントインスタンスを作成
 supabase: Client = None
+supabase_admin: Client = None
 
 def initialize_supabase():
     """Supabaseクライアントを初期化します"""
@@ -33,4 +42,139 @@ def get_supabase_client() -> Client:
     global supabase
     if supabase is None:
         return initialize_supabase()
-    return supabase 
\ No newline at end of file
+    return supabase
+
+def get_supabase_admin_client() -> Client:
+    """service_role のSupabaseクライアントのインスタンスを返します。
+
+    RLSを迂回するため、service_role のみに実行を許可した管理用のRPC（introspect_schema・
+    range_digests・range_row_digests）と django_supabase_schema_state・django_supabase_mirrored_tables の読み書きにのみ使用し、
+    行のミラーリングには get_supabase_client を使用します。
+    """
+    global supabase_admin
+    if supabase_admin is None:
+        if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
+            raise ValueError(
+                "Supabaseの管理用の接続情報が設定されていません。環境変数SUPABASE_URLとSUPABASE_SERVICE_KEYを設定してください。"
+            )
+        supabase_admin = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+    return supabase_admin
+
+# Supabaseプロジェクトのデータベース名とスキーマ（PostgRESTが公開するスキーマ）
+SUPABASE_DB_NAME = 'postgres'
+SUPABASE_DB_SCHEMA = 'public'
+
+# Supabase CLI（supabase start）のAPIとデータベースのポート
+SUPABASE_LOCAL_API_PORT = 54321
+SUPABASE_LOCAL_DB_PORT = 54322
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1', 'host.docker.internal')
+
+# 行のミラーリングの方法（settings.SUPABASE_MIRROR_BACKEND）
+# signals: 保存・削除時のシグナルでHTTP経由で反映、replication: replicate_supabase コマンドで論理レプリケーションにより反映
+MIRROR_BACKEND_SIGNALS = 'signals'
+MIRROR_BACKEND_REPLICATION = 'replication'
+
+# 判定結果のキャッシュ（設定は起動後に変わらないため1回だけ判定する）
+_shares_default_database: Optional[bool] = None
+
+def get_supabase_project_ref(url: Optional[str]) -> Optional[str]:
+    """
+    SupabaseのURL（https://<ref>.supabase.co）からプロジェクト参照IDを取り出します。
+
+    Returns:
+        プロジェクト参照ID、Supabaseのホストでない場合はNone
+    """
+    if not url:
+        return None
+    match = re.match(r'^([a-z0-9]+)\.supabase\.(co|in)$', urlparse(url).hostname or '')
+    return match.group(1) if match else None
+
+def get_database_search_path(db_settings: Dict[str, Any]) -> str:
+    """
+    DATABASESのOPTIONS（options='-c search_path=...'）から最初のスキーマを取得します。
+    指定がない場合はpublicを返します。
+    """
+    options = (db_settings.get('OPTIONS') or {}).get('options') or ''
+    tokens = shlex.split(options)
+    for i, token in enumerate(tokens):
+        value = token
+        if token == '-c' and i + 1 < len(tokens):
+            value = tokens[i + 1]
+        if value.startswith('-c'):
+            value = value[2:]
+        if value.startswith('search_path='):
+            first = value.split('=', 1)[1].split(',')[0].strip().strip('"')
+            return first or SUPABASE_DB_SCHEMA
+    return SUPABASE_DB_SCHEMA
+
+def is_supabase_database(db_settings: Dict[str, Any], supabase_url: Optional[str]) -> bool:
+    """
+    Djangoのデータベース設定がSupabaseプロジェクトと同じPostgreSQLのpublicスキーマを指しているかを判定します。
+
+    次のいずれかに該当し、データベース名とスキーマがSupabaseのものと一致する場合に同一とみなします。
+    - 直接接続: ホストが db.<ref>.supabase.co
+    - 接続プーラー（Supavisor）: ホストが *.pooler.supabase.com かつユーザーが <ユーザー>.<ref>
+    - Supabase CLI: APIとデータベースがともにローカルの既定ポート（54321 / 54322）
+
+    Args:
+        db_settings: DATABASESの1エントリ
+        supabase_url: SupabaseのURL
+
+    Returns:
+        同一のデータベースであればTrue
+    """
+    if 'postgresql' not in (db_settings.get('ENGINE') or ''):
+        return False
+    if (db_settings.get('NAME') or '') != SUPABASE_DB_NAME:
+        return False
+    if get_database_search_path(db_settings) != SUPABASE_DB_SCHEMA:
+        return False
+
+    host = (db_settings.get('HOST') or '').lower()
+    port = str(db_settings.get('PORT') or '5432')
+    user = db_settings.get('USER') or ''
+
+    ref = get_supabase_project_ref(supabase_url)
+    if ref:
+        if host == f'db.{ref}.supabase.co':
+            return True
+        return host.endswith('.pooler.supabase.com') and user.endswith(f'.{ref}')
+
+    parsed = urlparse(supabase_url or '')
+    return (
+        (parsed.hostname or '') in LOCAL_HOSTS and parsed.port == SUPABASE_LOCAL_API_PORT
+        and host in LOCAL_HOSTS and port == str(SUPABASE_LOCAL_DB_PORT)
+    )
+
+def shares_default_database() -> bool:
+    """
+    Djangoのdefaultデータベースが、Supabaseプロジェクトのデータベースそのものかどうかを返します。
+
+    Trueの場合、Djangoが書き込んだテーブルがそのままSupabaseのテーブルであるため、
+    SupabaseModelMixinによるHTTP経由のミラーリングは不要です。
+    settings.SUPABASE_SHARES_DEFAULT_DATABASE（True / False）で判定を上書きできます。
+    """
+    global _shares_default_database
+    if _shares_default_database is None:
+        from django.conf import settings
+
+        override = getattr(settings, 'SUPABASE_SHARES_DEFAULT_DATABASE', None)
+        if override is not None:
+            _shares_default_database = bool(override)
+        else:
+            _shares_default_database = is_supabase_database(
+                settings.DATABASES.get('default', {}),
+                getattr(settings, 'SUPABASE_URL', None) or SUPABASE_URL,
+            )
+    return _shares_default_database
+
+def reset_shares_default_database():
+    """同一データベース判定のキャッシュを破棄します（設定を変更するテスト用）"""
+    global _shares_default_database
+    _shares_default_database = None
+
+def is_replication_mirroring() -> bool:
+    """行のミラーリングを論理レプリケーション（replicate_supabase）で行う設定かどうかを返します"""
+    from django.conf import settings
+
+    return getattr(settings, 'SUPABASE_MIRROR_BACKEND', MIRROR_BACKEND_SIGNALS) == MIRROR_BACKEND_REPLICATION
@@ -0,0 +1,357 @@
+"""
+Supabase Sync Backends
+
+このモジュールはスキーマ同期のDDL・カタログ取得をSupabaseへ送る方法（バックエンド）を提供します。
+
+- DirectSQLSyncBackend: psycopg2でSupabaseのPostgreSQLに直接接続し、全モデルのDDLを
+  1トランザクションで実行します。カタログはサーバー側でPREPAREしたクエリで取得し、
+  既存のテーブルへのインデックスはトランザクションの外でCONCURRENTLYで作成します。
+- RPCSyncBackend: execute_sql RPC（HTTPS）でモデルごとに並列に同期します。
+  データベースの接続情報がない場合や直接接続できない場合のフォールバックです。
+
+使用するバックエンドは settings.SUPABASE_SYNC_BACKEND（'auto' / 'direct' / 'rpc'）で選択します。
+"""
+
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from django.conf import settings
+from django.db import models
+
+from .supabase_catalog import SupabaseCatalogSnapshot
+from .supabase_metrics import track_model, track_phase, set_model_status, PHASE_INTROSPECTION, PHASE_DDL
+from . import supabase_sync
+
+try:
+    import psycopg2
+except ImportError:  # psycopg2は開発用の依存関係のため、ない場合はRPCのみ使用する
+    psycopg2 = None
+
+logger = logging.getLogger(__name__)
+
+BACKEND_AUTO = 'auto'
+BACKEND_DIRECT = 'direct'
+BACKEND_RPC = 'rpc'
+SYNC_BACKENDS = (BACKEND_AUTO, BACKEND_DIRECT, BACKEND_RPC)
+
+# 直接接続のタイムアウト（秒）
+DIRECT_CONNECT_TIMEOUT = 10
+
+# サーバー側でPREPAREするカタログ取得クエリ（introspect_schema RPCと同じ形式の行を返す）
+INTROSPECTION_QUERIES = {
+    'supabase_sync_columns': """
+        SELECT c.relname AS table_name,
+               a.attname AS column_name,
+               pg_catalog.format_type(a.atttypid, a.atttypmod) AS data_type,
+               CASE WHEN a.attnotnull THEN 'NO' ELSE 'YES' END AS is_nullable,
+               pg_catalog.pg_get_expr(d.adbin, d.adrelid) AS column_default
+        FROM pg_catalog.pg_class c
+        JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+        JOIN pg_catalog.pg_attribute a ON a.attrelid = c.oid
+        LEFT JOIN pg_catalog.pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+        WHERE n.nspname = $1 AND c.relkind IN ('r', 'p')
+          AND a.attnum > 0 AND NOT a.attisdropped
+        ORDER BY c.relname, a.attnum
+    """,
+    'supabase_sync_constraints': """
+        SELECT c.relname AS table_name,
+               con.conname AS name,
+               con.contype::text AS type,
+               pg_catalog.pg_get_constraintdef(con.oid) AS definition
+        FROM pg_catalog.pg_constraint con
+        JOIN pg_catalog.pg_class c ON c.oid = con.conrelid
+        JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = $1 AND c.relkind IN ('r', 'p')
+        ORDER BY c.relname, con.conname
+    """,
+    'supabase_sync_indexes': """
+        SELECT c.relname AS table_name,
+               i.relname AS name,
+               x.indisunique AS is_unique,
+               x.indisprimary AS is_primary,
+               pg_catalog.pg_get_indexdef(x.indexrelid) AS definition
+        FROM pg_catalog.pg_index x
+        JOIN pg_catalog.pg_class i ON i.oid = x.indexrelid
+        JOIN pg_catalog.pg_class c ON c.oid = x.indrelid
+        JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = $1 AND c.relkind IN ('r', 'p')
+        ORDER BY c.relname, i.relname
+    """,
+}
+
+# カタログのキーと取得クエリの対応
+CATALOG_SECTIONS = {
+    'columns': 'supabase_sync_columns',
+    'constraints': 'supabase_sync_constraints',
+    'indexes': 'supabase_sync_indexes',
+}
+
+OnComplete = Optional[Callable[[Type[models.Model], bool, float], None]]
+
+
+def connect_supabase_database(dsn: Optional[str] = None, application_name: str = 'django-supabase-sync'):
+    """
+    Supabaseのデータベースにpsycopg2で直接接続します。
+
+    Args:
+        dsn: 接続文字列（省略時は settings.SUPABASE_DB_URL）
+        application_name: pg_stat_activityに表示する接続名
+
+    Returns:
+        psycopg2の接続
+
+    Raises:
+        SupabaseConnectionError: psycopg2がない、接続情報がない、または接続できない場合
+    """
+    if psycopg2 is None:
+        raise supabase_sync.SupabaseConnectionError("直接接続にはpsycopg2が必要です")
+    dsn = dsn or getattr(settings, 'SUPABASE_DB_URL', None)
+    if not dsn:
+        raise supabase_sync.SupabaseConnectionError("settings.SUPABASE_DB_URLが設定されていません")
+    try:
+        return psycopg2.connect(dsn, connect_timeout=DIRECT_CONNECT_TIMEOUT, application_name=application_name)
+    except Exception as e:
+        raise supabase_sync.SupabaseConnectionError(f"Supabaseのデータベースに接続できませんでした: {str(e)}")
+
+
+class SupabaseSyncBackend:
+    """
+    スキーマ同期のバックエンドの基底クラス
+    """
+
+    name = None
+
+    def load_catalog(self) -> Optional[SupabaseCatalogSnapshot]:
+        """スキーマのスナップショットを取得します（取得できない場合はNone）"""
+        raise NotImplementedError
+
+    def sync_models(
+        self,
+        models_list: List[Type[models.Model]],
+        jobs: int = supabase_sync.DEFAULT_SYNC_JOBS,
+        on_complete: OnComplete = None,
+        catalog: Optional[SupabaseCatalogSnapshot] = None
+    ) -> Dict[Type[models.Model], bool]:
+        """
+        モデルのスキーマをSupabaseに反映します。
+
+        Returns:
+            各モデルの同期結果を含む辞書 {モデル: 成功/失敗}
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """接続などのリソースを解放します"""
+
+
+class RPCSyncBackend(SupabaseSyncBackend):
+    """
+    execute_sql RPCでモデルごとに並列に同期するバックエンド
+    """
+
+    name = BACKEND_RPC
+
+    def load_catalog(self) -> Optional[SupabaseCatalogSnapshot]:
+        return supabase_sync.load_catalog_snapshot()
+
+    def sync_models(self, models_list, jobs=supabase_sync.DEFAULT_SYNC_JOBS, on_complete=None, catalog=None):
+        return supabase_sync.sync_models_concurrently(models_list, jobs=jobs, on_complete=on_complete, catalog=catalog)
+
+
+class DirectSQLSyncBackend(SupabaseSyncBackend):
+    """
+    psycopg2でSupabaseのPostgreSQLに直接接続して同期するバックエンド
+
+    全モデルのCREATE / ALTERを1トランザクションで実行し、モデルごとにSAVEPOINTを置くため、
+    失敗したモデルのDDLのみが取り消されます。
+    """
+
+    name = BACKEND_DIRECT
+
+    def __init__(self, dsn: str, schema: str = 'public'):
+        self.dsn = dsn
+        self.schema = schema
+        self._connection = None
+
+    @property
+    def connection(self):
+        """接続を返します（初回のみ接続し、カタログ取得クエリをPREPAREします）"""
+        if self._connection is None:
+            connection = connect_supabase_database(self.dsn)
+            with connection.cursor() as cursor:
+                for name, query in INTROSPECTION_QUERIES.items():
+                    cursor.execute(f"PREPARE {name}(text) AS {query}")
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def _fetch(self, cursor, statement_name: str) -> List[Dict[str, Any]]:
+        """PREPARE済みのクエリを実行し、行を辞書のリストで返します"""
+        cursor.execute(f"EXECUTE {statement_name}(%s)", [self.schema])
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def load_catalog(self) -> Optional[SupabaseCatalogSnapshot]:
+        tables: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        connection = self.connection
+        with track_phase(PHASE_INTROSPECTION), connection.cursor() as cursor:
+            for section, statement_name in CATALOG_SECTIONS.items():
+                for row in self._fetch(cursor, statement_name):
+                    table = tables.setdefault(row.pop('table_name'), {key: [] for key in CATALOG_SECTIONS})
+                    table[section].append(row)
+        connection.commit()
+        logger.debug(f"スキーマ {self.schema} のカタログを直接取得しました（{len(tables)}テーブル）")
+        return SupabaseCatalogSnapshot(tables, schema=self.schema)
+
+    def sync_models(self, models_list, jobs=supabase_sync.DEFAULT_SYNC_JOBS, on_complete=None, catalog=None):
+        if catalog is None:
+            catalog = self.load_catalog()
+        plans = [
+            supabase_sync.plan_model_sync(model, catalog)
+            for level in supabase_sync.sort_models_by_dependency(models_list)
+            for model in level
+        ]
+
+        results = {}
+        elapsed = {plan.model: 0.0 for plan in plans}
+        connection = self.connection
+        try:
+            with connection.cursor() as cursor:
+                for plan in plans:
+                    start = time.time()
+                    with track_model(plan.model):
+                        results[plan.model] = self._apply_statements(cursor, plan)
+                    elapsed[plan.model] = time.time() - start
+            connection.commit()
+        except Exception as e:
+            # 接続の切断などでトランザクション全体が失敗した場合は、すべてのモデルを失敗とする
+            connection.rollback()
+            supabase_sync.log_error_details(e, "スキーマ同期のトランザクションに失敗しました。変更はすべてロールバックされました")
+            results = {plan.model: False for plan in plans}
+
+        # CREATE INDEX CONCURRENTLY はトランザクション内で実行できないため、コミット後に自動コミットで実行する
+        index_plans = [plan for plan in plans if plan.index_statements and results[plan.model]]
+        if index_plans:
+            connection.autocommit = True
+            try:
+                with connection.cursor() as cursor:
+                    for plan in index_plans:
+                        start = time.time()
+                        with track_model(plan.model):
+                            # インデックスを作成できなかったモデルは失敗とし、フィンガープリントを保存せずに再試行する
+                            results[plan.model] = self._create_indexes(cursor, plan)
+                        elapsed[plan.model] += time.time() - start
+            finally:
+                connection.autocommit = False
+
+        for plan in plans:
+            success = results[plan.model]
+            set_model_status(plan.model, 'ok' if success else 'error')
+            if plan.extra_columns:
+                logger.warning(f"テーブル {plan.table_name} に不要なカラムがあります: {', '.join(plan.extra_columns)}。"
+                               "安全のため自動削除は行いません。手動で削除してください。")
+            if on_complete:
+                on_complete(plan.model, success, elapsed[plan.model])
+
+        return results
+
+    def _apply_statements(self, cursor, plan: 'supabase_sync.ModelSyncPlan') -> bool:
+        """
+        1モデル分のDDLをSAVEPOINTの中で実行します。失敗した場合はそのモデルのDDLのみ取り消します。
+        """
+        if not plan.statements:
+            return True
+        cursor.execute("SAVEPOINT supabase_sync_model")
+        try:
+            with track_phase(PHASE_DDL):
+                for statement in plan.statements:
+                    cursor.execute(statement)
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT supabase_sync_model")
+            supabase_sync.log_error_details(
+                e, f"テーブル {plan.table_name} の同期に失敗しました。このテーブルの変更は取り消されました",
+                {'table': plan.table_name, 'action': plan.action},
+            )
+            return False
+        cursor.execute("RELEASE SAVEPOINT supabase_sync_model")
+        logger.info(f"テーブル {plan.table_name} を{'作成' if plan.action == 'create' else '変更'}しました")
+        return True
+
+    def _create_indexes(self, cursor, plan: 'supabase_sync.ModelSyncPlan') -> bool:
+        """
+        既存のテーブルに不足しているインデックスをCONCURRENTLYで作成します。
+
+        Returns:
+            すべてのインデックスを作成できた場合はTrue、1つでも失敗した場合はFalse
+        """
+        success = True
+        for statement in plan.index_statements:
+            try:
+                with track_phase(PHASE_DDL):
+                    cursor.execute(statement)
+                logger.info(f"テーブル {plan.table_name} にインデックスを作成しました: {statement}")
+            except Exception as e:
+                supabase_sync.log_error_details(e, f"テーブル {plan.table_name} のインデックス作成に失敗しました", {'sql': statement})
+                success = False
+                # 失敗したCONCURRENTLYのインデックスはINVALIDのまま残り、再同期の IF NOT EXISTS で
+                # 作成済みとみなされるため、ここで削除しておく
+                drop_sql = f"DROP INDEX CONCURRENTLY IF EXISTS {self._index_name(statement)};"
+                try:
+                    with track_phase(PHASE_DDL):
+                        cursor.execute(drop_sql)
+                except Exception as drop_err:
+                    supabase_sync.log_error_details(drop_err, f"テーブル {plan.table_name} のINVALIDなインデックスの削除に失敗しました", {'sql': drop_sql})
+                    logger.warning("INVALIDなインデックスを DROP INDEX CONCURRENTLY で削除してから再同期してください。")
+        return success
+
+    @staticmethod
+    def _index_name(statement: str) -> str:
+        """build_index_sql で生成した CREATE INDEX 文からインデックス名を取り出します"""
+        return statement.split(' IF NOT EXISTS ', 1)[1].split()[0]
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def get_sync_backend(preferred: Optional[str] = None) -> SupabaseSyncBackend:
+    """
+    スキーマ同期のバックエンドを返します。
+
+    'auto' の場合は settings.SUPABASE_DB_URL が設定されていて psycopg2 で接続できれば直接SQL、
+    それ以外はexecute_sql RPCを使用します。
+
+    Args:
+        preferred: 'auto' / 'direct' / 'rpc'（省略時は settings.SUPABASE_SYNC_BACKEND）
+
+    Returns:
+        バックエンド
+
+    Raises:
+        SupabaseConnectionError: 'direct' を指定したが接続できない場合
+    """
+    preferred = preferred or getattr(settings, 'SUPABASE_SYNC_BACKEND', BACKEND_AUTO)
+    if preferred not in SYNC_BACKENDS:
+        raise ValueError(f"不明な同期バックエンドです: {preferred}（{', '.join(SYNC_BACKENDS)} のいずれかを指定してください）")
+    if preferred == BACKEND_RPC:
+        return RPCSyncBackend()
+
+    dsn = getattr(settings, 'SUPABASE_DB_URL', None)
+    if not dsn or psycopg2 is None:
+        if preferred == BACKEND_DIRECT:
+            raise supabase_sync.SupabaseConnectionError(
+                "直接接続にはsettings.SUPABASE_DB_URLとpsycopg2が必要です"
+            )
+        return RPCSyncBackend()
+
+    backend = DirectSQLSyncBackend(dsn)
+    try:
+        backend.connection
+    except supabase_sync.SupabaseConnectionError as e:
+        if preferred == BACKEND_DIRECT:
+            raise
+        logger.warning(f"{str(e)}。execute_sql RPCで同期します")
+        return RPCSyncBackend()
+    return backend
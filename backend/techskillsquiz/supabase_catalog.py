@@ -0,0 +1,155 @@
+"""
+Supabase Catalog Snapshot
+
+このモジュールはSupabase（PostgreSQL）側のスキーマ情報のスナップショットを提供します。
+introspect_schema RPCを1回呼び出すだけで全テーブルのカラム・制約・インデックスを取得し、
+テーブルの存在確認やスキーマ差分の計算はこのスナップショットを参照して行います。
+"""
+
+import logging
+import re
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# カタログ取得用のRPC関数名（supabase/migrations で定義）
+INTROSPECT_SCHEMA_RPC = 'introspect_schema'
+
+# PostgreSQLの型名の別名と正式名の対応
+PG_TYPE_ALIASES = {
+    'varchar': 'character varying',
+    'char': 'character',
+    'bpchar': 'character',
+    'int': 'integer',
+    'int4': 'integer',
+    'int8': 'bigint',
+    'int2': 'smallint',
+    'serial': 'integer',
+    'bigserial': 'bigint',
+    'smallserial': 'smallint',
+    'bool': 'boolean',
+    'float8': 'double precision',
+    'float4': 'real',
+    'decimal': 'numeric',
+    'timestamptz': 'timestamp with time zone',
+    'timestamp': 'timestamp without time zone',
+    'timetz': 'time with time zone',
+    'time': 'time without time zone',
+}
+
+
+def normalize_pg_type(type_name: Optional[str]) -> str:
+    """
+    PostgreSQLの型名を比較用の正規形に変換します。
+
+    例: 'varchar(100)' → 'character varying(100)'、'int4' → 'integer'
+
+    Args:
+        type_name: 型名
+
+    Returns:
+        正規化された型名
+    """
+    if not type_name:
+        return ''
+
+    normalized = re.sub(r'\s+', ' ', type_name.strip().lower())
+    normalized = re.sub(r'\s*\(\s*', '(', normalized)
+    normalized = re.sub(r'\s*,\s*', ',', normalized)
+    normalized = re.sub(r'\s*\)', ')', normalized)
+
+    match = re.match(r'^([a-z0-9_ ]+?)(\(.*\))?$', normalized)
+    if not match:
+        return normalized
+
+    base, modifier = match.group(1), match.group(2) or ''
+    base = PG_TYPE_ALIASES.get(base, base)
+    return f"{base}{modifier}"
+
+
+def pg_types_match(model_type: Optional[str], db_type: Optional[str]) -> bool:
+    """
+    モデル側とデータベース側の型が一致するかを判定します。
+
+    information_schema.columns.data_type のように修飾子（長さ・精度）を含まない
+    型名が渡された場合は、基本型のみで比較します。
+
+    Args:
+        model_type: Djangoモデルから算出した型名
+        db_type: データベースから取得した型名
+
+    Returns:
+        一致する場合はTrue
+    """
+    model_normalized = normalize_pg_type(model_type)
+    db_normalized = normalize_pg_type(db_type)
+
+    if model_normalized == db_normalized:
+        return True
+
+    if '(' not in db_normalized:
+        return model_normalized.split('(')[0] == db_normalized
+
+    return False
+
+
+class SupabaseCatalogSnapshot:
+    """
+    Supabaseのスキーマ情報のスナップショット。
+
+    introspect_schema RPCのレスポンス
+    { "テーブル名": { "columns": [...], "constraints": [...], "indexes": [...] } }
+    をそのまま保持し、読み取り専用で参照します（複数スレッドから参照可能）。
+    """
+
+    def __init__(self, tables: Dict[str, Dict[str, Any]], schema: str = 'public'):
+        self.schema = schema
+        self.tables = tables or {}
+
+    @classmethod
+    def load(cls, supabase, schema: str = 'public') -> 'SupabaseCatalogSnapshot':
+        """
+        introspect_schema RPCを1回呼び出してスナップショットを作成します。
+
+        Args:
+            supabase: Supabaseクライアント
+            schema: 対象スキーマ名
+
+        Returns:
+            スナップショット
+        """
+        result = supabase.rpc(INTROSPECT_SCHEMA_RPC, {'p_schema': schema}).execute()
+        data = result.data
+
+        # RPCの戻り値が1行の配列で返される場合にも対応
+        if isinstance(data, list):
+            data = data[0] if data else {}
+            if isinstance(data, dict) and INTROSPECT_SCHEMA_RPC in data:
+                data = data[INTROSPECT_SCHEMA_RPC]
+
+        if not isinstance(data, dict):
+            raise ValueError(f"{INTROSPECT_SCHEMA_RPC} のレスポンス形式が不正です: {type(data).__name__}")
+
+        logger.debug(f"スキーマ {schema} のカタログを取得しました（{len(data)}テーブル）")
+        return cls(data, schema=schema)
+
+    def table_exists(self, table_name: str) -> bool:
+        """テーブルが存在するかどうかを返します"""
+        return table_name in self.tables
+
+    def get_columns(self, table_name: str) -> List[Dict[str, Any]]:
+        """
+        テーブルのカラム情報を返します。
+
+        select_columns RPCと同じく column_name / data_type / is_nullable（'YES'/'NO'）
+        のキーを持つ辞書のリストを返します。
+        """
+        return self.tables.get(table_name, {}).get('columns', [])
+
+    def get_constraints(self, table_name: str) -> List[Dict[str, Any]]:
+        """テーブルの制約（name / type / definition）のリストを返します"""
+        return self.tables.get(table_name, {}).get('constraints', [])
+
+    def get_indexes(self, table_name: str) -> List[Dict[str, Any]]:
+        """テーブルのインデックス（name / is_unique / is_primary / definition）のリストを返します"""
+        return self.tables.get(table_name, {}).get('indexes', [])
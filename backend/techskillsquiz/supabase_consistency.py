@@ -0,0 +1,693 @@
+"""
+Supabase Consistency Verification
+
+このモジュールはDjangoモデルとSupabaseテーブル間の整合性検証を提供します。
+両側の主キーを主キー順に一定サイズのチャンクで読み込み、マージジョインで比較するため、
+テーブルの件数に関わらずメモリ使用量は一定です（不一致のIDのみを保持します）。
+
+内容の比較は主キー範囲ごとのダイジェストで行い、一致しない範囲のみを再帰的に分割します。
+"""
+
+import bisect
+import datetime
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type
+
+from django.db import models
+from django.db.models import Max, Min
+
+from .supabase import get_supabase_admin_client, get_supabase_client
+from .supabase_metrics import track_model, record as record_metrics
+
+logger = logging.getLogger(__name__)
+
+# 1回のクエリで取得する主キーの件数
+DEFAULT_CONSISTENCY_CHUNK_SIZE = 1000
+
+# マージジョインの比較結果
+MATCHED = 'matched'
+MISSING_IN_SUPABASE = 'missing_in_supabase'
+MISSING_IN_DJANGO = 'missing_in_django'
+CHANGED = 'changed'
+
+# 範囲ダイジェスト用のRPC関数名（supabase/migrations で定義）
+RANGE_DIGESTS_RPC = 'range_digests'
+RANGE_ROW_DIGESTS_RPC = 'range_row_digests'
+
+# 1回の比較で範囲を分割する数
+DEFAULT_RANGE_FANOUT = 16
+
+# この幅以下の範囲は行ごとのダイジェストで比較する
+DEFAULT_LEAF_RANGE_SIZE = 1000
+
+# 行の正規化テキストの規則（range_digest_row_expression と同じ）
+NULL_TOKEN = '\\N'
+FIELD_SEPARATOR = '\x1f'
+ROW_SEPARATOR = '\x1e'
+
+# 修復時に1回のupsertで送信する件数と、同時に送信するチャンク数
+DEFAULT_REPAIR_CHUNK_SIZE = 500
+DEFAULT_REPAIR_JOBS = 4
+
+# 1チャンクのupsertを再試行する回数
+REPAIR_RETRY_COUNT = 2
+
+# 中断した修復を再開するための状態ファイル
+DEFAULT_REPAIR_STATE_FILE = '.supabase_repair_state.json'
+
+
+class ConsistencyReport:
+    """
+    整合性検証の結果。
+
+    一致件数と、どちらか一方にしか存在しない主キーの一覧を保持します。
+    """
+
+    def __init__(self, model: Type[models.Model]):
+        self.model = model
+        self.matched_count = 0
+        self.missing_in_supabase: List[Any] = []
+        self.missing_in_django: List[Any] = []
+        self.changed: List[Any] = []
+        self.ranges_compared = 0
+
+    @property
+    def mismatched_count(self) -> int:
+        """不一致の件数（両側の欠落と内容の相違の合計）を返します"""
+        return len(self.missing_in_supabase) + len(self.missing_in_django) + len(self.changed)
+
+    @property
+    def is_consistent(self) -> bool:
+        """不一致がなければTrueを返します"""
+        return self.mismatched_count == 0
+
+    def add(self, status: str, pk: Any):
+        """マージジョインの比較結果を1件記録します"""
+        if status == MATCHED:
+            self.matched_count += 1
+        elif status == MISSING_IN_SUPABASE:
+            self.missing_in_supabase.append(pk)
+        elif status == MISSING_IN_DJANGO:
+            self.missing_in_django.append(pk)
+        elif status == CHANGED:
+            self.changed.append(pk)
+
+
+def iter_django_pks(model: Type[models.Model], chunk_size: int = DEFAULT_CONSISTENCY_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Django側の主キーを主キー順に、キーセットページングでチャンクごとに取得します。
+
+    Args:
+        model: Djangoモデルクラス
+        chunk_size: 1回のクエリで取得する件数
+
+    Yields:
+        主キーの値
+    """
+    queryset = model._default_manager.order_by('pk').values_list('pk', flat=True)
+    last_pk = None
+
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        chunk = list(page[:chunk_size])
+        if not chunk:
+            return
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last_pk = chunk[-1]
+
+
+def iter_supabase_pks(
+    model: Type[models.Model],
+    chunk_size: int = DEFAULT_CONSISTENCY_CHUNK_SIZE,
+    supabase=None,
+) -> Iterator[Any]:
+    """
+    Supabase側の主キーを主キー順に、キーセットページングでチャンクごとに取得します。
+
+    主キーのカラムのみを取得します。PostgRESTの最大行数設定によって
+    chunk_sizeより少ない件数が返される場合があるため、空のページが返るまで読み進めます。
+
+    Args:
+        model: Djangoモデルクラス
+        chunk_size: 1回のリクエストで取得する件数
+        supabase: Supabaseクライアント（省略時は共有クライアント）
+
+    Yields:
+        主キーの値（Django側と比較できるようにPythonの値に変換済み）
+    """
+    supabase = supabase or get_supabase_client()
+    pk_field = model._meta.pk
+    pk_column = pk_field.column
+    last_pk = None
+
+    while True:
+        query = supabase.table(model.supabase_table).select(pk_column)
+        if last_pk is not None:
+            query = query.gt(pk_column, last_pk)
+        rows = query.order(pk_column).limit(chunk_size).execute().data
+        if not rows:
+            return
+        for row in rows:
+            yield pk_field.to_python(row[pk_column])
+        last_pk = rows[-1][pk_column]
+
+
+def merge_join_pks(django_pks: Iterator[Any], supabase_pks: Iterator[Any]) -> Iterator[Tuple[str, Any]]:
+    """
+    主キー順に並んだ2つのイテレータをマージジョインします。
+
+    Args:
+        django_pks: Django側の主キー（昇順）
+        supabase_pks: Supabase側の主キー（昇順）
+
+    Yields:
+        (比較結果, 主キー) のタプル。比較結果は MATCHED / MISSING_IN_SUPABASE / MISSING_IN_DJANGO
+    """
+    sentinel = object()
+    django_pk = next(django_pks, sentinel)
+    supabase_pk = next(supabase_pks, sentinel)
+
+    while django_pk is not sentinel or supabase_pk is not sentinel:
+        if supabase_pk is sentinel or (django_pk is not sentinel and django_pk < supabase_pk):
+            yield MISSING_IN_SUPABASE, django_pk
+            django_pk = next(django_pks, sentinel)
+        elif django_pk is sentinel or supabase_pk < django_pk:
+            yield MISSING_IN_DJANGO, supabase_pk
+            supabase_pk = next(supabase_pks, sentinel)
+        else:
+            yield MATCHED, django_pk
+            django_pk = next(django_pks, sentinel)
+            supabase_pk = next(supabase_pks, sentinel)
+
+
+def verify_model_consistency(
+    model: Type[models.Model],
+    chunk_size: int = DEFAULT_CONSISTENCY_CHUNK_SIZE,
+    supabase=None,
+) -> ConsistencyReport:
+    """
+    DjangoモデルとSupabaseテーブルの主キーをストリーミングで比較します。
+
+    Args:
+        model: SupabaseModelMixinを継承したDjangoモデルクラス
+        chunk_size: 1回の取得件数
+        supabase: Supabaseクライアント（省略時は共有クライアント）
+
+    Returns:
+        整合性検証の結果
+    """
+    report = ConsistencyReport(model)
+
+    for status, pk in merge_join_pks(
+        iter_django_pks(model, chunk_size),
+        iter_supabase_pks(model, chunk_size, supabase),
+    ):
+        report.add(status, pk)
+
+    if report.missing_in_django:
+        logger.warning(
+            f"テーブル {model.supabase_table} にDjango側に存在しないレコードが "
+            f"{len(report.missing_in_django)}件あります"
+        )
+
+    return report
+
+
+def get_digest_fields(model: Type[models.Model]) -> List[models.Field]:
+    """
+    ダイジェストの対象となるフィールド（Supabaseに反映される具象カラム）を返します。
+    """
+    return [field for field in model._meta.concrete_fields]
+
+
+def canonical_value(value: Any) -> str:
+    """
+    値をrange_digest_row_expressionと同じ規則で正規化したテキストに変換します。
+
+    Args:
+        value: Django側のカラムの値
+
+    Returns:
+        正規化されたテキスト
+    """
+    if value is None:
+        return NULL_TOKEN
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc)
+        return value.strftime('%Y-%m-%dT%H:%M:%S.%f')
+    if isinstance(value, datetime.date):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, datetime.time):
+        return value.strftime('%H:%M:%S.%f')
+    if isinstance(value, float):
+        # PostgreSQLは整数値の浮動小数点数を「1」のように出力する
+        text = repr(value)
+        return text[:-2] if text.endswith('.0') else text
+    if isinstance(value, Decimal):
+        return format(value, 'f')
+    return str(value)
+
+
+def row_text(values) -> str:
+    """1行分の値を正規化テキストに変換します"""
+    return FIELD_SEPARATOR.join(canonical_value(value) for value in values)
+
+
+def split_range(lo: int, hi: int, fanout: int = DEFAULT_RANGE_FANOUT) -> List[int]:
+    """
+    主キー範囲 [lo, hi) をfanout個以下の連続する範囲に分割し、その境界を返します。
+
+    Returns:
+        境界のリスト（[b0, b1, ..., bn] で範囲 [b(i), b(i+1)) を表す）
+    """
+    step = max(1, -(-(hi - lo) // fanout))
+    bounds = list(range(lo, hi, step))
+    bounds.append(hi)
+    return bounds
+
+
+def _check_integer_pk(model: Type[models.Model]):
+    if model._meta.pk.get_internal_type() not in ('AutoField', 'BigAutoField', 'SmallAutoField', 'IntegerField', 'BigIntegerField'):
+        raise ValueError(f"{model.__name__} の主キーは整数ではないため、範囲ダイジェストで比較できません")
+
+
+def _digest_rpc_params(model: Type[models.Model]) -> Dict[str, Any]:
+    return {
+        'p_table': model.supabase_table,
+        'p_pk': model._meta.pk.column,
+        'p_columns': [field.column for field in get_digest_fields(model)],
+    }
+
+
+def django_range_digests(model: Type[models.Model], bounds: List[int]) -> List[Tuple[int, str]]:
+    """
+    Django側で連続する主キー範囲ごとの件数とダイジェストを計算します。
+
+    全範囲を1回のクエリで主キー順に読み込み、境界で振り分けます。
+
+    Args:
+        model: Djangoモデルクラス
+        bounds: split_rangeで生成した境界のリスト
+
+    Returns:
+        範囲ごとの (件数, ダイジェスト) のリスト
+    """
+    attnames = [field.attname for field in get_digest_fields(model)]
+    pk_index = attnames.index(model._meta.pk.attname)
+    digests = [hashlib.md5() for _ in bounds[:-1]]
+    counts = [0] * (len(bounds) - 1)
+
+    queryset = (
+        model._default_manager
+        .filter(pk__gte=bounds[0], pk__lt=bounds[-1])
+        .order_by('pk')
+        .values_list(*attnames)
+    )
+    for values in queryset.iterator():
+        index = bisect.bisect_right(bounds, values[pk_index]) - 1
+        if counts[index]:
+            digests[index].update(ROW_SEPARATOR.encode('utf-8'))
+        digests[index].update(row_text(values).encode('utf-8'))
+        counts[index] += 1
+
+    return [(count, digest.hexdigest()) for count, digest in zip(counts, digests)]
+
+
+def django_row_digests(model: Type[models.Model], lo: int, hi: int) -> Dict[Any, str]:
+    """
+    Django側で主キー範囲 [lo, hi) の行ごとのダイジェストを計算します。
+
+    Returns:
+        主キーをキーとしたダイジェストの辞書
+    """
+    attnames = [field.attname for field in get_digest_fields(model)]
+    pk_index = attnames.index(model._meta.pk.attname)
+    queryset = (
+        model._default_manager
+        .filter(pk__gte=lo, pk__lt=hi)
+        .order_by('pk')
+        .values_list(*attnames)
+    )
+    return {
+        values[pk_index]: hashlib.md5(row_text(values).encode('utf-8')).hexdigest()
+        for values in queryset.iterator()
+    }
+
+
+def supabase_range_digests(model: Type[models.Model], bounds: List[int], supabase=None) -> List[Optional[Tuple[int, str]]]:
+    """
+    Supabase側で連続する主キー範囲ごとの件数とダイジェストを1回のRPCで計算します。
+
+    Returns:
+        範囲ごとの (件数, ダイジェスト) のリスト（boundsと同じ順。RPCが返さなかった範囲はNone）
+    """
+    supabase = supabase or get_supabase_admin_client()
+    params = _digest_rpc_params(model)
+    params['p_bounds'] = bounds
+    rows = supabase.rpc(RANGE_DIGESTS_RPC, params).execute().data or []
+    # 範囲の下限で対応づけ、返されなかった範囲は不一致として再分割・行ごとの比較の対象にする
+    digests = {row['lo']: (row['row_count'], row['digest']) for row in rows}
+    if len(digests) != len(bounds) - 1:
+        logger.warning(
+            f"テーブル {model.supabase_table} の範囲ダイジェストが {len(bounds) - 1}件中{len(digests)}件しか"
+            "返されませんでした。返されなかった範囲は不一致として比較します"
+        )
+    return [digests.get(lo) for lo in bounds[:-1]]
+
+
+def supabase_row_digests(model: Type[models.Model], lo: int, hi: int, supabase=None) -> Dict[Any, str]:
+    """
+    Supabase側で主キー範囲 [lo, hi) の行ごとのダイジェストを取得します。
+
+    Returns:
+        主キーをキーとしたダイジェストの辞書
+    """
+    supabase = supabase or get_supabase_admin_client()
+    params = _digest_rpc_params(model)
+    params.update({'p_lo': lo, 'p_hi': hi})
+    rows = supabase.rpc(RANGE_ROW_DIGESTS_RPC, params).execute().data or []
+    pk_field = model._meta.pk
+    return {pk_field.to_python(pk): digest for pk, digest in rows}
+
+
+def get_pk_bounds(model: Type[models.Model], supabase=None) -> Optional[Tuple[int, int]]:
+    """
+    両側を合わせた主キーの範囲 [最小値, 最大値 + 1) を返します。
+
+    Returns:
+        (下限, 上限) のタプル。両側ともに空の場合はNone
+    """
+    supabase = supabase or get_supabase_client()
+    pk_column = model._meta.pk.column
+
+    bounds = model._default_manager.aggregate(lo=Min('pk'), hi=Max('pk'))
+    values = [value for value in (bounds['lo'], bounds['hi']) if value is not None]
+
+    for desc in (False, True):
+        rows = (
+            supabase.table(model.supabase_table)
+            .select(pk_column)
+            .order(pk_column, desc=desc)
+            .limit(1)
+            .execute()
+            .data
+        )
+        if rows:
+            values.append(int(rows[0][pk_column]))
+
+    if not values:
+        return None
+    return min(values), max(values) + 1
+
+
+def compare_row_digests(report: ConsistencyReport, django_rows: Dict[Any, str], supabase_rows: Dict[Any, str]):
+    """行ごとのダイジェストを比較し、結果をreportに記録します"""
+    for pk in sorted(set(django_rows) | set(supabase_rows)):
+        if pk not in supabase_rows:
+            report.add(MISSING_IN_SUPABASE, pk)
+        elif pk not in django_rows:
+            report.add(MISSING_IN_DJANGO, pk)
+        elif django_rows[pk] != supabase_rows[pk]:
+            report.add(CHANGED, pk)
+
+
+def verify_model_content(
+    model: Type[models.Model],
+    fanout: int = DEFAULT_RANGE_FANOUT,
+    leaf_size: int = DEFAULT_LEAF_RANGE_SIZE,
+    supabase=None,
+) -> ConsistencyReport:
+    """
+    DjangoモデルとSupabaseテーブルの内容を主キー範囲ごとのダイジェストで比較します。
+
+    範囲をfanout個に分割して両側のダイジェストを比較し、一致しない範囲のみを再帰的に分割します。
+    幅がleaf_size以下になった範囲は行ごとのダイジェストで比較し、
+    欠落しているレコードと内容が異なるレコードを特定します。
+
+    Args:
+        model: SupabaseModelMixinを継承したDjangoモデルクラス（主キーは整数）
+        fanout: 1回の比較で範囲を分割する数
+        leaf_size: 行ごとの比較に切り替える範囲の幅
+        supabase: Supabaseクライアント（省略時は、主キーの範囲の取得に共有クライアント、
+                  範囲ダイジェストのRPCに service_role のクライアントを使用する）
+
+    Returns:
+        整合性検証の結果（内容の相違はreport.changedに記録される）
+    """
+    _check_integer_pk(model)
+    digest_client = supabase or get_supabase_admin_client()
+    supabase = supabase or get_supabase_client()
+    report = ConsistencyReport(model)
+
+    pk_bounds = get_pk_bounds(model, supabase)
+    if pk_bounds is None:
+        return report
+
+    pending = [pk_bounds]
+    while pending:
+        lo, hi = pending.pop()
+
+        if hi - lo <= leaf_size:
+            compare_row_digests(
+                report,
+                django_row_digests(model, lo, hi),
+                supabase_row_digests(model, lo, hi, digest_client),
+            )
+            continue
+
+        bounds = split_range(lo, hi, fanout)
+        django_digests = django_range_digests(model, bounds)
+        supabase_digests = supabase_range_digests(model, bounds, digest_client)
+        report.ranges_compared += len(django_digests)
+
+        # 後から取り出すため逆順に積み、主キーの昇順で処理する
+        for index in reversed(range(len(django_digests))):
+            if django_digests[index] != supabase_digests[index]:
+                pending.append((bounds[index], bounds[index + 1]))
+
+    logger.debug(
+        f"テーブル {model.supabase_table} の内容比較が完了しました"
+        f"（比較した範囲: {report.ranges_compared}件、不一致: {report.mismatched_count}件）"
+    )
+    return report
+
+
+class RepairResult:
+    """
+    不整合の修復結果（進捗の報告にも使用）。
+    """
+
+    def __init__(self, model: Type[models.Model], total: int):
+        self.model = model
+        self.total = total
+        self.matched_count = 0
+        self.processed = 0
+        self.repaired = 0
+        self.skipped = 0
+        self.chunk_errors: List[Dict[str, Any]] = []
+        self.started_at = time.time()
+
+    @property
+    def error_count(self) -> int:
+        """修復に失敗したレコードの件数を返します"""
+        return sum(error['count'] for error in self.chunk_errors)
+
+    @property
+    def elapsed(self) -> float:
+        """経過時間（秒）を返します"""
+        return time.time() - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """1秒あたりの処理件数を返します"""
+        elapsed = self.elapsed
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+
+class RepairState:
+    """
+    修復の進捗を保存する状態ファイル。
+
+    { "app_label.Model": [未修復の主キー, ...] } の形式でJSONに保存し、
+    チャンクの完了ごとに更新します。中断された修復はこのファイルから再開できます。
+    """
+
+    def __init__(self, path: str = DEFAULT_REPAIR_STATE_FILE):
+        self.path = path
+        self.pending: Dict[str, List[Any]] = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.pending = json.load(f)
+
+    def get(self, label: str) -> Optional[List[Any]]:
+        """未修復の主キーを返します（記録がなければNone）"""
+        return self.pending.get(label)
+
+    def set(self, label: str, ids: List[Any]):
+        """未修復の主キーを記録して保存します（空の場合は記録を削除）"""
+        if ids:
+            self.pending[label] = list(ids)
+        else:
+            self.pending.pop(label, None)
+        self.save()
+
+    def save(self):
+        """状態をファイルに保存します（未修復の記録がなければファイルを削除）"""
+        if not self.pending:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.pending, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, self.path)
+
+
+def get_model_label(model: Type[models.Model]) -> str:
+    """状態ファイルやレポートで使用するモデルのラベルを返します"""
+    return f"{model._meta.app_label}.{model.__name__}"
+
+
+def load_record_chunk(model: Type[models.Model], ids: List[Any]) -> Dict[Any, models.Model]:
+    """主キーのチャンクに対応するDjangoのレコードを1回のクエリで取得します"""
+    return model._default_manager.in_bulk(ids)
+
+
+def upsert_record_chunk(model: Type[models.Model], rows: List[Dict[str, Any]], supabase=None) -> int:
+    """
+    レコードのチャンクを1回のupsertでSupabaseに送信します。
+
+    Returns:
+        送信した件数
+    """
+    supabase = supabase or get_supabase_client()
+    pk_column = model._meta.pk.column
+
+    # ワーカースレッドから呼ばれるため、計測対象のモデルをここで設定する
+    with track_model(model):
+        for attempt in range(REPAIR_RETRY_COUNT + 1):
+            try:
+                supabase.table(model.supabase_table).upsert(rows, on_conflict=pk_column).execute()
+                return len(rows)
+            except Exception as e:
+                if attempt >= REPAIR_RETRY_COUNT:
+                    raise
+                record_metrics(retries=1)
+                logger.warning(
+                    f"テーブル {model.supabase_table} へのupsertに失敗しました（試行 {attempt + 1}/{REPAIR_RETRY_COUNT + 1}）: {str(e)}"
+                )
+                time.sleep(1)
+
+
+def repair_model_records(
+    model: Type[models.Model],
+    ids: List[Any],
+    chunk_size: int = DEFAULT_REPAIR_CHUNK_SIZE,
+    jobs: int = DEFAULT_REPAIR_JOBS,
+    supabase=None,
+    on_progress: Optional[Callable[[RepairResult], None]] = None,
+    state: Optional[RepairState] = None,
+) -> RepairResult:
+    """
+    不整合のあるレコードをチャンク単位でSupabaseにupsertします。
+
+    チャンクごとにin_bulkで1回のクエリでレコードを読み込み、最大jobs個のチャンクを並列に送信します。
+    失敗したチャンクはresult.chunk_errorsに記録され、他のチャンクの処理は続行されます。
+
+    Args:
+        model: SupabaseModelMixinを継承したDjangoモデルクラス
+        ids: 修復する主キーのリスト
+        chunk_size: 1回のupsertで送信する件数
+        jobs: 同時に送信するチャンクの最大数
+        supabase: Supabaseクライアント（省略時は共有クライアント）
+        on_progress: チャンクの完了ごとにメインスレッドで呼び出されるコールバック
+        state: 進捗を保存する状態ファイル（指定時は完了したチャンクを記録から除外する）
+
+    Returns:
+        修復結果
+    """
+    supabase = supabase or get_supabase_client()
+    label = get_model_label(model)
+    ids = sorted(ids)
+    chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+    result = RepairResult(model, len(ids))
+    pending = set(ids)
+
+    if state is not None:
+        state.set(label, ids)
+
+    def finish_chunk(chunk, repaired, skipped, error=None):
+        result.processed += len(chunk)
+        result.repaired += repaired
+        result.skipped += skipped
+        if error is not None:
+            result.chunk_errors.append({
+                'first_id': chunk[0],
+                'last_id': chunk[-1],
+                'count': len(chunk) - skipped,
+                'error': str(error),
+            })
+            logger.error(f"テーブル {model.supabase_table} のID {chunk[0]}〜{chunk[-1]} の修復に失敗しました: {str(error)}")
+        elif state is not None:
+            pending.difference_update(chunk)
+            state.set(label, sorted(pending))
+        if on_progress:
+            on_progress(result)
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix='supabase-repair') as executor:
+        futures = {}
+
+        for chunk in chunks:
+            # 送信中のチャンク数を制限する
+            while len(futures) >= max(1, jobs):
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk_done, skipped = futures.pop(future)
+                    finish_chunk(chunk_done, *_future_outcome(future, skipped))
+
+            try:
+                records = load_record_chunk(model, chunk)
+                rows = [records[pk].to_supabase_dict() for pk in chunk if pk in records]
+            except Exception as e:
+                finish_chunk(chunk, 0, 0, e)
+                continue
+
+            # Django側で削除済みのレコードは修復の対象外
+            skipped = len(chunk) - len(rows)
+            if not rows:
+                finish_chunk(chunk, 0, skipped)
+                continue
+
+            future = executor.submit(upsert_record_chunk, model, rows, supabase)
+            futures[future] = (chunk, skipped)
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk_done, skipped = futures.pop(future)
+                finish_chunk(chunk_done, *_future_outcome(future, skipped))
+
+    logger.info(
+        f"テーブル {model.supabase_table} の修復が完了しました"
+        f"（{result.repaired}/{result.total}件、エラー: {result.error_count}件、{result.throughput:.1f}件/秒）"
+    )
+    return result
+
+
+def _future_outcome(future, skipped: int) -> Tuple[int, int, Optional[Exception]]:
+    """upsertのFutureから (修復件数, スキップ件数, 例外) を取り出します"""
+    try:
+        return future.result(), skipped, None
+    except Exception as e:
+        return 0, skipped, e
@@ -0,0 +1,477 @@
+"""
+Supabase Incremental Data Sync
+
+このモジュールはDjangoモデルのデータをupdated_atのウォーターマークに基づいて
+差分のみSupabaseに送信する機能を提供します。
+
+テーブルごとに前回送信した最後の行の (updated_at, 主キー) をSupabaseの
+django_supabase_sync_watermark テーブルに保存し、次回はそれより新しい行のみを
+(updated_at, 主キー) 順のキーセットページングで読み込んでバッチでupsertします。
+ウォーターマークはバッチの送信が完了するたびに1行のupsertで更新されるため、
+途中で中断しても送信済みのバッチを再送することはなく、処理量は変更件数に比例します。
+updated_at（auto_now）はコミット前に設定されるため、送信は settings.SUPABASE_DATA_SYNC_LAG 秒前までに
+更新された行に限り、実行中のトランザクションがウォーターマークより前の updated_at でコミットされても
+取りこぼさないようにします。
+
+逆方向（pull）では、Supabaseのトリガーが更新するテーブル（UserStatistics など）の
+変更された行のみを同じ方法で取得し、bulk_createでDjangoのデータベースに反映します。
+"""
+
+import datetime
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .supabase import get_supabase_client
+from .supabase_consistency import upsert_record_chunk
+
+logger = logging.getLogger(__name__)
+
+# ウォーターマークを保存するテーブル（supabase/migrations で作成）
+WATERMARK_TABLE = 'django_supabase_sync_watermark'
+
+# 同期の方向
+DIRECTION_PUSH = 'push'
+DIRECTION_PULL = 'pull'
+
+# 差分の判定に使用するフィールド
+WATERMARK_FIELD = 'updated_at'
+
+# 1回のupsertで送信する件数
+DEFAULT_DATA_SYNC_BATCH_SIZE = 500
+
+# --since に指定すると保存済みのウォーターマークから再開する
+SINCE_AUTO = 'auto'
+
+# Supabaseのトリガーが更新するため、Supabaseから取り込むモデル（settings.SUPABASE_PULL_MODELS で変更可能）
+# QUIZ_STATISTICS_BACKEND='django' ではDjango側で集計するため、取り込まずに送信する
+DEFAULT_PULL_MODELS = ('quiz.UserStatistics', 'quiz.ActivityHistory')
+
+# 継続実行時のポーリング間隔（秒）
+DEFAULT_PULL_INTERVAL = 5.0
+
+# 送信の対象を何秒前までに更新された行に限るか（settings.SUPABASE_DATA_SYNC_LAG で変更可能）
+DEFAULT_DATA_SYNC_LAG = 60.0
+
+
+class DataSyncResult:
+    """
+    差分同期の結果（進捗の報告にも使用）。
+    """
+
+    def __init__(self, model: Type[models.Model], since: Optional[datetime.datetime]):
+        self.model = model
+        self.since = since
+        self.synced = 0
+        self.batches = 0
+        self.watermark: Optional[datetime.datetime] = since
+        self.last_pk: Any = None
+        self.started_at = time.time()
+
+    @property
+    def elapsed(self) -> float:
+        """経過時間（秒）を返します"""
+        return time.time() - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """1秒あたりの送信件数を返します"""
+        elapsed = self.elapsed
+        return self.synced / elapsed if elapsed > 0 else 0.0
+
+
+def supports_incremental_sync(model: Type[models.Model]) -> bool:
+    """モデルがupdated_atによる差分同期に対応しているかどうかを返します"""
+    try:
+        field = model._meta.get_field(WATERMARK_FIELD)
+    except Exception:
+        return False
+    return isinstance(field, models.DateTimeField)
+
+
+def parse_since(value: Optional[str]) -> Optional[datetime.datetime]:
+    """
+    --since の値を日時に変換します。
+
+    Args:
+        value: ISO 8601形式の日時・日付、または 'auto'
+
+    Returns:
+        タイムゾーン付きの日時（'auto' または未指定の場合はNone）
+
+    Raises:
+        ValueError: 日時として解釈できない場合
+    """
+    if not value or value == SINCE_AUTO:
+        return None
+
+    parsed = parse_datetime(value)
+    if parsed is None:
+        date = parse_date(value)
+        if date is None:
+            raise ValueError(f"日時として解釈できません: {value}（ISO 8601形式または '{SINCE_AUTO}' を指定してください）")
+        parsed = datetime.datetime.combine(date, datetime.time.min)
+
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def load_watermark(
+    model: Type[models.Model],
+    direction: str = DIRECTION_PUSH,
+    supabase=None
+) -> Tuple[Optional[datetime.datetime], Any]:
+    """
+    保存済みのウォーターマークを取得します。
+
+    Returns:
+        (updated_at, 主キー) のタプル。保存されていない場合は (None, None)
+    """
+    supabase = supabase or get_supabase_client()
+    result = (
+        supabase.table(WATERMARK_TABLE)
+        .select('updated_at,last_pk')
+        .eq('table_name', model._meta.db_table)
+        .eq('direction', direction)
+        .limit(1)
+        .execute()
+    )
+    if not result.data:
+        return None, None
+
+    row = result.data[0]
+    updated_at = parse_datetime(row['updated_at'])
+    last_pk = row.get('last_pk')
+    if last_pk is not None:
+        last_pk = model._meta.pk.to_python(last_pk)
+    return updated_at, last_pk
+
+
+def save_watermark(
+    model: Type[models.Model],
+    updated_at: datetime.datetime,
+    last_pk: Any,
+    direction: str = DIRECTION_PUSH,
+    supabase=None
+):
+    """
+    ウォーターマークを1行のupsertで保存します（途中の状態が読まれることはありません）。
+    """
+    supabase = supabase or get_supabase_client()
+    supabase.table(WATERMARK_TABLE).upsert({
+        'table_name': model._meta.db_table,
+        'direction': direction,
+        'updated_at': updated_at.isoformat(),
+        'last_pk': None if last_pk is None else str(last_pk),
+        'synced_at': timezone.now().isoformat(),
+    }, on_conflict='table_name,direction').execute()
+
+
+def changed_rows_queryset(
+    model: Type[models.Model],
+    since: Optional[datetime.datetime],
+    after_pk: Any = None,
+    until: Optional[datetime.datetime] = None,
+) -> models.QuerySet:
+    """
+    (updated_at, 主キー) が (since, after_pk) より後の行を、その順に返すクエリセットを作成します。
+
+    Args:
+        model: Djangoモデルクラス
+        since: この日時より新しい行を対象にする（Noneの場合は全件）
+        after_pk: sinceと同じupdated_atの行のうち、この主キーより大きい行も対象にする
+        until: この日時以前に更新された行のみを対象にする
+    """
+    queryset = model._default_manager.order_by(WATERMARK_FIELD, 'pk')
+
+    if since is not None:
+        condition = Q(**{f'{WATERMARK_FIELD}__gt': since})
+        if after_pk is not None:
+            condition |= Q(**{WATERMARK_FIELD: since, 'pk__gt': after_pk})
+        queryset = queryset.filter(condition)
+
+    if until is not None:
+        queryset = queryset.filter(**{f'{WATERMARK_FIELD}__lte': until})
+
+    return queryset
+
+
+def get_push_until() -> datetime.datetime:
+    """
+    送信の対象とする updated_at の上限を返します（現在時刻から settings.SUPABASE_DATA_SYNC_LAG 秒前）。
+
+    updated_at は auto_now によりトランザクションのコミット前に設定されるため、現在時刻までの行を送信して
+    ウォーターマークを進めると、その後にコミットされた、より前の updated_at の行を取りこぼします。
+    上限を遅らせ、それより長いトランザクション以外は次回の送信の対象に含まれるようにします。
+    """
+    lag = float(getattr(settings, 'SUPABASE_DATA_SYNC_LAG', DEFAULT_DATA_SYNC_LAG))
+    return timezone.now() - datetime.timedelta(seconds=max(lag, 0.0))
+
+
+def push_model_changes(
+    model: Type[models.Model],
+    since: Optional[datetime.datetime] = None,
+    batch_size: int = DEFAULT_DATA_SYNC_BATCH_SIZE,
+    supabase=None,
+    on_progress: Optional[Callable[[DataSyncResult], None]] = None,
+) -> DataSyncResult:
+    """
+    ウォーターマークより新しい行をバッチでSupabaseにupsertし、ウォーターマークを進めます。
+
+    バッチは (updated_at, 主キー) 順のキーセットページングで読み込むため、
+    同じupdated_atの行がバッチの境界をまたいでも取りこぼしや重複はありません。
+    開始時刻の settings.SUPABASE_DATA_SYNC_LAG 秒前までに更新された行のみを送信し、
+    それ以降に更新された行とコミット待ちの行は次回の同期の対象とします（get_push_until を参照）。
+
+    Args:
+        model: SupabaseModelMixinを継承したDjangoモデルクラス
+        since: この日時より新しい行を送信する（省略時は保存済みのウォーターマークから再開、
+               ウォーターマークがなければ全件）
+        batch_size: 1回のupsertで送信する件数
+        supabase: Supabaseクライアント（省略時は共有クライアント）
+        on_progress: バッチの送信完了ごとに呼び出されるコールバック
+
+    Returns:
+        同期結果
+
+    Raises:
+        ValueError: モデルにupdated_atフィールドがない場合
+    """
+    if not supports_incremental_sync(model):
+        raise ValueError(f"モデル {model.__name__} には差分同期に必要な {WATERMARK_FIELD} フィールドがありません")
+
+    supabase = supabase or get_supabase_client()
+    after_pk = None
+    if since is None:
+        since, after_pk = load_watermark(model, supabase=supabase)
+
+    result = DataSyncResult(model, since)
+    result.last_pk = after_pk
+    until = get_push_until()
+
+    while True:
+        batch = list(changed_rows_queryset(model, result.watermark, result.last_pk, until)[:batch_size])
+        if not batch:
+            break
+
+        upsert_record_chunk(model, [instance.to_supabase_dict() for instance in batch], supabase)
+
+        # 送信が完了したバッチの最後の行までウォーターマークを進める
+        last = batch[-1]
+        result.watermark = getattr(last, WATERMARK_FIELD)
+        result.last_pk = last.pk
+        save_watermark(model, result.watermark, result.last_pk, supabase=supabase)
+
+        result.synced += len(batch)
+        result.batches += 1
+        if on_progress:
+            on_progress(result)
+
+        if len(batch) < batch_size:
+            break
+
+    logger.info(
+        f"テーブル {model.supabase_table} の差分同期が完了しました"
+        f"（{result.synced}件、{result.batches}バッチ、{result.throughput:.1f}件/秒）"
+    )
+    return result
+
+
+def get_pull_models() -> List[Type[models.Model]]:
+    """
+    Supabaseから取り込む対象のモデルを返します（settings.SUPABASE_PULL_MODELS）。
+
+    未設定（None）の場合は統計情報の集計方法から求め、'trigger' では DEFAULT_PULL_MODELS を、
+    'django' ではDjango側で集計した行を送信するため空を返します。'django' で DEFAULT_PULL_MODELS の
+    モデルを指定した場合は、取り込みでDjangoの集計結果が上書きされるためValueErrorとします。
+    """
+    from quiz.statistics import STATISTICS_BACKEND_DJANGO, get_statistics_backend
+
+    django_statistics = get_statistics_backend() == STATISTICS_BACKEND_DJANGO
+    labels = getattr(settings, 'SUPABASE_PULL_MODELS', None)
+    if labels is None:
+        labels = () if django_statistics else DEFAULT_PULL_MODELS
+    elif django_statistics:
+        conflicting = [label for label in labels if label in DEFAULT_PULL_MODELS]
+        if conflicting:
+            raise ValueError(
+                f"QUIZ_STATISTICS_BACKEND='django' ではDjango側で集計するため、"
+                f"SUPABASE_PULL_MODELS に指定できません: {', '.join(conflicting)}"
+            )
+    return [apps.get_model(label) for label in labels]
+
+
+def is_pull_model(model: Type[models.Model]) -> bool:
+    """
+    モデルがSupabase側で更新され、Djangoに取り込む対象かどうかを返します。
+
+    取り込み対象のモデルをDjangoから送信すると、Supabaseのトリガーがupdated_atを更新し、
+    次の取り込みで再び取得されるため、送信の対象から除外します。
+    """
+    return model in get_pull_models()
+
+
+def _filter_value(value: datetime.datetime) -> str:
+    """PostgRESTの論理フィルタ（or=...）に埋め込む日時の値"""
+    return '"' + value.isoformat() + '"'
+
+
+def fetch_changed_rows(
+    model: Type[models.Model],
+    since: Optional[datetime.datetime],
+    after_pk: Any = None,
+    limit: int = DEFAULT_DATA_SYNC_BATCH_SIZE,
+    supabase=None,
+) -> List[Dict[str, Any]]:
+    """
+    Supabaseから (updated_at, 主キー) が (since, after_pk) より後の行を、その順に1ページ取得します。
+
+    Returns:
+        Supabaseの行（カラム名をキーとする辞書）のリスト
+    """
+    supabase = supabase or get_supabase_client()
+    pk_column = model._meta.pk.column
+    columns = ','.join(field.column for field in model._meta.concrete_fields)
+
+    query = supabase.table(model.supabase_table).select(columns)
+    if since is not None:
+        if after_pk is None:
+            query = query.gt(WATERMARK_FIELD, since.isoformat())
+        else:
+            query = query.or_(
+                f"{WATERMARK_FIELD}.gt.{_filter_value(since)},"
+                f"and({WATERMARK_FIELD}.eq.{_filter_value(since)},{pk_column}.gt.{after_pk})"
+            )
+    result = query.order(WATERMARK_FIELD).order(pk_column).limit(limit).execute()
+    return result.data or []
+
+
+def rows_to_instances(model: Type[models.Model], rows: List[Dict[str, Any]]) -> List[models.Model]:
+    """Supabaseの行をDjangoモデルのインスタンス（未保存）に変換します"""
+    fields = list(model._meta.concrete_fields)
+    return [
+        model(**{
+            field.attname: field.to_python(row[field.column])
+            for field in fields if field.column in row
+        })
+        for row in rows
+    ]
+
+
+_timestamps_lock = threading.Lock()
+
+
+@contextmanager
+def preserve_timestamps(model: Type[models.Model]):
+    """
+    auto_now / auto_now_add を一時的に無効にし、取り込んだ行の作成・更新日時をそのまま保存します。
+    """
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    with _timestamps_lock:
+        saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+        for field in fields:
+            field.auto_now = field.auto_now_add = False
+        try:
+            yield
+        finally:
+            for field, auto_now, auto_now_add in saved:
+                field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def apply_pulled_rows(model: Type[models.Model], instances: List[models.Model]) -> int:
+    """
+    取り込んだ行を主キーで1回のINSERT ... ON CONFLICT DO UPDATEとしてDjangoのデータベースに反映します。
+
+    bulk_createはシグナルを送信しないため、取り込んだ行がSupabaseへ送り返されることはありません。
+
+    Returns:
+        反映した件数
+    """
+    pk = model._meta.pk
+    update_fields = [field.name for field in model._meta.concrete_fields if not field.primary_key]
+    with preserve_timestamps(model), transaction.atomic(using=model._default_manager.db):
+        model._default_manager.bulk_create(
+            instances,
+            update_conflicts=True,
+            unique_fields=[pk.name],
+            update_fields=update_fields,
+        )
+    return len(instances)
+
+
+def pull_model_changes(
+    model: Type[models.Model],
+    since: Optional[datetime.datetime] = None,
+    batch_size: int = DEFAULT_DATA_SYNC_BATCH_SIZE,
+    supabase=None,
+    on_progress: Optional[Callable[[DataSyncResult], None]] = None,
+) -> DataSyncResult:
+    """
+    Supabaseでウォーターマークより後に更新された行を取得してDjangoに反映し、ウォーターマークを進めます。
+
+    Args:
+        model: SupabaseModelMixinを継承したDjangoモデルクラス
+        since: この日時より新しい行を取り込む（省略時は保存済みのウォーターマークから再開、
+               ウォーターマークがなければ全件）
+        batch_size: 1回に取得する件数
+        supabase: Supabaseクライアント（省略時は共有クライアント）
+        on_progress: バッチの反映完了ごとに呼び出されるコールバック
+
+    Returns:
+        同期結果
+
+    Raises:
+        ValueError: モデルにupdated_atフィールドがない場合
+    """
+    if not supports_incremental_sync(model):
+        raise ValueError(f"モデル {model.__name__} には差分同期に必要な {WATERMARK_FIELD} フィールドがありません")
+
+    supabase = supabase or get_supabase_client()
+    after_pk = None
+    if since is None:
+        since, after_pk = load_watermark(model, DIRECTION_PULL, supabase=supabase)
+
+    result = DataSyncResult(model, since)
+    result.last_pk = after_pk
+
+    while True:
+        rows = fetch_changed_rows(model, result.watermark, result.last_pk, batch_size, supabase)
+        if not rows:
+            break
+
+        instances = rows_to_instances(model, rows)
+        apply_pulled_rows(model, instances)
+
+        # 反映が完了したバッチの最後の行までウォーターマークを進める
+        last = instances[-1]
+        result.watermark = getattr(last, WATERMARK_FIELD)
+        result.last_pk = last.pk
+        save_watermark(model, result.watermark, result.last_pk, DIRECTION_PULL, supabase=supabase)
+
+        result.synced += len(instances)
+        result.batches += 1
+        if on_progress:
+            on_progress(result)
+
+        if len(rows) < batch_size:
+            break
+
+    if result.synced:
+        logger.info(
+            f"テーブル {model.supabase_table} から{result.synced}件を取り込みました"
+            f"（{result.batches}バッチ、{result.throughput:.1f}件/秒）"
+        )
+    return result
@@ -0,0 +1,284 @@
+"""
+Supabase Data Export
+
+このモジュールはDjangoモデルのデータをSupabase（PostgreSQL）に投入するためのSQLを
+ストリーミングで出力する機能を提供します。
+
+クエリセットを主キー順に .iterator() で読み込み、チャンクごとの複数行INSERT、
+またはPostgreSQLの COPY ... FROM STDIN 形式でファイルやストリームに書き出すため、
+データ量に関わらずメモリ使用量は一定です。
+"""
+
+import datetime
+import json
+import logging
+import math
+import uuid
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, TextIO, Type
+
+from django.db import models
+
+logger = logging.getLogger(__name__)
+
+# 1回のクエリで読み込む件数、および1つのINSERT文に含める行数
+DEFAULT_EXPORT_CHUNK_SIZE = 1000
+
+# 出力形式
+EXPORT_FORMAT_INSERT = 'insert'
+EXPORT_FORMAT_COPY = 'copy'
+EXPORT_FORMATS = (EXPORT_FORMAT_INSERT, EXPORT_FORMAT_COPY)
+
+# COPY形式でエスケープが必要な文字
+COPY_ESCAPES = {
+    '\\': '\\\\',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r',
+    '\b': '\\b',
+    '\f': '\\f',
+    '\v': '\\v',
+}
+
+
+def quote_identifier(name: str) -> str:
+    """PostgreSQLの識別子をダブルクォートで囲みます"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _check_text(value: str) -> str:
+    if '\x00' in value:
+        raise ValueError("PostgreSQLのテキストにはNUL文字（\\x00）を含めることができません")
+    return value
+
+
+def _text_value(value: Any) -> str:
+    """リテラルとして出力する値のテキスト表現を返します"""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, Decimal):
+        return format(value, 'f')
+    return _check_text(str(value))
+
+
+def sql_literal(value: Any) -> str:
+    """
+    値をPostgreSQLのSQLリテラルに変換します（standard_conforming_strings = on を前提）。
+
+    Args:
+        value: Django側のカラムの値
+
+    Returns:
+        SQLリテラル
+    """
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        if math.isnan(value) or math.isinf(value):
+            return f"'{'NaN' if math.isnan(value) else ('Infinity' if value > 0 else '-Infinity')}'::double precision"
+        return repr(value)
+    if isinstance(value, Decimal):
+        return format(value, 'f') if value.is_finite() else "'NaN'::numeric"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"'\\x{bytes(value).hex()}'::bytea"
+    return "'" + _text_value(value).replace("'", "''") + "'"
+
+
+def copy_value(value: Any) -> str:
+    """
+    値をCOPY（text形式）の1フィールドに変換します。
+
+    Args:
+        value: Django側のカラムの値
+
+    Returns:
+        エスケープ済みのフィールド値
+    """
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (int, float)):
+        return repr(value) if isinstance(value, float) else str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return '\\\\x' + bytes(value).hex()
+    text = _text_value(value)
+    return ''.join(COPY_ESCAPES.get(char, char) for char in text)
+
+
+def get_export_fields(model: Type[models.Model]) -> List[models.Field]:
+    """出力対象のフィールド（具象カラム）を返します"""
+    return list(model._meta.concrete_fields)
+
+
+def iter_model_rows(
+    model: Type[models.Model],
+    queryset: Optional[models.QuerySet] = None,
+    chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE,
+):
+    """
+    モデルの行を主キー順に、値のタプルとしてストリーミングで読み込みます。
+
+    Args:
+        model: Djangoモデルクラス
+        queryset: 出力するクエリセット（省略時は全件）
+        chunk_size: データベースから1回に読み込む件数
+
+    Yields:
+        get_export_fieldsの順に並んだ値のタプル
+    """
+    if queryset is None:
+        queryset = model._default_manager.all()
+    attnames = [field.attname for field in get_export_fields(model)]
+    yield from queryset.order_by('pk').values_list(*attnames).iterator(chunk_size=chunk_size)
+
+
+def _column_list(model: Type[models.Model]) -> str:
+    return ', '.join(quote_identifier(field.column) for field in get_export_fields(model))
+
+
+def write_insert_sql(
+    model: Type[models.Model],
+    stream: TextIO,
+    queryset: Optional[models.QuerySet] = None,
+    chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE,
+) -> int:
+    """
+    モデルのデータをチャンクごとの複数行INSERT文として書き出します。
+
+    既存の行と主キーが衝突した場合は何もしません（ON CONFLICT DO NOTHING）。
+
+    Args:
+        model: Djangoモデルクラス
+        stream: 書き込み先
+        queryset: 出力するクエリセット（省略時は全件）
+        chunk_size: 1つのINSERT文に含める行数
+
+    Returns:
+        書き出した行数
+    """
+    header = f"INSERT INTO {quote_identifier(model._meta.db_table)} ({_column_list(model)}) VALUES\n"
+    row_count = 0
+    rows_in_statement = 0
+
+    for values in iter_model_rows(model, queryset, chunk_size):
+        if rows_in_statement == 0:
+            stream.write(header)
+        else:
+            stream.write(",\n")
+        stream.write("  (" + ", ".join(sql_literal(value) for value in values) + ")")
+        rows_in_statement += 1
+        row_count += 1
+
+        if rows_in_statement >= chunk_size:
+            stream.write("\nON CONFLICT DO NOTHING;\n")
+            rows_in_statement = 0
+
+    if rows_in_statement:
+        stream.write("\nON CONFLICT DO NOTHING;\n")
+
+    return row_count
+
+
+def write_copy_sql(
+    model: Type[models.Model],
+    stream: TextIO,
+    queryset: Optional[models.QuerySet] = None,
+    chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE,
+) -> int:
+    """
+    モデルのデータを COPY ... FROM STDIN 形式（psqlで実行可能）で書き出します。
+
+    Args:
+        model: Djangoモデルクラス
+        stream: 書き込み先
+        queryset: 出力するクエリセット（省略時は全件）
+        chunk_size: データベースから1回に読み込む件数
+
+    Returns:
+        書き出した行数
+    """
+    stream.write(f"COPY {quote_identifier(model._meta.db_table)} ({_column_list(model)}) FROM STDIN;\n")
+    row_count = 0
+
+    for values in iter_model_rows(model, queryset, chunk_size):
+        stream.write("\t".join(copy_value(value) for value in values))
+        stream.write("\n")
+        row_count += 1
+
+    stream.write("\\.\n")
+    return row_count
+
+
+def write_sequence_reset_sql(model: Type[models.Model], stream: TextIO):
+    """
+    自動採番の主キーを持つモデルについて、投入後にシーケンスを最大値に合わせるSQLを書き出します。
+    """
+    pk = model._meta.pk
+    if pk.get_internal_type() not in ('AutoField', 'BigAutoField', 'SmallAutoField'):
+        return
+
+    table = quote_identifier(model._meta.db_table)
+    column = quote_identifier(pk.column)
+    stream.write(
+        f"SELECT setval(pg_get_serial_sequence('{table}', '{pk.column}'), "
+        f"COALESCE((SELECT MAX({column}) FROM {table}), 1), "
+        f"(SELECT MAX({column}) FROM {table}) IS NOT NULL);\n"
+    )
+
+
+def export_models(
+    models_list: List[Type[models.Model]],
+    stream: TextIO,
+    export_format: str = EXPORT_FORMAT_COPY,
+    chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE,
+    reset_sequences: bool = True,
+    on_model: Optional[Callable[[Type[models.Model], int], None]] = None,
+) -> Dict[Type[models.Model], int]:
+    """
+    複数モデルのデータを外部キーの依存順に、1つのトランザクションのSQLスクリプトとして書き出します。
+
+    Args:
+        models_list: 出力するモデルのリスト
+        stream: 書き込み先
+        export_format: 'copy' または 'insert'
+        chunk_size: データベースから1回に読み込む件数（INSERT形式では1文あたりの行数）
+        reset_sequences: 投入後に主キーのシーケンスを最大値に合わせるかどうか
+        on_model: モデルの出力完了ごとに (モデル, 行数) を受け取るコールバック
+
+    Returns:
+        モデルごとの出力行数
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"出力形式は {', '.join(EXPORT_FORMATS)} のいずれかを指定してください: {export_format}")
+
+    # 循環インポートを回避するためローカルにインポート
+    from .supabase_sync import sort_models_by_dependency
+
+    writer = write_copy_sql if export_format == EXPORT_FORMAT_COPY else write_insert_sql
+    counts = {}
+
+    stream.write("-- Django から出力したSupabase投入用データ\n")
+    stream.write("SET client_encoding = 'UTF8';\n")
+    stream.write("SET standard_conforming_strings = on;\n")
+    stream.write("BEGIN;\n\n")
+
+    for level in sort_models_by_dependency(models_list):
+        for model in level:
+            stream.write(f"-- {model._meta.app_label}.{model.__name__}\n")
+            counts[model] = writer(model, stream, chunk_size=chunk_size)
+            if reset_sequences:
+                write_sequence_reset_sql(model, stream)
+            stream.write("\n")
+            logger.debug(f"テーブル {model._meta.db_table} のデータを出力しました（{counts[model]}件）")
+            if on_model:
+                on_model(model, counts[model])
+
+    stream.write("COMMIT;\n")
+    return counts
@@ -0,0 +1,299 @@
+"""
+Supabase Sync Metrics
+
+このモジュールはSupabase同期処理の計測機能を提供します。
+モデルごとにフェーズ（introspection / ddl / data）別の処理時間、HTTP・RPC呼び出し回数、
+再試行回数、送受信バイト数、確認・修復・差分同期したレコード数を記録し、
+JSON / NDJSON形式のレポートとして出力・比較できます。
+
+計測はstart_recording()からstop_recording()までの間だけ有効で、
+それ以外の時間は各記録関数は何もしません。
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Type
+
+# フェーズ名
+PHASE_INTROSPECTION = 'introspection'
+PHASE_DDL = 'ddl'
+PHASE_DATA = 'data'
+
+# モデルに属さない処理（スキーマ全体の取得など）の記録先
+RUN_LABEL = '__run__'
+
+# レポートの形式
+REPORT_FORMAT_TEXT = 'text'
+REPORT_FORMAT_JSON = 'json'
+REPORT_FORMAT_NDJSON = 'ndjson'
+REPORT_FORMATS = (REPORT_FORMAT_TEXT, REPORT_FORMAT_JSON, REPORT_FORMAT_NDJSON)
+
+# 比較対象の数値項目
+COUNTER_FIELDS = (
+    'http_calls',
+    'rpc_calls',
+    'retries',
+    'bytes_sent',
+    'bytes_received',
+    'rows_checked',
+    'rows_repaired',
+    'rows_synced',
+)
+
+
+class ModelSyncMetrics:
+    """1モデル分の計測値"""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.phases: Dict[str, float] = {}
+        self.status: Optional[str] = None
+        for field in COUNTER_FIELDS:
+            setattr(self, field, 0)
+
+    @property
+    def total_seconds(self) -> float:
+        """フェーズの処理時間の合計を返します"""
+        return sum(self.phases.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """レポート出力用の辞書に変換します"""
+        data = {
+            'model': self.label,
+            'status': self.status,
+            'phases': {phase: round(seconds, 6) for phase, seconds in self.phases.items()},
+            'total_seconds': round(self.total_seconds, 6),
+        }
+        for field in COUNTER_FIELDS:
+            data[field] = getattr(self, field)
+        return data
+
+
+class SyncMetricsRecorder:
+    """
+    同期処理全体の計測値を保持します（複数スレッドから更新可能）。
+    """
+
+    def __init__(self, mode: str = 'sync'):
+        self.mode = mode
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.models: Dict[str, ModelSyncMetrics] = {}
+        self._lock = threading.Lock()
+
+    def get(self, label: str) -> ModelSyncMetrics:
+        """ラベルに対応する計測値を返します（なければ作成）"""
+        with self._lock:
+            if label not in self.models:
+                self.models[label] = ModelSyncMetrics(label)
+            return self.models[label]
+
+    def add(self, metrics: ModelSyncMetrics, **counters):
+        """カウンタを加算します"""
+        with self._lock:
+            for field, value in counters.items():
+                setattr(metrics, field, getattr(metrics, field) + value)
+
+    def add_phase(self, metrics: ModelSyncMetrics, phase: str, seconds: float):
+        """フェーズの処理時間を加算します"""
+        with self._lock:
+            metrics.phases[phase] = metrics.phases.get(phase, 0.0) + seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        """レポート全体を辞書に変換します"""
+        finished_at = self.finished_at or time.time()
+        return {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'mode': self.mode,
+            'total_seconds': round(finished_at - self.started_at, 6),
+            'models': {label: metrics.to_dict() for label, metrics in sorted(self.models.items())},
+        }
+
+
+_recorder: Optional[SyncMetricsRecorder] = None
+_local = threading.local()
+
+
+def start_recording(mode: str = 'sync') -> SyncMetricsRecorder:
+    """計測を開始します"""
+    global _recorder
+    _recorder = SyncMetricsRecorder(mode)
+    return _recorder
+
+
+def stop_recording() -> Optional[SyncMetricsRecorder]:
+    """計測を終了し、計測結果を返します"""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    if recorder is not None:
+        recorder.finished_at = time.time()
+    return recorder
+
+
+def get_model_label(model: Type) -> str:
+    """計測値のラベル（app_label.Model）を返します"""
+    return f"{model._meta.app_label}.{model.__name__}"
+
+
+def _current_metrics() -> Optional[ModelSyncMetrics]:
+    if _recorder is None:
+        return None
+    label = getattr(_local, 'label', None) or RUN_LABEL
+    return _recorder.get(label)
+
+
+@contextmanager
+def track_model(model: Type):
+    """
+    このスレッドで実行される処理の計測値を、指定したモデルに記録します。
+    """
+    previous = getattr(_local, 'label', None)
+    _local.label = get_model_label(model)
+    try:
+        yield
+    finally:
+        _local.label = previous
+
+
+@contextmanager
+def track_phase(phase: str):
+    """ブロックの処理時間を現在のモデルのフェーズとして記録します"""
+    metrics = _current_metrics()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None and _recorder is not None:
+            _recorder.add_phase(metrics, phase, time.perf_counter() - started)
+
+
+def record(**counters):
+    """現在のモデルのカウンタ（retries / rows_checked / rows_repaired など）を加算します"""
+    metrics = _current_metrics()
+    if metrics is not None and _recorder is not None:
+        _recorder.add(metrics, **counters)
+
+
+def set_model_status(model: Type, status: str):
+    """モデルの処理結果を記録します"""
+    if _recorder is not None:
+        _recorder.get(get_model_label(model)).status = status
+
+
+def _on_request(request):
+    rpc = 1 if '/rpc/' in request.url.path else 0
+    content = request.content if hasattr(request, '_content') else b''
+    record(http_calls=1, rpc_calls=rpc, bytes_sent=len(content))
+
+
+def _on_response(response):
+    if _recorder is None:
+        return
+    response.read()
+    record(bytes_received=len(response.content))
+
+
+def install_http_metrics(supabase):
+    """
+    SupabaseクライアントのHTTPセッションに計測用のフックを登録します（登録は1回のみ）。
+
+    Args:
+        supabase: Supabaseクライアント
+    """
+    session = getattr(getattr(supabase, 'postgrest', None), 'session', None)
+    hooks = getattr(session, 'event_hooks', None)
+    if not isinstance(hooks, dict) or _on_request in hooks.get('request', []):
+        return
+    session.event_hooks = {
+        'request': list(hooks.get('request', [])) + [_on_request],
+        'response': list(hooks.get('response', [])) + [_on_response],
+    }
+
+
+def write_report(recorder: SyncMetricsRecorder, path: str, report_format: str = REPORT_FORMAT_JSON):
+    """
+    計測結果をJSONまたはNDJSON形式で書き出します。
+
+    NDJSON形式では1行目にモデルごとの計測値、最終行に全体のまとめ（type: summary）を出力します。
+    """
+    report = recorder.to_dict()
+    with open(path, 'w', encoding='utf-8') as f:
+        if report_format == REPORT_FORMAT_NDJSON:
+            for metrics in report['models'].values():
+                f.write(json.dumps(dict(type='model', **metrics), ensure_ascii=False) + '\n')
+            summary = {key: value for key, value in report.items() if key != 'models'}
+            f.write(json.dumps(dict(type='summary', **summary), ensure_ascii=False) + '\n')
+        else:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    """
+    write_reportで出力したJSONまたはNDJSON形式のレポートを読み込みます。
+
+    Returns:
+        JSON形式と同じ構造の辞書
+    """
+    with open(path, encoding='utf-8') as f:
+        content = f.read()
+
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        pass
+
+    report: Dict[str, Any] = {'models': {}}
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        entry_type = entry.pop('type', 'model')
+        if entry_type == 'summary':
+            report.update(entry)
+        else:
+            report['models'][entry['model']] = entry
+    return report
+
+
+def diff_reports(old: Dict[str, Any], new: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    2つのレポートのモデルごとの数値を比較します。
+
+    Returns:
+        {model, metric, old, new, delta, ratio} の辞書のリスト（値が変化した項目のみ）
+    """
+    rows = []
+    labels = sorted(set(old.get('models', {})) | set(new.get('models', {})))
+
+    for label in labels:
+        old_metrics = old.get('models', {}).get(label, {})
+        new_metrics = new.get('models', {}).get(label, {})
+
+        values = [('total_seconds', old_metrics.get('total_seconds', 0), new_metrics.get('total_seconds', 0))]
+        phases = sorted(set(old_metrics.get('phases', {})) | set(new_metrics.get('phases', {})))
+        for phase in phases:
+            values.append((
+                f'phases.{phase}',
+                old_metrics.get('phases', {}).get(phase, 0),
+                new_metrics.get('phases', {}).get(phase, 0),
+            ))
+        for field in COUNTER_FIELDS:
+            values.append((field, old_metrics.get(field, 0), new_metrics.get(field, 0)))
+
+        for metric, old_value, new_value in values:
+            if old_value == new_value:
+                continue
+            rows.append({
+                'model': label,
+                'metric': metric,
+                'old': old_value,
+                'new': new_value,
+                'delta': new_value - old_value,
+                'ratio': (new_value / old_value) if old_value else None,
+            })
+
+    return rows
@@ -15,7 +15,18 @@ from django.db.models.signals import post_save, pre_delete, pre_save
 from django.dispatch import receiver
 from django.conf import settings
 
-from .supabase import get_supabase_client
+from .supabase import get_supabase_client, shares_default_database, is_replication_mirroring
+from .supabase_metrics import record as record_metrics
+from .supabase_consistency import (
+    DEFAULT_CONSISTENCY_CHUNK_SIZE,
+    DEFAULT_REPAIR_CHUNK_SIZE,
+    DEFAULT_REPAIR_JOBS,
+    ConsistencyReport,
+    RepairResult,
+    RepairState,
+    repair_model_records,
+    verify_model_consistency,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -55,6 +66,7 @@ def retry_on_error(max_retries=3, retry_delay=1, allowed_exceptions=(Exception,)
                 except allowed_exceptions as e:
                     last_exception = e
                     if attempt < max_retries:
+                        record_metrics(retries=1)
                         # エラー情報をログに記録
                         logger.warning(
                             f"関数 {func.__name__} の実行中にエラーが発生しました（試行 {attempt + 1}/{max_retries + 1}）: {str(e)}"
@@ -292,13 +304,12 @@ class SupabaseModelMixin:
                     continue
                     
                 field_name = field.name
-                field_value = getattr(self, field_name)
                 
-                # 外部キーの場合はIDを取得
+                # 外部キーの場合は関連オブジェクトを読み込まずにIDを取得
                 if field.is_relation:
-                    if field_value is not None:
-                        related_id_field = field.related_model._meta.pk.name
-                        field_value = getattr(field_value, related_id_field)
+                    field_value = getattr(self, field.attname)
+                else:
+                    field_value = getattr(self, field_name)
                 
                 # datetime型を文字列に変換
                 from datetime import datetime, date
@@ -330,6 +341,11 @@ class SupabaseModelMixin:
             error_msg = f"{self.__class__.__name__}のsupabase_tableが設定されていません"
             logger.error(error_msg)
             raise ValueError(error_msg)
+        
+        # DjangoがSupabaseのデータベースに直接書き込んでいる場合は、保存した行がそのままSupabaseの行となる
+        if shares_default_database():
+            logger.debug(f"{self.__class__.__name__} はSupabaseと同じデータベースに保存されているため同期を省略します")
+            return True
             
         try:
             # モデルのデータをSupabase用の辞書に変換
@@ -373,12 +389,17 @@ class SupabaseModelMixin:
             raise SupabaseDataError(error_msg)
     
     @classmethod
-    def verify_supabase_consistency(cls) -> Tuple[int, int, List[Any]]:
+    def verify_supabase_consistency_report(cls, chunk_size: int = DEFAULT_CONSISTENCY_CHUNK_SIZE) -> ConsistencyReport:
         """
-        DjangoモデルとSupabaseテーブル間の整合性を検証します。
+        DjangoモデルとSupabaseテーブル間の整合性を検証し、両側の不一致を含む結果を返します。
+        
+        両側の主キーをチャンク単位でストリーミング比較するため、件数に関わらずメモリ使用量は一定です。
+        
+        Args:
+            chunk_size: 1回の取得件数
         
         Returns:
-            (一致件数, 不一致件数, 不一致のID一覧)
+            整合性検証の結果
         """
         if not cls.supabase_table:
             raise ValueError(f"{cls.__name__}のsupabase_tableが設定されていません")
@@ -398,32 +419,8 @@ class SupabaseModelMixin:
                 if not success:
                     raise SupabaseDataError(f"テーブル {cls.supabase_table} の作成に失敗しました")
             
-            # Djangoモデルの全レコードを取得
-            django_records = cls.objects.all()
-            
-            # Supabaseの全レコードを取得
-            supabase_records = cls.supabase_select()
-            
-            # 主キーのフィールド名を取得
-            pk_name = cls._meta.pk.name
-            
-            # IDでSupabaseレコードをインデックス化
-            supabase_by_id = {record.get(pk_name): record for record in supabase_records}
-            
-            # 一致しないレコードを確認
-            mismatched_ids = []
-            matched_count = 0
-            
-            for django_record in django_records:
-                record_id = getattr(django_record, pk_name)
-                
-                if record_id not in supabase_by_id:
-                    # Supabaseにレコードが存在しない
-                    mismatched_ids.append(record_id)
-                else:
-                    matched_count += 1
-            
-            return matched_count, len(mismatched_ids), mismatched_ids
+            # 両側の主キーのみを主キー順にチャンクで読み込み、マージジョインで比較する
+            return verify_model_consistency(cls, chunk_size=chunk_size, supabase=client)
             
         except SupabaseDataError:
             # 既に適切な例外なので再スロー
@@ -435,60 +432,91 @@ class SupabaseModelMixin:
             raise SupabaseDataError(f"{error_context}: {str(e)}")
     
     @classmethod
-    def fix_supabase_consistency(cls) -> Tuple[int, int, int]:
+    def verify_supabase_consistency(cls, chunk_size: int = DEFAULT_CONSISTENCY_CHUNK_SIZE) -> Tuple[int, int, List[Any]]:
+        """
+        DjangoモデルとSupabaseテーブル間の整合性を検証します。
+        
+        Args:
+            chunk_size: 1回の取得件数
+        
+        Returns:
+            (一致件数, 不一致件数, 不一致のID一覧)
+            不一致はSupabaseにレコードが存在しないIDです。
+        """
+        report = cls.verify_supabase_consistency_report(chunk_size=chunk_size)
+        return report.matched_count, len(report.missing_in_supabase), report.missing_in_supabase
+    
+    @classmethod
+    def fix_supabase_consistency(
+        cls,
+        ids: Optional[List[Any]] = None,
+        chunk_size: int = DEFAULT_REPAIR_CHUNK_SIZE,
+        jobs: int = DEFAULT_REPAIR_JOBS,
+        on_progress=None,
+        state: Optional[RepairState] = None,
+    ) -> Tuple[int, int, int]:
         """
         DjangoモデルとSupabaseテーブル間の整合性の問題を修正します。
         
+        不一致のレコードをin_bulkでチャンクごとに読み込み、バッチupsertで並列に送信します。
+        
+        Args:
+            ids: 修正する主キーのリスト（省略時は整合性を検証して不一致のIDを修正）
+            chunk_size: 1回のupsertで送信する件数
+            jobs: 同時に送信するチャンクの最大数
+            on_progress: チャンクの完了ごとに RepairResult を受け取るコールバック
+            state: 中断時に再開するための状態ファイル
+        
         Returns:
             (確認済みレコード数, 追加されたレコード数, エラー数)
         """
+        result = cls.repair_supabase_records(ids, chunk_size=chunk_size, jobs=jobs, on_progress=on_progress, state=state)
+        return result.matched_count, result.repaired, result.error_count
+    
+    @classmethod
+    def repair_supabase_records(
+        cls,
+        ids: Optional[List[Any]] = None,
+        chunk_size: int = DEFAULT_REPAIR_CHUNK_SIZE,
+        jobs: int = DEFAULT_REPAIR_JOBS,
+        on_progress=None,
+        state: Optional[RepairState] = None,
+    ) -> RepairResult:
+        """
+        fix_supabase_consistencyと同じ修正を行い、チャンクごとのエラーやスループットを含む結果を返します。
+        
+        Returns:
+            修復結果（matched_countに検証時の一致件数を持つ）
+        """
         if not cls.supabase_table:
             raise ValueError(f"{cls.__name__}のsupabase_tableが設定されていません")
             
         try:
-            # 整合性を検証
-            try:
-                matched_count, mismatched_count, mismatched_ids = cls.verify_supabase_consistency()
-            except SupabaseDataError as e:
-                logger.error(f"整合性検証中にエラーが発生しました: {str(e)}")
-                # テーブルがなければ作成を試みる
-                from .supabase_sync import create_supabase_table
-                success = create_supabase_table(cls)
-                if not success:
-                    raise
-                # 再検証
-                matched_count, mismatched_count, mismatched_ids = 0, 0, []
-            
-            # 不一致がなければ終了
-            if mismatched_count == 0:
-                return matched_count, 0, 0
-                
-            # 不一致のレコードを修正
-            added_count = 0
-            error_count = 0
-            
-            for record_id in mismatched_ids:
+            matched_count = 0
+            if ids is None:
+                # 整合性を検証
                 try:
-                    # Djangoレコードを取得
-                    record = cls.objects.get(pk=record_id)
-                    
-                    # Supabaseに同期
-                    success = record.sync_to_supabase()
-                    
-                    if success:
-                        added_count += 1
-                        logger.info(f"レコード {record_id} の同期に成功しました")
-                    else:
-                        error_count += 1
-                        logger.warning(f"レコード {record_id} の同期に失敗しました（失敗レスポンス）")
-                        
-                except Exception as e:
-                    error_details = traceback.format_exc()
-                    logger.exception(f"レコード {record_id} の同期中にエラーが発生しました: {str(e)}")
-                    logger.debug(f"スタックトレース:\n{error_details}")
-                    error_count += 1
-                    
-            return matched_count, added_count, error_count
+                    matched_count, mismatched_count, ids = cls.verify_supabase_consistency()
+                except SupabaseDataError as e:
+                    logger.error(f"整合性検証中にエラーが発生しました: {str(e)}")
+                    # テーブルがなければ作成を試みる
+                    from .supabase_sync import create_supabase_table
+                    success = create_supabase_table(cls)
+                    if not success:
+                        raise
+                    ids = []
+            
+            result = repair_model_records(
+                cls,
+                ids,
+                chunk_size=chunk_size,
+                jobs=jobs,
+                supabase=cls.get_supabase_client(),
+                on_progress=on_progress,
+                state=state,
+            )
+            result.matched_count = matched_count
+            return result
             
         except Exception as e:
             error_details = traceback.format_exc()
@@ -521,6 +549,14 @@ def handle_supabase_pre_save(sender, instance, **kwargs):
     auto_sync = getattr(settings, 'SUPABASE_AUTO_SYNC', True)
     if not auto_sync:
         return
+    
+    # DjangoがSupabaseのデータベースに直接書き込んでいる場合はミラーリング不要
+    if shares_default_database():
+        return
+    
+    # 論理レプリケーション（replicate_supabase）でミラーリングしている場合は行ごとに送信しない
+    if is_replication_mirroring():
+        return
         
     try:
         # 保存前に行いたい処理があればここに記述
@@ -558,6 +594,14 @@ def handle_supabase_sync_on_save(sender, instance, created, **kwargs):
     if not auto_sync:
         return
     
+    # DjangoがSupabaseのデータベースに直接書き込んでいる場合はミラーリング不要
+    if shares_default_database():
+        return
+    
+    # 論理レプリケーション（replicate_supabase）でミラーリングしている場合は行ごとに送信しない
+    if is_replication_mirroring():
+        return
+    
     # pre_save処理が実行されたか確認
     pre_save_called = getattr(instance, '_pre_save_called', False)
     operation_type = "作成" if created else "更新"
@@ -601,6 +645,14 @@ def handle_supabase_delete(sender, instance, **kwargs):
     auto_sync = getattr(settings, 'SUPABASE_AUTO_SYNC', True)
     if not auto_sync:
         return
+    
+    # DjangoがSupabaseのデータベースに直接書き込んでいる場合はミラーリング不要
+    if shares_default_database():
+        return
+    
+    # 論理レプリケーション（replicate_supabase）でミラーリングしている場合は行ごとに送信しない
+    if is_replication_mirroring():
+        return
         
     try:
         # Supabaseからも削除
@@ -0,0 +1,326 @@
+"""
+Supabase Logical Replication Mirror
+
+このモジュールはDjangoのデータベース（PostgreSQL）の論理レプリケーションスロットから
+ミラー対象のテーブルの変更を読み込み、Supabaseのデータベースにバッチで反映する機能を提供します。
+
+シグナルによる行単位のミラーリングと異なり、QuerySet.update() や bulk_create を含む
+すべての書き込みを取りこぼさず、リクエスト処理中のHTTP呼び出しも発生しません。
+
+- 変更の読み込みには wal2json（format-version 2）を出力プラグインとして、
+  SQL関数 pg_logical_slot_peek_changes を使用します（Djangoのデータベース接続のみで動作します）。
+- 反映はトランザクション単位でまとめ、同じ行への複数の変更は最後の状態のみを反映します。
+- 反映と同じトランザクションで、反映済みの最後のコミットLSNを
+  django_supabase_replication_checkpoint に保存し、その後スロットを進めます。
+  再起動時はチェックポイント以前にコミットされたトランザクションを読み飛ばします。
+
+Djangoのデータベースでは wal_level=logical と wal2json の導入が必要です。
+"""
+
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from django.db import models
+
+from .supabase_data_sync import is_pull_model
+from .supabase_export import quote_identifier
+from .supabase_sync import sort_models_by_dependency
+
+logger = logging.getLogger(__name__)
+
+# 出力プラグイン
+REPLICATION_PLUGIN = 'wal2json'
+
+# レプリケーションスロット名のデフォルト
+DEFAULT_REPLICATION_SLOT = 'django_supabase_mirror'
+
+# 1回に読み込む変更の件数の目安（トランザクションの途中では区切られないため、超える場合がある）
+DEFAULT_REPLICATION_BATCH_SIZE = 1000
+
+# --watch のポーリング間隔（秒）
+DEFAULT_REPLICATION_INTERVAL = 1.0
+
+# 反映済みのLSNを保存するSupabase側のテーブル
+CHECKPOINT_TABLE = 'django_supabase_replication_checkpoint'
+
+# wal2jsonの変更の種類
+ACTION_INSERT = 'I'
+ACTION_UPDATE = 'U'
+ACTION_DELETE = 'D'
+ACTION_BEGIN = 'B'
+ACTION_COMMIT = 'C'
+ACTION_TRUNCATE = 'T'
+
+
+def parse_lsn(lsn: str) -> int:
+    """LSNの文字列（例: '16/B374D848'）を比較可能な整数に変換します"""
+    high, low = lsn.split('/')
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+class ReplicationChange:
+    """
+    wal2jsonが出力した1行の変更
+    """
+
+    def __init__(self, action: str, table: Optional[str] = None,
+                 values: Optional[Dict[str, Any]] = None, identity: Optional[Dict[str, Any]] = None):
+        self.action = action
+        self.table = table
+        self.values = values or {}
+        self.identity = identity or {}
+
+    @classmethod
+    def from_wal2json(cls, data: str) -> 'ReplicationChange':
+        """wal2json（format-version 2）の1行のJSONから変更を作成します"""
+        payload = json.loads(data)
+
+        def to_dict(columns):
+            return {column['name']: column.get('value') for column in columns or []}
+
+        return cls(
+            payload['action'],
+            table=payload.get('table'),
+            values=to_dict(payload.get('columns')),
+            identity=to_dict(payload.get('identity')),
+        )
+
+
+class ReplicationTransaction:
+    """
+    コミット済みの1トランザクション分の変更
+    """
+
+    def __init__(self, commit_lsn: str, changes: List[ReplicationChange]):
+        self.commit_lsn = commit_lsn
+        self.changes = changes
+
+
+class ReplicationBatchResult:
+    """
+    1バッチの反映結果
+    """
+
+    def __init__(self):
+        self.transactions = 0
+        self.skipped_transactions = 0
+        self.upserted = 0
+        self.deleted = 0
+        self.lsn: Optional[str] = None
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        """処理時間（秒）"""
+        return (self.finished_at or time.time()) - self.started_at
+
+
+def group_transactions(rows: List[Tuple[str, str]]) -> List[ReplicationTransaction]:
+    """
+    pg_logical_slot_peek_changes の (lsn, data) 行をトランザクションごとにまとめます。
+
+    並行するトランザクションの変更はWAL上で前後するため、変更ごとのLSNではなく
+    コミットのLSNでチェックポイントと比較します。
+    """
+    transactions = []
+    changes: List[ReplicationChange] = []
+    for lsn, data in rows:
+        change = ReplicationChange.from_wal2json(data)
+        if change.action == ACTION_BEGIN:
+            changes = []
+        elif change.action == ACTION_COMMIT:
+            transactions.append(ReplicationTransaction(lsn, changes))
+            changes = []
+        elif change.action in (ACTION_INSERT, ACTION_UPDATE, ACTION_DELETE):
+            changes.append(change)
+        elif change.action == ACTION_TRUNCATE:
+            logger.warning(f"テーブル {change.table} のTRUNCATEはミラーリングされません。sync_supabase --check --fix で修復してください")
+    return transactions
+
+
+def _adapt_value(value: Any) -> Any:
+    """wal2jsonの値をpsycopg2のパラメータに変換します（json / jsonb の値は文字列で渡す）"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+class LogicalReplicationMirror:
+    """
+    論理レプリケーションスロットの変更をSupabaseのデータベースに反映するミラー
+
+    Args:
+        models_list: ミラー対象のモデル（Supabase側で更新され取り込む対象のモデルは除外される）
+        source_connection: Djangoのデータベース接続（django.db.connections[...]）
+        target_connection: Supabaseのデータベースへのpsycopg2の接続
+        slot_name: レプリケーションスロット名
+        batch_size: 1回に読み込む変更の件数の目安
+    """
+
+    def __init__(self, models_list: List[Type[models.Model]], source_connection, target_connection,
+                 slot_name: str = DEFAULT_REPLICATION_SLOT, batch_size: int = DEFAULT_REPLICATION_BATCH_SIZE):
+        self.models = {
+            model._meta.db_table: model
+            for level in sort_models_by_dependency([m for m in models_list if not is_pull_model(m)])
+            for model in level
+        }
+        self.source_connection = source_connection
+        self.target_connection = target_connection
+        self.slot_name = slot_name
+        self.batch_size = batch_size
+
+    def ensure_slot(self) -> bool:
+        """
+        レプリケーションスロットがなければ作成します。
+
+        Returns:
+            作成した場合はTrue
+        """
+        with self.source_connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_replication_slots WHERE slot_name = %s", [self.slot_name])
+            if cursor.fetchone():
+                return False
+            cursor.execute("SELECT pg_create_logical_replication_slot(%s, %s)", [self.slot_name, REPLICATION_PLUGIN])
+        logger.info(f"レプリケーションスロット {self.slot_name} を作成しました")
+        return True
+
+    def drop_slot(self):
+        """レプリケーションスロットを削除します（削除しないとWALが蓄積し続けます）"""
+        with self.source_connection.cursor() as cursor:
+            cursor.execute("SELECT pg_drop_replication_slot(%s)", [self.slot_name])
+        logger.info(f"レプリケーションスロット {self.slot_name} を削除しました")
+
+    def read_transactions(self) -> List[ReplicationTransaction]:
+        """スロットの変更をトランザクション単位で読み込みます（スロットは進めない）"""
+        tables = ','.join(f"public.{table}" for table in self.models)
+        with self.source_connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT lsn::text, data FROM pg_logical_slot_peek_changes("
+                "%s, NULL, %s, 'format-version', '2', 'include-transaction', 'true', 'add-tables', %s)",
+                [self.slot_name, self.batch_size, tables],
+            )
+            rows = cursor.fetchall()
+        return group_transactions(rows)
+
+    def load_checkpoint(self) -> Optional[str]:
+        """Supabase側に保存された反映済みのLSNを返します"""
+        with self.target_connection.cursor() as cursor:
+            cursor.execute(f"SELECT lsn::text FROM {CHECKPOINT_TABLE} WHERE slot_name = %s", [self.slot_name])
+            row = cursor.fetchone()
+        self.target_connection.commit()
+        return row[0] if row else None
+
+    def advance_slot(self, lsn: str):
+        """反映済みのLSNまでスロットを進め、不要になったWALを解放します"""
+        with self.source_connection.cursor() as cursor:
+            cursor.execute("SELECT pg_replication_slot_advance(%s, %s::pg_lsn)", [self.slot_name, lsn])
+
+    def apply(self, transactions: List[ReplicationTransaction], checkpoint: Optional[str] = None) -> ReplicationBatchResult:
+        """
+        トランザクションの変更をSupabaseのデータベースに1トランザクションで反映し、チェックポイントを保存します。
+
+        同じ行への複数の変更は最後の状態にまとめ、upsertは外部キーの依存順、削除はその逆順に実行します。
+        """
+        result = ReplicationBatchResult()
+        checkpoint_value = parse_lsn(checkpoint) if checkpoint else -1
+
+        # テーブルごとに {主キー: (操作, 値)} の最後の状態を求める
+        latest: Dict[str, Dict[Any, Tuple[str, Dict[str, Any]]]] = {}
+        for transaction in transactions:
+            if parse_lsn(transaction.commit_lsn) <= checkpoint_value:
+                result.skipped_transactions += 1
+                continue
+            result.transactions += 1
+            result.lsn = transaction.commit_lsn
+            for change in transaction.changes:
+                model = self.models.get(change.table)
+                if model is None:
+                    continue
+                pk_column = model._meta.pk.column
+                key_source = change.identity if change.action == ACTION_DELETE else change.values
+                pk_value = key_source.get(pk_column, change.identity.get(pk_column))
+                latest.setdefault(change.table, {})[pk_value] = (change.action, change.values)
+
+        if result.lsn is None:
+            result.finished_at = time.time()
+            return result
+
+        try:
+            with self.target_connection.cursor() as cursor:
+                for table, model in self.models.items():
+                    result.upserted += self._upsert(cursor, model, latest.get(table, {}))
+                for table, model in reversed(list(self.models.items())):
+                    result.deleted += self._delete(cursor, model, latest.get(table, {}))
+                cursor.execute(
+                    f"INSERT INTO {CHECKPOINT_TABLE} (slot_name, lsn, applied_at) VALUES (%s, %s::pg_lsn, NOW()) "
+                    "ON CONFLICT (slot_name) DO UPDATE SET lsn = EXCLUDED.lsn, applied_at = EXCLUDED.applied_at",
+                    [self.slot_name, result.lsn],
+                )
+            self.target_connection.commit()
+        except Exception:
+            self.target_connection.rollback()
+            raise
+
+        result.finished_at = time.time()
+        return result
+
+    def _upsert(self, cursor, model: Type[models.Model], rows: Dict[Any, Tuple[str, Dict[str, Any]]]) -> int:
+        """挿入・更新された行をupsertします（変更されていないTOASTのカラムは含まれないため、カラムの組ごとに実行）"""
+        pk_column = model._meta.pk.column
+        groups: Dict[Tuple[str, ...], List[List[Any]]] = {}
+        for action, values in rows.values():
+            if action == ACTION_DELETE:
+                continue
+            columns = tuple(values)
+            groups.setdefault(columns, []).append([_adapt_value(values[column]) for column in columns])
+
+        count = 0
+        table = quote_identifier(model._meta.db_table)
+        for columns, params in groups.items():
+            column_list = ', '.join(quote_identifier(column) for column in columns)
+            updates = ', '.join(
+                f"{quote_identifier(column)} = EXCLUDED.{quote_identifier(column)}"
+                for column in columns if column != pk_column
+            )
+            conflict = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+            cursor.executemany(
+                f"INSERT INTO {table} ({column_list}) VALUES ({', '.join(['%s'] * len(columns))}) "
+                f"ON CONFLICT ({quote_identifier(pk_column)}) {conflict}",
+                params,
+            )
+            count += len(params)
+        return count
+
+    def _delete(self, cursor, model: Type[models.Model], rows: Dict[Any, Tuple[str, Dict[str, Any]]]) -> int:
+        """削除された行を削除します"""
+        pks = [pk for pk, (action, _) in rows.items() if action == ACTION_DELETE]
+        if pks:
+            cursor.execute(
+                f"DELETE FROM {quote_identifier(model._meta.db_table)} "
+                f"WHERE {quote_identifier(model._meta.pk.column)} = ANY(%s)",
+                [pks],
+            )
+        return len(pks)
+
+    def run_once(self) -> ReplicationBatchResult:
+        """
+        1バッチ分の変更を読み込んで反映し、スロットを進めます。
+
+        Supabaseへの反映が失敗した場合はスロットを進めないため、次回同じ変更から再試行されます。
+        """
+        transactions = self.read_transactions()
+        if not transactions:
+            return ReplicationBatchResult()
+
+        result = self.apply(transactions, self.load_checkpoint())
+        # 読み飛ばしたトランザクションを含め、読み込んだ最後のコミットまでスロットを進める
+        self.advance_slot(transactions[-1].commit_lsn)
+        if result.transactions:
+            logger.info(
+                f"{result.transactions}トランザクションを反映しました"
+                f"（upsert {result.upserted}件、削除 {result.deleted}件、LSN {result.lsn}、{result.elapsed:.2f}秒）"
+            )
+        return result
@@ -6,18 +6,30 @@ Supabase Sync Utilities
 """
 
 import logging
-from typing import Type, Dict, Any, List, Optional, Tuple, Set, Union
+from typing import Type, Dict, Any, List, Optional, Tuple, Set, Union, Callable
+import hashlib
 import inspect
 import json
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from django.db import models
 from django.apps import apps
 from django.db.models.fields import Field
 from django.db.models.fields.related import RelatedField
 from django.conf import settings
 
-from .supabase import get_supabase_client
+from .supabase import get_supabase_admin_client, get_supabase_client, shares_default_database
 from .supabase_mixins import SupabaseModelMixin
+from .supabase_catalog import SupabaseCatalogSnapshot, pg_types_match
+from .supabase_export import sql_literal
+from .supabase_metrics import (
+    track_model,
+    track_phase,
+    set_model_status,
+    PHASE_INTROSPECTION,
+    PHASE_DDL,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -110,39 +122,82 @@ FIELD_TYPE_MAPPING = {
     'ManyToManyField': None,  # これは別テーブルとして扱う
 }
 
-def get_supabase_models() -> List[Type[SupabaseModelMixin]]:
+# 並列同期のデフォルトのワーカー数
+DEFAULT_SYNC_JOBS = 4
+
+# スキーマのフィンガープリントを保存するSupabase側のテーブル
+SCHEMA_STATE_TABLE = 'django_supabase_schema_state'
+
+# 範囲ダイジェストのRPCの対象として許可するミラーテーブルを登録するSupabase側のテーブル
+MIRRORED_TABLES_TABLE = 'django_supabase_mirrored_tables'
+
+# PostgreSQLの識別子の最大長
+MAX_IDENTIFIER_LENGTH = 63
+
+# SupabaseModelMixinを継承したモデルのキャッシュ（アプリ起動時に構築）
+_supabase_model_registry: Optional[List[Type[SupabaseModelMixin]]] = None
+
+def build_supabase_model_registry() -> List[Type[SupabaseModelMixin]]:
     """
-    プロジェクト内のSupabaseModelMixinを継承したモデルを全て取得します。
+    SupabaseModelMixinを継承し、supabase_tableが設定されたモデルを走査してキャッシュします。
+    アプリ起動時（AppConfig.ready）に1回だけ呼び出されます。
     
     Returns:
         SupabaseModelMixinを継承したモデルのリスト
     """
-    import sys
+    global _supabase_model_registry
     supabase_models = []
     
-    # 全アプリケーションのモデルを調べる
     for app_config in apps.get_app_configs():
-        print(f"アプリケーション確認: {app_config.name}", file=sys.stderr)
         for model in app_config.get_models():
-            print(f"  モデル確認: {model.__name__}", file=sys.stderr)
-            
-            # SupabaseModelMixinを継承しているか確認
-            is_supabase_model = False
             try:
-                is_supabase_model = issubclass(model, SupabaseModelMixin)
-                if is_supabase_model:
-                    print(f"    SupabaseModelMixinを継承: {model.__name__}", file=sys.stderr)
-                    if hasattr(model, 'supabase_table') and model.supabase_table:
-                        print(f"    supabase_table設定あり: {model.supabase_table}", file=sys.stderr)
-                        supabase_models.append(model)
-                    else:
-                        print(f"    supabase_table設定なし: {model.__name__}", file=sys.stderr)
+                if not issubclass(model, SupabaseModelMixin):
+                    continue
             except (TypeError, AttributeError) as e:
-                error_msg = log_error_details(e, f"モデル継承チェック中にエラー発生: {model.__name__}")
-                print(f"    継承チェックエラー: {error_msg}", file=sys.stderr)
-                
-    print(f"Supabaseモデル検索結果: {len(supabase_models)}件", file=sys.stderr)
-    return supabase_models
+                log_error_details(e, f"モデル継承チェック中にエラー発生: {model.__name__}")
+                continue
+            
+            if getattr(model, 'supabase_table', None):
+                logger.debug(f"Supabaseモデルを登録: {app_config.label}.{model.__name__} ({model.supabase_table})")
+                supabase_models.append(model)
+            else:
+                logger.debug(f"supabase_table設定なしのため除外: {app_config.label}.{model.__name__}")
+    
+    logger.debug(f"Supabaseモデル検索結果: {len(supabase_models)}件")
+    _supabase_model_registry = supabase_models
+    return list(supabase_models)
+
+def get_supabase_models(refresh: bool = False) -> List[Type[SupabaseModelMixin]]:
+    """
+    プロジェクト内のSupabaseModelMixinを継承したモデルを全て取得します。
+    
+    Args:
+        refresh: Trueの場合はキャッシュを使わずにモデルを再走査する
+    
+    Returns:
+        SupabaseModelMixinを継承したモデルのリスト
+    """
+    if refresh or _supabase_model_registry is None:
+        return build_supabase_model_registry()
+    return list(_supabase_model_registry)
+
+def is_last_post_migrate_sender(sender) -> bool:
+    """
+    post_migrateシグナルの送信元が、1回のmigrateで最後に通知されるアプリかどうかを判定します。
+    
+    post_migrateはモデルモジュールを持つアプリごとに登録順で送信されるため、
+    最後のアプリで受信した時点で全てのマイグレーションが完了しています。
+    
+    Args:
+        sender: シグナルを送信したAppConfig
+        
+    Returns:
+        最後のアプリの場合はTrue
+    """
+    app_configs = [config for config in apps.get_app_configs() if config.models_module is not None]
+    if not app_configs:
+        return False
+    return getattr(sender, 'label', None) == app_configs[-1].label
 
 def get_django_field_type(field: Field) -> Tuple[str, Dict[str, Any]]:
     """
@@ -245,9 +300,542 @@ def get_model_table_schema(model: Type[models.Model]) -> Dict[str, Any]:
         'table_name': model._meta.db_table,
         'fields': fields_info,
         'primary_key': primary_key,
-        'foreign_keys': foreign_keys
+        'foreign_keys': foreign_keys,
+        'unique_constraints': get_model_unique_constraints(model),
+        'indexes': get_model_indexes(model),
+    }
+
+def get_constraint_name(table_name: str, columns: List[str], suffix: str) -> str:
+    """
+    制約・インデックスの名前を生成します（PostgreSQLの自動命名 <テーブル>_<カラム>_<接尾辞> と同じ形式）。
+
+    63文字を超える場合は切り詰め、衝突しないようにハッシュを付加します。
+    """
+    name = f"{table_name}_{'_'.join(columns)}_{suffix}"
+    if len(name) <= MAX_IDENTIFIER_LENGTH:
+        return name
+    digest = hashlib.md5(name.encode('utf-8')).hexdigest()[:8]
+    return f"{name[:MAX_IDENTIFIER_LENGTH - len(suffix) - 10]}_{digest}_{suffix}"
+
+def get_model_unique_constraints(model: Type[models.Model]) -> List[Dict[str, Any]]:
+    """
+    モデルの一意制約（unique=True のフィールド、unique_together、Meta.constraints の UniqueConstraint）を取得します。
+
+    条件付き・式によるUniqueConstraintはカラムの組で表現できないため対象外とします。
+
+    Returns:
+        {'name': 制約名, 'columns': [カラム名, ...]} のリスト
+        （nulls_distinct=False の UniqueConstraint は 'nulls_distinct': False を含む）
+    """
+    opts = model._meta
+    table_name = opts.db_table
+    constraints = []
+
+    for field in opts.local_concrete_fields:
+        if field.unique and not field.primary_key:
+            constraints.append({'name': get_constraint_name(table_name, [field.column], 'key'), 'columns': [field.column]})
+
+    for field_names in opts.unique_together:
+        columns = [opts.get_field(name).column for name in field_names]
+        constraints.append({'name': get_constraint_name(table_name, columns, 'uniq'), 'columns': columns})
+
+    for constraint in opts.constraints:
+        if not isinstance(constraint, models.UniqueConstraint) or not constraint.fields:
+            continue
+        if constraint.condition is not None or constraint.include or constraint.opclasses:
+            logger.debug(f"制約 {constraint.name} は条件付きのためSupabaseへの同期の対象外です")
+            continue
+        columns = [opts.get_field(name).column for name in constraint.fields]
+        entry = {'name': constraint.name, 'columns': columns}
+        if constraint.nulls_distinct is not None:
+            entry['nulls_distinct'] = constraint.nulls_distinct
+        constraints.append(entry)
+
+    return constraints
+
+def get_model_indexes(model: Type[models.Model]) -> List[Dict[str, Any]]:
+    """
+    モデルの Meta.indexes を取得します。
+
+    式・条件付き・INCLUDE付きのインデックスはカラムの並びで表現できないため対象外とします。
+
+    Returns:
+        {'name': インデックス名, 'columns': ['カラム名' または 'カラム名 DESC', ...]} のリスト
+    """
+    indexes = []
+    for index in model._meta.indexes:
+        if index.expressions or index.condition is not None or index.include or index.opclasses:
+            logger.debug(f"インデックス {index.name} は式・条件を含むためSupabaseへの同期の対象外です")
+            continue
+        columns = [
+            f"{model._meta.get_field(field_name).column}{' DESC' if order == 'DESC' else ''}"
+            for field_name, order in index.fields_orders
+        ]
+        indexes.append({'name': index.name, 'columns': columns})
+    return indexes
+
+def get_model_schema_fingerprint(model: Type[models.Model]) -> str:
+    """
+    モデルのテーブルスキーマから安定したフィンガープリントを算出します。
+
+    callableのデフォルト値（timezone.nowなど）は呼び出すたびに値が変わるため、
+    関数の完全修飾名に置き換えてから算出します。
+
+    Args:
+        model: Djangoモデルクラス
+
+    Returns:
+        スキーマのSHA-256ハッシュ（16進文字列）
+    """
+    schema = get_model_table_schema(model)
+
+    for field in model._meta.fields:
+        if callable(field.default) and field.column in schema['fields']:
+            default_name = getattr(field.default, '__qualname__', repr(field.default))
+            schema['fields'][field.column]['default'] = f"callable:{getattr(field.default, '__module__', '')}.{default_name}"
+
+    payload = json.dumps(schema, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def load_schema_fingerprints(supabase=None) -> Dict[str, str]:
+    """
+    Supabaseに保存された前回同期時のフィンガープリントを取得します。
+
+    取得に失敗した場合（メタデータテーブル未作成など）は空の辞書を返し、
+    全モデルを差分確認の対象とします。
+
+    Args:
+        supabase: Supabaseクライアント（省略時は service_role のクライアント）
+
+    Returns:
+        {テーブル名: フィンガープリント} の辞書
+    """
+    try:
+        if supabase is None:
+            supabase = get_supabase_admin_client()
+        result = supabase.table(SCHEMA_STATE_TABLE).select('table_name,fingerprint').execute()
+        return {row['table_name']: row['fingerprint'] for row in (result.data or [])}
+    except Exception as e:
+        logger.warning(f"スキーマ同期状態の取得に失敗しました。全モデルの差分を確認します: {str(e)}")
+        return {}
+
+def save_schema_fingerprints(fingerprints: Dict[str, str], supabase=None) -> bool:
+    """
+    同期に成功したテーブルのフィンガープリントをSupabaseに保存します。
+
+    Args:
+        fingerprints: {テーブル名: フィンガープリント} の辞書
+        supabase: Supabaseクライアント（省略時は service_role のクライアント）
+
+    Returns:
+        成功した場合はTrue、それ以外はFalse
+    """
+    if not fingerprints:
+        return True
+
+    from django.utils import timezone
+    synced_at = timezone.now().isoformat()
+    rows = [
+        {'table_name': table_name, 'fingerprint': fingerprint, 'synced_at': synced_at}
+        for table_name, fingerprint in fingerprints.items()
+    ]
+
+    try:
+        if supabase is None:
+            supabase = get_supabase_admin_client()
+        supabase.table(SCHEMA_STATE_TABLE).upsert(rows, on_conflict='table_name').execute()
+        return True
+    except Exception as e:
+        log_error_details(e, "スキーマ同期状態の保存に失敗しました", {'tables': ', '.join(fingerprints)})
+        return False
+
+def register_mirrored_tables(table_names: List[str], supabase=None) -> bool:
+    """
+    同期したテーブルを範囲ダイジェストのRPCの対象として登録します。
+
+    range_digest_row_expression は django_supabase_mirrored_tables に登録されたテーブルのみを
+    対象とするため、スキーマ同期のたびにミラーリング対象のモデルのテーブルを登録します。
+
+    Args:
+        table_names: テーブル名のリスト
+        supabase: Supabaseクライアント（省略時は service_role のクライアント）
+
+    Returns:
+        成功した場合はTrue、それ以外はFalse
+    """
+    if not table_names:
+        return True
+
+    from django.utils import timezone
+    registered_at = timezone.now().isoformat()
+    rows = [{'table_name': table_name, 'registered_at': registered_at} for table_name in table_names]
+
+    try:
+        if supabase is None:
+            supabase = get_supabase_admin_client()
+        supabase.table(MIRRORED_TABLES_TABLE).upsert(rows, on_conflict='table_name').execute()
+        return True
+    except Exception as e:
+        log_error_details(e, "ミラーテーブルの登録に失敗しました", {'tables': ', '.join(table_names)})
+        return False
+
+def get_model_dependencies(models_list: List[Type[models.Model]]) -> Dict[Type[models.Model], Set[Type[models.Model]]]:
+    """
+    外部キー参照から同期対象モデル間の依存関係グラフを構築します。
+
+    同期対象に含まれないモデル（auth_userなど）への参照は、
+    既にテーブルが存在するものとして依存関係から除外します。
+
+    Args:
+        models_list: 同期対象のモデルのリスト
+
+    Returns:
+        {モデル: 先に同期する必要があるモデルの集合} の辞書
+    """
+    model_set = set(models_list)
+    graph = {}
+
+    for model in models_list:
+        dependencies = set()
+        for field in model._meta.fields:
+            if not isinstance(field, RelatedField):
+                continue
+            related_model = field.related_model
+            # 自己参照は同じテーブル内で完結するため依存関係にしない
+            if related_model is None or related_model is model:
+                continue
+            if related_model in model_set:
+                dependencies.add(related_model)
+        graph[model] = dependencies
+
+    return graph
+
+def sort_models_by_dependency(models_list: List[Type[models.Model]]) -> List[List[Type[models.Model]]]:
+    """
+    依存関係に従ってモデルを段（レベル）ごとに並べます。
+
+    同じ段のモデルは互いに依存しないため並列に同期できます。
+    循環参照がある場合は警告を出し、残りのモデルを最後の段にまとめます。
+
+    Args:
+        models_list: 同期対象のモデルのリスト
+
+    Returns:
+        トポロジカル順に並んだモデルの段のリスト
+    """
+    graph = get_model_dependencies(models_list)
+    remaining = {model: set(deps) for model, deps in graph.items()}
+    levels = []
+
+    while remaining:
+        # 入力順を保ったまま、依存先が全て解決済みのモデルを取り出す
+        level = [model for model in models_list if model in remaining and not remaining[model]]
+        if not level:
+            cyclic = [model.__name__ for model in models_list if model in remaining]
+            logger.warning(f"モデル間に循環参照があります: {', '.join(cyclic)}。依存関係を無視して同期します。")
+            levels.append([model for model in models_list if model in remaining])
+            break
+
+        levels.append(level)
+        for model in level:
+            del remaining[model]
+        for deps in remaining.values():
+            deps.difference_update(level)
+
+    return levels
+
+def format_default_sql(default_val: Any) -> str:
+    """
+    デフォルト値をSQLのリテラルに変換します。
+    
+    Args:
+        default_val: get_model_table_schemaで取得したデフォルト値
+        
+    Returns:
+        SQLリテラル
+    """
+    if isinstance(default_val, str):
+        return f"'{default_val}'"
+    if default_val is None:
+        return "NULL"
+    if isinstance(default_val, bool):
+        return str(default_val).lower()
+    return str(default_val)
+
+def get_column_definition_sql(col_name: str, field_info: Dict[str, Any]) -> str:
+    """
+    カラム定義（名前・型・NOT NULL・DEFAULT）のSQLを生成します。
+    
+    Args:
+        col_name: カラム名
+        field_info: get_model_table_schemaで取得したフィールド情報
+        
+    Returns:
+        カラム定義のSQL
+    """
+    column_def = f"{col_name} {field_info['type']}"
+    
+    if not field_info.get('nullable', False):
+        column_def += " NOT NULL"
+        
+    if 'default' in field_info:
+        column_def += f" DEFAULT {format_default_sql(field_info['default'])}"
+    
+    return column_def
+
+def get_alter_table_clauses(schema: Dict[str, Any], existing_columns: Dict[str, Dict[str, Any]]) -> List[str]:
+    """
+    モデルのスキーマと既存カラムの差分から、ALTER TABLEの句のリストを生成します。
+    
+    Args:
+        schema: get_model_table_schemaで取得したスキーマ情報
+        existing_columns: カラム名をキーとした既存カラム情報（data_type / is_nullable）
+        
+    Returns:
+        ADD COLUMN / ALTER COLUMN 句のリスト（差分がなければ空）
+    """
+    clauses = []
+    fields = schema['fields']
+    
+    # 新しいカラムを追加（モデルの定義順を維持する）
+    for col_name, field_info in fields.items():
+        if col_name not in existing_columns:
+            clauses.append(f"ADD COLUMN {get_column_definition_sql(col_name, field_info)}")
+    
+    for col_name, field_info in fields.items():
+        db_info = existing_columns.get(col_name)
+        if db_info is None:
+            continue
+        
+        # 型が異なる場合は変更（別名や修飾子の有無は正規化して比較）
+        if not pg_types_match(field_info['type'], db_info['data_type']):
+            clauses.append(f"ALTER COLUMN {col_name} TYPE {field_info['type']} USING {col_name}::{field_info['type']}")
+        
+        # NULL制約の変更
+        is_nullable = str(db_info['is_nullable']).lower() in ('yes', 'true')
+        should_be_nullable = field_info.get('nullable', False)
+        if is_nullable != should_be_nullable:
+            clauses.append(f"ALTER COLUMN {col_name} {'DROP NOT NULL' if should_be_nullable else 'SET NOT NULL'}")
+    
+    return clauses
+
+def build_alter_table_sql(table_name: str, clauses: List[str]) -> str:
+    """
+    ALTER TABLEの句をまとめて1つのSQL文にします。
+    
+    Args:
+        table_name: テーブル名
+        clauses: get_alter_table_clausesで生成した句のリスト
+        
+    Returns:
+        ALTER TABLE文
+    """
+    return f"ALTER TABLE {table_name}\n  " + ",\n  ".join(clauses) + ";"
+
+def _definition_columns(definition: Optional[str]) -> Tuple[str, ...]:
+    """
+    pg_get_constraintdef / pg_get_indexdef の定義からカラムの並びを取り出します。
+
+    例: 'UNIQUE (user_id, quiz_id)' → ('user_id', 'quiz_id')、
+        'CREATE INDEX i ON public.t USING btree (user_id, created_at DESC)' → ('user_id', 'created_at desc')
+    """
+    if not definition or '(' not in definition:
+        return ()
+    inner = definition[definition.index('(') + 1:definition.rindex(')')]
+    return tuple(
+        ' '.join(part.replace('"', '').split()).lower()
+        for part in inner.split(',')
+    )
+
+def _definition_nulls_not_distinct(definition: Optional[str]) -> bool:
+    """pg_get_constraintdef / pg_get_indexdef の定義が NULLS NOT DISTINCT かどうかを返します"""
+    return 'NULLS NOT DISTINCT' in ' '.join((definition or '').upper().split())
+
+def get_unique_constraint_clauses(
+    schema: Dict[str, Any],
+    existing_constraints: List[Dict[str, Any]],
+    existing_indexes: List[Dict[str, Any]]
+) -> List[str]:
+    """
+    既存の一意制約・一意インデックスにない一意制約を追加するALTER TABLEの句を生成します。
+
+    名前が一致するか、同じカラムの組でNULLの扱い（NULLS NOT DISTINCT）も同じ一意制約・一意インデックスが
+    あれば作成済みとみなします。
+
+    Returns:
+        ADD CONSTRAINT ... UNIQUE 句のリスト
+    """
+    existing_names = {c['name'] for c in existing_constraints} | {i['name'] for i in existing_indexes}
+    existing_columns = {
+        (_definition_columns(c.get('definition')), _definition_nulls_not_distinct(c.get('definition')))
+        for c in existing_constraints if c.get('type') == 'u'
+    } | {
+        (_definition_columns(i.get('definition')), _definition_nulls_not_distinct(i.get('definition')))
+        for i in existing_indexes if i.get('is_unique')
     }
 
+    return [
+        build_unique_constraint_clause(constraint)
+        for constraint in schema.get('unique_constraints', [])
+        if constraint['name'] not in existing_names
+        and (
+            tuple(column.lower() for column in constraint['columns']),
+            constraint.get('nulls_distinct') is False,
+        ) not in existing_columns
+    ]
+
+def get_missing_indexes(schema: Dict[str, Any], existing_indexes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    モデルの Meta.indexes のうち、Supabase側に存在しないものを返します。
+
+    名前が一致するか、同じカラムの並びのインデックスがあれば作成済みとみなします。
+    """
+    existing_names = {index['name'] for index in existing_indexes}
+    existing_columns = {_definition_columns(index.get('definition')) for index in existing_indexes}
+
+    return [
+        index for index in schema.get('indexes', [])
+        if index['name'] not in existing_names
+        and tuple(column.lower() for column in index['columns']) not in existing_columns
+    ]
+
+def _foreign_key_column(definition: Optional[str]) -> Optional[str]:
+    """
+    pg_get_constraintdef の外部キーの定義から参照元のカラムを取り出します。
+
+    例: 'FOREIGN KEY (user_id) REFERENCES auth_user(id)' → 'user_id'
+    """
+    normalized = ' '.join((definition or '').split())
+    if not normalized.upper().startswith('FOREIGN KEY (') or ')' not in normalized:
+        return None
+    return normalized[len('FOREIGN KEY ('):normalized.index(')')].replace('"', '').strip().lower()
+
+def get_missing_foreign_keys(schema: Dict[str, Any], existing_constraints: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    テーブルスキーマの外部キーのうち、Supabase側に存在しないものを返します。
+
+    名前が一致するか、同じカラムの外部キーがあれば作成済みとみなします
+    （テーブル作成時に外部キーの追加に失敗した場合、次回の同期で追加するため）。
+    """
+    existing_names = {c['name'] for c in existing_constraints}
+    existing_columns = {
+        _foreign_key_column(c.get('definition')) for c in existing_constraints if c.get('type') == 'f'
+    }
+    return [
+        fk for fk in schema.get('foreign_keys', [])
+        if fk['name'] not in existing_names and fk['column'].lower() not in existing_columns
+    ]
+
+def _unique_definition(constraint: Dict[str, Any]) -> str:
+    """一意制約の定義（UNIQUE [NULLS NOT DISTINCT] (カラム, ...)）を生成します"""
+    nulls = 'NULLS NOT DISTINCT ' if constraint.get('nulls_distinct') is False else ''
+    return f"UNIQUE {nulls}({', '.join(constraint['columns'])})"
+
+def build_unique_constraint_clause(constraint: Dict[str, Any]) -> str:
+    """一意制約を追加するALTER TABLEの句を生成します"""
+    return f"ADD CONSTRAINT {constraint['name']} {_unique_definition(constraint)}"
+
+def build_index_sql(table_name: str, index: Dict[str, Any], concurrently: bool = False) -> str:
+    """
+    CREATE INDEX文を生成します。
+
+    CONCURRENTLYはトランザクション内では実行できないため、execute_sql RPC
+    （関数の実行＝1トランザクション）で実行する場合は concurrently=False とします。
+
+    Args:
+        table_name: テーブル名
+        index: get_model_indexesで取得したインデックス情報
+        concurrently: CREATE INDEX CONCURRENTLY とするかどうか
+
+    Returns:
+        CREATE INDEX文
+    """
+    return (
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {index['name']} "
+        f"ON {table_name} ({', '.join(index['columns'])});"
+    )
+
+def build_create_table_sql(schema: Dict[str, Any]) -> str:
+    """
+    テーブルスキーマからCREATE TABLE文を生成します。
+
+    Args:
+        schema: get_model_table_schemaで生成したテーブルスキーマ
+
+    Returns:
+        CREATE TABLE文
+    """
+    field_defs = [
+        f"  {get_column_definition_sql(field_name, field_info)}"
+        for field_name, field_info in schema['fields'].items()
+    ]
+
+    # 主キー制約
+    if schema['primary_key']:
+        field_defs.append(f"  PRIMARY KEY ({schema['primary_key']})")
+
+    # 一意制約
+    for constraint in schema.get('unique_constraints', []):
+        field_defs.append(f"  CONSTRAINT {constraint['name']} {_unique_definition(constraint)}")
+
+    return f"CREATE TABLE IF NOT EXISTS {schema['table_name']} (\n" + ",\n".join(field_defs) + "\n);"
+
+def build_foreign_key_sql(table_name: str, fk: Dict[str, Any]) -> str:
+    """
+    外部キー制約を追加するALTER TABLE文を生成します。
+
+    Args:
+        table_name: テーブル名
+        fk: テーブルスキーマの foreign_keys の要素
+
+    Returns:
+        ALTER TABLE文
+    """
+    return (
+        f"ALTER TABLE {table_name}\n"
+        f"  ADD CONSTRAINT {fk['name']}\n"
+        f"  FOREIGN KEY ({fk['column']})\n"
+        f"  REFERENCES {fk['references']['table']}({fk['references']['column']});"
+    )
+
+def create_supabase_index(supabase, table_name: str, index: Dict[str, Any]) -> bool:
+    """
+    Supabaseのテーブルにインデックスを作成します。
+
+    インデックスの作成に失敗してもテーブル自体は利用できるため、警告のみ記録します。
+
+    Returns:
+        成功した場合はTrue、それ以外はFalse
+    """
+    index_sql = build_index_sql(table_name, index)
+    try:
+        with track_phase(PHASE_DDL):
+            supabase.rpc('execute_sql', { 'sql': index_sql }).execute()
+        return True
+    except Exception as index_err:
+        error_context = f"インデックス {index['name']} の作成に失敗しました"
+        log_error_details(index_err, error_context, {'table': table_name, 'index': index['name'], 'sql': index_sql})
+        logger.warning(f"{error_context}。sync_supabase --plan で出力される CREATE INDEX CONCURRENTLY を手動で実行してください。")
+        return False
+
+def fetch_table_constraints_and_indexes(supabase, table_name: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    スナップショットがない場合に、テーブルの制約とインデックスを introspect_schema RPCで取得します。
+
+    execute_sql RPCは結果を返さない（RETURNS VOID）ため、カタログの問い合わせには使用しません。
+
+    Returns:
+        (制約のリスト, インデックスのリスト)。形式は SupabaseCatalogSnapshot と同じ
+
+    Raises:
+        SupabaseDataError: カタログにテーブルが含まれない場合（呼び出し側は差分確認を省略する）
+    """
+    with track_phase(PHASE_INTROSPECTION):
+        catalog = SupabaseCatalogSnapshot.load(supabase)
+    if not catalog.table_exists(table_name):
+        raise SupabaseDataError(f"テーブル {table_name} の制約・インデックス情報がカタログに含まれていません")
+    return catalog.get_constraints(table_name), catalog.get_indexes(table_name)
+
 def create_supabase_table(model: Type[models.Model]) -> bool:
     """
     Djangoモデルに基づいてSupabaseにテーブルを作成します。
@@ -256,7 +844,9 @@ def create_supabase_table(model: Type[models.Model]) -> bool:
         model: Djangoモデルクラス
         
     Returns:
-        成功した場合はTrue、それ以外はFalse
+        外部キー・インデックスを含むすべてのDDLが成功した場合はTrue、それ以外はFalse
+        （テーブルを作成できても外部キーやインデックスの作成に失敗した場合はFalseとし、
+        フィンガープリントを保存せずに次回の同期で再試行する）
     """
     try:
         schema = get_model_table_schema(model)
@@ -266,38 +856,12 @@ def create_supabase_table(model: Type[models.Model]) -> bool:
         table_name = schema['table_name']
         
         # SQL文の作成
-        sql = f"CREATE TABLE IF NOT EXISTS {table_name} (\n"
-        
-        # フィールド定義
-        field_defs = []
-        for field_name, field_info in schema['fields'].items():
-            field_def = f"  {field_name} {field_info['type']}"
-            
-            if not field_info.get('nullable', False):
-                field_def += " NOT NULL"
-                
-            if 'default' in field_info:
-                default_val = field_info['default']
-                if isinstance(default_val, str):
-                    default_val = f"'{default_val}'"
-                elif default_val is None:
-                    default_val = "NULL"
-                elif isinstance(default_val, bool):
-                    default_val = str(default_val).lower()
-                field_def += f" DEFAULT {default_val}"
-                
-            field_defs.append(field_def)
-        
-        # 主キー制約
-        if schema['primary_key']:
-            field_defs.append(f"  PRIMARY KEY ({schema['primary_key']})")
-        
-        sql += ",\n".join(field_defs)
-        sql += "\n);"
+        sql = build_create_table_sql(schema)
         
         # テーブル作成
         try:
-            supabase.rpc('execute_sql', { 'sql': sql }).execute()
+            with track_phase(PHASE_DDL):
+                supabase.rpc('execute_sql', { 'sql': sql }).execute()
         except Exception as rpc_err:
             error_context = f"テーブル {table_name} の作成に失敗しました"
             extra_info = {'table': table_name, 'sql': sql}
@@ -305,23 +869,32 @@ def create_supabase_table(model: Type[models.Model]) -> bool:
             # より具体的な例外に変換
             raise SupabaseOperationError(f"{error_context}: {str(rpc_err)}")
         
+        # 失敗した処理（テーブルは作成済みのため続行し、最後にまとめて報告する）
+        failed_steps = []
+
         # 外部キー制約の作成
         for fk in schema['foreign_keys']:
-            fk_sql = f"""
-            ALTER TABLE {table_name} 
-            ADD CONSTRAINT {fk['name']} 
-            FOREIGN KEY ({fk['column']}) 
-            REFERENCES {fk['references']['table']}({fk['references']['column']});
-            """
+            fk_sql = build_foreign_key_sql(table_name, fk)
             try:
-                supabase.rpc('execute_sql', { 'sql': fk_sql }).execute()
+                with track_phase(PHASE_DDL):
+                    supabase.rpc('execute_sql', { 'sql': fk_sql }).execute()
             except Exception as fk_err:
                 error_context = f"外部キー制約 {fk['name']} の作成に失敗しました"
                 extra_info = {'table': table_name, 'constraint': fk['name'], 'sql': fk_sql}
                 log_error_details(fk_err, error_context, extra_info)
-                # このエラーはログに記録するが、致命的とはしない（テーブル自体は作成済み）
+                # テーブル自体は作成済みのため続行する（次回の同期で alter_supabase_table が追加する）
                 logger.warning(f"{error_context}。テーブルは作成されましたが、外部キー制約の追加に失敗しました。")
+                failed_steps.append(f"外部キー制約 {fk['name']}")
+        
+        # インデックスの作成（作成直後の空のテーブルなのでCONCURRENTLYは不要）
+        for index in schema['indexes']:
+            if not create_supabase_index(supabase, table_name, index):
+                failed_steps.append(f"インデックス {index['name']}")
         
+        if failed_steps:
+            logger.warning(f"テーブル {table_name} を作成しましたが、次の処理に失敗しました: {', '.join(failed_steps)}。"
+                           "次回の同期で再試行します")
+            return False
         logger.info(f"テーブル {table_name} を作成しました")
         return True
         
@@ -334,25 +907,34 @@ def create_supabase_table(model: Type[models.Model]) -> bool:
         log_error_details(e, error_context, extra_info)
         return False
 
-def alter_supabase_table(model: Type[models.Model]) -> bool:
+def alter_supabase_table(model: Type[models.Model], catalog: Optional[SupabaseCatalogSnapshot] = None) -> bool:
     """
     既存のSupabaseテーブルをDjangoモデルに合わせて変更します。
     
     Args:
         model: Djangoモデルクラス
+        catalog: スキーマのスナップショット（指定時はカラム情報の取得にRPCを使わない）
         
     Returns:
-        成功した場合はTrue、それ以外はFalse
+        すべての差分確認とDDLが成功した場合はTrue、それ以外はFalse
+        （制約・インデックスの差分確認を省略した場合や、一意制約・外部キーの追加に失敗した場合、
+        手動で CREATE INDEX CONCURRENTLY を実行すべきインデックスが残っている場合もFalseとし、
+        フィンガープリントを保存せずに次回の同期で再試行する）
     """
     try:
         schema = get_model_table_schema(model)
         supabase = get_supabase_client()
         table_name = schema['table_name']
         
-        # 既存のテーブル構造を取得（RPC失敗時はinformation_schema.columnsへフォールバック）
+        # 既存のテーブル構造を取得（スナップショットがあればそれを参照し、
+        # なければRPC、失敗時はpg_catalogへフォールバック）
         try:
-            rpc_res = supabase.rpc("select_columns", {"p_table_name": table_name}).execute()
-            columns_data = rpc_res.data
+            if catalog is not None and catalog.table_exists(table_name):
+                columns_data = catalog.get_columns(table_name)
+            else:
+                with track_phase(PHASE_INTROSPECTION):
+                    rpc_res = supabase.rpc("select_columns", {"p_table_name": table_name}).execute()
+                columns_data = rpc_res.data
         except Exception as col_err:
             log_error_details(col_err, f"テーブル {table_name} のカラム情報取得に失敗しました (RPC)、フォールバックを試みます", {'table': table_name})
             # pg_catalogを利用したフォールバック
@@ -367,7 +949,8 @@ def alter_supabase_table(model: Type[models.Model]) -> bool:
               AND a.attnum > 0 AND NOT a.attisdropped;
             """
             try:
-                fb_res = supabase.rpc('execute_sql', {'sql': pg_fallback_sql}).execute()
+                with track_phase(PHASE_INTROSPECTION):
+                    fb_res = supabase.rpc('execute_sql', {'sql': pg_fallback_sql}).execute()
                 columns_data = fb_res.data
                 logger.info(f"pg_catalogフォールバックでテーブル {table_name} のカラム情報を取得しました")
             except Exception as fb_err:
@@ -382,74 +965,75 @@ def alter_supabase_table(model: Type[models.Model]) -> bool:
         model_columns = set(schema['fields'].keys())
         db_columns = set(existing_columns.keys())
         
-        # 新しいカラムを追加
-        for col_name in model_columns - db_columns:
-            field_info = schema['fields'][col_name]
-            add_col_sql = f"ALTER TABLE {table_name} ADD COLUMN {col_name} {field_info['type']}"
-            
-            if not field_info.get('nullable', False):
-                add_col_sql += " NOT NULL"
-                
-            if 'default' in field_info:
-                default_val = field_info['default']
-                if isinstance(default_val, str):
-                    default_val = f"'{default_val}'"
-                elif default_val is None:
-                    default_val = "NULL"
-                elif isinstance(default_val, bool):
-                    default_val = str(default_val).lower()
-                add_col_sql += f" DEFAULT {default_val}"
-            
+        # 失敗・省略した処理（カラムの変更は続行し、最後にまとめて報告する）
+        failed_steps = []
+
+        # 既存の制約・インデックスを取得（取得できない場合は制約・インデックスの差分確認を省略する）
+        missing_indexes = []
+        missing_foreign_keys = []
+        try:
+            if catalog is not None and catalog.table_exists(table_name):
+                existing_constraints = catalog.get_constraints(table_name)
+                existing_indexes = catalog.get_indexes(table_name)
+            else:
+                existing_constraints, existing_indexes = fetch_table_constraints_and_indexes(
+                    get_supabase_admin_client(), table_name
+                )
+            unique_clauses = get_unique_constraint_clauses(schema, existing_constraints, existing_indexes)
+            missing_indexes = get_missing_indexes(schema, existing_indexes)
+            missing_foreign_keys = get_missing_foreign_keys(schema, existing_constraints)
+        except Exception as idx_err:
+            log_error_details(idx_err, f"テーブル {table_name} の制約・インデックス情報の取得に失敗しました。差分確認を省略します", {'table': table_name})
+            unique_clauses = []
+            failed_steps.append("制約・インデックスの差分確認")
+        
+        # カラムの追加・型変更・NULL制約変更を1つのALTER TABLE文にまとめて実行する
+        # （1回のRPC＝1トランザクションなので、途中で失敗しても部分的に適用されない）
+        clauses = get_alter_table_clauses(schema, existing_columns)
+        if clauses:
+            alter_sql = build_alter_table_sql(table_name, clauses)
             try:
-                supabase.rpc('execute_sql', { 'sql': add_col_sql }).execute()
-                logger.info(f"カラム {col_name} をテーブル {table_name} に追加しました")
-            except Exception as add_err:
-                error_context = f"カラム {col_name} の追加に失敗しました"
-                extra_info = {'table': table_name, 'column': col_name, 'sql': add_col_sql}
-                log_error_details(add_err, error_context, extra_info)
-                # 続行する（他のカラムは追加できる可能性がある）
-                logger.warning(f"{error_context}。処理を続行します。")
-        
-        # 型の変更が必要なカラムを変更
-        for col_name in model_columns.intersection(db_columns):
-            field_info = schema['fields'][col_name]
-            db_info = existing_columns[col_name]
-            
-            # 型が異なる場合は変更
-            if field_info['type'] != db_info['data_type']:
-                alter_col_sql = f"ALTER TABLE {table_name} ALTER COLUMN {col_name} TYPE {field_info['type']} USING {col_name}::{field_info['type']}"
-                try:
-                    supabase.rpc('execute_sql', { 'sql': alter_col_sql }).execute()
-                    logger.info(f"カラム {col_name} の型を {field_info['type']} に変更しました")
-                except Exception as type_err:
-                    error_context = f"カラム {col_name} の型変更に失敗しました"
-                    extra_info = {
-                        'table': table_name, 
-                        'column': col_name, 
-                        'current_type': db_info['data_type'],
-                        'desired_type': field_info['type'],
-                        'sql': alter_col_sql
-                    }
-                    log_error_details(type_err, error_context, extra_info)
-                    # 続行する（他のカラムは変更できる可能性がある）
-                    logger.warning(f"{error_context}。処理を続行します。")
-            
-            # NULL制約の変更
-            is_nullable = db_info['is_nullable'].lower() == 'yes'
-            should_be_nullable = field_info.get('nullable', False)
-            
-            if is_nullable != should_be_nullable:
-                null_sql = f"ALTER TABLE {table_name} ALTER COLUMN {col_name} "
-                null_sql += "DROP NOT NULL" if should_be_nullable else "SET NOT NULL"
-                try:
-                    supabase.rpc('execute_sql', { 'sql': null_sql }).execute()
-                    logger.info(f"カラム {col_name} のNULL制約を {'解除' if should_be_nullable else '設定'} しました")
-                except Exception as null_err:
-                    error_context = f"カラム {col_name} のNULL制約変更に失敗しました"
-                    extra_info = {'table': table_name, 'column': col_name, 'sql': null_sql}
-                    log_error_details(null_err, error_context, extra_info)
-                    # 続行する
-                    logger.warning(f"{error_context}。処理を続行します。")
+                with track_phase(PHASE_DDL):
+                    supabase.rpc('execute_sql', { 'sql': alter_sql }).execute()
+                logger.info(f"テーブル {table_name} を変更しました（{len(clauses)}件）")
+            except Exception as alter_err:
+                error_context = f"テーブル {table_name} の変更に失敗しました。変更はすべてロールバックされました"
+                extra_info = {'table': table_name, 'sql': alter_sql}
+                log_error_details(alter_err, error_context, extra_info)
+                raise SupabaseOperationError(f"{error_context}: {str(alter_err)}")
+        
+        # 不足している一意制約の追加
+        # （既存の行が重複していると失敗するため、カラムの変更とは別のALTER TABLE文で実行する）
+        if unique_clauses:
+            unique_sql = build_alter_table_sql(table_name, unique_clauses)
+            try:
+                with track_phase(PHASE_DDL):
+                    supabase.rpc('execute_sql', { 'sql': unique_sql }).execute()
+                logger.info(f"テーブル {table_name} に一意制約を追加しました（{len(unique_clauses)}件）")
+            except Exception as unique_err:
+                log_error_details(unique_err, f"テーブル {table_name} の一意制約の追加に失敗しました",
+                                  {'table': table_name, 'sql': unique_sql})
+                failed_steps.append("一意制約")
+
+        # 不足しているインデックスは作成しない
+        # （execute_sql RPCはトランザクション内で実行されCONCURRENTLYを使えず、稼働中のテーブルへの
+        #   書き込みをブロックするため、sync_supabase --plan の CREATE INDEX CONCURRENTLY を手動で実行する）
+        for index in missing_indexes:
+            logger.warning(f"テーブル {table_name} にインデックス {index['name']} がありません。次のSQLを手動で実行してください: "
+                           f"{build_index_sql(table_name, index, concurrently=True)}")
+            failed_steps.append(f"インデックス {index['name']}")
+
+        # 不足している外部キー制約の作成（テーブル作成時に失敗したもの）
+        for fk in missing_foreign_keys:
+            fk_sql = build_foreign_key_sql(table_name, fk)
+            try:
+                with track_phase(PHASE_DDL):
+                    supabase.rpc('execute_sql', { 'sql': fk_sql }).execute()
+                logger.info(f"テーブル {table_name} に外部キー制約 {fk['name']} を追加しました")
+            except Exception as fk_err:
+                log_error_details(fk_err, f"外部キー制約 {fk['name']} の作成に失敗しました",
+                                  {'table': table_name, 'constraint': fk['name'], 'sql': fk_sql})
+                failed_steps.append(f"外部キー制約 {fk['name']}")
         
         # 削除対象のカラムを確認（安全のため実際には削除しない）
         columns_to_remove = db_columns - model_columns
@@ -457,6 +1041,10 @@ def alter_supabase_table(model: Type[models.Model]) -> bool:
             logger.warning(f"テーブル {table_name} に不要なカラムがあります: {', '.join(columns_to_remove)}。"
                           "安全のため自動削除は行いません。手動で削除してください。")
         
+        if failed_steps:
+            logger.warning(f"テーブル {table_name} の次の処理に失敗しました: {', '.join(failed_steps)}。"
+                           "次回の同期で再試行します")
+            return False
         return True
         
     except SupabaseSyncError as sse:
@@ -468,13 +1056,14 @@ def alter_supabase_table(model: Type[models.Model]) -> bool:
         log_error_details(e, error_context, extra_info)
         return False
 
-def sync_django_model_to_supabase(model: Type[models.Model]) -> bool:
+def sync_django_model_to_supabase(model: Type[models.Model], catalog: Optional[SupabaseCatalogSnapshot] = None) -> bool:
     """
     指定したDjangoモデルをSupabaseと同期します。
     テーブルが存在しなければ作成し、存在すれば必要な変更を行います。
     
     Args:
         model: Djangoモデルクラス
+        catalog: スキーマのスナップショット（指定時はテーブルの存在確認にHTTP呼び出しを行わない）
         
     Returns:
         同期が成功したらTrue、失敗したらFalse
@@ -493,9 +1082,13 @@ def sync_django_model_to_supabase(model: Type[models.Model]) -> bool:
             
         table_name = model._meta.db_table
         
-        # テーブルの存在確認 - 複数の方法でフォールバックする拡張アプローチ
+        # テーブルの存在確認 - スナップショットがなければ複数の方法でフォールバックする
         try:
-            table_exists = check_table_exists_with_fallback(supabase, table_name)
+            if catalog is not None:
+                table_exists = catalog.table_exists(table_name)
+            else:
+                with track_phase(PHASE_INTROSPECTION):
+                    table_exists = check_table_exists_with_fallback(supabase, table_name)
         except Exception as check_err:
             error_context = f"テーブル {table_name} の存在確認中にエラーが発生しました"
             extra_info = {'table': table_name}
@@ -510,7 +1103,7 @@ def sync_django_model_to_supabase(model: Type[models.Model]) -> bool:
         else:
             logger.info(f"テーブル {table_name} が存在するため変更します")
             # テーブルが存在する場合は変更
-            return alter_supabase_table(model)
+            return alter_supabase_table(model, catalog=catalog)
             
     except SupabaseSyncError as sse:
         # 既に処理済みのSupabaseSyncError
@@ -582,25 +1175,311 @@ def check_table_exists_with_fallback(supabase, table_name: str) -> bool:
         return False
     raise SupabaseOperationError(f"テーブル {table_name} の存在確認に失敗しました")
 
-def sync_all_models_to_supabase() -> Dict[str, bool]:
+def load_catalog_snapshot(supabase=None) -> Optional[SupabaseCatalogSnapshot]:
+    """
+    publicスキーマ全体のカタログ情報を1回のRPCで取得します。
+
+    取得に失敗した場合（introspect_schema RPC未適用など）はNoneを返し、
+    呼び出し側はモデルごとの存在確認・カラム取得にフォールバックします。
+
+    Args:
+        supabase: Supabaseクライアント（省略時は service_role のクライアント）
+
+    Returns:
+        スナップショット、取得できない場合はNone
+    """
+    try:
+        if supabase is None:
+            supabase = get_supabase_admin_client()
+        return SupabaseCatalogSnapshot.load(supabase)
+    except Exception as e:
+        log_error_details(e, "スキーマ情報の一括取得に失敗しました。テーブルごとの確認にフォールバックします")
+        return None
+
+class ModelSyncPlan:
+    """
+    1モデル分の同期計画（同期時に実行されるDDL）
+    """
+
+    def __init__(self, model: Type[models.Model], action: Optional[str] = None,
+                 statements: Optional[List[str]] = None, extra_columns: Optional[List[str]] = None,
+                 index_statements: Optional[List[str]] = None):
+        self.model = model
+        self.table_name = model._meta.db_table
+        self.action = action  # 'create' / 'alter' / None（変更なし）
+        self.statements = statements or []
+        self.extra_columns = extra_columns or []
+        # トランザクション外で実行する CREATE INDEX CONCURRENTLY
+        self.index_statements = index_statements or []
+
+    @property
+    def has_changes(self) -> bool:
+        """実行されるDDLがあるかどうか"""
+        return bool(self.statements or self.index_statements)
+
+def plan_model_sync(model: Type[models.Model], catalog: SupabaseCatalogSnapshot) -> ModelSyncPlan:
+    """
+    スキーマのスナップショットと比較し、同期時に
+    create_supabase_table / alter_supabase_table が実行するDDLを求めます（実行はしません）。
+
+    Args:
+        model: Djangoモデルクラス
+        catalog: スキーマのスナップショット
+
+    Returns:
+        同期計画
+    """
+    schema = get_model_table_schema(model)
+    table_name = schema['table_name']
+
+    if not catalog.table_exists(table_name):
+        statements = [build_create_table_sql(schema)]
+        statements += [build_foreign_key_sql(table_name, fk) for fk in schema['foreign_keys']]
+        # 作成直後の空のテーブルにはロックを気にせずトランザクション内で作成する
+        statements += [build_index_sql(table_name, index) for index in schema['indexes']]
+        return ModelSyncPlan(model, 'create', statements)
+
+    existing_columns = {col['column_name']: col for col in catalog.get_columns(table_name)}
+    existing_indexes = catalog.get_indexes(table_name)
+    clauses = get_alter_table_clauses(schema, existing_columns)
+    unique_clauses = get_unique_constraint_clauses(schema, catalog.get_constraints(table_name), existing_indexes)
+    # 既存のテーブルへのインデックスは書き込みをブロックしないようCONCURRENTLYで作成する
+    index_statements = [
+        build_index_sql(table_name, index, concurrently=True)
+        for index in get_missing_indexes(schema, existing_indexes)
+    ]
+    foreign_key_statements = [
+        build_foreign_key_sql(table_name, fk)
+        for fk in get_missing_foreign_keys(schema, catalog.get_constraints(table_name))
+    ]
+    # 不要なカラムは同期時と同様に削除しない（計画には注記のみ含める）
+    extra_columns = sorted(set(existing_columns) - set(schema['fields']))
+    if not clauses and not unique_clauses and not index_statements and not foreign_key_statements:
+        return ModelSyncPlan(model, None, extra_columns=extra_columns)
+    statements = [build_alter_table_sql(table_name, clauses)] if clauses else []
+    # 一意制約はカラムの変更の後に別の文で追加する
+    if unique_clauses:
+        statements.append(build_alter_table_sql(table_name, unique_clauses))
+    statements += foreign_key_statements
+    return ModelSyncPlan(model, 'alter', statements, extra_columns, index_statements)
+
+def plan_models_sync(
+    models_list: List[Type[models.Model]],
+    catalog: Optional[SupabaseCatalogSnapshot] = None,
+    backend: Optional[str] = None
+) -> List[ModelSyncPlan]:
+    """
+    複数モデルの同期計画を、外部キーの依存順に求めます。
+
+    スキーマ情報は1回で取得し（直接接続またはintrospect_schema RPC）、モデルやカラムごとの問い合わせは行いません。
+
+    Args:
+        models_list: 対象のモデルのリスト
+        catalog: スキーマのスナップショット（省略時は取得する）
+        backend: スキーマ情報の取得に使う同期バックエンド（省略時は settings.SUPABASE_SYNC_BACKEND）
+
+    Returns:
+        依存順に並んだ同期計画のリスト
+
+    Raises:
+        SupabaseOperationError: スキーマ情報を取得できなかった場合
+    """
+    if catalog is None:
+        from .supabase_backends import get_sync_backend
+        sync_backend = get_sync_backend(backend)
+        try:
+            catalog = sync_backend.load_catalog()
+        finally:
+            sync_backend.close()
+    if catalog is None:
+        raise SupabaseOperationError(
+            "スキーマ情報を取得できませんでした。introspect_schema RPCが適用されているか確認してください"
+        )
+
+    return [
+        plan_model_sync(model, catalog)
+        for level in sort_models_by_dependency(models_list)
+        for model in level
+    ]
+
+def sync_all_models_to_supabase(force: bool = False) -> Dict[str, bool]:
     """
     SupabaseModelMixinを継承した全てのモデルをSupabaseと同期します。
-    
+    外部キーの依存関係に従い、依存先のテーブルから順に並列で同期します。
+
+    Args:
+        force: Trueの場合はスキーマに変更のないモデルも差分を確認する
+
     Returns:
         各モデルの同期結果を含む辞書 {モデル名: 成功/失敗}
     """
+    results = sync_models_to_supabase(get_supabase_models(), force=force)
+    return {model.__name__: success for model, success in results.items()}
+
+def sync_models_to_supabase(
+    models_list: List[Type[models.Model]],
+    jobs: Optional[int] = None,
+    on_complete: Optional[Callable[[Type[models.Model], bool, float], None]] = None,
+    catalog: Optional[SupabaseCatalogSnapshot] = None,
+    force: bool = False,
+    on_skip: Optional[Callable[[Type[models.Model]], None]] = None,
+    backend: Optional[str] = None
+) -> Dict[Type[models.Model], bool]:
+    """
+    依存関係の順序を守りながら、複数のモデルをSupabaseと同期します。
+
+    データベースの接続情報（settings.SUPABASE_DB_URL）があれば直接SQLで1トランザクションとして、
+    なければexecute_sql RPCでモデルごとに並列に同期します（supabase_backends を参照）。
+    スキーマ情報は開始前に1回だけ取得し、全モデルで共有します。
+
+    前回同期時とスキーマのフィンガープリントが一致するモデルは、
+    スキーマ情報を取得せずにスキップします（成功扱い）。
+
+    Args:
+        models_list: 同期対象のモデルのリスト
+        jobs: 同時に同期するモデルの最大数（省略時は settings.SUPABASE_SYNC_JOBS）
+        on_complete: モデルごとの同期完了時に (モデル, 成功/失敗, 処理秒数) で呼ばれるコールバック
+        catalog: スキーマのスナップショット（省略時は introspect_schema RPCで取得）
+        force: Trueの場合はフィンガープリントが一致するモデルも差分を確認する
+        on_skip: 変更がないためスキップしたモデルごとに呼ばれるコールバック
+        backend: 同期バックエンド 'auto' / 'direct' / 'rpc'（省略時は settings.SUPABASE_SYNC_BACKEND）
+
+    Returns:
+        各モデルの同期結果を含む辞書 {モデル: 成功/失敗}
+    """
+    if jobs is None:
+        jobs = getattr(settings, 'SUPABASE_SYNC_JOBS', DEFAULT_SYNC_JOBS)
+    jobs = max(1, int(jobs))
+
     results = {}
-    models = get_supabase_models()
-    
-    for model in models:
-        model_name = model.__name__
-        results[model_name] = sync_django_model_to_supabase(model)
-        
+
+    # スキーマに変更のないモデルを除外
+    fingerprints = {model: get_model_schema_fingerprint(model) for model in models_list}
+    if not force and models_list:
+        with track_phase(PHASE_INTROSPECTION):
+            stored_fingerprints = load_schema_fingerprints()
+        unchanged = [
+            model for model in models_list
+            if stored_fingerprints.get(model._meta.db_table) == fingerprints[model]
+        ]
+        for model in unchanged:
+            logger.info(f"モデル {model.__name__} のスキーマは前回の同期から変更がないためスキップします")
+            results[model] = True
+            set_model_status(model, 'skipped')
+            if on_skip:
+                on_skip(model)
+        models_list = [model for model in models_list if model not in results]
+
+    if models_list:
+        # 接続情報があれば直接SQL、なければexecute_sql RPCで同期する
+        from .supabase_backends import get_sync_backend
+        sync_backend = get_sync_backend(backend)
+        try:
+            results.update(sync_backend.sync_models(models_list, jobs=jobs, on_complete=on_complete, catalog=catalog))
+        finally:
+            sync_backend.close()
+
+        # 同期に成功したモデルのフィンガープリントを保存（差分確認の省略や外部キー・インデックスの作成失敗を含め、
+        # 一部でも失敗したモデルは保存せず、次回の同期で再試行する）
+        save_schema_fingerprints({
+            model._meta.db_table: fingerprints[model]
+            for model in models_list if results.get(model)
+        })
+
+    # スキップしたモデルを含め、同期済みのテーブルを範囲ダイジェストの対象として登録する
+    register_mirrored_tables([model._meta.db_table for model, success in results.items() if success])
+
+    return results
+
+def sync_models_concurrently(
+    models_list: List[Type[models.Model]],
+    jobs: int = DEFAULT_SYNC_JOBS,
+    on_complete: Optional[Callable[[Type[models.Model], bool, float], None]] = None,
+    catalog: Optional[SupabaseCatalogSnapshot] = None
+) -> Dict[Type[models.Model], bool]:
+    """
+    依存関係の順序を守りながら、複数のモデルをexecute_sql RPCで並列に同期します。
+
+    依存先のモデルの同期が完了したモデルから順にスレッドプールへ投入するため、
+    全体の処理時間はモデル数ではなく最も長い依存チェーンの長さで決まります。
+
+    Args:
+        models_list: 同期対象のモデルのリスト
+        jobs: 同時に同期するモデルの最大数
+        on_complete: モデルごとの同期完了時に (モデル, 成功/失敗, 処理秒数) で呼ばれるコールバック
+        catalog: スキーマのスナップショット（省略時は introspect_schema RPCで取得）
+
+    Returns:
+        各モデルの同期結果を含む辞書 {モデル: 成功/失敗}
+    """
+    results = {}
+
+    if catalog is None:
+        with track_phase(PHASE_INTROSPECTION):
+            catalog = load_catalog_snapshot()
+
+    graph = get_model_dependencies(models_list)
+    remaining = {model: set(deps) for model, deps in graph.items()}
+    dependents = {model: [] for model in models_list}
+    for model, deps in graph.items():
+        for dep in deps:
+            dependents[dep].append(model)
+
+    def timed_sync(model):
+        start = time.time()
+        # ワーカースレッド内のHTTP呼び出しや再試行をこのモデルの計測値として記録する
+        with track_model(model):
+            try:
+                success = sync_django_model_to_supabase(model, catalog=catalog)
+            except Exception as e:
+                log_error_details(e, f"モデル同期中に予期しないエラーが発生しました", {'model': model.__name__})
+                success = False
+        set_model_status(model, 'ok' if success else 'error')
+        return success, time.time() - start
+
+    scheduled = set()
+
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix='supabase-sync') as executor:
+        futures = {}
+
+        def schedule(model):
+            scheduled.add(model)
+            futures[executor.submit(timed_sync, model)] = model
+
+        for model in models_list:
+            if not remaining[model]:
+                schedule(model)
+
+        while futures or len(scheduled) < len(models_list):
+            if not futures:
+                # 循環参照で投入できるモデルが残っている場合は依存関係を無視して投入する
+                stuck = [model for model in models_list if model not in scheduled]
+                logger.warning(f"モデル間に循環参照があります: {', '.join(m.__name__ for m in stuck)}。依存関係を無視して同期します。")
+                schedule(stuck[0])
+                continue
+
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                model = futures.pop(future)
+                success, elapsed = future.result()
+                results[model] = success
+
+                if on_complete:
+                    on_complete(model, success, elapsed)
+
+                for dependent in dependents[model]:
+                    if not success:
+                        logger.warning(f"依存先モデル {model.__name__} の同期に失敗しましたが、{dependent.__name__} の同期を続行します")
+                    remaining[dependent].discard(model)
+                    if not remaining[dependent] and dependent not in scheduled:
+                        schedule(dependent)
+
     return results
 
 def get_data_migration_sql(model: Type[models.Model], instances: List[models.Model]) -> str:
     """
     モデルインスタンスのリストからSUPABASEへのデータ移行用SQLを生成します。
+    大量のデータを出力する場合は supabase_export.export_models を使用してください。
     
     Args:
         model: Djangoモデルクラス
@@ -614,50 +1493,20 @@ def get_data_migration_sql(model: Type[models.Model], instances: List[models.Mod
     
     table_name = model._meta.db_table
     
-    # インスタンスからデータを抽出
-    rows = []
-    field_names = []
-    
-    # フィールド名の抽出（最初のインスタンスから）
-    for field in model._meta.fields:
-        if not field.primary_key or not field.auto_created:  # 自動生成される主キーはスキップ
-            field_names.append(field.column)
+    # 自動生成される主キー以外のフィールドを対象とする
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not (field.primary_key and field.auto_created)
+    ]
     
-    # インスタンスごとのデータ抽出
+    # インスタンスごとのデータ抽出（外部キーはattnameで値を取得し、エスケープは共通関数で行う）
+    rows = []
     for instance in instances:
-        row_data = []
-        for field_name in field_names:
-            field = model._meta.get_field(field_name)
-            value = getattr(instance, field_name)
-            
-            # NULL処理
-            if value is None:
-                row_data.append("NULL")
-                continue
-                
-            # 型に応じた形式化
-            if isinstance(value, str):
-                # エスケープ処理
-                escaped = value.replace("'", "''")
-                row_data.append(f"'{escaped}'")
-            elif isinstance(value, bool):
-                row_data.append(str(value).lower())
-            elif isinstance(value, (int, float)):
-                row_data.append(str(value))
-            elif hasattr(value, 'isoformat'):  # 日付・時間型
-                row_data.append(f"'{value.isoformat()}'")
-            elif isinstance(value, dict) or isinstance(value, list):
-                # JSON型
-                json_str = json.dumps(value).replace("'", "''")
-                row_data.append(f"'{json_str}'")
-            else:
-                # その他の型
-                row_data.append(f"'{str(value)}'")
-        
+        row_data = [sql_literal(getattr(instance, field.attname)) for field in fields]
         rows.append("(" + ", ".join(row_data) + ")")
     
     # INSERT文の生成
-    fields_str = ", ".join(field_names)
+    fields_str = ", ".join(field.column for field in fields)
     values_str = ",\n  ".join(rows)
     
     sql = f"""
@@ -692,97 +1541,87 @@ def post_migration_sync_handler(sender, **kwargs):
         **kwargs: シグナルから渡される追加パラメータ
     
     Djangoのpost_migrateシグナルハンドラとして使用します。
+    post_migrateはアプリごとに送信されるため、最後のアプリの通知時にのみ1回同期します。
     """
     import sys
     import time
     from django.core.management import color
     
+    if not is_last_post_migrate_sender(sender):
+        return
+    
     # 処理時間計測開始
     start_time = time.time()
     
     # カラー出力のためのスタイルを取得
     style = color.color_style()
     
-    print(f"=== Supabase同期ハンドラ開始 ===", file=sys.stderr)
-    print(f"シグナル受信: sender={sender}, apps={kwargs.get('apps')}", file=sys.stderr)
-    
-    # アプリケーション名を取得（ロギング用）
-    app_name = sender.name if hasattr(sender, 'name') else 'unknown'
-    print(f"アプリケーション名: {app_name}", file=sys.stderr)
+    logger.debug(f"Supabase同期ハンドラ開始: sender={sender}")
     
     # 設定でAutoSyncが有効になっているか確認
     auto_sync = getattr(settings, 'SUPABASE_AUTO_SYNC', False)
-    print(f"SUPABASE_AUTO_SYNC: {auto_sync}", file=sys.stderr)
     
     if not auto_sync:
-        logger.info(f"マイグレーション後の自動Supabase同期が無効です（app: {app_name}）")
-        print(f"{style.WARNING('注意:')} マイグレーション後の自動Supabase同期が無効です（app: {app_name}）", file=sys.stderr)
+        logger.info("マイグレーション後の自動Supabase同期が無効です")
+        print(f"{style.WARNING('注意:')} マイグレーション後の自動Supabase同期が無効です", file=sys.stderr)
         print(f"自動同期を有効にするには .env.development ファイルで SUPABASE_AUTO_SYNC=True を設定してください。", file=sys.stderr)
         print(f"または手動で同期を実行: python manage.py sync_supabase", file=sys.stderr)
         return
     
     # Supabaseの接続情報が設定されているか確認
     has_connection_info = all([settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY])
-    print(f"Supabase接続情報: URL={bool(settings.SUPABASE_URL)}, SERVICE_KEY={bool(settings.SUPABASE_SERVICE_KEY)}", file=sys.stderr)
     
     if not has_connection_info:
-        logger.warning(f"Supabase接続情報が設定されていないため、同期をスキップします（app: {app_name}）")
-        print(f"{style.ERROR('エラー:')} Supabase接続情報が設定されていないため、同期をスキップします（app: {app_name}）", file=sys.stderr)
+        logger.warning("Supabase接続情報が設定されていないため、同期をスキップします")
+        print(f"{style.ERROR('エラー:')} Supabase接続情報が設定されていないため、同期をスキップします", file=sys.stderr)
         print(f"接続情報を設定するには .env.development ファイルを確認してください。", file=sys.stderr)
         return
     
+    # Djangoのマイグレーションが適用されたテーブルがそのままSupabaseのテーブルであるため同期不要
+    if shares_default_database():
+        logger.info("DjangoのデータベースがSupabaseのデータベースと同一のため、同期をスキップします")
+        return
+    
     try:
-        logger.info(f"アプリケーション '{app_name}' のマイグレーション後Supabase同期を開始します")
-        print(f"{style.SUCCESS('開始:')} アプリケーション '{app_name}' のマイグレーション後Supabase同期を開始します", file=sys.stderr)
-        
-        # このアプリケーションのSupabaseモデルのみを取得
-        app_models = []
-        all_models = get_supabase_models()
-        print(f"取得したSupabaseモデル数: {len(all_models)}", file=sys.stderr)
+        logger.info("マイグレーション後のSupabase同期を開始します")
+        print(f"{style.SUCCESS('開始:')} マイグレーション後のSupabase同期を開始します", file=sys.stderr)
         
-        for model in all_models:
-            model_app = model._meta.app_label
-            print(f"モデル確認: {model.__name__}, app_label={model_app}", file=sys.stderr)
-            if model_app == app_name or app_name == 'techskillsquiz':  # 'techskillsquiz'はメインアプリなので全てのモデルを対象
-                app_models.append(model)
-        
-        print(f"同期対象モデル数: {len(app_models)}", file=sys.stderr)
+        app_models = get_supabase_models()
+        logger.debug(f"同期対象モデル数: {len(app_models)}")
         
         if not app_models:
-            logger.info(f"アプリケーション '{app_name}' にはSupabaseと同期するモデルがありません")
-            print(f"{style.WARNING('注意:')} アプリケーション '{app_name}' にはSupabaseと同期するモデルがありません", file=sys.stderr)
+            logger.info("Supabaseと同期するモデルがありません")
+            print(f"{style.WARNING('注意:')} Supabaseと同期するモデルがありません", file=sys.stderr)
             print(f"モデルにSupabaseModelMixinを継承させ、supabase_table属性を設定してください。", file=sys.stderr)
             return
         
-        # モデルごとに同期
-        results = {}
+        # 依存関係の順序を守りながらモデルを並列に同期
         total_count = len(app_models)
-        current = 0
-        
-        for model in app_models:
-            current += 1
+        completed = []
+
+        def report_model_result(model, success, model_time):
+            completed.append(model)
             model_name = f"{model._meta.app_label}.{model.__name__}"
-            logger.info(f"モデル '{model_name}' の同期を開始します")
-            print(f"[{current}/{total_count}] モデル '{model_name}' の同期を開始します...", file=sys.stderr)
-            
-            try:
-                start_model_time = time.time()
-                success = sync_django_model_to_supabase(model)
-                model_time = time.time() - start_model_time
-                results[model_name] = success
-                
-                if success:
-                    logger.info(f"モデル '{model_name}' の同期が成功しました ({model_time:.2f}秒)")
-                    print(f"{style.SUCCESS('✓')} モデル '{model_name}' の同期が成功しました ({model_time:.2f}秒)", file=sys.stderr)
-                else:
-                    logger.error(f"モデル '{model_name}' の同期に失敗しました ({model_time:.2f}秒)")
-                    print(f"{style.ERROR('✗')} モデル '{model_name}' の同期に失敗しました ({model_time:.2f}秒)", file=sys.stderr)
-            except Exception as e:
-                logger.exception(f"モデル '{model_name}' の同期中に例外が発生しました: {str(e)}")
-                print(f"{style.ERROR('✗')} モデル '{model_name}' の同期中に例外が発生しました: {str(e)}", file=sys.stderr)
-                import traceback
-                traceback.print_exc(file=sys.stderr)
-                results[model_name] = False
+            progress = f"[{len(completed)}/{total_count}]"
+            if success:
+                logger.debug(f"{progress} モデル '{model_name}' の同期が成功しました ({model_time:.2f}秒)")
+            else:
+                logger.error(f"{progress} モデル '{model_name}' の同期に失敗しました ({model_time:.2f}秒)")
+
+        def report_model_skipped(model):
+            completed.append(model)
+            model_name = f"{model._meta.app_label}.{model.__name__}"
+            logger.debug(f"モデル '{model_name}' はスキーマに変更がないためスキップしました")
+
+        sync_results = sync_models_to_supabase(
+            app_models,
+            on_complete=report_model_result,
+            on_skip=report_model_skipped,
+        )
+        results = {
+            f"{model._meta.app_label}.{model.__name__}": success
+            for model, success in sync_results.items()
+        }
         
         # 処理時間を計算
         total_time = time.time() - start_time
@@ -792,8 +1631,8 @@ def post_migration_sync_handler(sender, **kwargs):
         total_count = len(results)
         
         if total_count > 0:
-            logger.info(f"アプリケーション '{app_name}' のSupabase同期が完了しました。{success_count}/{total_count}のモデルが正常に同期されました。(合計: {total_time:.2f}秒)")
-            print(f"{style.SUCCESS('完了:')} アプリケーション '{app_name}' のSupabase同期が完了しました。", file=sys.stderr)
+            logger.info(f"Supabase同期が完了しました。{success_count}/{total_count}のモデルが正常に同期されました。(合計: {total_time:.2f}秒)")
+            print(f"{style.SUCCESS('完了:')} Supabase同期が完了しました。", file=sys.stderr)
             print(f"{style.SUCCESS(f'{success_count}/{total_count}')}のモデルが正常に同期されました。(合計: {total_time:.2f}秒)", file=sys.stderr)
             
             # 失敗したモデルがあれば警告
@@ -812,4 +1651,4 @@ def post_migration_sync_handler(sender, **kwargs):
         traceback.print_exc(file=sys.stderr)
     
     finally:
-        print(f"=== Supabase同期ハンドラ終了 ===", file=sys.stderr) 
\ No newline at end of file
+        logger.debug("Supabase同期ハンドラ終了") 
\ No newline at end of file
@@ -0,0 +1,124 @@
+"""
+Supabaseとの同一データベース判定のテスト
+
+DjangoのdefaultデータベースがSupabaseプロジェクトのデータベースそのものである場合に、
+HTTP経由のミラーリングが行われないことをテストします。
+"""
+
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+from quiz.models import Category, DifficultyLevel, Quiz
+from techskillsquiz.supabase import (
+    get_database_search_path,
+    is_supabase_database,
+    reset_shares_default_database,
+    shares_default_database,
+)
+
+
+def postgres(host, port='5432', user='postgres', name='postgres', options=None):
+    """DATABASESのエントリを作成します"""
+    db_settings = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': name, 'USER': user, 'HOST': host, 'PORT': port,
+    }
+    if options:
+        db_settings['OPTIONS'] = {'options': options}
+    return db_settings
+
+
+class SameDatabaseDetectionTestCase(TestCase):
+    """同一データベースの判定のテスト"""
+
+    URL = 'https://abcdefghijklmnop.supabase.co'
+
+    def test_direct_connection(self):
+        """プロジェクトの直接接続ホストを同一と判定することのテスト"""
+        self.assertTrue(is_supabase_database(postgres('db.abcdefghijklmnop.supabase.co'), self.URL))
+        self.assertFalse(is_supabase_database(postgres('db.otherproject.supabase.co'), self.URL))
+
+    def test_pooler_connection(self):
+        """接続プーラーはユーザー名のプロジェクト参照IDで判定することのテスト"""
+        host = 'aws-0-ap-northeast-1.pooler.supabase.com'
+        self.assertTrue(is_supabase_database(postgres(host, '6543', 'postgres.abcdefghijklmnop'), self.URL))
+        self.assertFalse(is_supabase_database(postgres(host, '6543', 'postgres.otherproject'), self.URL))
+
+    def test_local_cli(self):
+        """Supabase CLIの既定ポートを同一と判定することのテスト"""
+        self.assertTrue(is_supabase_database(postgres('127.0.0.1', '54322'), 'http://localhost:54321'))
+        self.assertFalse(is_supabase_database(postgres('127.0.0.1', '5432'), 'http://localhost:54321'))
+
+    def test_other_database_or_schema(self):
+        """データベース名・スキーマ・エンジンが異なる場合は別と判定することのテスト"""
+        host = 'db.abcdefghijklmnop.supabase.co'
+        self.assertFalse(is_supabase_database(postgres(host, name='django'), self.URL))
+        self.assertFalse(is_supabase_database(postgres(host, options='-c search_path=django,public'), self.URL))
+        self.assertFalse(is_supabase_database({'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}, self.URL))
+        self.assertEqual(get_database_search_path({'OPTIONS': {'options': '-csearch_path="public"'}}), 'public')
+
+
+class SharedDatabaseMirroringTestCase(TestCase):
+    """同一データベースの場合にミラーリングが無効になることのテスト"""
+
+    def setUp(self):
+        reset_shares_default_database()
+        self.addCleanup(reset_shares_default_database)
+        self.category = Category.objects.create(name='カテゴリ', slug='category')
+        self.difficulty = DifficultyLevel.objects.create(name='初級', slug='beginner', level=1, point_multiplier=1)
+
+    @override_settings(SUPABASE_AUTO_SYNC=True, SUPABASE_SHARES_DEFAULT_DATABASE=True)
+    @patch('techskillsquiz.supabase_mixins.get_supabase_client')
+    def test_save_does_not_call_supabase(self, mock_get_client):
+        """保存・削除時にSupabaseへHTTPリクエストを送らないことのテスト"""
+        quiz = Quiz.objects.create(
+            category=self.category, difficulty=self.difficulty, title='クイズ', description='説明'
+        )
+        self.assertTrue(quiz.sync_to_supabase())
+        quiz.delete()
+
+        mock_get_client.assert_not_called()
+
+    @override_settings(SUPABASE_AUTO_SYNC=True, SUPABASE_SHARES_DEFAULT_DATABASE=False)
+    @patch('techskillsquiz.supabase_mixins.SupabaseModelMixin.sync_to_supabase', return_value=True)
+    def test_save_is_mirrored_for_separate_database(self, mock_sync):
+        """別のデータベースの場合は従来どおり保存時に同期することのテスト"""
+        Quiz.objects.create(category=self.category, difficulty=self.difficulty, title='クイズ', description='説明')
+
+        self.assertFalse(shares_default_database())
+        mock_sync.assert_called_once()
+
+
+class SupabaseClientKeyTestCase(TestCase):
+    """共有クライアントと管理用クライアントの接続キーのテスト"""
+
+    URL = 'https://abcdefghijklmnop.supabase.co'
+
+    def setUp(self):
+        for name in ('supabase', 'supabase_admin'):
+            patcher = patch(f'techskillsquiz.supabase.{name}', None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @patch('techskillsquiz.supabase.create_client')
+    def test_shared_client_uses_anon_key(self, mock_create_client):
+        """共有クライアントは service_role ではなく anon キーで作成されることのテスト"""
+        from techskillsquiz import supabase as supabase_module
+
+        with patch.multiple(supabase_module, SUPABASE_URL=self.URL, SUPABASE_KEY='anon', SUPABASE_SERVICE_KEY='service'):
+            supabase_module.get_supabase_client()
+            supabase_module.get_supabase_admin_client()
+
+        self.assertEqual(
+            [c.args for c in mock_create_client.call_args_list],
+            [(self.URL, 'anon'), (self.URL, 'service')],
+        )
+
+    def test_admin_client_requires_service_key(self):
+        """SUPABASE_SERVICE_KEY がない場合は管理用クライアントを作成しないことのテスト"""
+        from techskillsquiz import supabase as supabase_module
+
+        with patch.multiple(supabase_module, SUPABASE_URL=self.URL, SUPABASE_KEY='anon', SUPABASE_SERVICE_KEY=None):
+            with self.assertRaises(ValueError):
+                supabase_module.get_supabase_admin_client()
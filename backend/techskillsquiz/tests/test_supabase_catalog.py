@@ -0,0 +1,113 @@
+"""
+Supabaseスキーマスナップショットのテスト
+
+introspect_schema RPCによるスキーマ情報の一括取得と、
+スナップショットを参照した同期処理をテストします。
+"""
+
+from unittest.mock import patch, MagicMock
+from django.test import TestCase
+from django.db import models
+
+from techskillsquiz.supabase_catalog import (
+    SupabaseCatalogSnapshot,
+    normalize_pg_type,
+    pg_types_match,
+)
+from techskillsquiz.supabase_sync import sync_models_to_supabase, MIRRORED_TABLES_TABLE, SCHEMA_STATE_TABLE
+from techskillsquiz.supabase_mixins import SupabaseModelMixin
+
+# --- Test Models ---
+
+class CatalogRelatedModel(SupabaseModelMixin, models.Model):
+    name = models.CharField(max_length=50)
+    supabase_table = 'quiz_catalogrelatedmodel'
+
+    class Meta:
+        app_label = 'quiz'
+        managed = False
+
+class CatalogChildModel(SupabaseModelMixin, models.Model):
+    related = models.ForeignKey(CatalogRelatedModel, on_delete=models.CASCADE)
+    supabase_table = 'quiz_catalogchildmodel'
+
+    class Meta:
+        app_label = 'quiz'
+        managed = False
+
+
+def build_catalog_response():
+    """introspect_schema RPCのレスポンス例を返す"""
+    return {
+        'quiz_catalogrelatedmodel': {
+            'columns': [
+                {'column_name': 'id', 'data_type': 'bigint', 'is_nullable': 'NO', 'column_default': None},
+                {'column_name': 'name', 'data_type': 'character varying(50)', 'is_nullable': 'NO', 'column_default': None},
+            ],
+            'constraints': [
+                {'name': 'quiz_catalogrelatedmodel_pkey', 'type': 'p', 'definition': 'PRIMARY KEY (id)'},
+            ],
+            'indexes': [
+                {'name': 'quiz_catalogrelatedmodel_pkey', 'is_unique': True, 'is_primary': True,
+                 'definition': 'CREATE UNIQUE INDEX quiz_catalogrelatedmodel_pkey ON public.quiz_catalogrelatedmodel USING btree (id)'},
+            ],
+        },
+    }
+
+
+class PgTypeNormalizationTestCase(TestCase):
+    """PostgreSQLの型名の正規化と比較のテスト"""
+
+    def test_normalize_aliases(self):
+        """型の別名が正式名に変換されることのテスト"""
+        self.assertEqual(normalize_pg_type('varchar(100)'), 'character varying(100)')
+        self.assertEqual(normalize_pg_type('INT4'), 'integer')
+        self.assertEqual(normalize_pg_type('numeric( 5, 2 )'), 'numeric(5,2)')
+        self.assertEqual(normalize_pg_type('timestamptz'), 'timestamp with time zone')
+
+    def test_types_match(self):
+        """修飾子なしの型名は基本型のみで比較されることのテスト"""
+        self.assertTrue(pg_types_match('varchar(50)', 'character varying(50)'))
+        self.assertTrue(pg_types_match('varchar(50)', 'character varying'))
+        self.assertFalse(pg_types_match('varchar(50)', 'character varying(100)'))
+        self.assertFalse(pg_types_match('integer', 'bigint'))
+
+
+class SupabaseCatalogSnapshotTestCase(TestCase):
+    """スナップショットの取得と参照のテスト"""
+
+    def test_load_from_rpc(self):
+        """introspect_schema RPCのレスポンスからスナップショットを構築するテスト"""
+        mock_supabase = MagicMock()
+        mock_supabase.rpc.return_value.execute.return_value.data = build_catalog_response()
+
+        catalog = SupabaseCatalogSnapshot.load(mock_supabase)
+
+        mock_supabase.rpc.assert_called_once_with('introspect_schema', {'p_schema': 'public'})
+        self.assertTrue(catalog.table_exists('quiz_catalogrelatedmodel'))
+        self.assertFalse(catalog.table_exists('quiz_catalogchildmodel'))
+        self.assertEqual([c['column_name'] for c in catalog.get_columns('quiz_catalogrelatedmodel')], ['id', 'name'])
+        self.assertEqual(catalog.get_indexes('quiz_catalogrelatedmodel')[0]['name'], 'quiz_catalogrelatedmodel_pkey')
+        self.assertEqual(catalog.get_columns('quiz_catalogchildmodel'), [])
+
+    @patch('techskillsquiz.supabase_sync.create_supabase_table')
+    @patch('techskillsquiz.supabase_sync.get_supabase_client')
+    @patch('techskillsquiz.supabase_sync.get_supabase_admin_client')
+    def test_full_sync_uses_single_introspection(self, mock_get_admin_client, mock_get_client, mock_create):
+        """全モデルの同期でスキーマ情報の取得が service_role のクライアントで1回だけ行われることのテスト"""
+        mock_supabase = MagicMock()
+        mock_supabase.rpc.return_value.execute.return_value.data = build_catalog_response()
+        mock_get_admin_client.return_value = mock_supabase
+        mock_create.return_value = True
+
+        results = sync_models_to_supabase([CatalogRelatedModel, CatalogChildModel], jobs=2)
+
+        self.assertEqual(results, {CatalogRelatedModel: True, CatalogChildModel: True})
+        # introspect_schema以外のRPCは行われず、RESTは同期状態・ミラーテーブルの登録のみ参照する
+        mock_supabase.rpc.assert_called_once_with('introspect_schema', {'p_schema': 'public'})
+        for table_call in mock_supabase.table.call_args_list:
+            self.assertIn(table_call.args, [(SCHEMA_STATE_TABLE,), (MIRRORED_TABLES_TABLE,)])
+        mock_create.assert_called_once_with(CatalogChildModel)
+        # 共有クライアント（anon）は管理用のRPC・テーブルに使用しない
+        mock_get_client.return_value.rpc.assert_not_called()
+        mock_get_client.return_value.table.assert_not_called()
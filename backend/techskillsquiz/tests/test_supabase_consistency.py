@@ -0,0 +1,319 @@
+"""
+Supabase整合性検証のテスト
+
+主キーのストリーミング取得とマージジョインによる整合性検証、
+範囲ダイジェストによる内容比較、バッチupsertによる修復をテストします。
+"""
+
+import datetime
+import hashlib
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
+from django.test import TestCase
+
+from quiz.models import Category
+from techskillsquiz.supabase_consistency import (
+    iter_django_pks,
+    iter_supabase_pks,
+    merge_join_pks,
+    verify_model_consistency,
+    MATCHED,
+    MISSING_IN_SUPABASE,
+    MISSING_IN_DJANGO,
+    canonical_value,
+    row_text,
+    split_range,
+    get_digest_fields,
+    verify_model_content,
+    ROW_SEPARATOR,
+    RepairState,
+    repair_model_records,
+)
+
+
+def build_paged_supabase(pages):
+    """
+    キーセットページングのリクエストに対して、順にページを返すSupabaseクライアントのモックを作成する
+    """
+    mock_supabase = MagicMock()
+    responses = iter(pages)
+
+    def execute():
+        return MagicMock(data=next(responses, []))
+
+    select = mock_supabase.table.return_value.select.return_value
+    select.order.return_value.limit.return_value.execute.side_effect = execute
+    select.gt.return_value.order.return_value.limit.return_value.execute.side_effect = execute
+    return mock_supabase
+
+
+class MergeJoinTestCase(TestCase):
+    """マージジョインのテスト"""
+
+    def test_merge_join_reports_both_sides(self):
+        """両側にしか存在しない主キーがそれぞれ報告されることのテスト"""
+        results = list(merge_join_pks(iter([1, 2, 4, 6]), iter([2, 3, 4, 5])))
+
+        self.assertEqual(results, [
+            (MISSING_IN_SUPABASE, 1),
+            (MATCHED, 2),
+            (MISSING_IN_DJANGO, 3),
+            (MATCHED, 4),
+            (MISSING_IN_DJANGO, 5),
+            (MISSING_IN_SUPABASE, 6),
+        ])
+
+    def test_merge_join_with_empty_side(self):
+        """片側が空の場合のテスト"""
+        self.assertEqual(list(merge_join_pks(iter([]), iter([1]))), [(MISSING_IN_DJANGO, 1)])
+        self.assertEqual(list(merge_join_pks(iter([1]), iter([]))), [(MISSING_IN_SUPABASE, 1)])
+
+
+class StreamingPkTestCase(TestCase):
+    """主キーのチャンク取得のテスト"""
+
+    def setUp(self):
+        self.categories = [
+            Category.objects.create(name=f'カテゴリ{i}', slug=f'category-{i}')
+            for i in range(5)
+        ]
+
+    def test_iter_django_pks_in_chunks(self):
+        """Django側の主キーがチャンクサイズに関わらず全件、昇順で取得されることのテスト"""
+        expected = sorted(category.pk for category in self.categories)
+
+        with self.assertNumQueries(3):
+            self.assertEqual(list(iter_django_pks(Category, chunk_size=2)), expected)
+
+    def test_iter_supabase_pks_follows_keyset(self):
+        """Supabase側は主キーのみを取得し、空のページまでキーセットで読み進めることのテスト"""
+        # PostgRESTの最大行数によりチャンクサイズより少ない件数が返されるケース
+        mock_supabase = build_paged_supabase([[{'id': 1}, {'id': 2}], [{'id': 5}]])
+
+        pks = list(iter_supabase_pks(Category, chunk_size=1000, supabase=mock_supabase))
+
+        self.assertEqual(pks, [1, 2, 5])
+        mock_supabase.table.return_value.select.assert_called_with('id')
+        gt = mock_supabase.table.return_value.select.return_value.gt
+        self.assertEqual([c.args for c in gt.call_args_list], [('id', 2), ('id', 5)])
+
+    def test_verify_model_consistency(self):
+        """整合性検証の結果に両側の不一致が含まれることのテスト"""
+        pks = sorted(category.pk for category in self.categories)
+        extra_pk = pks[-1] + 100
+        mock_supabase = build_paged_supabase([
+            [{'id': pk} for pk in pks[1:]] + [{'id': extra_pk}],
+        ])
+
+        report = verify_model_consistency(Category, chunk_size=2, supabase=mock_supabase)
+
+        self.assertEqual(report.matched_count, len(pks) - 1)
+        self.assertEqual(report.missing_in_supabase, [pks[0]])
+        self.assertEqual(report.missing_in_django, [extra_pk])
+        self.assertFalse(report.is_consistent)
+
+
+class FakeDigestSupabase:
+    """
+    range_digests / range_row_digests RPCを、メモリ上の行データからDjango側と同じ規則で再現するモック
+    """
+
+    def __init__(self, rows):
+        self.rows = dict(rows)
+        self.rpc_calls = []
+
+    def _rows_in(self, lo, hi):
+        return [(pk, self.rows[pk]) for pk in sorted(self.rows) if lo <= pk < hi]
+
+    def rpc(self, name, params):
+        self.rpc_calls.append((name, params))
+        if name == 'range_digests':
+            bounds = params['p_bounds']
+            data = []
+            for lo, hi in zip(bounds, bounds[1:]):
+                texts = [row_text(values) for _, values in self._rows_in(lo, hi)]
+                digest = hashlib.md5(ROW_SEPARATOR.join(texts).encode('utf-8')).hexdigest()
+                data.append({'lo': lo, 'hi': hi, 'row_count': len(texts), 'digest': digest})
+        else:
+            data = [
+                [pk, hashlib.md5(row_text(values).encode('utf-8')).hexdigest()]
+                for pk, values in self._rows_in(params['p_lo'], params['p_hi'])
+            ]
+        return MagicMock(execute=MagicMock(return_value=MagicMock(data=data)))
+
+    def table(self, name):
+        fake = self
+
+        class Query:
+            def select(self, column):
+                return self
+
+            def order(self, column, desc=False):
+                self.desc = desc
+                return self
+
+            def limit(self, count):
+                return self
+
+            def execute(self):
+                pks = sorted(fake.rows, reverse=self.desc)
+                return MagicMock(data=[{'id': pk} for pk in pks[:1]])
+
+        return Query()
+
+
+class CanonicalValueTestCase(TestCase):
+    """行の正規化テキストのテスト"""
+
+    def test_canonical_values(self):
+        """SQL側の正規化規則と同じテキストに変換されることのテスト"""
+        jst = datetime.timezone(datetime.timedelta(hours=9))
+        self.assertEqual(canonical_value(None), '\\N')
+        self.assertEqual(canonical_value(True), 'true')
+        self.assertEqual(canonical_value(3), '3')
+        self.assertEqual(canonical_value(1.0), '1')
+        self.assertEqual(canonical_value(0.25), '0.25')
+        self.assertEqual(
+            canonical_value(datetime.datetime(2026, 1, 1, 9, 0, 0, 5, tzinfo=jst)),
+            '2026-01-01T00:00:00.000005',
+        )
+        self.assertEqual(canonical_value(datetime.date(2026, 1, 2)), '2026-01-02')
+
+    def test_split_range(self):
+        """範囲が連続する境界に分割されることのテスト"""
+        self.assertEqual(split_range(0, 10, 4), [0, 3, 6, 9, 10])
+        self.assertEqual(split_range(5, 7, 16), [5, 6, 7])
+
+
+class RangeDigestTestCase(TestCase):
+    """範囲ダイジェストによる内容比較のテスト"""
+
+    def setUp(self):
+        for i in range(40):
+            Category.objects.create(name=f'カテゴリ{i}', slug=f'category-{i}')
+        attnames = [field.attname for field in get_digest_fields(Category)]
+        self.rows = {values[0]: values for values in Category.objects.order_by('pk').values_list(*attnames)}
+
+    def test_identical_tables_compare_top_level_only(self):
+        """内容が一致する場合は最上位の範囲のみ比較されることのテスト"""
+        fake = FakeDigestSupabase(self.rows)
+
+        report = verify_model_content(Category, fanout=4, leaf_size=4, supabase=fake)
+
+        self.assertTrue(report.is_consistent)
+        self.assertEqual(len(fake.rpc_calls), 1)
+
+    def test_detects_changed_and_missing_rows(self):
+        """内容の相違と欠落が、一致しない範囲のみを分割して検出されることのテスト"""
+        pks = sorted(self.rows)
+        changed_pk, missing_pk = pks[5], pks[30]
+        supabase_rows = dict(self.rows)
+        values = list(supabase_rows[changed_pk])
+        values[1] = '変更されたカテゴリ'
+        supabase_rows[changed_pk] = tuple(values)
+        del supabase_rows[missing_pk]
+        fake = FakeDigestSupabase(supabase_rows)
+
+        report = verify_model_content(Category, fanout=4, leaf_size=4, supabase=fake)
+
+        self.assertEqual(report.changed, [changed_pk])
+        self.assertEqual(report.missing_in_supabase, [missing_pk])
+        self.assertEqual(report.missing_in_django, [])
+        # 全行を取得せず、一致しない範囲のみを比較している
+        row_calls = [params for name, params in fake.rpc_calls if name == 'range_row_digests']
+        self.assertEqual(len(row_calls), 2)
+        self.assertTrue(all(params['p_hi'] - params['p_lo'] <= 4 for params in row_calls))
+
+    def test_missing_ranges_are_treated_as_drift(self):
+        """RPCが一部の範囲しか返さない場合も例外にせず、返されなかった範囲を不一致として比較することのテスト"""
+        fake = FakeDigestSupabase(self.rows)
+        rpc = fake.rpc
+
+        def truncated_rpc(name, params):
+            response = rpc(name, params)
+            if name == 'range_digests' and len(fake.rpc_calls) == 1:
+                response.execute.return_value.data = response.execute.return_value.data[:-1]
+            return response
+
+        fake.rpc = truncated_rpc
+
+        with self.assertLogs('techskillsquiz.supabase_consistency', level='WARNING'):
+            report = verify_model_content(Category, fanout=4, leaf_size=4, supabase=fake)
+
+        self.assertTrue(report.is_consistent)
+        # 返されなかった最後の範囲のみを再分割して比較している
+        top_bounds = fake.rpc_calls[0][1]['p_bounds']
+        compared = [params for name, params in fake.rpc_calls[1:]]
+        self.assertTrue(compared)
+        self.assertTrue(all(params.get('p_lo', params.get('p_bounds', [None])[0]) >= top_bounds[-2] for params in compared))
+
+
+
+class BulkRepairTestCase(TestCase):
+    """バッチupsertによる修復のテスト"""
+
+    def setUp(self):
+        self.categories = [
+            Category.objects.create(name=f'カテゴリ{i}', slug=f'category-{i}')
+            for i in range(5)
+        ]
+        self.pks = sorted(category.pk for category in self.categories)
+        self.state_path = os.path.join(tempfile.mkdtemp(), 'repair_state.json')
+
+    def _mock_supabase(self, fail_pks=()):
+        mock_supabase = MagicMock()
+        self.upserted = []
+
+        def upsert(rows, on_conflict):
+            request = MagicMock()
+            if any(row['id'] in fail_pks for row in rows):
+                request.execute.side_effect = Exception("upstream timeout")
+            else:
+                self.upserted.append([row['id'] for row in rows])
+            return request
+
+        mock_supabase.table.return_value.upsert.side_effect = upsert
+        return mock_supabase
+
+    def test_repair_in_chunks(self):
+        """レコードがチャンクごとにまとめてupsertされ、進捗が報告されることのテスト"""
+        mock_supabase = self._mock_supabase()
+        progress = []
+        deleted_pk = self.pks[-1] + 100
+
+        with self.assertNumQueries(3):
+            result = repair_model_records(
+                Category, self.pks + [deleted_pk], chunk_size=2, jobs=2,
+                supabase=mock_supabase, on_progress=lambda r: progress.append(r.processed),
+            )
+
+        self.assertEqual(result.repaired, 5)
+        self.assertEqual(result.skipped, 1)
+        self.assertEqual(result.error_count, 0)
+        self.assertEqual(sorted(pk for chunk in self.upserted for pk in chunk), self.pks)
+        self.assertTrue(all(len(chunk) <= 2 for chunk in self.upserted))
+        self.assertEqual(progress[-1], 6)
+
+    @patch('techskillsquiz.supabase_consistency.time.sleep')
+    def test_failed_chunks_can_be_resumed(self, mock_sleep):
+        """失敗したチャンクが報告され、状態ファイルから再開できることのテスト"""
+        state = RepairState(self.state_path)
+        result = repair_model_records(
+            Category, self.pks, chunk_size=2, jobs=2,
+            supabase=self._mock_supabase(fail_pks={self.pks[2]}), state=state,
+        )
+
+        self.assertEqual(result.repaired, 3)
+        self.assertEqual(result.error_count, 2)
+        self.assertEqual(result.chunk_errors[0]['first_id'], self.pks[2])
+        pending = RepairState(self.state_path).get('quiz.Category')
+        self.assertEqual(pending, self.pks[2:4])
+
+        result = repair_model_records(
+            Category, pending, chunk_size=2, jobs=2,
+            supabase=self._mock_supabase(), state=RepairState(self.state_path),
+        )
+
+        self.assertEqual(result.repaired, 2)
+        self.assertFalse(os.path.exists(self.state_path))
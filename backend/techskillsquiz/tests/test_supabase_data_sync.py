@@ -0,0 +1,298 @@
+"""
+Supabaseデータ差分同期のテスト
+
+updated_atのウォーターマークに基づく差分の送信・取り込みと、ウォーターマークの更新をテストします。
+"""
+
+import datetime
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from quiz.models import ActivityHistory, Category, DifficultyLevel, Quiz, UserStatistics
+from techskillsquiz.supabase_data_sync import (
+    get_pull_models,
+    is_pull_model,
+    push_model_changes,
+    pull_model_changes,
+    parse_since,
+    WATERMARK_TABLE,
+)
+
+
+class FakeWatermarkSupabase:
+    """
+    upsertされた行とウォーターマークをメモリ上に記録するSupabaseクライアントのモック
+    """
+
+    def __init__(self, watermark=None, fail_on_batch=None):
+        self.watermark = watermark
+        self.saved_watermarks = []
+        self.upserted = []
+        self.fail_on_batch = fail_on_batch
+
+    def table(self, name):
+        query = MagicMock()
+        query.select.return_value.eq.return_value.eq.return_value.limit.return_value.execute.return_value = MagicMock(
+            data=[self.watermark] if self.watermark else []
+        )
+
+        def upsert(rows, on_conflict):
+            request = MagicMock()
+            if name == WATERMARK_TABLE:
+                self.saved_watermarks.append(rows)
+            elif self.fail_on_batch == len(self.upserted):
+                request.execute.side_effect = Exception("connection reset")
+            else:
+                self.upserted.append([row['id'] for row in rows])
+            return request
+
+        query.upsert.side_effect = upsert
+        return query
+
+
+@override_settings(SUPABASE_DATA_SYNC_LAG=0)
+class PushModelChangesTestCase(TestCase):
+    """ウォーターマークによる差分送信のテスト"""
+
+    def setUp(self):
+        category = Category.objects.create(name='カテゴリ', slug='category')
+        difficulty = DifficultyLevel.objects.create(name='初級', slug='beginner', level=1, point_multiplier=1)
+        self.quizzes = [
+            Quiz.objects.create(category=category, difficulty=difficulty, title=f'クイズ{i}', description='説明')
+            for i in range(5)
+        ]
+        self.pks = sorted(quiz.pk for quiz in self.quizzes)
+        # 同じupdated_atの行がバッチの境界をまたぐケースを再現する
+        self.updated_at = timezone.now() - datetime.timedelta(minutes=5)
+        Quiz.objects.update(updated_at=self.updated_at)
+
+    def test_push_all_without_watermark(self):
+        """ウォーターマークがない場合は全件をバッチで送信し、バッチごとにウォーターマークを進めることのテスト"""
+        fake = FakeWatermarkSupabase()
+
+        result = push_model_changes(Quiz, batch_size=2, supabase=fake)
+
+        self.assertEqual(result.synced, 5)
+        self.assertEqual(fake.upserted, [self.pks[0:2], self.pks[2:4], self.pks[4:]])
+        self.assertEqual([w['last_pk'] for w in fake.saved_watermarks], [str(self.pks[1]), str(self.pks[3]), str(self.pks[4])])
+        self.assertEqual(fake.saved_watermarks[-1]['direction'], 'push')
+
+    @patch('techskillsquiz.supabase_consistency.time.sleep')
+    def test_resume_from_watermark(self, mock_sleep):
+        """保存済みの (updated_at, 主キー) より後の行のみが送信されることのテスト"""
+        fake = FakeWatermarkSupabase(watermark={'updated_at': self.updated_at.isoformat(), 'last_pk': str(self.pks[2])})
+        Quiz.objects.filter(pk=self.pks[0]).update(updated_at=timezone.now() - datetime.timedelta(seconds=1))
+
+        result = push_model_changes(Quiz, batch_size=10, supabase=fake)
+
+        self.assertEqual(result.synced, 3)
+        self.assertEqual(fake.upserted, [[self.pks[3], self.pks[4], self.pks[0]]])
+
+    @patch('techskillsquiz.supabase_consistency.time.sleep')
+    def test_watermark_is_kept_on_failure(self, mock_sleep):
+        """送信に失敗した場合は、完了したバッチまでのウォーターマークが残ることのテスト"""
+        fake = FakeWatermarkSupabase(fail_on_batch=1)
+
+        with self.assertRaises(Exception):
+            push_model_changes(Quiz, batch_size=2, supabase=fake)
+
+        self.assertEqual(len(fake.saved_watermarks), 1)
+        self.assertEqual(fake.saved_watermarks[0]['last_pk'], str(self.pks[1]))
+
+    def test_explicit_since(self):
+        """--sinceで指定した日時より新しい行のみが送信されることのテスト"""
+        Quiz.objects.filter(pk=self.pks[4]).update(updated_at=timezone.now())
+        fake = FakeWatermarkSupabase(watermark={'updated_at': '2000-01-01T00:00:00+00:00', 'last_pk': None})
+
+        result = push_model_changes(Quiz, since=self.updated_at, supabase=fake)
+
+        self.assertEqual(result.synced, 1)
+        self.assertEqual(fake.upserted, [[self.pks[4]]])
+
+    @override_settings(SUPABASE_DATA_SYNC_LAG=60)
+    def test_recent_rows_wait_for_lag(self):
+        """SUPABASE_DATA_SYNC_LAG 秒以内に更新された行は送信せず、ウォーターマークも進めないことのテスト"""
+        Quiz.objects.filter(pk=self.pks[4]).update(updated_at=timezone.now() - datetime.timedelta(seconds=10))
+        fake = FakeWatermarkSupabase()
+
+        result = push_model_changes(Quiz, batch_size=10, supabase=fake)
+
+        self.assertEqual(fake.upserted, [self.pks[:4]])
+        self.assertEqual(fake.saved_watermarks[-1]['last_pk'], str(self.pks[3]))
+
+        # コミットが遅れた行（ウォーターマークより後で、上限より前の updated_at）は次回送信される
+        Quiz.objects.filter(pk=self.pks[4]).update(updated_at=timezone.now() - datetime.timedelta(minutes=2))
+        fake.watermark = fake.saved_watermarks[-1]
+
+        result = push_model_changes(Quiz, batch_size=10, supabase=fake)
+
+        self.assertEqual(result.synced, 1)
+        self.assertEqual(fake.upserted[-1], [self.pks[4]])
+
+    def test_parse_since(self):
+        """--sinceの値の解釈のテスト"""
+        self.assertIsNone(parse_since('auto'))
+        self.assertEqual(parse_since('2026-10-01T00:00:00+00:00'), datetime.datetime(2026, 10, 1, tzinfo=datetime.timezone.utc))
+        self.assertTrue(timezone.is_aware(parse_since('2026-10-01')))
+        with self.assertRaises(ValueError):
+            parse_since('yesterday')
+
+    @override_settings(SUPABASE_URL='https://example.supabase.co', SUPABASE_SERVICE_KEY='key')
+    @patch('techskillsquiz.supabase_data_sync.get_supabase_client')
+    def test_command(self, mock_get_client):
+        """--dataで差分が依存順に送信されることのテスト"""
+        fake = FakeWatermarkSupabase()
+        mock_get_client.return_value = fake
+        stdout = StringIO()
+
+        call_command('sync_supabase', '--data', '--no-input', '--app=quiz', '--model=Quiz', stdout=stdout)
+
+        self.assertIn('5件を送信しました', stdout.getvalue())
+        self.assertEqual(sum(len(chunk) for chunk in fake.upserted), 5)
+
+        with self.assertRaises(CommandError):
+            call_command('sync_supabase', '--data', '--since=yesterday', '--no-input', stdout=StringIO())
+
+
+class FakePullSupabase:
+    """
+    ページ単位で行を返し、フィルタとウォーターマークを記録するSupabaseクライアントのモック
+    """
+
+    def __init__(self, pages, watermark=None):
+        self.pages = iter(pages)
+        self.watermark = watermark
+        self.filters = []
+        self.saved_watermarks = []
+
+    def table(self, name):
+        fake = self
+        query = MagicMock()
+
+        if name == WATERMARK_TABLE:
+            query.select.return_value.eq.return_value.eq.return_value.limit.return_value.execute.return_value = MagicMock(
+                data=[fake.watermark] if fake.watermark else []
+            )
+            query.upsert.side_effect = lambda row, on_conflict: fake.saved_watermarks.append(row) or MagicMock()
+            return query
+
+        class Query:
+            def select(self, columns):
+                return self
+
+            def gt(self, column, value):
+                fake.filters.append(('gt', column, value))
+                return self
+
+            def or_(self, filters):
+                fake.filters.append(('or', filters))
+                return self
+
+            def order(self, column):
+                return self
+
+            def limit(self, count):
+                return self
+
+            def execute(self):
+                return MagicMock(data=next(fake.pages, []))
+
+        return Query()
+
+
+class PullModelChangesTestCase(TestCase):
+    """Supabaseで更新された行の取り込みのテスト"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='pull-user', password='password')
+        self.existing = UserStatistics.objects.create(user=self.user, quizzes_completed=1, total_points=10)
+
+    def _row(self, pk, updated_at, quizzes_completed=1):
+        return {
+            'id': pk, 'user_id': self.user.pk, 'category_id': None, 'difficulty_id': None,
+            'quizzes_completed': quizzes_completed, 'total_points': 10 * quizzes_completed,
+            'avg_score': 80.0, 'highest_score': 90, 'last_quiz_date': None,
+            'created_at': '2026-10-01T00:00:00+00:00', 'updated_at': updated_at,
+        }
+
+    def test_rows_are_inserted_and_updated(self):
+        """変更された行が主キーで反映され、Supabaseの更新日時が保存されることのテスト"""
+        new_pk = self.existing.pk + 1
+        fake = FakePullSupabase([
+            [self._row(self.existing.pk, '2026-10-19T01:00:00+00:00', 5)],
+            [self._row(new_pk, '2026-10-19T02:00:00+00:00', 2)],
+        ])
+
+        with patch('techskillsquiz.supabase_mixins.SupabaseModelMixin.sync_to_supabase') as mock_push:
+            result = pull_model_changes(UserStatistics, batch_size=1, supabase=fake)
+            mock_push.assert_not_called()
+
+        self.assertEqual(result.synced, 2)
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.quizzes_completed, 5)
+        self.assertEqual(
+            self.existing.updated_at,
+            datetime.datetime(2026, 10, 19, 1, 0, tzinfo=datetime.timezone.utc),
+        )
+        self.assertEqual(UserStatistics.objects.get(pk=new_pk).quizzes_completed, 2)
+        self.assertEqual([w['last_pk'] for w in fake.saved_watermarks], [str(self.existing.pk), str(new_pk)])
+        self.assertTrue(all(w['direction'] == 'pull' for w in fake.saved_watermarks))
+        # auto_now / auto_now_add は元に戻っている
+        self.assertTrue(UserStatistics._meta.get_field('updated_at').auto_now)
+
+    def test_resume_uses_keyset_filter(self):
+        """ウォーターマークの (updated_at, 主キー) より後の行のみを要求することのテスト"""
+        fake = FakePullSupabase([], watermark={'updated_at': '2026-10-19T01:00:00+00:00', 'last_pk': '7'})
+
+        result = pull_model_changes(UserStatistics, supabase=fake)
+
+        self.assertEqual(result.synced, 0)
+        self.assertEqual(fake.filters, [(
+            'or',
+            'updated_at.gt."2026-10-19T01:00:00+00:00",and(updated_at.eq."2026-10-19T01:00:00+00:00",id.gt.7)',
+        )])
+        self.assertEqual(fake.saved_watermarks, [])
+
+    @patch('techskillsquiz.supabase_data_sync.get_supabase_client')
+    def test_command_runs_once(self, mock_get_client):
+        """取り込みコマンドが対象モデルの変更を取り込むことのテスト"""
+        mock_get_client.return_value = FakePullSupabase([
+            [self._row(self.existing.pk, '2026-10-19T01:00:00+00:00', 3)],
+        ])
+        stdout = StringIO()
+
+        call_command('pull_supabase_data', '--model=UserStatistics', stdout=stdout)
+
+        self.assertIn('quiz.UserStatistics: 1件を取り込みました', stdout.getvalue())
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.quizzes_completed, 3)
+
+
+@override_settings(SUPABASE_PULL_MODELS=None)
+class PullModelsSettingTestCase(TestCase):
+    """取り込み対象のモデルと統計情報の集計方法の組み合わせのテスト"""
+
+    @override_settings(QUIZ_STATISTICS_BACKEND='trigger')
+    def test_trigger_backend_pulls_statistics(self):
+        """トリガーで集計する場合は統計情報のモデルを取り込むことのテスト"""
+        self.assertEqual(get_pull_models(), [UserStatistics, ActivityHistory])
+
+    @override_settings(QUIZ_STATISTICS_BACKEND='django')
+    def test_django_backend_pushes_statistics(self):
+        """Django側で集計する場合は統計情報のモデルを取り込まず、送信の対象とすることのテスト"""
+        self.assertEqual(get_pull_models(), [])
+        self.assertFalse(is_pull_model(UserStatistics))
+
+    @override_settings(QUIZ_STATISTICS_BACKEND='django', SUPABASE_PULL_MODELS=['quiz.UserStatistics'])
+    def test_django_backend_rejects_pulling_statistics(self):
+        """Django側で集計する場合に統計情報のモデルの取り込みを指定するとエラーになることのテスト"""
+        with self.assertRaises(ValueError):
+            get_pull_models()
+        with self.assertRaises(CommandError):
+            call_command('pull_supabase_data', stdout=StringIO())
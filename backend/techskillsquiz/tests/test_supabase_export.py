@@ -0,0 +1,111 @@
+"""
+Supabaseデータ出力のテスト
+
+SQLリテラル・COPY形式のエスケープと、ストリーミングでのSQLスクリプト出力をテストします。
+"""
+
+import datetime
+import io
+from django.core.management import call_command
+from django.test import TestCase
+
+from quiz.models import Category, DifficultyLevel, Quiz
+from techskillsquiz.supabase_export import (
+    sql_literal,
+    copy_value,
+    write_insert_sql,
+    write_copy_sql,
+    export_models,
+)
+from techskillsquiz.supabase_sync import get_data_migration_sql
+
+
+class ValueEscapingTestCase(TestCase):
+    """値のエスケープのテスト"""
+
+    def test_sql_literal(self):
+        """SQLリテラルへの変換のテスト"""
+        self.assertEqual(sql_literal(None), 'NULL')
+        self.assertEqual(sql_literal(True), 'TRUE')
+        self.assertEqual(sql_literal(42), '42')
+        self.assertEqual(sql_literal("O'Reilly \\ path"), "'O''Reilly \\ path'")
+        self.assertEqual(sql_literal(datetime.date(2026, 1, 2)), "'2026-01-02'")
+        self.assertEqual(sql_literal({'a': "it's"}), "'{\"a\": \"it''s\"}'")
+        with self.assertRaises(ValueError):
+            sql_literal('nul\x00char')
+
+    def test_copy_value(self):
+        """COPY形式のフィールドへの変換のテスト"""
+        self.assertEqual(copy_value(None), '\\N')
+        self.assertEqual(copy_value(False), 'f')
+        self.assertEqual(copy_value('tab\there\nnew\\line'), 'tab\\there\\nnew\\\\line')
+        self.assertEqual(copy_value("O'Reilly"), "O'Reilly")
+
+
+class StreamingExportTestCase(TestCase):
+    """ストリーミングでのSQLスクリプト出力のテスト"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name="初心者's\tカテゴリ", slug='category')
+        self.difficulty = DifficultyLevel.objects.create(name='初級', slug='beginner', level=1, point_multiplier=1)
+        for i in range(5):
+            Quiz.objects.create(
+                category=self.category,
+                difficulty=self.difficulty,
+                title=f'クイズ{i}',
+                description='説明',
+            )
+
+    def test_insert_is_chunked(self):
+        """INSERT文がチャンクごとに分割され、外部キーはカラム名で出力されることのテスト"""
+        stream = io.StringIO()
+
+        row_count = write_insert_sql(Quiz, stream, chunk_size=2)
+
+        sql = stream.getvalue()
+        self.assertEqual(row_count, 5)
+        self.assertEqual(sql.count('INSERT INTO "quiz_quiz"'), 3)
+        self.assertEqual(sql.count('ON CONFLICT DO NOTHING;'), 3)
+        self.assertIn('"category_id"', sql)
+        self.assertIn(f'({Quiz.objects.order_by("pk").first().pk}, {self.category.pk}, {self.difficulty.pk}, ', sql)
+
+    def test_copy_format(self):
+        """COPY形式で1行1レコードが出力され、終端が付くことのテスト"""
+        stream = io.StringIO()
+
+        row_count = write_copy_sql(Category, stream)
+
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(row_count, 1)
+        self.assertTrue(lines[0].startswith('COPY "quiz_category" ("id", "name", '))
+        self.assertIn("初心者's\\tカテゴリ", lines[1])
+        self.assertEqual(lines[-1], '\\.')
+
+    def test_export_in_dependency_order(self):
+        """複数モデルが外部キーの依存順に1つのトランザクションで出力されることのテスト"""
+        stream = io.StringIO()
+
+        counts = export_models([Quiz, Category, DifficultyLevel], stream)
+
+        sql = stream.getvalue()
+        self.assertEqual(counts[Quiz], 5)
+        self.assertLess(sql.index('COPY "quiz_category"'), sql.index('COPY "quiz_quiz"'))
+        self.assertLess(sql.index('COPY "quiz_difficultylevel"'), sql.index('COPY "quiz_quiz"'))
+        self.assertTrue(sql.rstrip().endswith('COMMIT;'))
+        self.assertIn("pg_get_serial_sequence('\"quiz_quiz\"', 'id')", sql)
+
+    def test_data_migration_sql_uses_foreign_key_columns(self):
+        """get_data_migration_sqlが外部キーの_idカラムを出力できることのテスト"""
+        sql = get_data_migration_sql(Quiz, list(Quiz.objects.all()))
+
+        self.assertIn('category_id, difficulty_id', sql)
+        self.assertIn(f"({self.category.pk}, {self.difficulty.pk}, 'クイズ", sql)
+
+    def test_command_writes_script(self):
+        """管理コマンドがSQLスクリプトを標準出力に書き出すことのテスト"""
+        stdout, stderr = io.StringIO(), io.StringIO()
+
+        call_command('export_supabase_data', '--app=quiz', '--model=Category', '--format=insert', stdout=stdout, stderr=stderr)
+
+        self.assertIn('INSERT INTO "quiz_category"', stdout.getvalue())
+        self.assertIn('1件', stderr.getvalue())
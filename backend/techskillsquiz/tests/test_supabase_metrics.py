@@ -0,0 +1,199 @@
+"""
+Supabase同期の計測レポートのテスト
+
+モデルごとのフェーズ別処理時間・呼び出し回数の記録、JSON / NDJSON形式での出力、
+2つのレポートの比較をテストします。
+"""
+
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+import httpx
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from quiz.models import Quiz
+from techskillsquiz.supabase_consistency import ConsistencyReport, MATCHED
+from techskillsquiz.supabase_metrics import (
+    start_recording,
+    stop_recording,
+    track_model,
+    track_phase,
+    record,
+    install_http_metrics,
+    write_report,
+    load_report,
+    diff_reports,
+    PHASE_DDL,
+    PHASE_INTROSPECTION,
+    RUN_LABEL,
+)
+from techskillsquiz.supabase_mixins import retry_on_error
+from techskillsquiz.supabase_sync import sync_models_to_supabase
+
+
+class MetricsRecordingTestCase(TestCase):
+    """計測値の記録のテスト"""
+
+    def tearDown(self):
+        stop_recording()
+
+    def test_records_per_model(self):
+        """計測値がスレッドの現在のモデルとフェーズに記録されることのテスト"""
+        recorder = start_recording()
+
+        with track_model(Quiz), track_phase(PHASE_DDL):
+            record(rows_checked=3)
+        record(http_calls=1)
+
+        report = stop_recording().to_dict()
+        self.assertEqual(report['models']['quiz.Quiz']['rows_checked'], 3)
+        self.assertIn(PHASE_DDL, report['models']['quiz.Quiz']['phases'])
+        self.assertEqual(report['models'][RUN_LABEL]['http_calls'], 1)
+        self.assertIs(recorder.get('quiz.Quiz'), recorder.models['quiz.Quiz'])
+
+    def test_nothing_is_recorded_when_stopped(self):
+        """計測していない間は記録しないことのテスト"""
+        with track_model(Quiz):
+            record(retries=1)
+
+        recorder = start_recording()
+        self.assertEqual(recorder.models, {})
+
+    @patch('techskillsquiz.supabase_mixins.time.sleep')
+    def test_retries_are_counted(self, mock_sleep):
+        """retry_on_errorによる再試行が記録されることのテスト"""
+        attempts = []
+
+        @retry_on_error(max_retries=2)
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise Exception("temporary error")
+            return True
+
+        start_recording()
+        with track_model(Quiz):
+            flaky()
+
+        self.assertEqual(stop_recording().models['quiz.Quiz'].retries, 2)
+
+    def test_http_calls_and_bytes(self):
+        """HTTPセッションのフックで呼び出し回数と送受信バイト数が記録されることのテスト"""
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, content=b'[{"ok": true}]'))
+        session = httpx.Client(base_url='https://example.supabase.co/rest/v1', transport=transport)
+        supabase = MagicMock()
+        supabase.postgrest.session = session
+
+        install_http_metrics(supabase)
+        install_http_metrics(supabase)
+        start_recording()
+        with track_model(Quiz):
+            session.post('/rpc/execute_sql', content=b'{"sql": "SELECT 1"}')
+            session.get('/quiz_quiz')
+
+        metrics = stop_recording().models['quiz.Quiz']
+        self.assertEqual(metrics.http_calls, 2)
+        self.assertEqual(metrics.rpc_calls, 1)
+        self.assertEqual(metrics.bytes_sent, len(b'{"sql": "SELECT 1"}'))
+        self.assertEqual(metrics.bytes_received, 2 * len(b'[{"ok": true}]'))
+
+    @patch('techskillsquiz.supabase_sync.save_schema_fingerprints')
+    @patch('techskillsquiz.supabase_sync.load_schema_fingerprints', return_value={})
+    @patch('techskillsquiz.supabase_sync.sync_django_model_to_supabase')
+    def test_sync_records_model_status(self, mock_sync_model, mock_load, mock_save):
+        """並列同期のワーカースレッドの計測値がモデルごとに記録されることのテスト"""
+        def sync_model(model, catalog=None):
+            with track_phase(PHASE_DDL):
+                record(rpc_calls=1)
+            return True
+        mock_sync_model.side_effect = sync_model
+
+        start_recording()
+        sync_models_to_supabase([Quiz], catalog=MagicMock())
+
+        report = stop_recording().to_dict()
+        self.assertEqual(report['models']['quiz.Quiz']['status'], 'ok')
+        self.assertEqual(report['models']['quiz.Quiz']['rpc_calls'], 1)
+        self.assertIn(PHASE_INTROSPECTION, report['models'][RUN_LABEL]['phases'])
+
+
+class ReportFileTestCase(TestCase):
+    """レポートの出力と比較のテスト"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def _report(self, seconds, rpc_calls):
+        recorder = start_recording()
+        metrics = recorder.get('quiz.Quiz')
+        recorder.add_phase(metrics, PHASE_DDL, seconds)
+        recorder.add(metrics, rpc_calls=rpc_calls)
+        stop_recording()
+        return recorder
+
+    def test_json_and_ndjson_round_trip(self):
+        """JSON / NDJSON形式で出力したレポートを同じ構造で読み込めることのテスト"""
+        recorder = self._report(1.5, 3)
+        json_path = os.path.join(self.directory, 'report.json')
+        ndjson_path = os.path.join(self.directory, 'report.ndjson')
+
+        write_report(recorder, json_path, 'json')
+        write_report(recorder, ndjson_path, 'ndjson')
+
+        with open(ndjson_path, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([line['type'] for line in lines], ['model', 'summary'])
+        self.assertEqual(load_report(ndjson_path)['models'], load_report(json_path)['models'])
+
+    def test_diff_reports(self):
+        """変化した項目のみが増加率とともに報告されることのテスト"""
+        old = self._report(1.0, 4).to_dict()
+        new = self._report(1.5, 4).to_dict()
+
+        rows = diff_reports(old, new)
+
+        self.assertEqual([row['metric'] for row in rows], ['total_seconds', 'phases.ddl'])
+        self.assertAlmostEqual(rows[1]['ratio'], 1.5)
+
+    def test_compare_command_fails_on_regression(self):
+        """しきい値を超える増加があればエラー終了することのテスト"""
+        old_path = os.path.join(self.directory, 'old.json')
+        new_path = os.path.join(self.directory, 'new.json')
+        write_report(self._report(1.0, 4), old_path)
+        write_report(self._report(1.0, 8), new_path)
+
+        stdout = StringIO()
+        call_command('compare_sync_reports', old_path, new_path, stdout=stdout)
+        self.assertIn('rpc_calls: 4 → 8', stdout.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command('compare_sync_reports', old_path, new_path, '--fail-on-regression', stdout=StringIO())
+
+        call_command('compare_sync_reports', old_path, new_path, '--threshold=1.5', '--fail-on-regression', stdout=StringIO())
+
+    @override_settings(SUPABASE_URL='https://example.supabase.co', SUPABASE_SERVICE_KEY='key')
+    @patch('techskillsquiz.management.commands.sync_supabase.get_supabase_client')
+    def test_check_writes_json_report(self, mock_get_client):
+        """整合性チェックの計測値がJSONレポートに出力されることのテスト"""
+        report = ConsistencyReport(Quiz)
+        for pk in (1, 2):
+            report.add(MATCHED, pk)
+        report_path = os.path.join(self.directory, 'check.json')
+
+        with patch.object(Quiz, 'verify_supabase_consistency_report', return_value=report):
+            call_command(
+                'sync_supabase', '--check', '--app=quiz', '--model=Quiz',
+                '--report', '--report-format=json', f'--report-file={report_path}',
+                stdout=StringIO(),
+            )
+
+        data = load_report(report_path)
+        self.assertEqual(data['mode'], 'check')
+        self.assertEqual(data['models']['quiz.Quiz']['status'], 'ok')
+        self.assertEqual(data['models']['quiz.Quiz']['rows_checked'], 2)
+        self.assertIn('data', data['models']['quiz.Quiz']['phases'])
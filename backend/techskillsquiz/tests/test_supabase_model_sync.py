@@ -224,24 +224,20 @@ class SupabaseModelSyncTestCase(TestCase):
             # テーブルが存在すると返す
             mock_check_table.return_value = True
             
-            # Djangoデータベースクエリ結果をモック
-            mock_instance1 = MagicMock(id=1, name="名前1")
-            mock_instance2 = MagicMock(id=2, name="名前2")
-            
-            # Djangoモデルインスタンスを準備
-            with patch.object(ModelSyncTest, 'objects') as mock_objects:
-                mock_objects.all.return_value = [mock_instance1, mock_instance2]
+            # Django側の主キー（主キー順のストリーム）をモック
+            with patch('techskillsquiz.supabase_consistency.iter_django_pks') as mock_django_pks:
+                mock_django_pks.return_value = iter([1, 2])
                 
-                # Supabaseデータをモック
+                # Supabaseの主キーをモック（1ページ目のみデータあり）
                 mock_supabase_data = [
-                    {"id": 1, "name": "名前1"},        # 一致するレコード
-                    {"id": 3, "name": "名前3"},        # Django側に存在しないレコード
+                    {"id": 1},        # 一致するレコード
+                    {"id": 3},        # Django側に存在しないレコード
                 ]
                 
                 # モックのクエリ結果を設定
-                mock_select = MagicMock()
-                mock_select.execute.return_value.data = mock_supabase_data
-                mock_client.table.return_value.select.return_value = mock_select
+                mock_select = mock_client.table.return_value.select.return_value
+                mock_select.order.return_value.limit.return_value.execute.return_value.data = mock_supabase_data
+                mock_select.gt.return_value.order.return_value.limit.return_value.execute.return_value.data = []
                 
                 # 一貫性検証を実行
                 matched, mismatched, mismatched_ids = ModelSyncTest.verify_supabase_consistency()
@@ -262,32 +258,17 @@ class SupabaseModelSyncTestCase(TestCase):
         mock_client = MagicMock()
         mock_get_client.return_value = mock_client
         
-        # 挿入が成功することをシミュレート
-        mock_insert = MagicMock()
-        mock_insert.execute.return_value.data = [
-            {"id": 1, "name": "テスト名前", "description": "テスト説明", "is_active": True}
-        ]
-        mock_client.table.return_value.insert.return_value = mock_insert
-        
-        # selectが空のリストを返すようにシミュレート
-        mock_select = MagicMock()
-        mock_select.execute.return_value.data = []
-        mock_client.table.return_value.select.return_value.eq.return_value = mock_select
-        mock_client.table.return_value.select.return_value = mock_select
-        
         # Djangoインスタンス
-        def mock_sync_to_supabase():
-            # 上記で設定したモックが使われるので、成功を返す
-            return True
-            
-        mock_instance1 = MagicMock(id=1, sync_to_supabase=MagicMock(side_effect=mock_sync_to_supabase))
-        mock_instance2 = MagicMock(id=2, sync_to_supabase=MagicMock(side_effect=mock_sync_to_supabase))
-        
-        # get()の結果をモック
-        with patch.object(ModelSyncTest, 'objects') as mock_objects:
-            mock_objects.get.side_effect = lambda pk: (
-                mock_instance1 if pk == 1 else mock_instance2 if pk == 2 else None
-            )
+        mock_instance1 = MagicMock(id=1)
+        mock_instance1.to_supabase_dict.return_value = {"id": 1, "name": "名前1"}
+        mock_instance2 = MagicMock(id=2)
+        mock_instance2.to_supabase_dict.return_value = {"id": 2, "name": "名前2"}
+        
+        # in_bulk()の結果をモック
+        with patch('techskillsquiz.supabase_consistency.load_record_chunk') as mock_load:
+            mock_load.side_effect = lambda model, ids: {
+                pk: instance for pk, instance in ((1, mock_instance1), (2, mock_instance2)) if pk in ids
+            }
             
             # 不整合検出結果
             matched_count = 5    # 一致するレコード数
@@ -305,11 +286,11 @@ class SupabaseModelSyncTestCase(TestCase):
             self.assertEqual(fixed_added, mismatched_count)    # 追加されたレコード数
             self.assertEqual(fixed_error, 0)    # エラー数
             
-            # レコード同期が呼び出されたことを確認
-            self.assertEqual(mock_objects.get.call_count, 2)
-            # 各レコードがsync_to_supabase()を呼んだことを確認
-            mock_instance1.sync_to_supabase.assert_called_once()
-            mock_instance2.sync_to_supabase.assert_called_once()
+            # レコードは1回のクエリで読み込まれ、1回のupsertで送信される
+            mock_load.assert_called_once_with(ModelSyncTest, [1, 2])
+            mock_client.table.return_value.upsert.assert_called_once_with(
+                [{"id": 1, "name": "名前1"}, {"id": 2, "name": "名前2"}], on_conflict='id'
+            )
     
     @patch.object(ModelSyncTest, 'objects')
     @patch.object(ModelSyncTest, 'get_supabase_client')
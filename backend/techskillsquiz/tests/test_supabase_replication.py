@@ -0,0 +1,201 @@
+"""
+論理レプリケーションによるミラーリングのテスト
+
+wal2jsonの変更のトランザクション単位での読み込み、Supabaseへのバッチでの反映、
+LSNのチェックポイントによる再起動時の読み飛ばしをテストします。
+"""
+
+import json
+
+from django.test import TestCase, override_settings
+
+from quiz.models import Category, DifficultyLevel, Quiz, UserStatistics
+from techskillsquiz.supabase_replication import (
+    CHECKPOINT_TABLE,
+    LogicalReplicationMirror,
+    group_transactions,
+    parse_lsn,
+)
+
+
+def wal2json(action, table=None, columns=None, identity=None):
+    """wal2json（format-version 2）の1行を作成します"""
+    payload = {'action': action}
+    if table:
+        payload.update({'schema': 'public', 'table': table})
+    if columns:
+        payload['columns'] = [{'name': k, 'type': 'text', 'value': v} for k, v in columns.items()]
+    if identity:
+        payload['identity'] = [{'name': k, 'type': 'integer', 'value': v} for k, v in identity.items()]
+    return json.dumps(payload)
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self._result = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, sql, params=None):
+        self.connection.executed.append((sql, params))
+        self._result = self.connection.respond(sql, params)
+
+    def executemany(self, sql, params):
+        self.connection.executed.append((sql, list(params)))
+
+    def fetchall(self):
+        return self._result
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+
+class FakeSource:
+    """レプリケーションスロットを持つDjangoのデータベース接続のモック"""
+
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.executed = []
+        self.advanced = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def respond(self, sql, params):
+        if 'pg_logical_slot_peek_changes' in sql:
+            return self.batches.pop(0) if self.batches else []
+        if 'pg_replication_slot_advance' in sql:
+            self.advanced.append(params[1])
+        return []
+
+
+class FakeTarget:
+    """Supabaseのデータベースへのpsycopg2の接続のモック"""
+
+    def __init__(self, checkpoint=None):
+        self.checkpoint = checkpoint
+        self.executed = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def respond(self, sql, params):
+        if sql.startswith(f'SELECT lsn::text FROM {CHECKPOINT_TABLE}'):
+            return [(self.checkpoint,)] if self.checkpoint else []
+        if sql.startswith(f'INSERT INTO {CHECKPOINT_TABLE}'):
+            self.checkpoint = params[1]
+        return []
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def statements(self, keyword):
+        return [(sql, params) for sql, params in self.executed if sql.startswith(keyword)]
+
+
+class LogicalReplicationMirrorTestCase(TestCase):
+    """論理レプリケーションによるミラーリングのテスト"""
+
+    def setUp(self):
+        self.quiz_table = Quiz._meta.db_table
+        self.category_table = Category._meta.db_table
+
+    def _batch(self):
+        return [
+            ('0/100', wal2json('B')),
+            ('0/110', wal2json('I', self.category_table, {'id': 1, 'name': 'Python'})),
+            ('0/120', wal2json('I', self.quiz_table, {'id': 10, 'title': '旧タイトル', 'category_id': 1})),
+            ('0/130', wal2json('U', self.quiz_table, {'id': 10, 'title': '新タイトル', 'category_id': 1}, {'id': 10})),
+            ('0/140', wal2json('C')),
+            ('0/150', wal2json('B')),
+            ('0/160', wal2json('D', self.quiz_table, identity={'id': 11})),
+            ('0/170', wal2json('C')),
+        ]
+
+    def _mirror(self, source, target, models_list=(Category, DifficultyLevel, Quiz)):
+        return LogicalReplicationMirror(list(models_list), source, target)
+
+    def test_group_transactions(self):
+        """変更がコミットのLSNとともにトランザクション単位にまとめられることのテスト"""
+        transactions = group_transactions(self._batch())
+
+        self.assertEqual([t.commit_lsn for t in transactions], ['0/140', '0/170'])
+        self.assertEqual([c.action for c in transactions[0].changes], ['I', 'I', 'U'])
+        self.assertLess(parse_lsn('0/FFFFFFFF'), parse_lsn('1/0'))
+
+    def test_batch_is_applied_with_checkpoint_in_one_transaction(self):
+        """最後の状態のみを依存順に反映し、同じトランザクションでチェックポイントを保存してからスロットを進めることのテスト"""
+        source = FakeSource([self._batch()])
+        target = FakeTarget()
+
+        result = self._mirror(source, target).run_once()
+
+        self.assertEqual((result.transactions, result.upserted, result.deleted), (2, 2, 1))
+        inserts = target.statements('INSERT INTO "')
+        self.assertIn(f'"{self.category_table}"', inserts[0][0])
+        self.assertIn(f'"{self.quiz_table}"', inserts[1][0])
+        self.assertEqual(inserts[1][1], [[10, '新タイトル', 1]])
+        self.assertIn('ON CONFLICT ("id") DO UPDATE SET', inserts[1][0])
+        self.assertEqual(target.statements('DELETE FROM')[0][1], [[11]])
+        self.assertEqual(target.checkpoint, '0/170')
+        self.assertEqual(target.commits, 2)  # チェックポイントの読み込み + 反映
+        self.assertEqual(source.advanced, ['0/170'])
+
+    def test_transactions_before_checkpoint_are_skipped(self):
+        """再起動時にチェックポイント以前にコミットされたトランザクションを読み飛ばすことのテスト"""
+        source = FakeSource([self._batch()])
+        target = FakeTarget(checkpoint='0/140')
+
+        result = self._mirror(source, target).run_once()
+
+        self.assertEqual((result.transactions, result.skipped_transactions), (1, 1))
+        self.assertEqual(target.statements('INSERT INTO "'), [])
+        self.assertEqual(len(target.statements('DELETE FROM')), 1)
+        self.assertEqual(source.advanced, ['0/170'])
+
+    def test_slot_is_not_advanced_on_failure(self):
+        """反映に失敗した場合はロールバックし、スロットを進めないことのテスト"""
+        source = FakeSource([self._batch()])
+        target = FakeTarget()
+        target.cursor = lambda: FailingCursor(target)
+
+        with self.assertRaises(Exception):
+            self._mirror(source, target).run_once()
+
+        self.assertEqual(target.rollbacks, 1)
+        self.assertEqual(source.advanced, [])
+
+    def test_pull_models_are_not_mirrored(self):
+        """Supabase側で更新される取り込み対象のモデルはミラー対象から除外されることのテスト"""
+        mirror = self._mirror(FakeSource([]), FakeTarget(), [Quiz, UserStatistics])
+
+        self.assertEqual(list(mirror.models), [self.quiz_table])
+
+    @override_settings(SUPABASE_AUTO_SYNC=True, SUPABASE_MIRROR_BACKEND='replication')
+    def test_signals_do_not_mirror_in_replication_mode(self):
+        """論理レプリケーションでミラーリングする設定ではシグナルで送信しないことのテスト"""
+        from unittest.mock import patch
+
+        with patch('techskillsquiz.supabase_mixins.SupabaseModelMixin.sync_to_supabase') as mock_sync:
+            category = Category.objects.create(name='カテゴリ', slug='category')
+            difficulty = DifficultyLevel.objects.create(name='初級', slug='beginner', level=1, point_multiplier=1)
+            Quiz.objects.create(category=category, difficulty=difficulty, title='クイズ', description='説明')
+
+        mock_sync.assert_not_called()
+
+
+class FailingCursor(FakeCursor):
+    """upsertで失敗するカーソル"""
+
+    def executemany(self, sql, params):
+        raise Exception('connection reset')
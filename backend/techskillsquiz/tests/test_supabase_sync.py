@@ -9,10 +9,25 @@ from techskillsquiz.supabase_sync import (
     check_table_exists_with_fallback,
     get_supabase_client,
     sync_django_model_to_supabase,
+    get_model_dependencies,
+    sort_models_by_dependency,
+    sync_models_to_supabase,
+    get_model_schema_fingerprint,
+    get_model_table_schema,
+    alter_supabase_table,
+    create_supabase_table,
+    get_supabase_models,
+    build_supabase_model_registry,
+    post_migration_sync_handler,
+    plan_models_sync,
+    get_constraint_name,
+    MAX_IDENTIFIER_LENGTH,
+    MIRRORED_TABLES_TABLE,
     FIELD_TYPE_MAPPING,
     SupabaseOperationError
 )
 from techskillsquiz.supabase_mixins import SupabaseModelMixin
+from techskillsquiz.supabase_catalog import SupabaseCatalogSnapshot
 
 # --- Test Models ---
 
@@ -320,5 +335,568 @@ class SupabaseModelSyncStructureTestCase(TestCase):
         # create/alter 関数の内部で OneToOneField (primary_key=True) が主キーとして扱われることを期待
 
 
+class SupabaseSyncDependencyOrderTestCase(TestCase):
+    """
+    外部キー依存関係に基づく同期順序と並列同期のテストケース
+    """
+
+    def test_dependencies_from_foreign_keys(self):
+        """ForeignKey・OneToOneFieldの参照先が依存関係になることのテスト"""
+        graph = get_model_dependencies([RelatedModel, ParentModel, ChildModel, OneToOneRelatedModel, OneToOneModel])
+
+        self.assertEqual(graph[RelatedModel], set())
+        # ChildModelは親モデルへのOneToOne（parent_ptr）とRelatedModelへのFKを持つ
+        self.assertEqual(graph[ChildModel], {ParentModel, RelatedModel})
+        self.assertEqual(graph[OneToOneModel], {OneToOneRelatedModel})
+
+    def test_dependencies_outside_sync_set_are_ignored(self):
+        """同期対象外のモデルへの参照は依存関係に含まれないことのテスト"""
+        graph = get_model_dependencies([ChildModel])
+
+        self.assertEqual(graph[ChildModel], set())
+
+    def test_sort_models_by_dependency(self):
+        """依存先のモデルが前の段に並ぶことのテスト"""
+        levels = sort_models_by_dependency([ChildModel, OneToOneModel, RelatedModel, ParentModel, OneToOneRelatedModel])
+
+        self.assertEqual(levels, [
+            [RelatedModel, ParentModel, OneToOneRelatedModel],
+            [ChildModel, OneToOneModel],
+        ])
+
+    @patch('techskillsquiz.supabase_sync.sync_django_model_to_supabase')
+    def test_sync_models_respects_dependency_order(self, mock_sync):
+        """依存先の同期が完了してから依存元の同期が始まることのテスト"""
+        import threading
+        lock = threading.Lock()
+        events = []
+
+        def record_sync(model, catalog=None):
+            with lock:
+                events.append(('start', model))
+            with lock:
+                events.append(('end', model))
+            return model is not ParentModel
+
+        mock_sync.side_effect = record_sync
+        completed = []
+
+        results = sync_models_to_supabase(
+            [ChildModel, RelatedModel, ParentModel],
+            jobs=3,
+            on_complete=lambda model, success, elapsed: completed.append((model, success)),
+            catalog=MagicMock(),
+        )
+
+        self.assertEqual(results, {RelatedModel: True, ParentModel: False, ChildModel: True})
+        self.assertEqual(len(completed), 3)
+        child_start = events.index(('start', ChildModel))
+        self.assertLess(events.index(('end', RelatedModel)), child_start)
+        self.assertLess(events.index(('end', ParentModel)), child_start)
+
+
+class SupabaseSchemaFingerprintTestCase(TestCase):
+    """
+    スキーマのフィンガープリントによる同期スキップのテストケース
+    """
+
+    def test_fingerprint_is_stable(self):
+        """同じモデルのフィンガープリントは毎回同じ値になることのテスト"""
+        self.assertEqual(get_model_schema_fingerprint(RelatedModel), get_model_schema_fingerprint(RelatedModel))
+        self.assertNotEqual(get_model_schema_fingerprint(RelatedModel), get_model_schema_fingerprint(ParentModel))
+
+    def _mock_client_with_fingerprints(self, mock_get_client, fingerprints):
+        mock_supabase = MagicMock()
+        mock_supabase.table.return_value.select.return_value.execute.return_value.data = [
+            {'table_name': table_name, 'fingerprint': fingerprint}
+            for table_name, fingerprint in fingerprints.items()
+        ]
+        mock_get_client.return_value = mock_supabase
+        # 同期状態テーブルは service_role のクライアントで読み書きする
+        admin = patch('techskillsquiz.supabase_sync.get_supabase_admin_client', return_value=mock_supabase)
+        admin.start()
+        self.addCleanup(admin.stop)
+        return mock_supabase
+
+    @patch('techskillsquiz.supabase_sync.sync_django_model_to_supabase')
+    @patch('techskillsquiz.supabase_sync.get_supabase_client')
+    def test_unchanged_models_are_skipped(self, mock_get_client, mock_sync):
+        """フィンガープリントが一致するモデルはスキーマ情報を取得せずスキップされることのテスト"""
+        mock_supabase = self._mock_client_with_fingerprints(mock_get_client, {
+            RelatedModel._meta.db_table: get_model_schema_fingerprint(RelatedModel),
+        })
+        skipped = []
+
+        results = sync_models_to_supabase([RelatedModel], on_skip=skipped.append)
+
+        self.assertEqual(results, {RelatedModel: True})
+        self.assertEqual(skipped, [RelatedModel])
+        mock_sync.assert_not_called()
+        mock_supabase.rpc.assert_not_called()
+
+    @patch('techskillsquiz.supabase_sync.sync_django_model_to_supabase')
+    @patch('techskillsquiz.supabase_sync.get_supabase_client')
+    def test_changed_models_are_synced_and_recorded(self, mock_get_client, mock_sync):
+        """フィンガープリントが異なるモデルは同期され、新しい値が保存されることのテスト"""
+        mock_supabase = self._mock_client_with_fingerprints(mock_get_client, {
+            RelatedModel._meta.db_table: 'outdated',
+        })
+        mock_sync.return_value = True
+
+        results = sync_models_to_supabase([RelatedModel])
+
+        self.assertEqual(results, {RelatedModel: True})
+        mock_sync.assert_called_once_with(RelatedModel, catalog=ANY)
+        upserts = mock_supabase.table.return_value.upsert.call_args_list
+        rows = upserts[0].args[0]
+        self.assertEqual(rows[0]['table_name'], RelatedModel._meta.db_table)
+        self.assertEqual(rows[0]['fingerprint'], get_model_schema_fingerprint(RelatedModel))
+        # 同期したテーブルを範囲ダイジェストの対象として登録する
+        self.assertEqual(mock_supabase.table.call_args_list[-1].args, (MIRRORED_TABLES_TABLE,))
+        self.assertEqual([row['table_name'] for row in upserts[-1].args[0]], [RelatedModel._meta.db_table])
+
+    @patch('techskillsquiz.supabase_sync.sync_django_model_to_supabase')
+    @patch('techskillsquiz.supabase_sync.get_supabase_client')
+    def test_unchanged_models_are_registered_as_mirrored(self, mock_get_client, mock_sync):
+        """スキップしたモデルのテーブルも範囲ダイジェストの対象として登録されることのテスト"""
+        mock_supabase = self._mock_client_with_fingerprints(mock_get_client, {
+            RelatedModel._meta.db_table: get_model_schema_fingerprint(RelatedModel),
+        })
+
+        sync_models_to_supabase([RelatedModel])
+
+        mock_supabase.table.assert_called_with(MIRRORED_TABLES_TABLE)
+        rows = mock_supabase.table.return_value.upsert.call_args.args[0]
+        self.assertEqual([row['table_name'] for row in rows], [RelatedModel._meta.db_table])
+
+    @patch('techskillsquiz.supabase_sync.get_supabase_client')
+    def test_partially_applied_model_is_not_recorded(self, mock_get_client):
+        """外部キーの作成に失敗したモデルはフィンガープリントを保存せず、次回の同期で再試行されることのテスト"""
+        mock_supabase = self._mock_client_with_fingerprints(mock_get_client, {})
+
+        def rpc(name, params):
+            call = MagicMock()
+            if name == 'execute_sql' and 'FOREIGN KEY' in params['sql']:
+                call.execute.side_effect = Exception('relation does not exist')
+            return call
+
+        mock_supabase.rpc.side_effect = rpc
+
+        results = sync_models_to_supabase([ChildModel], catalog=SupabaseCatalogSnapshot({}))
+
+        self.assertEqual(results, {ChildModel: False})
+        mock_supabase.table.return_value.upsert.assert_not_called()
+
+    @patch('techskillsquiz.supabase_sync.sync_django_model_to_supabase')
+    @patch('techskillsquiz.supabase_sync.get_supabase_client')
+    def test_force_syncs_unchanged_models(self, mock_get_client, mock_sync):
+        """forceを指定するとフィンガープリントが一致しても同期されることのテスト"""
+        self._mock_client_with_fingerprints(mock_get_client, {
+            RelatedModel._meta.db_table: get_model_schema_fingerprint(RelatedModel),
+        })
+        mock_sync.return_value = True
+
+        sync_models_to_supabase([RelatedModel], force=True)
+
+        mock_sync.assert_called_once_with(RelatedModel, catalog=ANY)
+
+
+class SupabaseAlterTableTestCase(TestCase):
+    """
+    テーブル変更のDDLが1つの文にまとめて実行されることのテストケース
+    """
+
+    def _catalog_with_columns(self, columns):
+        catalog = MagicMock()
+        catalog.table_exists.return_value = True
+        catalog.get_columns.return_value = columns
+        return catalog
+
+    @patch('techskillsquiz.supabase_sync.get_supabase_client')
+    def test_changes_are_sent_in_single_statement(self, mock_get_client):
+        """型変更とNULL制約変更が1回のexecute_sqlで実行されることのテスト"""
+        mock_supabase = MagicMock()
+        mock_get_client.return_value = mock_supabase
+        id_type = get_model_table_schema(RelatedModel)['fields']['id']['type']
+        catalog = self._catalog_with_columns([
+            {'column_name': 'id', 'data_type': id_type, 'is_nullable': 'NO'},
+            {'column_name': 'name', 'data_type': 'text', 'is_nullable': 'YES'},
+        ])
+
+        self.assertTrue(alter_supabase_table(RelatedModel, catalog=catalog))
+
+        mock_supabase.rpc.assert_called_once()
+        sql = mock_supabase.rpc.call_args.args[1]['sql']
+        self.assertTrue(sql.startswith(f"ALTER TABLE {RelatedModel._meta.db_table}\n"))
+        self.assertEqual(sql.count('ALTER TABLE'), 1)
+        self.assertIn('ALTER COLUMN name TYPE varchar(50)', sql)
+        self.assertIn('ALTER COLUMN name SET NOT NULL', sql)
+
+    @patch('techskillsquiz.supabase_sync.get_supabase_client')
+    def test_no_statement_when_schema_matches(self, mock_get_client):
+        """差分がない場合はDDLを実行しないことのテスト"""
+        mock_supabase = MagicMock()
+        mock_get_client.return_value = mock_supabase
+        fields = get_model_table_schema(RelatedModel)['fields']
+        catalog = self._catalog_with_columns([
+            {'column_name': name, 'data_type': info['type'], 'is_nullable': 'NO'}
+            for name, info in fields.items()
+        ])
+
+        self.assertTrue(alter_supabase_table(RelatedModel, catalog=catalog))
+        mock_supabase.rpc.assert_not_called()
+
+    @patch('techskillsquiz.supabase_sync.get_supabase_client')
+    def test_failure_is_reported(self, mock_get_client):
+        """DDLの実行に失敗した場合はFalseを返すことのテスト"""
+        mock_supabase = MagicMock()
+        mock_supabase.rpc.return_value.execute.side_effect = Exception("column does not exist")
+        mock_get_client.return_value = mock_supabase
+        catalog = self._catalog_with_columns([
+            {'column_name': 'id', 'data_type': 'text', 'is_nullable': 'YES'},
+        ])
+
+        self.assertFalse(alter_supabase_table(RelatedModel, catalog=catalog))
+        mock_supabase.rpc.assert_called_once()
+
+
+class SupabaseSyncPlanTestCase(TestCase):
+    """
+    同期計画（--plan）のテストケース
+    """
+
+    def _columns(self, model, overrides=None):
+        fields = get_model_table_schema(model)['fields']
+        columns = [
+            {'column_name': name, 'data_type': info['type'], 'is_nullable': 'YES' if info['nullable'] else 'NO'}
+            for name, info in fields.items()
+        ]
+        return columns + (overrides or [])
+
+    @patch('techskillsquiz.supabase_sync.get_supabase_client')
+    def test_plan_from_snapshot_without_rpc(self, mock_get_client):
+        """スナップショットのみから依存順にDDLが求められ、RPCが実行されないことのテスト"""
+        columns = [c for c in self._columns(RelatedModel) if c['column_name'] != 'name']
+        catalog = SupabaseCatalogSnapshot({
+            RelatedModel._meta.db_table: {'columns': columns + [
+                {'column_name': 'legacy', 'data_type': 'text', 'is_nullable': 'YES'},
+            ]},
+        })
+
+        plans = plan_models_sync([ChildModel, ParentModel, RelatedModel], catalog=catalog)
+
+        self.assertEqual([plan.model for plan in plans][-1], ChildModel)
+        related_plan = next(plan for plan in plans if plan.model is RelatedModel)
+        self.assertEqual(related_plan.action, 'alter')
+        self.assertIn('ADD COLUMN name varchar(50) NOT NULL', related_plan.statements[0])
+        self.assertEqual(related_plan.extra_columns, ['legacy'])
+        child_plan = plans[-1]
+        self.assertEqual(child_plan.action, 'create')
+        self.assertTrue(child_plan.statements[0].startswith(f"CREATE TABLE IF NOT EXISTS {ChildModel._meta.db_table}"))
+        mock_get_client.assert_not_called()
+
+    def test_no_changes(self):
+        """スナップショットとスキーマが一致する場合はDDLがないことのテスト"""
+        catalog = SupabaseCatalogSnapshot({
+            RelatedModel._meta.db_table: {'columns': self._columns(RelatedModel)},
+        })
+
+        plans = plan_models_sync([RelatedModel], catalog=catalog)
+
+        self.assertFalse(plans[0].has_changes)
+
+    @patch('techskillsquiz.supabase_sync.load_catalog_snapshot', return_value=None)
+    def test_snapshot_is_required(self, mock_load):
+        """スナップショットを取得できない場合はエラーになることのテスト"""
+        with self.assertRaises(SupabaseOperationError):
+            plan_models_sync([RelatedModel])
+
+    @override_settings(SUPABASE_URL='https://example.supabase.co', SUPABASE_SERVICE_KEY='key')
+    @patch('techskillsquiz.supabase_sync.load_catalog_snapshot')
+    def test_command_prints_script_and_fails_on_drift(self, mock_load):
+        """--planがSQLスクリプトを出力し、差分があればエラー終了することのテスト"""
+        from io import StringIO
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        from quiz.models import Quiz
+
+        mock_load.return_value = SupabaseCatalogSnapshot({})
+        stdout = StringIO()
+
+        with self.assertRaises(CommandError):
+            call_command('sync_supabase', '--plan', '--app=quiz', '--model=Quiz', stdout=stdout)
+
+        script = stdout.getvalue()
+        self.assertIn('BEGIN;', script)
+        self.assertIn(f'CREATE TABLE IF NOT EXISTS {Quiz._meta.db_table}', script)
+        self.assertTrue(script.rstrip().endswith('COMMIT;'))
+
+
+class SupabaseIndexSyncTestCase(TestCase):
+    """
+    Meta.indexes と一意制約の同期のテストケース
+    """
+
+    def setUp(self):
+        from quiz.models import UserStatistics
+        self.model = UserStatistics
+        self.schema = get_model_table_schema(UserStatistics)
+        self.table_name = self.schema['table_name']
+
+    def _catalog(self, constraints=None, indexes=None):
+        # 外部キー制約はテーブル作成時に追加済みとする
+        constraints = (constraints or []) + [
+            {'name': fk['name'], 'type': 'f',
+             'definition': f"FOREIGN KEY ({fk['column']}) REFERENCES {fk['references']['table']}({fk['references']['column']})"}
+            for fk in self.schema['foreign_keys']
+        ]
+        fields = self.schema['fields']
+        columns = [
+            {'column_name': name, 'data_type': info['type'], 'is_nullable': 'YES' if info['nullable'] else 'NO'}
+            for name, info in fields.items()
+        ]
+        return SupabaseCatalogSnapshot({
+            self.table_name: {'columns': columns, 'constraints': constraints, 'indexes': indexes or []},
+        })
+
+    def test_schema_includes_indexes_and_unique_constraints(self):
+        """unique_together と Meta.indexes がカラム名で取得されることのテスト"""
+        self.assertEqual(
+            [c['columns'] for c in self.schema['unique_constraints']],
+            [['user_id', 'category_id', 'difficulty_id']],
+        )
+        self.assertEqual(
+            [i['columns'] for i in self.schema['indexes']],
+            [['user_id', 'category_id'], ['user_id', 'difficulty_id']],
+        )
+
+    def test_create_plan_includes_constraints_and_indexes(self):
+        """新規テーブルでは一意制約をCREATE TABLEに含め、インデックスを同じトランザクションで作成することのテスト"""
+        plan = plan_models_sync([self.model], catalog=SupabaseCatalogSnapshot({}))[0]
+
+        self.assertIn('UNIQUE NULLS NOT DISTINCT (user_id, category_id, difficulty_id)', plan.statements[0])
+        self.assertTrue(any(s.startswith('CREATE INDEX IF NOT EXISTS') for s in plan.statements))
+        self.assertEqual(plan.index_statements, [])
+
+    def test_alter_plan_adds_missing_constraints_and_indexes_concurrently(self):
+        """既存のテーブルに不足する一意制約はALTER TABLEで、インデックスはCONCURRENTLYで作成することのテスト"""
+        plan = plan_models_sync([self.model], catalog=self._catalog())[0]
+
+        self.assertEqual(plan.action, 'alter')
+        self.assertIn('ADD CONSTRAINT', plan.statements[0])
+        self.assertEqual(len(plan.index_statements), 2)
+        self.assertTrue(all(s.startswith('CREATE INDEX CONCURRENTLY IF NOT EXISTS') for s in plan.index_statements))
+
+    def test_existing_constraints_are_matched_by_columns(self):
+        """名前が異なっても同じカラムの一意制約・インデックスがあれば差分としないことのテスト"""
+        catalog = self._catalog(
+            constraints=[{'name': 'stats_uniq', 'type': 'u', 'definition': 'UNIQUE NULLS NOT DISTINCT (user_id, category_id, difficulty_id)'}],
+            indexes=[
+                {'name': 'idx_a', 'is_unique': False, 'definition': f'CREATE INDEX idx_a ON public.{self.table_name} USING btree (user_id, category_id)'},
+                {'name': self.schema['indexes'][1]['name'], 'is_unique': False, 'definition': ''},
+            ],
+        )
+
+        plan = plan_models_sync([self.model], catalog=catalog)[0]
+
+        self.assertFalse(plan.has_changes)
+
+    def test_nulls_distinct_constraint_is_not_treated_as_existing(self):
+        """同じカラムでもNULLを区別する一意制約しかない場合は NULLS NOT DISTINCT の制約を追加することのテスト"""
+        catalog = self._catalog(
+            constraints=[{'name': 'stats_uniq', 'type': 'u', 'definition': 'UNIQUE (user_id, category_id, difficulty_id)'}],
+        )
+
+        plan = plan_models_sync([self.model], catalog=catalog)[0]
+
+        self.assertIn('UNIQUE NULLS NOT DISTINCT (user_id, category_id, difficulty_id)', plan.statements[0])
+
+    def test_alter_plan_adds_unique_constraints_after_columns(self):
+        """一意制約はカラムの変更とは別のALTER TABLE文で、カラムの変更の後に追加することのテスト"""
+        catalog = self._catalog()
+        catalog.tables[self.table_name]['columns'] = [
+            col for col in catalog.get_columns(self.table_name) if col['column_name'] != 'highest_score'
+        ]
+
+        plan = plan_models_sync([self.model], catalog=catalog)[0]
+
+        self.assertIn('ADD COLUMN highest_score', plan.statements[0])
+        self.assertNotIn('ADD CONSTRAINT', plan.statements[0])
+        self.assertIn('UNIQUE NULLS NOT DISTINCT (user_id, category_id, difficulty_id)', plan.statements[1])
+
+    @patch('techskillsquiz.supabase_sync.get_supabase_client')
+    def test_alter_does_not_create_missing_indexes(self, mock_get_client):
+        """alter_supabase_tableは不足するインデックスをCONCURRENTLYなしで作成せず、未完了としてFalseを返すことのテスト"""
+        mock_supabase = MagicMock()
+        mock_get_client.return_value = mock_supabase
+
+        with self.assertLogs('techskillsquiz.supabase_sync', level='WARNING') as logs:
+            result = alter_supabase_table(self.model, catalog=self._catalog())
+
+        self.assertFalse(result)
+        executed = [c.args[1]['sql'] for c in mock_supabase.rpc.call_args_list]
+        self.assertEqual(len(executed), 1)
+        self.assertIn('ADD CONSTRAINT', executed[0])
+        self.assertFalse(any(sql.startswith('CREATE INDEX') for sql in executed))
+        self.assertTrue(any('CREATE INDEX CONCURRENTLY IF NOT EXISTS' in line for line in logs.output))
+
+    @patch('techskillsquiz.supabase_sync.get_supabase_client')
+    def test_alter_keeps_column_changes_when_unique_constraint_fails(self, mock_get_client):
+        """一意制約の追加に失敗してもカラムの変更は適用し、Falseを返すことのテスト"""
+        mock_supabase = MagicMock()
+        mock_get_client.return_value = mock_supabase
+        catalog = self._catalog(
+            indexes=[{'name': index['name'], 'is_unique': False, 'definition': ''} for index in self.schema['indexes']],
+        )
+        catalog.tables[self.table_name]['columns'] = [
+            col for col in catalog.get_columns(self.table_name) if col['column_name'] != 'highest_score'
+        ]
+
+        def rpc(name, params):
+            call = MagicMock()
+            if 'ADD CONSTRAINT' in params['sql']:
+                call.execute.side_effect = Exception('could not create unique index')
+            return call
+
+        mock_supabase.rpc.side_effect = rpc
+
+        self.assertFalse(alter_supabase_table(self.model, catalog=catalog))
+
+        executed = [c.args[1]['sql'] for c in mock_supabase.rpc.call_args_list]
+        self.assertIn('ADD COLUMN highest_score', executed[0])
+        self.assertNotIn('ADD CONSTRAINT', executed[0])
+        self.assertIn('ADD CONSTRAINT', executed[1])
+
+    @patch('techskillsquiz.supabase_sync.get_supabase_client')
+    def test_alter_adds_missing_foreign_keys(self, mock_get_client):
+        """テーブル作成時に追加できなかった外部キー制約を追加することのテスト"""
+        mock_supabase = MagicMock()
+        mock_get_client.return_value = mock_supabase
+        catalog = self._catalog(
+            constraints=[{'name': self.schema['unique_constraints'][0]['name'], 'type': 'u',
+                          'definition': 'UNIQUE NULLS NOT DISTINCT (user_id, category_id, difficulty_id)'}],
+            indexes=[{'name': index['name'], 'is_unique': False, 'definition': ''} for index in self.schema['indexes']],
+        )
+        missing = self.schema['foreign_keys'][0]
+        catalog.tables[self.table_name]['constraints'] = [
+            c for c in catalog.get_constraints(self.table_name) if c['name'] != missing['name']
+        ]
+
+        self.assertTrue(alter_supabase_table(self.model, catalog=catalog))
+
+        executed = [c.args[1]['sql'] for c in mock_supabase.rpc.call_args_list]
+        self.assertEqual(len(executed), 1)
+        self.assertIn(f"ADD CONSTRAINT {missing['name']}", executed[0])
+        self.assertIn(f"FOREIGN KEY ({missing['column']})", executed[0])
+
+    @patch('techskillsquiz.supabase_sync.get_supabase_client')
+    def test_create_reports_failed_index(self, mock_get_client):
+        """テーブルを作成できてもインデックスの作成に失敗した場合はFalseを返すことのテスト"""
+        mock_supabase = MagicMock()
+        mock_get_client.return_value = mock_supabase
+
+        def rpc(name, params):
+            call = MagicMock()
+            if params['sql'].startswith('CREATE INDEX'):
+                call.execute.side_effect = Exception('out of memory')
+            return call
+
+        mock_supabase.rpc.side_effect = rpc
+
+        self.assertFalse(create_supabase_table(self.model))
+
+    def _no_catalog_client(self, introspect_error=None):
+        """スナップショットなしの経路で使うRPCを名前ごとに応答するクライアントを返す"""
+        catalog = self._catalog(
+            constraints=[{'name': self.schema['unique_constraints'][0]['name'], 'type': 'u',
+                          'definition': 'UNIQUE NULLS NOT DISTINCT (user_id, category_id, difficulty_id)'}],
+            indexes=[
+                {'name': index['name'], 'is_unique': False,
+                 'definition': f"CREATE INDEX {index['name']} ON public.{self.table_name} USING btree ({', '.join(index['columns'])})"}
+                for index in self.schema['indexes']
+            ],
+        )
+        responses = {
+            'select_columns': catalog.get_columns(self.table_name),
+            'introspect_schema': catalog.tables,
+            'execute_sql': None,  # execute_sql は RETURNS VOID
+        }
+
+        def rpc(name, params):
+            call = MagicMock()
+            if name == 'introspect_schema' and introspect_error:
+                call.execute.side_effect = introspect_error
+            else:
+                call.execute.return_value.data = responses[name]
+            return call
+
+        mock_supabase = MagicMock()
+        mock_supabase.rpc.side_effect = rpc
+        # introspect_schema は service_role のクライアントで呼び出す
+        admin = patch('techskillsquiz.supabase_sync.get_supabase_admin_client', return_value=mock_supabase)
+        admin.start()
+        self.addCleanup(admin.stop)
+        return mock_supabase
+
+    @patch('techskillsquiz.supabase_sync.get_supabase_client')
+    def test_alter_without_catalog_keeps_existing_constraints(self, mock_get_client):
+        """スナップショットなしで繰り返し同期しても、既存の一意制約・インデックスを追加しないことのテスト"""
+        mock_supabase = self._no_catalog_client()
+        mock_get_client.return_value = mock_supabase
+
+        for _ in range(2):
+            self.assertTrue(alter_supabase_table(self.model))
+
+        called = [c.args[0] for c in mock_supabase.rpc.call_args_list]
+        self.assertEqual(called.count('introspect_schema'), 2)
+        self.assertNotIn('execute_sql', called)
+
+    @patch('techskillsquiz.supabase_sync.get_supabase_client')
+    def test_alter_without_catalog_skips_diff_when_introspection_fails(self, mock_get_client):
+        """制約・インデックスを取得できない場合は差分確認を省略し、同期の失敗として報告することのテスト"""
+        mock_supabase = self._no_catalog_client(introspect_error=Exception('permission denied'))
+        mock_get_client.return_value = mock_supabase
+
+        self.assertFalse(alter_supabase_table(self.model))
+
+        self.assertNotIn('execute_sql', [c.args[0] for c in mock_supabase.rpc.call_args_list])
+
+    def test_long_constraint_name_is_truncated(self):
+        """識別子の長さの上限を超える名前が一意に切り詰められることのテスト"""
+        name = get_constraint_name('a' * 40, ['column_one', 'column_two'], 'uniq')
+        other = get_constraint_name('a' * 40, ['column_one', 'column_three'], 'uniq')
+
+        self.assertLessEqual(len(name), MAX_IDENTIFIER_LENGTH)
+        self.assertTrue(name.endswith('_uniq'))
+        self.assertNotEqual(name, other)
+
+
+class PostMigrateSyncHandlerTestCase(TestCase):
+    """
+    マイグレーション後の同期ハンドラとモデルレジストリのテストケース
+    """
+
+    def test_registry_is_cached(self):
+        """レジストリ構築後はモデルを再走査しないことのテスト"""
+        registry = build_supabase_model_registry()
+
+        with patch.object(apps, 'get_app_configs') as mock_get_app_configs:
+            self.assertEqual(get_supabase_models(), registry)
+            mock_get_app_configs.assert_not_called()
+
+    @override_settings(SUPABASE_AUTO_SYNC=True, SUPABASE_URL='https://example.supabase.co', SUPABASE_SERVICE_KEY='key')
+    @patch('techskillsquiz.supabase_sync.sync_models_to_supabase')
+    def test_sync_runs_once_per_migrate(self, mock_sync):
+        """全アプリにpost_migrateが送信されても同期は1回だけ実行されることのテスト"""
+        mock_sync.return_value = {}
+
+        for app_config in apps.get_app_configs():
+            if app_config.models_module is not None:
+                post_migration_sync_handler(sender=app_config, apps=apps)
+
+        mock_sync.assert_called_once()
+        self.assertEqual(mock_sync.call_args.args[0], get_supabase_models())
+
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
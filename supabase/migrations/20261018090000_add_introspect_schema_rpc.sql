@@ -0,0 +1,51 @@
+-- スキーマ全体のカタログ情報を1回のRPCで取得する関数
+--
+-- テーブルごとのカラム（型・NULL許可・デフォルト値）、制約、インデックスを
+-- { "テーブル名": { "columns": [...], "constraints": [...], "indexes": [...] } }
+-- 形式のJSONBで返します。Django側の同期処理はこのスナップショットを元に
+-- テーブルの存在確認とスキーマ差分の計算を行います。
+CREATE OR REPLACE FUNCTION introspect_schema(p_schema TEXT DEFAULT 'public')
+RETURNS JSONB AS $$
+    SELECT COALESCE(jsonb_object_agg(t.relname, jsonb_build_object(
+        'columns', (
+            SELECT COALESCE(jsonb_agg(jsonb_build_object(
+                'column_name', a.attname,
+                'data_type', pg_catalog.format_type(a.atttypid, a.atttypmod),
+                'is_nullable', CASE WHEN a.attnotnull THEN 'NO' ELSE 'YES' END,
+                'column_default', pg_catalog.pg_get_expr(d.adbin, d.adrelid)
+            ) ORDER BY a.attnum), '[]'::jsonb)
+            FROM pg_catalog.pg_attribute a
+            LEFT JOIN pg_catalog.pg_attrdef d
+                ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+            WHERE a.attrelid = t.oid AND a.attnum > 0 AND NOT a.attisdropped
+        ),
+        'constraints', (
+            SELECT COALESCE(jsonb_agg(jsonb_build_object(
+                'name', c.conname,
+                'type', c.contype,
+                'definition', pg_catalog.pg_get_constraintdef(c.oid)
+            ) ORDER BY c.conname), '[]'::jsonb)
+            FROM pg_catalog.pg_constraint c
+            WHERE c.conrelid = t.oid
+        ),
+        'indexes', (
+            SELECT COALESCE(jsonb_agg(jsonb_build_object(
+                'name', i.relname,
+                'is_unique', x.indisunique,
+                'is_primary', x.indisprimary,
+                'definition', pg_catalog.pg_get_indexdef(x.indexrelid)
+            ) ORDER BY i.relname), '[]'::jsonb)
+            FROM pg_catalog.pg_index x
+            JOIN pg_catalog.pg_class i ON i.oid = x.indexrelid
+            WHERE x.indrelid = t.oid
+        )
+    )), '{}'::jsonb)
+    FROM pg_catalog.pg_class t
+    JOIN pg_catalog.pg_namespace n ON n.oid = t.relnamespace
+    WHERE n.nspname = p_schema
+      AND t.relkind IN ('r', 'p');
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
+
+-- 管理者権限で実行するため、スキーマ同期（service_role）以外からは実行できないようにする
+REVOKE EXECUTE ON FUNCTION introspect_schema FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION introspect_schema TO service_role;
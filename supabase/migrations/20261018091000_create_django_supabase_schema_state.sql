@@ -0,0 +1,12 @@
+-- Djangoモデルのスキーマ同期状態を記録するテーブル
+--
+-- sync_supabase コマンドとマイグレーション後の自動同期は、モデルから算出した
+-- スキーマのフィンガープリントをここに保存し、前回から変更のないモデルの
+-- 差分確認をスキップします。
+CREATE TABLE IF NOT EXISTS django_supabase_schema_state (
+    table_name TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    synced_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE django_supabase_schema_state IS 'Djangoモデルのスキーマ同期状態（フィンガープリント）';
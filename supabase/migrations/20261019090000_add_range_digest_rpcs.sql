@@ -0,0 +1,113 @@
+-- 主キー範囲ごとのダイジェストを計算する関数
+--
+-- DjangoモデルとSupabaseテーブルの内容を比較するため、主キーの範囲ごとに
+-- 行の正規化テキストを主キー順に連結したMD5を返します。
+-- Django側（techskillsquiz/supabase_consistency.py）は同じ正規化規則で
+-- ダイジェストを計算し、一致しない範囲のみを再帰的に分割して比較します。
+--
+-- 正規化規則:
+--   NULL                → \N
+--   boolean             → true / false
+--   timestamp(tz)       → UTCの YYYY-MM-DDTHH24:MI:SS.US
+--   date / time         → YYYY-MM-DD / HH24:MI:SS.US
+--   その他              → テキスト表現
+--   カラムの区切りは chr(31)、行の区切りは chr(30)
+--
+-- 管理者権限（SECURITY DEFINER）で任意のカラムを読むため、対象はスキーマ同期で
+-- 作成したテーブル（django_supabase_schema_state に記録されたテーブル）に限定し、
+-- 実行権限は整合性検証（service_role）のみに付与します。
+
+-- 行の正規化テキストを生成するSQL式を返す関数
+CREATE OR REPLACE FUNCTION range_digest_row_expression(p_table TEXT, p_columns TEXT[])
+RETURNS TEXT AS $$
+DECLARE
+    col TEXT;
+    col_type TEXT;
+    expr TEXT;
+    exprs TEXT[] := ARRAY[]::TEXT[];
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM public.django_supabase_schema_state s WHERE s.table_name = p_table) THEN
+        RAISE EXCEPTION 'table % is not a mirrored table', p_table;
+    END IF;
+
+    FOREACH col IN ARRAY p_columns LOOP
+        SELECT pg_catalog.format_type(a.atttypid, NULL) INTO col_type
+        FROM pg_catalog.pg_attribute a
+        WHERE a.attrelid = format('public.%I', p_table)::regclass
+          AND a.attname = col
+          AND a.attnum > 0
+          AND NOT a.attisdropped;
+
+        IF col_type IS NULL THEN
+            RAISE EXCEPTION 'column %.% does not exist', p_table, col;
+        END IF;
+
+        expr := CASE col_type
+            WHEN 'boolean' THEN format('CASE WHEN t.%I THEN ''true'' ELSE ''false'' END', col)
+            WHEN 'timestamp with time zone' THEN format('to_char(t.%I AT TIME ZONE ''UTC'', ''YYYY-MM-DD"T"HH24:MI:SS.US'')', col)
+            WHEN 'timestamp without time zone' THEN format('to_char(t.%I, ''YYYY-MM-DD"T"HH24:MI:SS.US'')', col)
+            WHEN 'time without time zone' THEN format('to_char(DATE ''2000-01-01'' + t.%I, ''HH24:MI:SS.US'')', col)
+            WHEN 'date' THEN format('to_char(t.%I, ''YYYY-MM-DD'')', col)
+            ELSE format('t.%I::text', col)
+        END;
+
+        exprs := exprs || format('COALESCE(%s, E''\\N'')', expr);
+    END LOOP;
+
+    RETURN format('array_to_string(ARRAY[%s], chr(31))', array_to_string(exprs, ', '));
+END;
+$$ LANGUAGE plpgsql STABLE SECURITY DEFINER;
+
+-- 連続する主キー範囲 [p_bounds[i], p_bounds[i+1]) ごとの件数とダイジェストを返す関数
+CREATE OR REPLACE FUNCTION range_digests(p_table TEXT, p_pk TEXT, p_columns TEXT[], p_bounds BIGINT[])
+RETURNS JSONB AS $$
+DECLARE
+    result JSONB;
+BEGIN
+    EXECUTE format(
+        'SELECT COALESCE(jsonb_agg(jsonb_build_object(
+             ''lo'', b.lo, ''hi'', b.hi, ''row_count'', d.row_count, ''digest'', d.digest
+         ) ORDER BY b.lo), ''[]''::jsonb)
+         FROM (
+             SELECT $1[i] AS lo, $1[i + 1] AS hi
+             FROM generate_series(1, array_length($1, 1) - 1) AS i
+         ) b
+         CROSS JOIN LATERAL (
+             SELECT count(*) AS row_count,
+                    md5(COALESCE(string_agg(%s, chr(30) ORDER BY t.%I), '''')) AS digest
+             FROM public.%I t
+             WHERE t.%I >= b.lo AND t.%I < b.hi
+         ) d',
+        range_digest_row_expression(p_table, p_columns), p_pk, p_table, p_pk, p_pk
+    ) INTO result USING p_bounds;
+
+    RETURN result;
+END;
+$$ LANGUAGE plpgsql STABLE SECURITY DEFINER;
+
+-- 主キー範囲 [p_lo, p_hi) の行ごとのダイジェストを [主キー, ダイジェスト] の配列で返す関数
+CREATE OR REPLACE FUNCTION range_row_digests(p_table TEXT, p_pk TEXT, p_columns TEXT[], p_lo BIGINT, p_hi BIGINT)
+RETURNS JSONB AS $$
+DECLARE
+    result JSONB;
+BEGIN
+    EXECUTE format(
+        'SELECT COALESCE(jsonb_agg(jsonb_build_array(t.%I, md5(%s)) ORDER BY t.%I), ''[]''::jsonb)
+         FROM public.%I t
+         WHERE t.%I >= $1 AND t.%I < $2',
+        p_pk, range_digest_row_expression(p_table, p_columns), p_pk, p_table, p_pk, p_pk
+    ) INTO result USING p_lo, p_hi;
+
+    RETURN result;
+END;
+$$ LANGUAGE plpgsql STABLE SECURITY DEFINER;
+
+-- 管理者権限で実行するため、整合性検証（service_role）以外からは実行できないようにする
+REVOKE EXECUTE ON FUNCTION range_digest_row_expression FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION range_digest_row_expression TO service_role;
+
+REVOKE EXECUTE ON FUNCTION range_digests FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION range_digests TO service_role;
+
+REVOKE EXECUTE ON FUNCTION range_row_digests FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION range_row_digests TO service_role;
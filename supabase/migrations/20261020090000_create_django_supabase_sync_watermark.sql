@@ -0,0 +1,15 @@
+-- Djangoとのデータ差分同期の進捗（ウォーターマーク）を記録するテーブル
+--
+-- sync_supabase --data は updated_at がウォーターマークより新しい行のみを送信し、
+-- バッチのupsertが完了するごとに (updated_at, 主キー) をここに保存します。
+-- direction は同期の方向（push: Django → Supabase、pull: Supabase → Django）です。
+CREATE TABLE IF NOT EXISTS django_supabase_sync_watermark (
+    table_name TEXT NOT NULL,
+    direction TEXT NOT NULL DEFAULT 'push' CHECK (direction IN ('push', 'pull')),
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    last_pk TEXT,
+    synced_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (table_name, direction)
+);
+
+COMMENT ON TABLE django_supabase_sync_watermark IS 'Djangoとのデータ差分同期のウォーターマーク（updated_at と主キー）';
@@ -0,0 +1,12 @@
+-- Djangoのデータベースの論理レプリケーションによるミラーリングの進捗（LSN）を記録するテーブル
+--
+-- replicate_supabase はレプリケーションスロットから読み込んだ変更をバッチでこのデータベースに反映し、
+-- 同じトランザクションで反映済みの最後のトランザクションのコミットLSNをここに保存します。
+-- 再起動時はこのLSN以前にコミットされたトランザクションを読み飛ばすため、同じ変更は二重に反映されません。
+CREATE TABLE IF NOT EXISTS django_supabase_replication_checkpoint (
+    slot_name TEXT PRIMARY KEY,
+    lsn PG_LSN NOT NULL,
+    applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE django_supabase_replication_checkpoint IS 'Djangoのデータベースからの論理レプリケーションの反映済みLSN';
@@ -0,0 +1,45 @@
+-- ユーザーごとの統計・活動履歴のキャッシュを無効化するための通知トリガー
+--
+-- quiz_userstatistics / quiz_activityhistory は trigger_update_user_statistics が更新するため、
+-- Django側では変更を検知できません。これらのテーブルと quiz_quizresult の変更時に
+-- チャンネル quiz_user_cache へ {"table": ..., "op": ..., "user_id": ...} をNOTIFYし、
+-- Djangoの listen_cache_invalidation コマンドが該当ユーザーのキャッシュを無効化します。
+-- NOTIFYはコミット時に配信され、同じトランザクション内の同一ペイロードは1件にまとめられます。
+CREATE OR REPLACE FUNCTION notify_user_cache_invalidation()
+RETURNS TRIGGER AS $$
+DECLARE
+    row_user_id INTEGER;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        row_user_id := OLD.user_id;
+    ELSE
+        row_user_id := NEW.user_id;
+    END IF;
+
+    PERFORM pg_notify('quiz_user_cache', json_build_object(
+        'table', TG_TABLE_NAME,
+        'op', TG_OP,
+        'user_id', row_user_id
+    )::text);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS notify_quiz_quizresult_user_cache ON quiz_quizresult;
+CREATE TRIGGER notify_quiz_quizresult_user_cache
+    AFTER INSERT OR UPDATE OR DELETE ON quiz_quizresult
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_user_cache_invalidation();
+
+DROP TRIGGER IF EXISTS notify_quiz_userstatistics_user_cache ON quiz_userstatistics;
+CREATE TRIGGER notify_quiz_userstatistics_user_cache
+    AFTER INSERT OR UPDATE OR DELETE ON quiz_userstatistics
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_user_cache_invalidation();
+
+DROP TRIGGER IF EXISTS notify_quiz_activityhistory_user_cache ON quiz_activityhistory;
+CREATE TRIGGER notify_quiz_activityhistory_user_cache
+    AFTER INSERT OR UPDATE OR DELETE ON quiz_activityhistory
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_user_cache_invalidation();
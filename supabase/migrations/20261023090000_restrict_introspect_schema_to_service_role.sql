@@ -0,0 +1,7 @@
+-- introspect_schema の実行権限を service_role のみに制限する
+--
+-- introspect_schema は管理者権限（SECURITY DEFINER）で public スキーマ全体の
+-- テーブル・カラム・制約・インデックス定義を返すため、未認証のクライアントに公開しない。
+-- 権限を付与していた以前の版を適用済みのデータベース向けに、権限を取り消します。
+REVOKE EXECUTE ON FUNCTION introspect_schema(TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION introspect_schema(TEXT) TO service_role;
@@ -0,0 +1,59 @@
+-- 範囲ダイジェストの関数の対象テーブルと実行権限を制限する
+--
+-- range_digest_row_expression / range_digests / range_row_digests は管理者権限
+-- （SECURITY DEFINER）で任意のテーブル・カラムの行ごとのMD5を返すため、
+-- anon / authenticated から実行できるとRLSを迂回して値や行の存在を推測できてしまう。
+-- 権限を付与していた以前の版を適用済みのデータベース向けに、
+-- 対象をスキーマ同期で作成したテーブル（django_supabase_schema_state に記録されたテーブル）に限定し、
+-- 実行権限を service_role のみにします。range_digests と range_row_digests は
+-- range_digest_row_expression を経由するため、この関数の確認が両方に適用されます。
+
+-- 行の正規化テキストを生成するSQL式を返す関数
+CREATE OR REPLACE FUNCTION range_digest_row_expression(p_table TEXT, p_columns TEXT[])
+RETURNS TEXT AS $$
+DECLARE
+    col TEXT;
+    col_type TEXT;
+    expr TEXT;
+    exprs TEXT[] := ARRAY[]::TEXT[];
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM public.django_supabase_schema_state s WHERE s.table_name = p_table) THEN
+        RAISE EXCEPTION 'table % is not a mirrored table', p_table;
+    END IF;
+
+    FOREACH col IN ARRAY p_columns LOOP
+        SELECT pg_catalog.format_type(a.atttypid, NULL) INTO col_type
+        FROM pg_catalog.pg_attribute a
+        WHERE a.attrelid = format('public.%I', p_table)::regclass
+          AND a.attname = col
+          AND a.attnum > 0
+          AND NOT a.attisdropped;
+
+        IF col_type IS NULL THEN
+            RAISE EXCEPTION 'column %.% does not exist', p_table, col;
+        END IF;
+
+        expr := CASE col_type
+            WHEN 'boolean' THEN format('CASE WHEN t.%I THEN ''true'' ELSE ''false'' END', col)
+            WHEN 'timestamp with time zone' THEN format('to_char(t.%I AT TIME ZONE ''UTC'', ''YYYY-MM-DD"T"HH24:MI:SS.US'')', col)
+            WHEN 'timestamp without time zone' THEN format('to_char(t.%I, ''YYYY-MM-DD"T"HH24:MI:SS.US'')', col)
+            WHEN 'time without time zone' THEN format('to_char(DATE ''2000-01-01'' + t.%I, ''HH24:MI:SS.US'')', col)
+            WHEN 'date' THEN format('to_char(t.%I, ''YYYY-MM-DD'')', col)
+            ELSE format('t.%I::text', col)
+        END;
+
+        exprs := exprs || format('COALESCE(%s, E''\\N'')', expr);
+    END LOOP;
+
+    RETURN format('array_to_string(ARRAY[%s], chr(31))', array_to_string(exprs, ', '));
+END;
+$$ LANGUAGE plpgsql STABLE SECURITY DEFINER;
+
+REVOKE EXECUTE ON FUNCTION range_digest_row_expression(TEXT, TEXT[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION range_digest_row_expression(TEXT, TEXT[]) TO service_role;
+
+REVOKE EXECUTE ON FUNCTION range_digests(TEXT, TEXT, TEXT[], BIGINT[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION range_digests(TEXT, TEXT, TEXT[], BIGINT[]) TO service_role;
+
+REVOKE EXECUTE ON FUNCTION range_row_digests(TEXT, TEXT, TEXT[], BIGINT, BIGINT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION range_row_digests(TEXT, TEXT, TEXT[], BIGINT, BIGINT) TO service_role;
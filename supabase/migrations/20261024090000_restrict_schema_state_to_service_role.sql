@@ -0,0 +1,10 @@
+-- django_supabase_schema_state を service_role 専用にする
+--
+-- スキーマのフィンガープリントは sync_supabase コマンドが service_role の
+-- クライアントでのみ読み書きする。anon・authenticated から書き換えられると
+-- 差分確認が不正にスキップされるため、RLS を有効にしてポリシーを作らず、
+-- テーブルの権限も取り消します（service_role は RLS をバイパスします）。
+ALTER TABLE django_supabase_schema_state ENABLE ROW LEVEL SECURITY;
+
+REVOKE ALL ON TABLE django_supabase_schema_state FROM PUBLIC, anon, authenticated;
+GRANT SELECT, INSERT, UPDATE, DELETE ON TABLE django_supabase_schema_state TO service_role;
@@ -0,0 +1,66 @@
+-- 範囲ダイジェストの対象テーブルを明示的な許可リストで管理する
+--
+-- range_digest_row_expression はこれまで django_supabase_schema_state（スキーマのフィンガープリントの
+-- キャッシュ）に記録されたテーブルを対象としていたが、キャッシュは --force や手動の削除で変わり、
+-- 対象の可否を決める用途には向かない。sync_supabase がミラーリング対象のモデルのテーブルを
+-- service_role のクライアントで django_supabase_mirrored_tables に登録し、関数はこのテーブルのみを確認します。
+CREATE TABLE IF NOT EXISTS django_supabase_mirrored_tables (
+    table_name TEXT PRIMARY KEY,
+    registered_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE django_supabase_mirrored_tables IS '範囲ダイジェストの対象とするDjangoモデルのミラーテーブル';
+
+-- service_role 専用（RLSを有効にしてポリシーを作らない。service_role は RLS をバイパスします）
+ALTER TABLE django_supabase_mirrored_tables ENABLE ROW LEVEL SECURITY;
+REVOKE ALL ON TABLE django_supabase_mirrored_tables FROM PUBLIC, anon, authenticated;
+GRANT SELECT, INSERT, UPDATE, DELETE ON TABLE django_supabase_mirrored_tables TO service_role;
+
+-- 適用済みのデータベースでは次回の同期までの間も検証できるよう、同期済みのテーブルを登録しておく
+INSERT INTO django_supabase_mirrored_tables (table_name)
+SELECT s.table_name FROM django_supabase_schema_state s
+ON CONFLICT (table_name) DO NOTHING;
+
+-- 行の正規化テキストを生成するSQL式を返す関数
+CREATE OR REPLACE FUNCTION range_digest_row_expression(p_table TEXT, p_columns TEXT[])
+RETURNS TEXT AS $$
+DECLARE
+    col TEXT;
+    col_type TEXT;
+    expr TEXT;
+    exprs TEXT[] := ARRAY[]::TEXT[];
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM public.django_supabase_mirrored_tables m WHERE m.table_name = p_table) THEN
+        RAISE EXCEPTION 'table % is not a mirrored table', p_table;
+    END IF;
+
+    FOREACH col IN ARRAY p_columns LOOP
+        SELECT pg_catalog.format_type(a.atttypid, NULL) INTO col_type
+        FROM pg_catalog.pg_attribute a
+        WHERE a.attrelid = format('public.%I', p_table)::regclass
+          AND a.attname = col
+          AND a.attnum > 0
+          AND NOT a.attisdropped;
+
+        IF col_type IS NULL THEN
+            RAISE EXCEPTION 'column %.% does not exist', p_table, col;
+        END IF;
+
+        expr := CASE col_type
+            WHEN 'boolean' THEN format('CASE WHEN t.%I THEN ''true'' ELSE ''false'' END', col)
+            WHEN 'timestamp with time zone' THEN format('to_char(t.%I AT TIME ZONE ''UTC'', ''YYYY-MM-DD"T"HH24:MI:SS.US'')', col)
+            WHEN 'timestamp without time zone' THEN format('to_char(t.%I, ''YYYY-MM-DD"T"HH24:MI:SS.US'')', col)
+            WHEN 'time without time zone' THEN format('to_char(DATE ''2000-01-01'' + t.%I, ''HH24:MI:SS.US'')', col)
+            WHEN 'date' THEN format('to_char(t.%I, ''YYYY-MM-DD'')', col)
+            ELSE format('t.%I::text', col)
+        END;
+
+        exprs := exprs || format('COALESCE(%s, E''\\N'')', expr);
+    END LOOP;
+
+    RETURN format('array_to_string(ARRAY[%s], chr(31))', array_to_string(exprs, ', '));
+END;
+$$ LANGUAGE plpgsql STABLE SECURITY DEFINER;
+
+REVOKE EXECUTE ON FUNCTION range_digest_row_expression(TEXT, TEXT[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION range_digest_row_expression(TEXT, TEXT[]) TO service_role;